@@ -0,0 +1,64 @@
+from context import pyneb
+ 
+import numpy as np
+
+import itertools
+import os
+import sys
+import tempfile
+import time
+
+"""
+Time spent in ForceLogger.log and the final flush/close, on the optimizer's
+thread, with loggerSettings["asyncWrite"] False (the file is opened, resized
+and closed every writeFreq evaluations) and True (one open file, written by 
+a background thread). Every evaluation first waits evalTime seconds, standing
+in for the potential; the overhead reported excludes it. h5py holds the GIL
+while writing, so the background writes overlap with the evaluations rather
+than with other Python code. The logs are checked to be identical.
+
+Run as
+    python main.py [nEvals]
+to log nEvals force evaluations (default 2000).
+"""
+
+def pot(coords):
+    return coords[:,0]**2 + coords[:,1]**2
+
+if __name__ == "__main__":
+    nEvals = 2000
+    if len(sys.argv) > 1:
+        nEvals = int(sys.argv[1])
+    
+    tmpDir = tempfile.TemporaryDirectory()
+    os.chdir(tmpDir.name)
+    
+    print("nPts | writeFreq | evalTime (s) | sync: overhead (s) | async: overhead (s) | same log")
+    for nPts in [50,500]:
+        variablesDict = {nm:np.random.rand(nPts,2) for nm in \
+                         ["points","tangents","springForce","netForce"]}
+        for (writeFreq,evalTime) in itertools.product([1,10,50],[0,0.001]):
+            times = []
+            logs = []
+            for asyncWrite in [False,True]:
+                logName = "sync" if not asyncWrite else "async"
+                lap = pyneb.LeastActionPath(pot,nPts,2,logLevel=1,\
+                                            loggerSettings={"writeFreq":writeFreq,\
+                                                            "logName":logName,\
+                                                            "asyncWrite":asyncWrite})
+                t0 = time.time()
+                for evalIter in range(nEvals):
+                    time.sleep(evalTime)
+                    lap.logger.log(variablesDict)
+                lap.logger.flush()
+                lap.logger.close()
+                times.append(time.time() - t0 - nEvals*evalTime)
+                logs.append(pyneb.LoadForceLogger("logs/"+logName+".lap"))
+                
+            sameLog = all(np.array_equal(getattr(logs[0],nm),getattr(logs[1],nm)) \
+                          for nm in variablesDict)
+            print("%4d | %9d | %12.3f | %18.3f | %19.3f | %s" % \
+                  (nPts,writeFreq,evalTime,times[0],times[1],sameLog))
+                
+    os.chdir("/")
+    tmpDir.cleanup()
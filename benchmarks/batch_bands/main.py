@@ -0,0 +1,66 @@
+from context import pyneb
+ 
+import numpy as np
+
+import time
+
+"""
+Relaxes one band per spring constant, as in benchmarks/neb_params, either one
+band at a time with VerletMinimization or all at once with
+BatchVerletMinimization. The batched run calls the potential once per iteration
+on every image of every band, and computes the action gradient of all bands
+with forward_action_batch_grad.
+"""
+
+def camelback(coords):
+    ndims = coords.ndim
+    x, y = coords[(ndims-1)*(slice(None),)+(0,)], coords[(ndims-1)*(slice(None),)+(1,)]
+    
+    return (4 - 2.1*(x**2) + (1/3) * (x**4))*(x**2) + x*y + 4*((y**2) - 1)*(y**2) + 1.0315488275145395
+
+def initial_path(nPts):
+    return np.array([np.linspace(-1.7,1.7,nPts),np.linspace(0.79,-0.79,nPts)]).T
+
+def run_serial(kVals,nPts,tStep,nIters):
+    allFinalPts = np.zeros((len(kVals),nPts,2))
+    for (kIter,k) in enumerate(kVals):
+        lap = pyneb.LeastActionPath(camelback,nPts,2,endpointSpringForce=False,
+                                    endpointHarmonicForce=False,nebParams={"k":k},
+                                    logLevel=0)
+        nebObj = pyneb.VerletMinimization(lap,initial_path(nPts))
+        nebObj.fire(tStep,nIters,useLocal=False,earlyStop=False,
+                    fireParams={"maxmove":np.array(2*[0.2])})
+        allFinalPts[kIter] = nebObj.allPts[-1]
+    return allFinalPts
+
+def run_batch(kVals,nPts,tStep,nIters):
+    lap = pyneb.LeastActionPath(camelback,nPts,2,endpointSpringForce=False,
+                                endpointHarmonicForce=False,nebParams={"k":kVals},
+                                logLevel=0)
+    initialPoints = np.array(len(kVals)*[initial_path(nPts)])
+    nebObj = pyneb.BatchVerletMinimization(lap,initialPoints)
+    nebObj.fire(tStep,nIters,useLocal=False,earlyStop=False,
+                fireParams={"maxmove":np.array(2*[0.2])})
+    return nebObj.allPts[-1]
+
+if __name__ == "__main__":
+    kVals = np.array([0.01,0.05,0.1,0.5,1,5,10])
+    nPtsArr = [20,40]
+    tStep = 0.1
+    nIters = 200
+    
+    #The gradients of the action agree only to within the finite-difference error,
+    #so the bands are compared by their action rather than point-by-point
+    print("nPts | serial (s) | batch (s) | max rel. difference in final action")
+    for nPts in nPtsArr:
+        t0 = time.time()
+        serialPts = run_serial(kVals,nPts,tStep,nIters)
+        t1 = time.time()
+        batchPts = run_batch(kVals,nPts,tStep,nIters)
+        t2 = time.time()
+        
+        serialAction = np.array([pyneb.TargetFunctions.action(p,camelback)[0] for p in serialPts])
+        batchAction = np.array([pyneb.TargetFunctions.action(p,camelback)[0] for p in batchPts])
+        relDiff = np.max(np.abs(serialAction-batchAction)/serialAction)
+        
+        print("%4d | %10.3f | %9.3f | %.2e" % (nPts,t1-t0,t2-t1,relDiff))
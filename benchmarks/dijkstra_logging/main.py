@@ -0,0 +1,75 @@
+from context import pyneb
+ 
+import numpy as np
+
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+"""
+Time spent writing and loading the Dijkstra log, and its size, on an N x N 
+grid with every node of the last row as an endpoint. Compared against the 
+solver's own phases: the search (Dijkstra._construct_path_dict) and the rest 
+of Dijkstra.__call__ (tracing the paths and looking up their coordinates). 
+The paths loaded from the log are checked against the ones returned by the 
+solver.
+
+Run as
+    python main.py [N]
+for an N x N grid (default 500).
+"""
+
+if __name__ == "__main__":
+    nPtsPerDim = 500
+    if len(sys.argv) > 1:
+        nPtsPerDim = int(sys.argv[1])
+    
+    tmpDir = tempfile.TemporaryDirectory()
+    os.chdir(tmpDir.name)
+    warnings.simplefilter("ignore")
+    
+    x = np.linspace(0,1,nPtsPerDim)
+    coordMeshTuple = np.meshgrid(x,x)
+    zz = 1 + np.sin(3*coordMeshTuple[0])**2 + coordMeshTuple[1]
+    allowedEndpoints = np.array([x,np.ones(nPtsPerDim)]).T
+    
+    djk = pyneb.Dijkstra(np.zeros(2),coordMeshTuple,zz,allowedEndpoints=allowedEndpoints,\
+                         fName="log")
+    
+    #Timing the writes only, and the search
+    times = {"write":0.,"search":0.}
+    write = djk.djkLogger._write_level_1
+    def timed_write(*args):
+        t0 = time.time()
+        write(*args)
+        times["write"] += time.time() - t0
+    djk.djkLogger._write_level_1 = timed_write
+    search = djk._construct_path_dict
+    def timed_search():
+        t0 = time.time()
+        out = search()
+        times["search"] += time.time() - t0
+        return out
+    djk._construct_path_dict = timed_search
+    
+    t0 = time.time()
+    pathIndsDict, pathArrDict, distanceDict = djk(returnAll=True)
+    totalTime = time.time() - t0
+    
+    t0 = time.time()
+    log = pyneb.LoadDijkstraLogger("logs/log.djk")
+    loadTime = time.time() - t0
+    samePaths = all(np.array_equal(log.pathArrDict[key],path) for (key,path) in \
+                    pathArrDict.items())
+    samePaths = samePaths and \
+        sorted(map(tuple,log.allPathsIndsDict.values())) == sorted(map(tuple,pathIndsDict.values()))
+    
+    print("search (s) | rest of __call__ (s) | log writes (s) | log size (MB) | eager load (s) | same paths")
+    print("%10.3f | %20.3f | %14.3f | %13.2f | %14.3f | %s" % \
+          (times["search"],totalTime-times["search"]-times["write"],times["write"],\
+           os.path.getsize("logs/log.djk")/1e6,loadTime,samePaths))
+    
+    os.chdir("/")
+    tmpDir.cleanup()
@@ -0,0 +1,113 @@
+from context import pyneb
+ 
+import numpy as np
+
+import sys
+import time
+import warnings
+
+"""
+Time for the Dijkstra solver on 2D and 3D grids of increasing size. Before
+Dijkstra._construct_path_dict used a binary heap, the next node was found by
+an argmin over the full grid at every step; that scan is kept here as a
+reference on the smaller grids, both for timing and to check that the two find
+the same distances. The heap search is also timed with the weights of each
+node computed when it is visited (maxWeightsMemory=0), as is done when the
+weights of the whole grid would not fit in memory.
+
+Run as
+    python main.py [maxExponent]
+to go up to 10**maxExponent nodes (default 6; 7 takes a few minutes).
+"""
+
+def argmin_scan_distances(djk):
+    tentativeDistance = np.ma.masked_array(np.full(djk.potArr.shape,np.inf),mask=False)
+    tentativeDistance[djk.initialInds] = 0
+    relativeNeighborInds = \
+        np.array([r for r in np.ndindex(djk.nDims*(3,)) if r != djk.nDims*(1,)]) - 1
+    maxInds = np.array(djk.potArr.shape)
+    
+    remainingEndpoints = set(djk.endpointIndices)
+    while remainingEndpoints:
+        currentInds = np.unravel_index(np.argmin(tentativeDistance),djk.potArr.shape)
+        neighborInds = np.array(currentInds) - relativeNeighborInds
+        neighborInds = neighborInds[np.all((neighborInds>=0)&(neighborInds<maxInds),axis=1)]
+        neighborInds = neighborInds[~tentativeDistance.mask[tuple(neighborInds.T)]]
+        
+        #Per-edge calls to djk.target_func
+        coords = np.zeros((2,djk.nDims))
+        coords[0] = [c[currentInds] for c in djk.coordMeshTuple]
+        enegs = np.zeros(2)
+        enegs[0] = djk.potArr[currentInds]
+        masses = np.zeros((2,)+2*(djk.nDims,))
+        masses[0] = djk.inertArr[currentInds]
+        for n in neighborInds:
+            n = tuple(n)
+            coords[1] = [c[n] for c in djk.coordMeshTuple]
+            enegs[1] = djk.potArr[n]
+            masses[1] = djk.inertArr[n]
+            distThroughCurrent = tentativeDistance.data[currentInds] + \
+                djk.target_func(coords,enegs,masses)[0]
+            if distThroughCurrent < tentativeDistance.data[n]:
+                tentativeDistance.data[n] = distThroughCurrent
+        
+        tentativeDistance[currentInds] = np.ma.masked
+        remainingEndpoints.discard(tuple(int(c) for c in currentInds))
+    
+    return tentativeDistance.data
+
+def make_solver(nDims,nNodes):
+    nPerDim = int(round(nNodes**(1/nDims)))
+    uniqueCoords = [np.linspace(-2,2,nPerDim) for dimIter in range(nDims)]
+    coordMeshTuple = np.meshgrid(*uniqueCoords)
+    potArr = sum([np.cos(3*c)**2 for c in coordMeshTuple]) + 0.1*coordMeshTuple[0]
+    
+    initialPoint = np.array(nDims*[-2.])
+    finalPoint = np.array(nDims*[2.])
+    
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        djk = pyneb.Dijkstra(initialPoint,coordMeshTuple,potArr,\
+                             allowedEndpoints=finalPoint,logLevel=0)
+    return djk
+
+if __name__ == "__main__":
+    maxExponent = 6
+    if len(sys.argv) > 1:
+        maxExponent = int(sys.argv[1])
+    #The argmin scan is quadratic in the number of nodes
+    maxReferenceExponent = 4
+    
+    print("nDims | nNodes   | weights (s) | heap total (s) | per node (s) |"+\
+          " argmin scan (s) | endpoint distance | difference")
+    for nDims in [2,3]:
+        relativeNeighborInds = np.array([r for r in np.ndindex(nDims*(3,)) if \
+                                         r != nDims*(1,)]) - 1
+        for exponent in range(3,maxExponent+1):
+            djk = make_solver(nDims,10**exponent)
+            
+            #The preprocessing stage on its own
+            t0 = time.time()
+            pyneb.SurfaceUtils.grid_edge_weights(djk.coordMeshTuple,djk.potArr,\
+                                                 relativeNeighborInds,djk.inertArr,\
+                                                 djk.target_func)
+            t1 = time.time()
+            dist, _, _ = djk._construct_path_dict()
+            t2 = time.time()
+            endpointDist = dist.data[djk.endpointIndices[0]]
+            
+            djk.maxWeightsMemory = 0
+            t0PerNode = time.time()
+            perNodeDist, _, _ = djk._construct_path_dict()
+            tPerNode = time.time() - t0PerNode
+            assert perNodeDist.data[djk.endpointIndices[0]] == endpointDist
+            
+            if exponent <= maxReferenceExponent:
+                refDist = argmin_scan_distances(djk)
+                t3 = time.time()
+                print("%5d | %8d | %11.2f | %14.2f | %12.2f | %15.2f | %17.6f | %.1e" % \
+                      (nDims,djk.potArr.size,t1-t0,t2-t1,tPerNode,t3-t2,endpointDist,\
+                       np.abs(refDist[djk.endpointIndices[0]]-endpointDist)))
+            else:
+                print("%5d | %8d | %11.2f | %14.2f | %12.2f | %15s | %17.6f | %s" % \
+                      (nDims,djk.potArr.size,t1-t0,t2-t1,tPerNode,"-",endpointDist,"-"))
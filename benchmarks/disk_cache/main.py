@@ -0,0 +1,66 @@
+from context import pyneb
+ 
+import numpy as np
+
+import os
+import sys
+import tempfile
+import time
+
+"""
+Number of potential evaluations for repeated NEB runs on the same surface,
+with the potential wrapped in a DiskEvaluationCache (and an EvaluationCache,
+for the repeated points within one force evaluation). The potential is the
+shifted camelback, made slow by sleeping for a fixed time per point, as a
+stand-in for an external model evaluation.
+
+The first run evaluates every point. Rerunning with the same parameters (e.g.
+after a crash, up to the last values written) evaluates nothing; rerunning with different nebParams follows
+the first run until the paths separate.
+
+Run as
+    python main.py [msPerPoint]
+to sleep for msPerPoint milliseconds per point (default 0.2).
+"""
+
+class SlowPotential:
+    def __init__(self,secPerPoint):
+        self.secPerPoint = secPerPoint
+        self.nEvals = 0
+    
+    def __call__(self,coords):
+        self.nEvals += coords.shape[0]
+        time.sleep(self.secPerPoint*coords.shape[0])
+        x, y = coords[:,0], coords[:,1]
+        return (4 - 2.1*(x**2) + (1/3) * (x**4))*(x**2) + x*y + \
+            4*((y**2) - 1)*(y**2) + 1.0315488275145395
+
+if __name__ == "__main__":
+    msPerPoint = 0.2
+    if len(sys.argv) > 1:
+        msPerPoint = float(sys.argv[1])
+    
+    nPts = 12
+    nDims = 2
+    initialPoints = np.linspace([-1.7,0.8],[1.7,-0.8],nPts)
+    initialPoints[1:-1,1] += 0.3
+    
+    with tempfile.TemporaryDirectory() as tmpDir:
+        fName = os.path.join(tmpDir,"camelback.h5")
+        
+        print("run                | time (s) | potential evals | final action")
+        for (runName,k) in [("first, k=10",10),("repeat, k=10",10),("new params, k=5",5)]:
+            slowPot = SlowPotential(msPerPoint/1000)
+            diskCache = pyneb.DiskEvaluationCache(slowPot,fName,writeFreq=100)
+            potential = pyneb.EvaluationCache(diskCache)
+            lap = pyneb.LeastActionPath(potential,nPts,nDims,nebParams={"k":k,"kappa":20},\
+                                        logLevel=0)
+            minObj = pyneb.VerletMinimization(lap,initialPoints)
+            
+            t0 = time.time()
+            minObj.velocity_verlet(0.1,50)
+            diskCache.flush()
+            runTime = time.time() - t0
+            
+            finalAction = pyneb.TargetFunctions.action(minObj.allPts[-1],SlowPotential(0))[0]
+            print("%-18s | %8.2f | %15d | %.6f" % (runName,runTime,slowPot.nEvals,finalAction))
@@ -0,0 +1,113 @@
+from context import pyneb
+ 
+import numpy as np
+
+import sys
+import time
+import warnings
+
+"""
+Time for one DynamicProgramming slice transition, on 3D grids with slices of
+increasing size. Before DynamicProgramming._select_prior_points evaluated all
+(previous, current) pairs as arrays, it called target_func once per pair; that
+loop is kept here as a reference on the smaller slices, both for timing and to
+check that the two agree. The windowed search (searchRange) is timed on the
+same slices, and then used for a full run on a 4D grid.
+
+Run as
+    python main.py [maxSliceLen]
+for slices of up to maxSliceLen x maxSliceLen points (default 100).
+"""
+
+def loop_select_prior_points(dp,currentIdx,previousIndsArr,distArr):
+    for idx in dp._gen_slice_inds(currentIdx):
+        coords = np.zeros((2,dp.nDims))
+        coords[1] = [c[idx] for c in dp.coordMeshTuple]
+        enegs = np.zeros((2,))
+        enegs[1] = dp.potArr[idx]
+        masses = np.zeros((2,dp.nDims,dp.nDims))
+        masses[1] = dp.inertArr[idx]
+        
+        for p in dp._gen_slice_inds(currentIdx-1):
+            coords[0] = [c[p] for c in dp.coordMeshTuple]
+            enegs[0] = dp.potArr[p]
+            masses[0] = dp.inertArr[p]
+            
+            tentDist = distArr[p] + dp.target_func(coords,enegs,masses)[0]
+            if tentDist < distArr[idx]:
+                previousIndsArr[idx] = p
+                distArr[idx] = tentDist
+    
+    return previousIndsArr, distArr
+
+def make_solver(sliceLen):
+    #The slices are along the first coordinate
+    uniqueCoords = [np.linspace(0,1,4),np.linspace(-2,2,sliceLen),np.linspace(-1,1,sliceLen)]
+    coordMeshTuple = np.meshgrid(*uniqueCoords)
+    potArr = 1 + np.cos(3*coordMeshTuple[1])**2 + coordMeshTuple[2]**2
+    inertArr = np.zeros(potArr.shape+(3,3))
+    inertArr[...,0,0] = 1 + coordMeshTuple[2]**2
+    inertArr[...,1,1] = 1
+    inertArr[...,2,2] = 2
+    
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        dp = pyneb.DynamicProgramming(np.array([0.,-2,-1]),coordMeshTuple,potArr,\
+                                      inertArr=inertArr,allowedEndpoints=np.array([1.,2,1]),\
+                                      logLevel=0)
+    return dp
+
+if __name__ == "__main__":
+    maxSliceLen = 100
+    if len(sys.argv) > 1:
+        maxSliceLen = int(sys.argv[1])
+    #The per-pair loop takes over a minute for 50x50 slices
+    maxReferenceLen = 20
+    
+    rng = np.random.default_rng(0)
+    
+    searchRange = 3
+    
+    print("slice size | vectorized (s) | window %d (s) | loop (s) | max |dist difference| |"%searchRange+\
+          " same previous inds")
+    for sliceLen in [10,20,50,100,200]:
+        if sliceLen > maxSliceLen:
+            break
+        dp = make_solver(sliceLen)
+        
+        previousIndsArr = -1*np.ones(dp.potArr.shape+(3,),dtype=int)
+        distArr = np.full(dp.potArr.shape,np.inf)
+        distArr[:,1] = rng.random(distArr[:,1].shape)
+        
+        t0 = time.time()
+        newInds, newDist = dp._select_prior_points(2,previousIndsArr.copy(),distArr.copy())
+        t1 = time.time()
+        dp._select_prior_points(2,previousIndsArr.copy(),distArr.copy(),searchRange)
+        t2 = time.time()
+        
+        if sliceLen <= maxReferenceLen:
+            loopInds, loopDist = loop_select_prior_points(dp,2,previousIndsArr.copy(),\
+                                                          distArr.copy())
+            t3 = time.time()
+            print("%10s | %14.3f | %12.3f | %8.2f | %25.1e | %s" % \
+                  ("%dx%d"%(sliceLen,sliceLen),t1-t0,t2-t1,t3-t2,\
+                   np.max(np.abs(newDist[:,2]-loopDist[:,2])),\
+                   np.array_equal(newInds,loopInds)))
+        else:
+            print("%10s | %14.3f | %12.3f | %8s | %25s | %s" % \
+                  ("%dx%d"%(sliceLen,sliceLen),t1-t0,t2-t1,"-","-","-"))
+    
+    #A full run on a 4D grid, which is only practical with a window
+    uniqueCoords = [np.linspace(0,1,30)] + 3*[np.linspace(-1,1,20)]
+    coordMeshTuple = np.meshgrid(*uniqueCoords)
+    potArr = 1 + sum([np.cos(2*c)**2 for c in coordMeshTuple[1:]]) + 0.5*coordMeshTuple[0]
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        dp = pyneb.DynamicProgramming(np.array([0.,-1,-1,-1]),coordMeshTuple,potArr,\
+                                      allowedEndpoints=np.array([1.,1,1,1]),logLevel=0)
+    
+    t0 = time.time()
+    _, _, distsDict = dp(searchRange=searchRange,pathAsText=False)
+    t1 = time.time()
+    print("\n4D grid of shape %s, window %d: %.1f s, action %.6f" % \
+          (str(potArr.shape),searchRange,t1-t0,list(distsDict.values())[0]))
@@ -0,0 +1,82 @@
+from context import pyneb
+ 
+import numpy as np
+
+import sys
+import time
+
+"""
+Number of points the potential and inertia are evaluated at, and the time taken,
+for LeastActionPath.compute_force with the default target_func_grad 
+(GradientApproximations().forward_action_grad), with and without wrapping them
+in an EvaluationCache. The potential and inertia are interpolated on a grid, as
+is usual for a PES.
+
+Run as
+    python main.py [maxPts]
+to go up to maxPts images (default 100).
+"""
+
+class CountingFunction:
+    def __init__(self,func):
+        self.func = func
+        self.nEvals = 0
+    
+    def __call__(self,points):
+        self.nEvals += points.shape[0]
+        return self.func(points)
+
+def make_surface(nDims):
+    uniqueCoords = [np.linspace(-2,2,30) for dimIter in range(nDims)]
+    coordMeshTuple = np.meshgrid(*uniqueCoords,indexing="ij")
+    zz = sum([np.cos(2*c)**2 for c in coordMeshTuple]) + 0.5
+    potential = pyneb.NDInterpWithBoundary(uniqueCoords,zz)
+    
+    massFuncs = {}
+    uniqueKeys = [str(i) for i in range(nDims)]
+    for i in range(nDims):
+        for j in range(i,nDims):
+            if i == j:
+                vals = 1 + 0.1*coordMeshTuple[i]**2
+            else:
+                vals = 0.05*coordMeshTuple[i]*coordMeshTuple[j]
+            massFuncs[uniqueKeys[i]+uniqueKeys[j]] = \
+                pyneb.NDInterpWithBoundary(uniqueCoords,vals)
+    mass = pyneb.mass_funcs_to_array_func(massFuncs,uniqueKeys)
+    
+    return potential, mass
+
+if __name__ == "__main__":
+    maxPts = 100
+    if len(sys.argv) > 1:
+        maxPts = int(sys.argv[1])
+    
+    nDims = 2
+    potential, mass = make_surface(nDims)
+    
+    print("nPts | plain: time (s) | pot evals | mass evals | cached: time (s) |"+\
+          " pot evals | mass evals | max difference")
+    for nPts in [10,30,100]:
+        if nPts > maxPts:
+            continue
+        path = np.linspace(-1.5*np.ones(nDims),1.5*np.ones(nDims),nPts)
+        path[:,0] += 0.3*np.sin(np.linspace(0,np.pi,nPts))
+        
+        results = []
+        for useCache in [False,True]:
+            countingPot = CountingFunction(potential)
+            countingMass = CountingFunction(mass)
+            if useCache:
+                lap = pyneb.LeastActionPath(pyneb.EvaluationCache(countingPot),nPts,nDims,\
+                                            mass=pyneb.EvaluationCache(countingMass),logLevel=0)
+            else:
+                lap = pyneb.LeastActionPath(countingPot,nPts,nDims,mass=countingMass,\
+                                            logLevel=0)
+            
+            t0 = time.time()
+            force = lap.compute_force(path)
+            results.append((time.time()-t0,countingPot.nEvals,countingMass.nEvals,force))
+        
+        print("%4d | %15.3f | %9d | %10d | %16.3f | %9d | %10d | %.1e" % \
+              ((nPts,)+results[0][:3]+results[1][:3]+\
+               (np.max(np.abs(results[0][3]-results[1][3])),)))
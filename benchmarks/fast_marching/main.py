@@ -0,0 +1,71 @@
+from context import pyneb
+ 
+import numpy as np
+
+import sys
+import time
+import warnings
+
+"""
+Accuracy and time of FastMarching against Dijkstra, under grid refinement. The
+potential is constant, so the least action path is a straight line and its
+action is known: sqrt(2V) ||x1 - x0||_M. Dijkstra's paths are restricted to the
+edges of the grid, so its error does not go to zero as the grid is refined,
+while the fast marching error does (at first order). The 2D runs are done for
+the identity and for an anisotropic inertia tensor.
+
+Run as
+    python main.py [maxPerDim]
+to refine up to maxPerDim points per dimension in 2D (default 161).
+"""
+
+def make_grid(nDims,nPerDim):
+    uniqueCoords = [np.linspace(0,1,nPerDim) for dimIter in range(nDims)]
+    coordMeshTuple = np.meshgrid(*uniqueCoords)
+    #sqrt(2V) = 1
+    potArr = 0.5*np.ones(coordMeshTuple[0].shape)
+    return coordMeshTuple, potArr
+
+if __name__ == "__main__":
+    maxPerDim = 161
+    if len(sys.argv) > 1:
+        maxPerDim = int(sys.argv[1])
+    
+    masses = {"identity":None,"anisotropic":np.array([[2.,0.5],[0.5,1]])}
+    
+    print("nDims | inertia     | nNodes  | exact    | Dijkstra error | time (s) |"+\
+          " FastMarching error | time (s)")
+    for (nDims,perDimList) in [(2,[21,41,81,161,321]),(3,[11,21,31])]:
+        for (massNm,mass) in masses.items():
+            if nDims != 2 and mass is not None:
+                continue
+            for nPerDim in perDimList:
+                if nDims == 2 and nPerDim > maxPerDim:
+                    continue
+                coordMeshTuple, potArr = make_grid(nDims,nPerDim)
+                initialPoint = np.zeros(nDims)
+                finalPoint = np.array([1.]+(nDims-1)*[0.6])
+                if mass is None:
+                    inertArr = None
+                    exact = np.linalg.norm(finalPoint)
+                else:
+                    inertArr = np.broadcast_to(mass,potArr.shape+(nDims,nDims))
+                    exact = np.sqrt(finalPoint @ mass @ finalPoint)
+                
+                with warnings.catch_warnings():
+                    warnings.simplefilter("ignore")
+                    djk = pyneb.Dijkstra(initialPoint,coordMeshTuple,potArr,inertArr=inertArr,\
+                                         allowedEndpoints=finalPoint,logLevel=0)
+                    t0 = time.time()
+                    _, _, djkDist = djk()
+                    t1 = time.time()
+                    
+                    fm = pyneb.FastMarching(initialPoint,coordMeshTuple,potArr,inertArr=inertArr,\
+                                            allowedEndpoints=finalPoint,logLevel=0)
+                    t2 = time.time()
+                    _, fmAction = fm()
+                    t3 = time.time()
+                
+                print("%5d | %-11s | %7d | %.6f | %14.2e | %8.2f | %18.2e | %8.2f" % \
+                      (nDims,massNm,potArr.size,exact,djkDist-exact,t1-t0,\
+                       fmAction-exact,t3-t2))
@@ -0,0 +1,201 @@
+from context import pyneb
+ 
+import numpy as np
+
+import sys
+import time
+
+"""
+Time per iteration, and trajectories, of VerletMinimization.fire and fire2,
+against LoopVerletMinimization, which keeps the per-image Python loops that
+the FIRE iterations used to have (including the maxmove clipping). The 
+trajectories are expected to agree bitwise. The potential is the shifted
+camelback, which is cheap, so the optimizer overhead shows. The final step 
+after the last iteration, and velocity_verlet, are not compared here.
+
+Run as
+    python main.py [maxIters]
+to take maxIters iterations (default 300).
+"""
+
+def camelback(coords):
+    x, y = coords[:,0], coords[:,1]
+    return (4 - 2.1*(x**2) + (1/3) * (x**4))*(x**2) + x*y + \
+        4*((y**2) - 1)*(y**2) + 1.0315488275145395
+
+class LoopVerletMinimization(pyneb.VerletMinimization):
+    def _local_fire_iter(self,step,tStepArr,alphaArr,stepsSinceReset,fireParams):
+        tStepPrev = tStepArr[step-1].reshape((-1,1)) #For multiplication below
+        
+        shift = tStepPrev*self.allVelocities[step-1] + \
+                0.5*self.allForces[step-1]*tStepPrev**2
+
+        for ptIter in range(self.nPts):
+            for dimIter in range(self.nDims):
+                if(abs(shift[ptIter,dimIter])>fireParams["maxmove"][dimIter]):
+                    shift[ptIter] = shift[ptIter] * \
+                        fireParams["maxmove"][dimIter]/abs(shift[ptIter,dimIter])
+
+        self.allPts[step] = self.allPts[step-1] + shift
+        
+        self.allForces[step] = self.nebObj.compute_force(self.allPts[step])
+        #What the Wikipedia article on velocity Verlet uses
+        self.allVelocities[step] = \
+            0.5*tStepPrev*(self.allForces[step]+self.allForces[step-1])
+        
+        for ptIter in range(self.nPts):
+            alpha = alphaArr[step-1,ptIter]
+            
+            product = np.dot(self.allVelocities[step-1,ptIter],self.allForces[step,ptIter])
+            if product > 0:
+                vMag = np.linalg.norm(self.allVelocities[step-1,ptIter])
+                fHat = self.allForces[step,ptIter]/np.linalg.norm(self.allForces[step,ptIter])
+                self.allVelocities[step,ptIter] += (1-alpha)*self.allVelocities[step-1,ptIter] + \
+                    alpha*vMag*fHat
+                
+                if stepsSinceReset[ptIter] > fireParams["nAccel"]:
+                    tStepArr[step,ptIter] = \
+                        min(tStepArr[step-1,ptIter]*fireParams["fInc"],fireParams["dtMax"])
+                    alphaArr[step,ptIter] = alpha*fireParams["fAlpha"]
+                else:
+                    tStepArr[step,ptIter] = tStepArr[step-1,ptIter]
+                
+                stepsSinceReset[ptIter] += 1
+            else:
+                tStepArr[step,ptIter] = \
+                    max(tStepArr[step-1,ptIter]*fireParams["fDecel"],fireParams["dtMin"])
+                alphaArr[step,ptIter] = fireParams["aStart"]
+                stepsSinceReset[ptIter] = 0
+        
+        return tStepArr, alphaArr, stepsSinceReset
+
+    def _global_fire_iter(self,step,tStepArr,alphaArr,stepsSinceReset,fireParams):
+        vdotf = 0.
+        for ptIter in range(self.nPts):
+            vdotf += np.dot(self.allVelocities[step-1,ptIter],self.allForces[step-1,ptIter])
+        
+        if vdotf > 0:
+            stepsSinceReset += 1
+            
+            if stepsSinceReset > fireParams["nAccel"]:
+                tStepArr[step] = min(tStepArr[step-1]*fireParams["fInc"],fireParams["dtMax"])
+                alphaArr[step] = alphaArr[step-1]**fireParams["fAlpha"]
+            else:
+                tStepArr[step] = tStepArr[step-1]
+                alphaArr[step] = alphaArr[step-1]            
+        else:
+            stepsSinceReset = 0
+            self.allVelocities[step-1,ptIter] = np.zeros(self.nDims)
+            tStepArr[step] = max(tStepArr[step-1]*fireParams["fDecel"],fireParams["dtMin"])
+            alphaArr[step] = fireParams["aStart"]
+            
+        #Semi-implicit Euler integration
+        self.allVelocities[step] = self.allVelocities[step-1] + tStepArr[step]*self.allForces[step-1]
+        
+        vdotv = 0.
+        fdotf = 0.
+        for ptIter in range(self.nPts):
+            vdotv += np.linalg.norm(self.allVelocities[step,ptIter])
+            fdotf += np.linalg.norm(self.allForces[step-1,ptIter])
+        
+        if fdotf > 10**(-16):
+            scale = vdotv/fdotf
+        else:
+            scale = 0.
+        
+        self.allVelocities[step] = (1-alphaArr[step]) * self.allVelocities[step]\
+            + alphaArr[step] * scale * self.allForces[step-1]
+        
+        shift = tStepArr[step]*self.allVelocities[step]
+        
+        for ptIter in range(self.nPts):
+            for dimIter in range(self.nDims):
+                if(abs(shift[ptIter,dimIter])>fireParams["maxmove"][dimIter]):
+                    shift[ptIter] = shift[ptIter] * \
+                        fireParams["maxmove"][dimIter]/abs(shift[ptIter,dimIter])
+        
+        self.allPts[step] = self.allPts[step-1] + shift
+        self.allForces[step] = self.nebObj.compute_force(self.allPts[step])
+        
+        return tStepArr, alphaArr, stepsSinceReset
+
+    def _global_fire2_iter(self,step,tStepArr,alphaArr,stepsSinceReset,fireParams):
+        vdotf = 0.0
+        for ptIter in range(self.nPts):
+            vdotf += np.dot(self.allVelocities[step-1,ptIter],self.allForces[step-1,ptIter])
+
+        if vdotf > 0.0:
+            stepsSinceReset += 1
+            if stepsSinceReset > fireParams["nAccel"]:
+                tStepArr[step] = \
+                    min(tStepArr[step-1]*fireParams["fInc"],fireParams["dtMax"])
+                alphaArr[step] = alphaArr[step-1]*fireParams["fAlpha"]
+            else:
+                tStepArr[step] = tStepArr[step-1]
+                alphaArr[step] = alphaArr[step-1]
+        else:
+            alphaArr[step] = fireParams["aStart"]
+            if(step > fireParams["minDecelIter"]):
+                tStepArr[step] = \
+                    max(tStepArr[step-1]*fireParams["fDecel"],fireParams["dtMin"])
+            else:
+                tStepArr[step] = tStepArr[step-1]
+            self.allPts[step-1] = self.allPts[step-1] - 0.5*tStepArr[step]*self.allVelocities[step-1,:,:]
+            self.allVelocities[step-1] = 0.0
+            
+        #Semi-implicit Euler integration
+        self.allVelocities[step] = self.allVelocities[step-1] + tStepArr[step] * self.allForces[step-1]
+        
+        #For mixing
+        vdotv = 0.0
+        fdotf = 0.0
+        for ptIter in range(self.nPts):
+            vdotv += np.dot(self.allVelocities[step,ptIter],self.allVelocities[step,ptIter])
+            fdotf += np.dot(self.allForces[step-1,ptIter],self.allForces[step-1,ptIter])
+        #Only vanishes if net force on all particles is zero, in which case this is zeroed out
+        #later anyways. Handled here to prevent nuisance exception-throwing
+        if fdotf > 10**(-16):
+            scale = np.sqrt(vdotv/fdotf)
+        else:
+            scale = 0.0
+        
+        self.allVelocities[step] = (1-alphaArr[step])*self.allVelocities[step] + \
+            alphaArr[step] * scale * self.allForces[step-1]
+        
+        shift = tStepArr[step]*self.allVelocities[step]
+        
+        for ptIter in range(self.nPts):
+            for dimIter in range(self.nDims):
+                if(abs(shift[ptIter,dimIter])>fireParams["maxmove"][dimIter]):
+                    shift[ptIter] = shift[ptIter] * \
+                        fireParams["maxmove"][dimIter]/abs(shift[ptIter,dimIter])
+        
+        self.allPts[step] = self.allPts[step-1] + shift
+        self.allForces[step] = self.nebObj.compute_force(self.allPts[step])
+        
+        return tStepArr, alphaArr, stepsSinceReset
+
+if __name__ == "__main__":
+    maxIters = 300
+    if len(sys.argv) > 1:
+        maxIters = int(sys.argv[1])
+    
+    print("method            | nPts | loops: time (s) | vectorized: time (s) | max difference")
+    for (methodName,useLocal) in [("fire",True),("fire",False),("fire2",False)]:
+        for nPts in [30,100,300]:
+            initialPoints = np.linspace([-1.7,0.8],[1.7,-0.8],nPts)
+            initialPoints[1:-1,1] += 0.3*np.sin(np.linspace(0,np.pi,nPts))[1:-1]
+            
+            results = []
+            for minClass in [LoopVerletMinimization,pyneb.VerletMinimization]:
+                mep = pyneb.MinimumEnergyPath(camelback,nPts,2,logLevel=0)
+                minObj = minClass(mep,initialPoints)
+                
+                t0 = time.time()
+                getattr(minObj,methodName)(0.01,maxIters,useLocal=useLocal,earlyStop=False)
+                results.append((time.time()-t0,minObj.allPts[:-1]))
+            
+            label = methodName+(" (local)" if useLocal else " (global)")
+            print("%-17s | %4d | %15.3f | %20.3f | %.1e" % \
+                  (label,nPts,results[0][0],results[1][0],\
+                   np.max(np.abs(results[0][1]-results[1][1]))))
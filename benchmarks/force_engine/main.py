@@ -0,0 +1,121 @@
+from context import pyneb
+ 
+import numpy as np
+import matplotlib.pyplot as plt
+
+import time
+
+"""
+Per-iteration cost of the NEB force bookkeeping (tangents, spring force, 
+perpendicular projection, endpoint force) as a function of the number of images.
+The per-image loops that BandForces replaced are kept here as a reference, both
+for timing and to check that the two agree.
+"""
+
+def loop_tangents(points,energies):
+    nPts, nDims = points.shape
+    tangents = np.zeros((nPts,nDims))
+    for ptIter in range(1,nPts-1):
+        tp = points[ptIter+1] - points[ptIter]
+        tm = points[ptIter] - points[ptIter-1]
+        dVMax = np.max(np.absolute([energies[ptIter+1]-energies[ptIter],\
+                                    energies[ptIter-1]-energies[ptIter]]))
+        dVMin = np.min(np.absolute([energies[ptIter+1]-energies[ptIter],\
+                                    energies[ptIter-1]-energies[ptIter]]))
+            
+        if (energies[ptIter+1] > energies[ptIter]) and \
+            (energies[ptIter] > energies[ptIter-1]):
+            tangents[ptIter] = tp
+        elif (energies[ptIter+1] < energies[ptIter]) and \
+            (energies[ptIter] < energies[ptIter-1]):
+            tangents[ptIter] = tm
+        elif energies[ptIter+1] > energies[ptIter-1]:
+            tangents[ptIter] = tp*dVMax + tm*dVMin
+        else:
+            tangents[ptIter] = tp*dVMin + tm*dVMax
+            
+        if not np.array_equal(tangents[ptIter],np.zeros(nDims)):
+            tangents[ptIter] = tangents[ptIter]/np.linalg.norm(tangents[ptIter])
+    
+    return tangents
+
+def loop_forces(points,energies,negGrad,k,kappa):
+    nPts, nDims = points.shape
+    tangents = loop_tangents(points,energies)
+    
+    projection = np.array([np.dot(negGrad[i],tangents[i]) for i in range(nPts)])
+    parallelForce = np.array([projection[i]*tangents[i] for i in range(nPts)])
+    perpForce = negGrad - parallelForce
+    
+    springForce = np.zeros((nPts,nDims))
+    for i in range(1,nPts-1):
+        forwardDist = np.linalg.norm(points[i+1] - points[i])
+        backwardsDist = np.linalg.norm(points[i] - points[i-1])
+        springForce[i] = k*(forwardDist - backwardsDist)*tangents[i]
+    springForce[0] = k*(points[1] - points[0])
+    springForce[-1] = k*(points[nPts-2] - points[nPts-1])
+    
+    netForce = np.zeros(points.shape)
+    for i in range(1,nPts-1):
+        netForce[i] = perpForce[i] + springForce[i]
+    for i in [0,-1]:
+        normForce = negGrad[i]/np.linalg.norm(negGrad[i])
+        netForce[i] = springForce[i] - (np.dot(springForce[i],normForce)-\
+                                        kappa*energies[i])*normForce
+    
+    return netForce
+
+def vectorized_forces(points,energies,negGrad,k,kappa):
+    tangents = pyneb.BandForces.tangents(points,energies)
+    perpForce = pyneb.BandForces.perpendicular_component(negGrad,tangents)
+    springForce = pyneb.BandForces.spring_force(points,tangents,k,(True,True))
+    return pyneb.BandForces.net_force(perpForce,springForce,negGrad,energies,\
+                                      kappa,0.,(True,True))
+
+def quadratic(coords):
+    return np.sum(coords**2,axis=-1)
+
+def time_func(func,args,nRepeats):
+    t0 = time.perf_counter()
+    for i in range(nRepeats):
+        func(*args)
+    t1 = time.perf_counter()
+    return (t1 - t0)/nRepeats
+
+if __name__ == "__main__":
+    nPtsArr = np.array([20,50,100,200,500,1000])
+    dimsList = [2,3,5]
+    nRepeats = 50
+    
+    rng = np.random.default_rng(1)
+    
+    fig, ax = plt.subplots()
+    print("nDims  nPts  loop (ms)  vectorized (ms)  MEP compute_force (ms)")
+    for nDims in dimsList:
+        loopTimes = np.zeros(nPtsArr.shape)
+        vecTimes = np.zeros(nPtsArr.shape)
+        for (nIter,nPts) in enumerate(nPtsArr):
+            points = np.cumsum(rng.uniform(0,0.1,(nPts,nDims)),axis=0) + 1
+            energies = quadratic(points) + rng.normal(0,0.01,nPts)
+            negGrad = -2*points
+            
+            loopOut = loop_forces(points,energies,negGrad,1.,10.)
+            vecOut = vectorized_forces(points,energies,negGrad,1.,10.)
+            np.testing.assert_allclose(loopOut,vecOut,rtol=1e-10,atol=1e-12)
+            
+            loopTimes[nIter] = time_func(loop_forces,(points,energies,negGrad,1.,10.),nRepeats)
+            vecTimes[nIter] = time_func(vectorized_forces,(points,energies,negGrad,1.,10.),nRepeats)
+            
+            mep = pyneb.MinimumEnergyPath(quadratic,nPts,nDims,logLevel=0)
+            mepTime = time_func(mep.compute_force,(points,),nRepeats)
+            
+            print("%5d %5d %10.3f %16.3f %23.3f" % (nDims,nPts,1000*loopTimes[nIter],\
+                                                    1000*vecTimes[nIter],1000*mepTime))
+        
+        ax.plot(nPtsArr,1000*loopTimes,marker=".",label="Loop, nDims = "+str(nDims))
+        ax.plot(nPtsArr,1000*vecTimes,marker=".",ls="--",label="BandForces, nDims = "+str(nDims))
+    
+    ax.set(xlabel="nPts",ylabel="Time per force call (ms)",xscale="log",yscale="log",\
+           title="NEB Force Bookkeeping")
+    ax.legend()
+    fig.savefig("force_engine.pdf",bbox_inches="tight")
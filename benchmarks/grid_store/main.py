@@ -0,0 +1,59 @@
+from context import pyneb
+ 
+import numpy as np
+import h5py
+
+import os
+import sys
+import tempfile
+import time
+
+"""
+Time and log size of the grid write done when a DijkstraLogger is created, for
+nRuns runs on the same 4D surface with a full inertia tensor. Without a grid
+store, every log copies potArr and inertArr; with loggerSettings["gridStore"],
+the first run writes them to the store and every log links to them. The
+grids loaded from the logs are checked to match.
+
+Run as
+    python main.py [nPtsPerDim]
+for a grid of nPtsPerDim**4 points (default 20).
+"""
+
+if __name__ == "__main__":
+    nPtsPerDim = 20
+    if len(sys.argv) > 1:
+        nPtsPerDim = int(sys.argv[1])
+    nRuns = 5
+    
+    tmpDir = tempfile.TemporaryDirectory()
+    os.chdir(tmpDir.name)
+    
+    coordMeshTuple = np.meshgrid(*(4*[np.linspace(0,1,nPtsPerDim)]))
+    zz = sum(c**2 for c in coordMeshTuple)
+    inertArr = np.tile(np.eye(4),zz.shape+(1,1))
+    djk = pyneb.Dijkstra(np.zeros(4),coordMeshTuple,zz,inertArr=inertArr,\
+                         allowedEndpoints=np.ones(4),logLevel=0)
+    
+    print("gridStore | run | write time (s) | log size (MB) | store size (MB) | same grids")
+    for gridStore in [None,"grids"]:
+        for runIter in range(nRuns):
+            fName = str(gridStore)+"_"+str(runIter)
+            t0 = time.time()
+            pyneb.DijkstraLogger(djk,fName=fName,loggerSettings={"gridStore":gridStore})
+            writeTime = time.time() - t0
+            
+            logSize = os.path.getsize("logs/"+fName+".djk")
+            storeSize = 0
+            if gridStore is not None:
+                storeSize = sum(os.path.getsize(os.path.join(gridStore,f)) \
+                                for f in os.listdir(gridStore))
+            h5File = h5py.File("logs/"+fName+".djk","r")
+            sameGrids = np.array_equal(h5File["potArr"][()],djk.potArr) and \
+                np.array_equal(h5File["inertArr"][()],djk.inertArr)
+            h5File.close()
+            print("%9s | %3d | %14.3f | %13.2f | %15.2f | %s" % \
+                  (gridStore,runIter,writeTime,logSize/1e6,storeSize/1e6,sameGrids))
+            
+    os.chdir("/")
+    tmpDir.cleanup()
@@ -0,0 +1,71 @@
+from context import pyneb
+ 
+import numpy as np
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+"""
+Time and peak memory to read the final band of many ForceLogger logs, with
+LoadForceLogger reading every dataset (lazy=False), and keeping the file open
+and reading only the last iteration (lazy=True). The final bands are checked to
+be identical.
+
+Run as
+    python main.py [nLogs]
+to scan nLogs logs (default 20).
+"""
+
+def pot(coords):
+    return coords[:,0]**2 + coords[:,1]**2
+
+def final_points(logNames,lazy):
+    finalPts = []
+    tracemalloc.start()
+    t0 = time.time()
+    for logName in logNames:
+        if lazy:
+            with pyneb.LoadForceLogger(logName,lazy=True) as log:
+                finalPts.append(log.points.final)
+        else:
+            log = pyneb.LoadForceLogger(logName)
+            finalPts.append(log.points[-1])
+    runTime = time.time() - t0
+    peakMem = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return finalPts, runTime, peakMem
+
+if __name__ == "__main__":
+    nLogs = 20
+    if len(sys.argv) > 1:
+        nLogs = int(sys.argv[1])
+    
+    tmpDir = tempfile.TemporaryDirectory()
+    os.chdir(tmpDir.name)
+    
+    print("nPts | nEvals | eager: time (s) | eager: peak (MB) | lazy: time (s) | lazy: peak (MB) | same")
+    for (nPts,nEvals) in [(50,500),(200,2000)]:
+        variablesDict = {nm:np.random.rand(nPts,2) for nm in \
+                         ["points","tangents","springForce","netForce"]}
+        logNames = []
+        for logIter in range(nLogs):
+            logName = str(nPts)+"_"+str(logIter)
+            lap = pyneb.LeastActionPath(pot,nPts,2,logLevel=1,\
+                                        loggerSettings={"writeFreq":500,"logName":logName})
+            for evalIter in range(nEvals):
+                lap.logger.log(variablesDict)
+            lap.logger.flush()
+            lap.logger.close()
+            logNames.append("logs/"+logName+".lap")
+        
+        eagerPts, eagerTime, eagerMem = final_points(logNames,False)
+        lazyPts, lazyTime, lazyMem = final_points(logNames,True)
+        same = all(np.array_equal(p,q) for (p,q) in zip(eagerPts,lazyPts))
+        print("%4d | %6d | %15.3f | %16.1f | %14.3f | %15.1f | %s" % \
+              (nPts,nEvals,eagerTime,eagerMem/1e6,lazyTime,lazyMem/1e6,same))
+            
+    os.chdir("/")
+    tmpDir.cleanup()
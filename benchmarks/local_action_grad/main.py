@@ -0,0 +1,90 @@
+from context import pyneb
+ 
+import numpy as np
+
+import sys
+import time
+
+"""
+Time for one action gradient with GradientApproximations().forward_action_grad,
+which recomputes the full action for every perturbed coordinate, against
+forward_action_local_grad, which only recomputes the two terms next to the
+perturbed image, with one call to the potential and mass. The potential and
+inertia are interpolated on a grid, as is usual for a PES. The number of points
+the potential is evaluated at is counted for both.
+
+Run as
+    python main.py [maxPts]
+to go up to maxPts images (default 300).
+"""
+
+class CountingFunction:
+    def __init__(self,func):
+        self.func = func
+        self.nEvals = 0
+    
+    def __call__(self,points):
+        if points.ndim == 1:
+            points = points.reshape((1,-1))
+        self.nEvals += points.shape[0]
+        return self.func(points)
+
+def make_surface(nDims):
+    uniqueCoords = [np.linspace(-2,2,30) for dimIter in range(nDims)]
+    coordMeshTuple = np.meshgrid(*uniqueCoords,indexing="ij")
+    zz = sum([np.cos(2*c)**2 for c in coordMeshTuple]) + 0.5
+    potential = pyneb.NDInterpWithBoundary(uniqueCoords,zz)
+    
+    massFuncs = {}
+    uniqueKeys = [str(i) for i in range(nDims)]
+    for i in range(nDims):
+        for j in range(i,nDims):
+            if i == j:
+                vals = 1 + 0.1*coordMeshTuple[i]**2
+            else:
+                vals = 0.05*coordMeshTuple[i]*coordMeshTuple[j]
+            massFuncs[uniqueKeys[i]+uniqueKeys[j]] = \
+                pyneb.NDInterpWithBoundary(uniqueCoords,vals)
+    mass = pyneb.mass_funcs_to_array_func(massFuncs,uniqueKeys)
+    
+    return potential, mass
+
+if __name__ == "__main__":
+    maxPts = 300
+    if len(sys.argv) > 1:
+        maxPts = int(sys.argv[1])
+    
+    gradObj = pyneb.GradientApproximations()
+    
+    print("nDims | mass  | nPts | full: time (s) | evals  | local: time (s) | evals |"+\
+          " max difference")
+    for nDims in [2,4]:
+        potential, mass = make_surface(nDims)
+        for useMass in [False,True]:
+            for nPts in [10,30,100,300]:
+                if nPts > maxPts:
+                    continue
+                path = np.linspace(-1.5*np.ones(nDims),1.5*np.ones(nDims),nPts)
+                path[:,0] += 0.3*np.sin(np.linspace(0,np.pi,nPts))
+                
+                countingPot = CountingFunction(potential)
+                if useMass:
+                    countingMass = CountingFunction(mass)
+                    massOnPath = mass(path)
+                else:
+                    countingMass = None
+                    massOnPath = None
+                potOnPath = potential(path)
+                
+                results = []
+                for grad_func in [gradObj.forward_action_grad,gradObj.forward_action_local_grad]:
+                    countingPot.nEvals = 0
+                    t0 = time.time()
+                    gradOfAction, _ = grad_func(path,countingPot,potOnPath,countingMass,\
+                                                massOnPath,pyneb.TargetFunctions.action)
+                    t1 = time.time()
+                    results.append((t1-t0,countingPot.nEvals,gradOfAction))
+                
+                print("%5d | %5s | %4d | %14.4f | %6d | %15.4f | %5d | %.1e" % \
+                      (nDims,useMass,nPts,results[0][0],results[0][1],results[1][0],\
+                       results[1][1],np.max(np.abs(results[0][2]-results[1][2]))))
@@ -0,0 +1,61 @@
+from context import pyneb
+ 
+import numpy as np
+
+import time
+import warnings
+
+"""
+Time to evaluate NDInterpWithBoundary on large batches of points, in and out
+of the grid region. The per-point loop that NDInterpWithBoundary.__call__ used
+previously is kept here as a reference, both for timing and to check that the
+two agree.
+"""
+
+def loop_call(interp,points):
+    points = points.reshape((-1,interp.nDims)).copy()
+    for dimIter in range(interp.nDims):
+        if interp.symmExtend[dimIter]:
+            points[:,dimIter] = np.abs(points[:,dimIter])
+    
+    result = np.zeros(points.shape[0])
+    for (ptIter, point) in enumerate(points):
+        isInBounds = np.zeros((2,interp.nDims),dtype=bool)
+        isInBounds[0] = (np.array([g[0] for g in interp.gridPoints]) <= point)
+        isInBounds[1] = (point <= np.array([g[-1] for g in interp.gridPoints]))
+        
+        if np.count_nonzero(~isInBounds) == 0:
+            result[ptIter] = interp._call(point)
+        else:
+            result[ptIter] = interp.boundaryHandler(point,isInBounds)
+    
+    return interp.post_eval(result)
+
+def make_interpolator(nDims):
+    gridPoints = tuple(np.linspace(-2,2,41+(dimIter>=2)) for dimIter in range(nDims))
+    mesh = np.meshgrid(*gridPoints)
+    gridVals = sum([(dimIter+1)*m**2 for (dimIter,m) in enumerate(mesh)]) + np.sin(mesh[0])
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        interp = pyneb.NDInterpWithBoundary(gridPoints,gridVals)
+    return interp
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    
+    print("nDims | nPoints | loop (s) | vectorized (s) | speedup | max |difference|")
+    for nDims in [2,3]:
+        interp = make_interpolator(nDims)
+        for nPoints in [10**3,10**4,10**5]:
+            #About a fifth of the points are out of bounds
+            points = rng.uniform(-2.2,2.2,(nPoints,nDims))
+            
+            t0 = time.time()
+            loopVals = loop_call(interp,points)
+            t1 = time.time()
+            vectorizedVals = interp(points)
+            t2 = time.time()
+            
+            print("%5d | %7d | %8.3f | %14.4f | %7.1f | %.2e" % \
+                  (nDims,nPoints,t1-t0,t2-t1,(t1-t0)/(t2-t1),\
+                   np.max(np.abs(loopVals-vectorizedVals))))
@@ -0,0 +1,82 @@
+from context import pyneb
+ 
+import numpy as np
+
+import os
+import sys
+import time
+
+"""
+Time per force evaluation of the discrete action-squared gradient:
+    -serially, with GradientApproximations().discrete_sqr_action_grad
+    -with a new pool of workers at every call, as discrete_sqr_action_grad_mp
+     did before it kept its workers (the pool is shut down after every call)
+    -with long-lived workers, as kept by a GradientExecutor for a whole run,
+     both for processes and for threads
+The inertia tensor is made more expensive to evaluate by repeating the
+evaluation, per point, nRepeats times, to stand in for costly inertia tensors.
+The parallel gradient pays off once the inertia tensor is expensive enough.
+
+Run as
+    python main.py [nWorkers]
+(default 4).
+"""
+
+def make_mass(nRepeats):
+    def mass(coords):
+        coords = coords.reshape((-1,2))
+        massArr = np.zeros((coords.shape[0],2,2))
+        #Point-by-point, as a stand-in for an expensive inertia tensor
+        for (ptIter,c) in enumerate(coords):
+            for repeatIter in range(nRepeats):
+                massArr[ptIter] = np.identity(2) + 0.1*np.outer(np.sin(c),np.sin(c))
+        return massArr
+    return mass
+
+def potential(coords):
+    return np.cos(coords[:,0])**2 + np.cos(coords[:,1])**2 + 0.5
+
+if __name__ == "__main__":
+    nWorkers = 4
+    if len(sys.argv) > 1:
+        nWorkers = int(sys.argv[1])
+    nCalls = 10
+    
+    target_func = pyneb.TargetFunctions.action_squared
+    
+    print("Using %d workers on %d CPUs" % (nWorkers,os.cpu_count()))
+    print("nPts | nRepeats | serial (s) | new pool per call (s) | processes (s) |"+\
+          " threads (s)")
+    for nPts in [32,128]:
+        path = np.linspace([-1.,-1.],[1.,1.2],nPts)
+        potOnPath = potential(path)
+        for nRepeats in [1,10,100]:
+            mass = make_mass(nRepeats)
+            massOnPath = mass(path)
+            args = (path,potential,potOnPath,mass,massOnPath,target_func)
+            
+            times = []
+            
+            t0 = time.time()
+            for callIter in range(nCalls):
+                pyneb.GradientApproximations().discrete_sqr_action_grad(*args)
+            times.append((time.time()-t0)/nCalls)
+            
+            t0 = time.time()
+            for callIter in range(nCalls):
+                executor = pyneb.GradientExecutor(nWorkers=nWorkers)
+                pyneb.GradientApproximations(executor=executor).discrete_sqr_action_grad_mp(*args)
+                executor.shutdown()
+            times.append((time.time()-t0)/nCalls)
+            
+            for kind in ["process","thread"]:
+                executor = pyneb.GradientExecutor(kind=kind,nWorkers=nWorkers)
+                gradObj = pyneb.GradientApproximations(executor=executor)
+                #Starting the workers is part of the run, but only happens once
+                t0 = time.time()
+                for callIter in range(nCalls):
+                    gradObj.discrete_sqr_action_grad_mp(*args)
+                times.append((time.time()-t0)/nCalls)
+                executor.shutdown()
+            
+            print("%4d | %8d | %10.4f | %21.4f | %13.4f | %11.4f" % ((nPts,nRepeats)+tuple(times)))
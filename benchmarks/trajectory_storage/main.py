@@ -0,0 +1,52 @@
+from context import pyneb
+ 
+import numpy as np
+
+import sys
+import time
+import tracemalloc
+
+"""
+Peak memory and runtime of VerletMinimization.fire for each storage policy.
+The trajectory arrays (allPts, allVelocities and allForces) take 
+3*maxIters*nPts*nDims floats with storage="full", and a fixed number of 
+iterations otherwise. The final band is checked against storage="full".
+
+Run as
+    python main.py [maxIters]
+to take maxIters iterations (default 2000).
+"""
+
+def camelback(coords):
+    x, y = coords[:,0], coords[:,1]
+    return (4 - 2.1*(x**2) + (1/3) * (x**4))*(x**2) + x*y + \
+        4*((y**2) - 1)*(y**2) + 1.0315488275145395
+
+if __name__ == "__main__":
+    maxIters = 2000
+    if len(sys.argv) > 1:
+        maxIters = int(sys.argv[1])
+    
+    nPts = 100
+    initialPoints = np.linspace([-1.7,0.8],[1.7,-0.8],nPts)
+    initialPoints[1:-1,1] += 0.3*np.sin(np.linspace(0,np.pi,nPts))[1:-1]
+    
+    print("storage | peak memory (MB) | time (s) | stored iterations | same final band")
+    finalBand = None
+    for storage in ["full","every","last","final"]:
+        mep = pyneb.MinimumEnergyPath(camelback,nPts,2,logLevel=0)
+        minObj = pyneb.VerletMinimization(mep,initialPoints,storage=storage,\
+                                          storageParams={"freq":100,"nKeep":10})
+        
+        tracemalloc.start()
+        t0 = time.time()
+        minObj.fire(0.01,maxIters,earlyStop=False)
+        runTime = time.time() - t0
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        
+        if finalBand is None:
+            finalBand = minObj.allPts[-1]
+        print("%-7s | %16.2f | %8.3f | %17d | %s" % \
+              (storage,peak/10**6,runTime,len(minObj.storedIters),\
+               np.array_equal(finalBand,minObj.allPts[-1])))
@@ -0,0 +1,73 @@
+from context import pyneb
+ 
+import numpy as np
+
+import sys
+import time
+
+"""
+Time for TargetFunctions.action on arrays, against the per-point loop it
+replaced, for the identity, a diagonal, and a full inertia tensor. Also times
+one call on a stack of paths against a loop over the paths.
+
+Run as
+    python main.py [nRepeats]
+to average over nRepeats calls (default 200).
+"""
+
+def loop_action(path,potArr,massArr=None):
+    nPoints, nDims = path.shape
+    if massArr is None:
+        massArr = np.full((nPoints,nDims,nDims),np.identity(nDims))
+    potArr = potArr.clip(0)
+    
+    actOut = 0
+    for ptIter in range(1,nPoints):
+        coordDiff = path[ptIter] - path[ptIter - 1]
+        dist = np.dot(coordDiff,np.dot(massArr[ptIter],coordDiff))
+        if dist<0:
+            dist = 0
+        actOut += np.sqrt(2*potArr[ptIter]*dist)
+    return actOut
+
+def time_call(func,nRepeats):
+    t0 = time.time()
+    for i in range(nRepeats):
+        out = func()
+    return (time.time() - t0)/nRepeats, out
+
+if __name__ == "__main__":
+    nRepeats = 200
+    if len(sys.argv) > 1:
+        nRepeats = int(sys.argv[1])
+    
+    rng = np.random.default_rng(0)
+    
+    print("nDims | nPts | mass     | loop (ms) | vectorized (ms) | max difference")
+    for nDims in [2,4]:
+        for nPts in [30,100,500]:
+            path = np.cumsum(rng.random((nPts,nDims)),axis=0)
+            potArr = rng.random(nPts)
+            diagMass = 1 + rng.random((nPts,nDims))
+            fullMass = diagMass[...,None]*np.identity(nDims)
+            
+            for massName, massIn, loopMass in [("identity",None,None),\
+                                               ("diagonal",diagMass,fullMass),\
+                                               ("full",fullMass,fullMass)]:
+                loopTime, loopAct = time_call(lambda: loop_action(path,potArr,loopMass),nRepeats)
+                vecTime, (vecAct, _, _) = \
+                    time_call(lambda: pyneb.TargetFunctions.action(path,potArr,massIn),nRepeats)
+                print("%5d | %4d | %-8s | %9.3f | %15.3f | %.1e" % \
+                      (nDims,nPts,massName,1000*loopTime,1000*vecTime,abs(loopAct-vecAct)))
+    
+    print("\nnPaths | nPts | loop over paths (ms) | stack (ms) | max difference")
+    for nPaths in [8,32]:
+        nPts = 100
+        paths = np.cumsum(rng.random((nPaths,nPts,2)),axis=1)
+        potArr = rng.random((nPaths,nPts))
+        loopTime, loopAct = time_call(lambda: np.array([pyneb.TargetFunctions.action(p,e)[0] \
+                                                        for (p,e) in zip(paths,potArr)]),nRepeats)
+        vecTime, (vecAct, _, _) = \
+            time_call(lambda: pyneb.TargetFunctions.action(paths,potArr),nRepeats)
+        print("%6d | %4d | %20.3f | %10.3f | %.1e" % \
+              (nPaths,nPts,1000*loopTime,1000*vecTime,np.max(np.abs(loopAct-vecAct))))
@@ -8,6 +8,11 @@ import datetime
 import warnings
 import functools
 import inspect
+import queue
+import threading
+import collections.abc
+import hashlib
+import tempfile
 
 def path_to_text(path,fName,colHeads=None):
     if colHeads is None:
@@ -36,16 +41,252 @@ def path_from_text(fName,returnHeads=False):
     else:
         return arr
 
+def _compression_kwargs(settings):
+    """
+    Keyword arguments of h5py's create_dataset, for the "compression",
+    "compressionOpts" and "shuffle" logger settings.
+    """
+    if settings["compression"] is None:
+        return {}
+    return {"compression":settings["compression"],"compression_opts":settings["compressionOpts"],\
+            "shuffle":settings["shuffle"]}
+
+def _write_logger_settings(h5File,settings):
+    """
+    Stores settings as attributes of the group logger_settings. None is 
+    stored as "none".
+    """
+    h5File.create_group("logger_settings")
+    for (key,val) in settings.items():
+        if val is None:
+            val = "none"
+        h5File["logger_settings"].attrs.create(key,val)
+    return None
+
+def _read_logger_settings(h5File):
+    """
+    Reads the settings written by _write_logger_settings, or returns None for
+    logs written without them.
+    """
+    if "logger_settings" not in h5File:
+        return None
+    settings = {}
+    for (key,val) in h5File["logger_settings"].attrs.items():
+        if isinstance(val,np.ndarray) and (val.dtype == object):
+            val = [str(v) for v in val]
+        if isinstance(val,str) and (val == "none"):
+            val = None
+        settings[key] = val
+    return settings
+
+def _fill_grid_logger_settings(loggerSettings):
+    """
+    Fills in the settings of DijkstraLogger and DPMLogger:
+        -"writeGrids": whether to copy potArr and inertArr into the log
+        -"dtype": the dtype potArr and inertArr are stored with; their own if
+            None
+        -"compression", "compressionOpts", "shuffle": the HDF5 filter of the
+            grid-sized datasets (as in h5py's create_dataset). No compression
+            if "compression" is None
+        -"gridStore": a directory that potArr and inertArr are written to
+            once, and linked to from every log (see _store_grid). Copied into
+            each log if None
+    """
+    defaultSettings = {"writeGrids":True,"dtype":None,"compression":None,\
+                       "compressionOpts":None,"shuffle":False,"gridStore":None}
+    settings = loggerSettings.copy()
+    for key in settings:
+        if key not in defaultSettings:
+            raise ValueError("Key "+key+" in loggerSettings not allowed")
+    for key in defaultSettings:
+        if key not in settings:
+            settings[key] = defaultSettings[key]
+    return settings
+
+def _grid_key(nm,arr,trimAttrs):
+    """
+    The hex digest keying the grid nm (potArr or inertArr) in a grid store.
+    Hashes the name, dtype, shape and contents of arr, and the trim values.
+    """
+    arr = np.ascontiguousarray(arr)
+    digest = hashlib.sha256()
+    digest.update(repr((nm,arr.dtype.str,arr.shape,sorted(trimAttrs.items()))).encode())
+    digest.update(memoryview(arr).cast("B"))
+    return digest.hexdigest()
+
+def _store_grid(storeDir,nm,arr,trimAttrs,settings):
+    """
+    Writes arr as the dataset nm of storeDir/<key>.h5, with the attributes
+    trimAttrs, unless that file exists already. Returns the file name.
+    
+    The file is written under a temporary name and then renamed, so that runs
+    storing the same grid at once do not read a partly written file.
+    """
+    os.makedirs(storeDir,exist_ok=True)
+    storeFile = os.path.join(storeDir,_grid_key(nm,arr,trimAttrs)+".h5")
+    if os.path.isfile(storeFile):
+        return storeFile
+    
+    tmpHandle, tmpFile = tempfile.mkstemp(suffix=".tmp",dir=storeDir)
+    os.close(tmpHandle)
+    try:
+        with h5py.File(tmpFile,"w") as h5File:
+            h5File.create_dataset(nm,data=arr,**_compression_kwargs(settings))
+            for (key,val) in trimAttrs.items():
+                h5File[nm].attrs.create(key,data=val)
+        os.replace(tmpFile,storeFile)
+    finally:
+        if os.path.isfile(tmpFile):
+            os.remove(tmpFile)
+    return storeFile
+
+def _write_grids(h5File,classInst,settings):
+    """
+    Writes classInst.potArr and classInst.inertArr, if settings["writeGrids"].
+    If settings["gridStore"] is set, they are written there instead, and linked
+    to with HDF5 external links, relative to the directory of h5File. h5py
+    follows the links when the datasets are read.
+    """
+    if not settings["writeGrids"]:
+        return None
+    
+    trimAttrs = {}
+    if classInst.trimVals[0] is not None:
+        trimAttrs["minTrim"] = classInst.trimVals[0]
+    if classInst.trimVals[1] is not None:
+        trimAttrs["maxTrim"] = classInst.trimVals[1]
+        
+    for nm in ["potArr","inertArr"]:
+        arr = getattr(classInst,nm)
+        if settings["dtype"] is not None:
+            arr = arr.astype(settings["dtype"])
+        attrs = trimAttrs if nm == "potArr" else {}
+        if settings["gridStore"] is None:
+            h5File.create_dataset(nm,data=arr,**_compression_kwargs(settings))
+            for (key,val) in attrs.items():
+                h5File[nm].attrs.create(key,data=val)
+        else:
+            storeFile = _store_grid(settings["gridStore"],nm,arr,attrs,settings)
+            logDir = os.path.dirname(os.path.abspath(h5File.filename))
+            h5File[nm] = h5py.ExternalLink(os.path.relpath(os.path.abspath(storeFile),logDir),\
+                                           "/"+nm)
+    return None
+
+def _get_dataset(h5File,nm):
+    """
+    Returns h5File[nm], raising a ValueError if nm is an external link (see
+    _write_grids) to a file that cannot be opened.
+    """
+    try:
+        return h5File[nm]
+    except KeyError:
+        link = h5File.get(nm,getlink=True)
+        if isinstance(link,h5py.ExternalLink):
+            raise ValueError("Dataset "+nm+" links to "+link.filename+\
+                             ", which cannot be opened (relative to "+\
+                             os.path.dirname(os.path.abspath(h5File.filename))+")")
+        raise
+    
+class _AsyncH5Writer:
+    """
+    Applies writes to an HDF5 file on a background thread. The file is opened
+    once, and kept open until close. Writes are functions of the open file,
+    passed through a bounded queue, so that submit only blocks when maxPending
+    writes are already waiting. An exception raised by a write is reraised
+    by the next call to submit, flush or close.
+    """
+    def __init__(self,fileName,maxPending=2):
+        self.h5File = h5py.File(fileName,"a")
+        self.queue = queue.Queue(maxsize=maxPending)
+        self.error = None
+        
+        self.thread = threading.Thread(target=self._run,daemon=True)
+        self.thread.start()
+        
+    def _run(self):
+        while True:
+            write = self.queue.get()
+            try:
+                if write is None:
+                    return None
+                if self.error is None:
+                    write(self.h5File)
+            except Exception as e:
+                self.error = e
+            finally:
+                self.queue.task_done()
+                
+    def _raise_error(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+        return None
+    
+    def submit(self,write):
+        self._raise_error()
+        self.queue.put(write)
+        return None
+    
+    def flush(self):
+        """
+        Waits for the submitted writes, and flushes the file to disk.
+        """
+        self.queue.join()
+        self.h5File.flush()
+        self._raise_error()
+        return None
+    
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+        self.h5File.close()
+        self._raise_error()
+        return None
+    
 class ForceLogger:
     #TODO: log interpolators better/at all. Want to allow a link to the dataset(s)
     #interpolated, in case we just use the default data; otherwise, dump the data
     #to the file. Better yet - just make the user link it, in a separate method
     def __init__(self,classInst,logLevel,loggerSettings,fileExt):
+        """
+        Logs the band, tangents and forces of every force evaluation of 
+        classInst to logs/<logName><fileExt>, writeFreq evaluations at a time.
+        
+        loggerSettings are
+            -"writeFreq": the number of evaluations written at once. Also the
+                chunk size of the datasets. Default 50
+            -"logName": the file name; the time at initialization if None. 
+                Default None
+            -"writeInterpData": unused. Default False
+            -"asyncWrite": if True, the file is kept open, and written to by a
+                background thread, so that logging does not wait on the disk.
+                The logged arrays are double-buffered: a full chunk is written
+                while the next one is filled. The data is on disk after flush,
+                and the file is released by close. Default False
+            -"variables": the variables logged, out of "points", "tangents",
+                "springForce" and "netForce". Default all of them
+            -"dtype": the dtype of the logged variables, or a dict of dtypes
+                per variable. Default "f4"
+            -"compression", "compressionOpts", "shuffle": the HDF5 filter of
+                the datasets (as in h5py's create_dataset), e.g. "gzip" or 
+                "lzf" with shuffle=True. No compression if "compression" is 
+                None. Defaults None, None and False
+            -"stride": only every stride-th evaluation is logged. Default 1
+        The settings (but logName and writeInterpData) are stored in the group
+        logger_settings, and read back by LoadForceLogger.
+        """
         self.loggerSettings = loggerSettings
-        defaultSettings = {"writeFreq":50,"logName":None,"writeInterpData":False}
+        defaultSettings = {"writeFreq":50,"logName":None,"writeInterpData":False,\
+                           "asyncWrite":False,\
+                           "variables":["points","tangents","springForce","netForce"],\
+                           "dtype":"f4","compression":None,"compressionOpts":None,\
+                           "shuffle":False,"stride":1}
         for s in defaultSettings:
             if s not in self.loggerSettings:
                 self.loggerSettings[s] = defaultSettings[s]
+        for var in self.loggerSettings["variables"]:
+            if var not in defaultSettings["variables"]:
+                raise ValueError("Variable "+str(var)+" in loggerSettings not allowed")
         
         self.logLevel = logLevel
         if self.logLevel not in [0,1]:
@@ -57,92 +298,182 @@ class ForceLogger:
         os.makedirs("logs",exist_ok=True)
         
         self.loggedVariables = \
-            {0:[],1:["points","tangents","springForce","netForce"]}
+            {0:[],1:list(self.loggerSettings["variables"])}
+        nVars = len(self.loggedVariables[1])
         varShapes = \
-            {0:[],1:4*[(self.loggerSettings["writeFreq"],self.classInst.nPts,self.classInst.nDims)]}
+            {0:[],1:nVars*[(self.loggerSettings["writeFreq"],self.classInst.nPts,self.classInst.nDims)]}
+        
+        dtypes = self.loggerSettings["dtype"]
+        if not isinstance(dtypes,dict):
+            dtypes = {nm:dtypes for nm in self.loggedVariables[1]}
+        for nm in dtypes:
+            if nm not in self.loggedVariables[1]:
+                raise ValueError("dtype given for "+str(nm)+", which is not logged")
+        self.dtypes = {nm:np.dtype(dtypes.get(nm,"f4")) for nm in self.loggedVariables[1]}
         
         if self.logLevel != 0:
+            #The number of evaluations logged, and of calls to self.log
             self.iterCounter = 0
+            self.evalCounter = 0
             #Setting the variables that are to be logged at this level
             self.logDict = {}
             for (dsetNm,dsetShape) in zip(self.loggedVariables[self.logLevel],\
                                           varShapes[self.logLevel]):
-                self.logDict[dsetNm] = np.zeros(dsetShape)
+                self.logDict[dsetNm] = np.zeros(dsetShape,dtype=self.dtypes[dsetNm])
             
             if self.loggerSettings["logName"] is None:
                 self.fileName = "logs/"+self.initTime+fileExt
             else:
                 self.fileName = "logs/"+self.loggerSettings["logName"]+fileExt
                         
-            #Creating attributes and initializing datasets
-            h5File = h5py.File(self.fileName,"w")
-            
-            #For any nonzero logging level, we'll want these attributes. It's just
-            #a question of which datasets we want to store
-            # if isinstance(self.classInst.potential,NDInterpWithBoundary):
-            #     h5File.create_group("potential")
-            #     h5File["potential"].attrs.create("potential",self.classInst.potential.__qualname__)
-            #     #TODO: write potential settings here
-            # else:
-            if hasattr(self.classInst.potential,"__qualname__"):
-                nm = self.classInst.potential.__qualname__
-            elif hasattr(type(self.classInst.potential),"__qualname__"):
-                nm = type(self.classInst.potential).__qualname__
-            else:
-                nm = "unknown"
-                warnings.warn("ForceLogger potential has no attribute __qualname__,"+\
-                              " will be logged as unknown name")
-            h5File.attrs.create("potential",nm)
+            #The file is created by the first write, so that a log being resumed
+            #(see self.resume) is not overwritten first
+            self.isFileCreated = False
             
-            h5File.attrs.create("target_func",self.classInst.target_func.__qualname__)
-            h5File.attrs.create("target_func_grad",self.classInst.target_func_grad.__qualname__)
+            self.writer = None
+            if self.loggerSettings["asyncWrite"]:
+                #The second buffer is filled while the first is written
+                self.logBuffers = [self.logDict,\
+                                   {nm:np.zeros_like(arr) for (nm,arr) in self.logDict.items()}]
+                self.bufferFree = [threading.Event(),threading.Event()]
+                for event in self.bufferFree:
+                    event.set()
+                self.bufferIdx = 0
             
-            #MinimumEnergyPath does not use the inertia tensor; this accounts for that
-            if hasattr(self.classInst,"mass"):
-                if self.classInst.mass is None:
-                    massNm = "constant"
-                else:
-                    if hasattr(self.classInst.mass,"__qualname__"):
-                        massNm = self.classInst.mass.__qualname__
-                    elif hasattr(type(self.classInst.mass),"__qualname__"):
-                        massNm = type(self.classInst.mass).__qualname__
-                    else:
-                        warnings.warn("ForceLogger mass has no attribute __qualname__,"+\
-                                      " will be logged as unknown name")
-                        massNm = "unknown"
-                    #TODO: to actually log the mass function, we need to make
-                    #it a class, with a __call__ method
-                    # if (isinstance(self.classInst.mass,np.ndarray)) and \
-                    #     isinstance(self.classInst.mass)
-            else:
+    def _create_file(self):
+        """
+        Creates the log file, with the attributes of self.classInst, the
+        logger settings and the (empty) logged datasets.
+        """
+        h5File = h5py.File(self.fileName,"w")
+        
+        #For any nonzero logging level, we'll want these attributes. It's just
+        #a question of which datasets we want to store
+        # if isinstance(self.classInst.potential,NDInterpWithBoundary):
+        #     h5File.create_group("potential")
+        #     h5File["potential"].attrs.create("potential",self.classInst.potential.__qualname__)
+        #     #TODO: write potential settings here
+        # else:
+        if hasattr(self.classInst.potential,"__qualname__"):
+            nm = self.classInst.potential.__qualname__
+        elif hasattr(type(self.classInst.potential),"__qualname__"):
+            nm = type(self.classInst.potential).__qualname__
+        else:
+            nm = "unknown"
+            warnings.warn("ForceLogger potential has no attribute __qualname__,"+\
+                          " will be logged as unknown name")
+        h5File.attrs.create("potential",nm)
+        
+        h5File.attrs.create("target_func",self.classInst.target_func.__qualname__)
+        h5File.attrs.create("target_func_grad",self.classInst.target_func_grad.__qualname__)
+        
+        #MinimumEnergyPath does not use the inertia tensor; this accounts for that
+        if hasattr(self.classInst,"mass"):
+            if self.classInst.mass is None:
                 massNm = "constant"
-            h5File.attrs.create("mass",massNm)
-            
-            h5File.attrs.create("endpointSpringForce",np.array(self.classInst.endpointSpringForce))
-            h5File.attrs.create("endpointHarmonicForce",np.array(self.classInst.endpointHarmonicForce))
-            
-            h5File.create_group("nebParams")
-            for (key, val) in self.classInst.nebParams.items():
-                h5File["nebParams"].attrs.create(key,val)
-            
-            for (nm, arr) in self.logDict.items():
-                h5File.create_dataset(nm,arr.shape,maxshape=(None,)+tuple(arr.shape[1:]))
-            
+            else:
+                if hasattr(self.classInst.mass,"__qualname__"):
+                    massNm = self.classInst.mass.__qualname__
+                elif hasattr(type(self.classInst.mass),"__qualname__"):
+                    massNm = type(self.classInst.mass).__qualname__
+                else:
+                    warnings.warn("ForceLogger mass has no attribute __qualname__,"+\
+                                  " will be logged as unknown name")
+                    massNm = "unknown"
+                #TODO: to actually log the mass function, we need to make
+                #it a class, with a __call__ method
+                # if (isinstance(self.classInst.mass,np.ndarray)) and \
+                #     isinstance(self.classInst.mass)
+        else:
+            massNm = "constant"
+        h5File.attrs.create("mass",massNm)
+        
+        h5File.attrs.create("endpointSpringForce",np.array(self.classInst.endpointSpringForce))
+        h5File.attrs.create("endpointHarmonicForce",np.array(self.classInst.endpointHarmonicForce))
+        
+        h5File.create_group("nebParams")
+        for (key, val) in self.classInst.nebParams.items():
+            h5File["nebParams"].attrs.create(key,val)
+        
+        settingsToStore = {key:self.loggerSettings[key] for key in \
+                           ["writeFreq","variables","compression","compressionOpts",\
+                            "shuffle","stride"]}
+        settingsToStore["dtype"] = [self.dtypes[nm].str for nm in self.loggedVariables[1]]
+        _write_logger_settings(h5File,settingsToStore)
+        
+        #One chunk per write in self.log
+        for (nm, arr) in self.logDict.items():
+            h5File.create_dataset(nm,arr.shape,maxshape=(None,)+tuple(arr.shape[1:]),\
+                                  chunks=arr.shape,dtype=arr.dtype,\
+                                  **_compression_kwargs(self.loggerSettings))
+        
+        #The number of rows written. The datasets are created with writeFreq
+        #rows, so their length alone does not say how many were logged
+        h5File.attrs.create("loggedRows",0)
+        
+        h5File.close()
+        self.isFileCreated = True
+        return None
+    
+    def _write(self,write):
+        """
+        Applies write, a function of the open log file, on the background
+        thread if loggerSettings["asyncWrite"], else right away.
+        """
+        if not self.isFileCreated:
+            self._create_file()
+        if self.loggerSettings["asyncWrite"]:
+            if self.writer is None:
+                self.writer = _AsyncH5Writer(self.fileName)
+            self.writer.submit(write)
+        else:
+            h5File = h5py.File(self.fileName,"a")
+            write(h5File)
             h5File.close()
+        return None
+    
+    def _write_rows(self,rows,nIters,bufferFree=None):
+        """
+        Writes rows, a dict of the logged variables, to the last iterations
+        of the first nIters iterations, and sets bufferFree when done.
+        """
+        def write(h5File):
+            try:
+                for (nm,arr) in rows.items():
+                    h5File[nm].resize((nIters,)+tuple(h5File[nm].shape[1:]))
+                    h5File[nm][nIters-arr.shape[0]:] = arr
+                #Written last, so that it only counts rows of every variable
+                h5File.attrs["loggedRows"] = nIters
+            finally:
+                if bufferFree is not None:
+                    bufferFree.set()
+            return None
+        
+        self._write(write)
+        return None
             
     def log(self,variablesDict):
         if self.logLevel != 0:
+            isLogged = (self.evalCounter % self.loggerSettings["stride"] == 0)
+            self.evalCounter += 1
+            if not isLogged:
+                return None
+            
             idx = self.iterCounter % self.loggerSettings["writeFreq"]
             for varNm in self.loggedVariables[self.logLevel]:
                 self.logDict[varNm][idx] = variablesDict[varNm]
                 
             if idx == (self.loggerSettings["writeFreq"] - 1):
-                h5File = h5py.File(self.fileName,"a")
-                for nm in self.loggedVariables[self.logLevel]:
-                    h5File[nm].resize((self.iterCounter+1,)+tuple(h5File[nm].shape[1:]))
-                    h5File[nm][-self.loggerSettings["writeFreq"]:] = self.logDict[nm]
-                
-                h5File.close()
+                if self.loggerSettings["asyncWrite"]:
+                    bufferFree = self.bufferFree[self.bufferIdx]
+                    bufferFree.clear()
+                    self._write_rows(self.logDict,self.iterCounter+1,bufferFree)
+                    
+                    self.bufferIdx = 1 - self.bufferIdx
+                    self.bufferFree[self.bufferIdx].wait()
+                    self.logDict = self.logBuffers[self.bufferIdx]
+                else:
+                    self._write_rows(self.logDict,self.iterCounter+1)
                 
             self.iterCounter += 1
         
@@ -168,48 +499,320 @@ class ForceLogger:
         """
         if self.logLevel != 0:
             idx = self.iterCounter % self.loggerSettings["writeFreq"]
-            #Only flushes if necessary
-            if idx != (self.loggerSettings["writeFreq"] - 1):
-                h5File = h5py.File(self.fileName,"a")
-                for nm in self.loggedVariables[self.logLevel]:
-                    h5File[nm].resize((self.iterCounter,)+tuple(h5File[nm].shape[1:]))
-                    h5File[nm][-idx:] = self.logDict[nm][:idx]
-                
-                h5File.close()
+            #Only flushes if necessary. idx == 0 right after a chunk is written
+            #in self.log, so there is nothing left to write
+            if idx != 0:
+                #Copied, as logging continues in self.logDict
+                rows = {nm:self.logDict[nm][:idx].copy() for nm in self.logDict}
+                self._write_rows(rows,self.iterCounter)
+            if self.writer is not None:
+                self.writer.flush()
         return None
     
-    def write_fire_params(self,tStep,alpha,stepsSinceReset,fireParams):
+    def close(self):
+        """
+        Waits for pending writes, and closes the log file, if it is kept open.
+        It is reopened by the next write.
+        """
+        if (self.logLevel != 0) and (self.writer is not None):
+            writer, self.writer = self.writer, None
+            writer.close()
+        return None
+    
+    def resume(self,fileName,nIters):
+        """
+        Continues logging to the existing log fileName, after its first nIters
+        evaluations (of which every stride-th was logged). Later evaluations, 
+        and the datasets written at the end of a run, are removed. If nothing 
+        has been logged to self.fileName yet, that file is removed. Used when 
+        resuming a VerletMinimization run.
+        
+        Parameters
+        ----------
+        fileName : str
+            The log to continue.
+        nIters : int
+            The number of evaluations to keep.
+        
+        Raises
+        ------
+        ValueError
+            If fileName has fewer than nIters evaluations, or a different
+            stride or variables.
+        
+        Returns
+        -------
+        None.
+        
+        """
         if self.logLevel != 0:
+            self.close()
+            isSameFile = (os.path.abspath(fileName) == os.path.abspath(self.fileName))
+            if self.isFileCreated and (not isSameFile) and (self.iterCounter == 0):
+                os.remove(self.fileName)
+            self.fileName = fileName
+            
             h5File = h5py.File(self.fileName,"a")
-            h5File.create_dataset("tStep",data=tStep)
-            h5File.create_dataset("alpha",data=alpha)
-            h5File.create_dataset("stepsSinceReset",data=stepsSinceReset)
+            stride = self.loggerSettings["stride"]
+            fileSettings = _read_logger_settings(h5File)
+            if fileSettings is None:
+                fileSettings = {"stride":1,"variables":["points","tangents","springForce",\
+                                                        "netForce"]}
+            if (fileSettings["stride"] != stride) or \
+                (list(fileSettings["variables"]) != self.loggedVariables[self.logLevel]):
+                h5File.close()
+                raise ValueError("Log "+fileName+" was written with a different stride or variables")
             
-            h5File.create_group("fire_params")
-            for (key,val) in fireParams.items():
-                h5File["fire_params"].attrs.create(key,val)
+            for nm in ["tStep","alpha","stepsSinceReset","fire_params","early_stop_params"]:
+                if nm in h5File:
+                    del h5File[nm]
+            if "runTime" in h5File.attrs:
+                del h5File.attrs["runTime"]
             
+            #The evaluations 0, stride, ... before nIters
+            nRows = -(-nIters//stride)
+            if "loggedRows" in h5File.attrs:
+                loggedRows = int(h5File.attrs["loggedRows"])
+            else:
+                loggedRows = min(h5File[nm].shape[0] for nm in self.loggedVariables[self.logLevel])
+            if loggedRows < nRows:
+                h5File.close()
+                raise ValueError("Log "+fileName+" has fewer than "+str(nIters)+\
+                                 " iterations")
+            #The start of the current chunk, which self.log rewrites
+            idx = nRows % self.loggerSettings["writeFreq"]
+            for nm in self.loggedVariables[self.logLevel]:
+                h5File[nm].resize((nRows,)+tuple(h5File[nm].shape[1:]))
+                self.logDict[nm][:idx] = h5File[nm][nRows-idx:nRows]
+            h5File.attrs["loggedRows"] = nRows
             h5File.close()
+            
+            self.isFileCreated = True
+            self.iterCounter = nRows
+            self.evalCounter = nIters
+        return None
+    
+    def write_fire_params(self,tStep,alpha,stepsSinceReset,fireParams):
+        if self.logLevel != 0:
+            def write(h5File):
+                h5File.create_dataset("tStep",data=tStep)
+                h5File.create_dataset("alpha",data=alpha)
+                h5File.create_dataset("stepsSinceReset",data=stepsSinceReset)
+                
+                h5File.create_group("fire_params")
+                for (key,val) in fireParams.items():
+                    h5File["fire_params"].attrs.create(key,val)
+                return None
+            
+            self._write(write)
         return None
     
     def write_runtime(self,runTime):
-        h5File = h5py.File(self.fileName,"a")
-        h5File.attrs.create("runTime",runTime)
-        h5File.close()
+        if self.logLevel != 0:
+            def write(h5File):
+                h5File.attrs.create("runTime",runTime)
+                return None
+            
+            self._write(write)
         return None
     
     def write_early_stop_params(self,earlyStopParams):
         if self.logLevel != 0:
-            h5File = h5py.File(self.fileName,"a")
-            h5File.create_group("early_stop_params")
-            for (key, val) in earlyStopParams.items():
-                h5File["early_stop_params"].attrs.create(key,val)
-            h5File.close()
+            def write(h5File):
+                h5File.create_group("early_stop_params")
+                for (key, val) in earlyStopParams.items():
+                    h5File["early_stop_params"].attrs.create(key,val)
+                return None
             
+            self._write(write)
         return None
         
-class LoadForceLogger:
-    def __init__(self,file):
+def _path_inds_from_row(row):
+    """
+    The path indices in a row of the allPathsIndsDict dataset.
+    """
+    return [tuple(val) for val in row["pathInds"][:row["nPts"]]]
+
+def _path_from_row(row):
+    """
+    The path in a row of the pathArrDict dataset.
+    """
+    return np.array(row["path"][:row["nPts"]])
+
+def _pad_paths(paths):
+    """
+    Stacks paths, each of shape (nPts,nDims), into one array of shape 
+    (len(paths),maxPts,nDims), padded with zeros. Returns it and the nPts of
+    each path.
+    """
+    paths = [np.asarray(path) for path in paths]
+    nPts = np.array([len(path) for path in paths],dtype=int)
+    allPts = np.concatenate(paths)
+    
+    rowInds = np.repeat(np.arange(len(paths)),nPts)
+    colInds = np.arange(len(allPts)) - np.repeat(np.cumsum(nPts)-nPts,nPts)
+    padded = np.zeros((len(paths),nPts.max())+allPts.shape[1:],dtype=allPts.dtype)
+    padded[rowInds,colInds] = allPts
+    return padded, nPts
+
+def _unravel_previous(previousFlatInds,gridShape):
+    """
+    Converts flat predecessor indices (-1 where there is none) to grid indices,
+    of shape previousFlatInds.shape+(nDims,), as in Dijkstra's previousIndsArr.
+    """
+    previousFlatInds = np.asarray(previousFlatInds)
+    previousIndsArr = -1*np.ones(previousFlatInds.shape+(len(gridShape),),dtype=int)
+    isReached = previousFlatInds >= 0
+    previousIndsArr[isReached] = \
+        np.array(np.unravel_index(previousFlatInds[isReached],gridShape)).T
+    return previousIndsArr
+
+def _masked_from_struct(arr):
+    """
+    The masked array stored as the fields "data" and "mask" of arr.
+    """
+    return np.ma.masked_array(arr["data"],mask=arr["mask"])
+
+class _LazyDataset:
+    """
+    A read-only view of a dataset in a log kept open by a loader. Only what is
+    sliced is read from disk; np.array(view) reads the whole dataset.
+    """
+    def __init__(self,dset,convert=None):
+        self.dset = dset
+        #Applied to everything read, e.g. _masked_from_struct
+        self.convert = convert
+        self.shape = dset.shape
+        self.dtype = dset.dtype
+        
+    def __len__(self):
+        return self.shape[0]
+    
+    def __getitem__(self,key):
+        arr = self.dset[key]
+        if self.convert is not None:
+            arr = self.convert(arr)
+        return arr
+    
+    def __array__(self,dtype=None,copy=None):
+        arr = np.asarray(self[()])
+        if dtype is not None:
+            arr = arr.astype(dtype)
+        return arr
+    
+    @property
+    def final(self):
+        """
+        The last row, e.g. the final iteration of a ForceLogger log.
+        """
+        if len(self) == 0:
+            raise IndexError("Dataset "+self.dset.name+" is empty")
+        return self[len(self)-1]
+    
+class _LazyPathDict(collections.abc.Mapping):
+    """
+    A read-only, dict-like view of a dataset of paths written by DijkstraLogger
+    (allPathsIndsDict or pathArrDict). The keys are read when the view is made;
+    a path is read when it is looked up.
+    """
+    def __init__(self,dset,keyField,convert):
+        self.dset = dset
+        self.convert = convert
+        keys = dset.fields(keyField)[()]
+        self.rowInds = {tuple(key):rowIter for (rowIter,key) in enumerate(keys)}
+        
+    def __getitem__(self,key):
+        return self.convert(self.dset[self.rowInds[tuple(key)]])
+    
+    def __iter__(self):
+        return iter(self.rowInds)
+    
+    def __len__(self):
+        return len(self.rowInds)
+    
+class _PredecessorPathDict(collections.abc.Mapping):
+    """
+    A read-only, dict-like view of the grid indices of the paths to
+    endpointIndices, as in Dijkstra._get_paths. A path is traced back through
+    previousFlatInds (the flat index of the node each node was reached from, 
+    of the grid's shape) when it is looked up. Endpoints that were not reached
+    are left out. previousFlatInds may be a dataset; it is read on first use.
+    """
+    def __init__(self,previousFlatInds,initialInds,endpointIndices):
+        self.source = previousFlatInds
+        self.initialInds = tuple(int(i) for i in initialInds)
+        self.endpointIndices = [tuple(int(i) for i in e) for e in endpointIndices]
+        self.previousFlatInds = None
+        self.reachedEndpoints = None
+        
+    def _load(self):
+        if self.previousFlatInds is not None:
+            return None
+        previousFlatInds = np.asarray(self.source[()])
+        self.gridShape = previousFlatInds.shape
+        self.previousFlatInds = previousFlatInds.ravel()
+        self.initialFlatInd = np.ravel_multi_index(self.initialInds,self.gridShape)
+        
+        self.reachedEndpoints = {}
+        for endptInds in self.endpointIndices:
+            flatInd = np.ravel_multi_index(endptInds,self.gridShape)
+            if (flatInd == self.initialFlatInd) or (self.previousFlatInds[flatInd] >= 0):
+                self.reachedEndpoints[endptInds] = flatInd
+        return None
+    
+    def __getitem__(self,key):
+        self._load()
+        flatInd = self.reachedEndpoints[tuple(int(i) for i in key)]
+        pathFlatInds = [flatInd]
+        while flatInd != self.initialFlatInd:
+            flatInd = self.previousFlatInds[flatInd]
+            pathFlatInds.append(flatInd)
+        pathFlatInds.reverse()
+        pathInds = np.array(np.unravel_index(pathFlatInds,self.gridShape)).T
+        return [tuple(inds) for inds in pathInds.tolist()]
+    
+    def __iter__(self):
+        self._load()
+        return iter(self.reachedEndpoints)
+    
+    def __len__(self):
+        self._load()
+        return len(self.reachedEndpoints)
+    
+class _LogLoader:
+    """
+    The context manager API of the loaders. If lazy, a loader keeps its file
+    open until close is called (or the with block exits).
+    """
+    def close(self):
+        if self.h5File is not None:
+            self.h5File.close()
+            self.h5File = None
+        return None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self,excType,excVal,excTb):
+        self.close()
+        return False
+    
+class LoadForceLogger(_LogLoader):
+    def __init__(self,file,lazy=False):
+        """
+        Loads a ForceLogger log.
+        
+        Parameters
+        ----------
+        file : str
+            The .lap or .mep file.
+        lazy : bool, optional
+            If True, the file is kept open and its datasets are loaded as
+            read-only views (with a "final" attribute for the last iteration),
+            read from disk only when sliced. Call close, or use the loader in a
+            with block, when done. The default is False.
+        
+        """
         allowedExtensions = [".lap",".mep"]
         fileExt = file[-4:]
         if fileExt not in allowedExtensions:
@@ -219,6 +822,7 @@ class LoadForceLogger:
         arrayAttrs = ["endpointSpringForce","endpointHarmonicForce"]
                     
         self.fileName = file
+        self.lazy = lazy
         h5File = h5py.File(self.fileName,"r")
         for attr in h5File.attrs:
             if attr in scalarAttrs:
@@ -231,11 +835,28 @@ class LoadForceLogger:
         self.nebParams = {}
         for attr in h5File["nebParams"].attrs:
             self.nebParams[attr] = h5File["nebParams"].attrs[attr]
+        
+        #Logs written before logger_settings existed logged every evaluation
+        self.loggerSettings = _read_logger_settings(h5File)
+        stride = 1 if self.loggerSettings is None else self.loggerSettings["stride"]
             
         for dset in h5File.keys():
-            setattr(self,dset,np.array(h5File[dset]))
+            if dset == "logger_settings":
+                continue
+            if lazy and isinstance(h5File[dset],h5py.Dataset):
+                setattr(self,dset,_LazyDataset(h5File[dset]))
+            else:
+                setattr(self,dset,np.array(h5File[dset]))
         
-        h5File.close()
+        #The evaluations in the logged datasets
+        nRows = max([h5File[dset].shape[0] for dset in ["points","tangents","springForce",\
+                                                         "netForce"] if dset in h5File],\
+                    default=0)
+        self.loggedIters = stride*np.arange(nRows)
+        
+        self.h5File = h5File
+        if not lazy:
+            self.close()
         
 class LoadForceLog(LoadForceLogger):
     def __init__(self,file):
@@ -256,7 +877,9 @@ class NDInterpLogger:
         #can point to these files
 
 class DijkstraLogger:
-    def __init__(self,djkInst,logLevel=1,fName=None):
+    def __init__(self,djkInst,logLevel=1,fName=None,loggerSettings={}):
+        #See _fill_grid_logger_settings for loggerSettings
+        self.loggerSettings = _fill_grid_logger_settings(loggerSettings)
         self.logLevel = logLevel
         if self.logLevel not in [0,1,2]:
             raise ValueError("DijkstraLogger logLevel "+str(self.logLevel)+\
@@ -283,13 +906,8 @@ class DijkstraLogger:
             for (cIter, coord) in enumerate(self.djkInst.uniqueCoords):
                 h5File["uniqueCoords"].create_dataset("coord_"+str(cIter),\
                                                       data=np.array(coord))
-            h5File.create_dataset("potArr",data=self.djkInst.potArr)
-            if djkInst.trimVals[0] is not None:
-                h5File["potArr"].attrs.create("minTrim",data=self.djkInst.trimVals[0])
-            if djkInst.trimVals[1] is not None:
-                h5File["potArr"].attrs.create("maxTrim",data=self.djkInst.trimVals[1])
-                
-            h5File.create_dataset("inertArr",data=self.djkInst.inertArr)
+            _write_grids(h5File,self.djkInst,self.loggerSettings)
+            _write_logger_settings(h5File,self.loggerSettings)
             
             h5File.create_dataset("endpointIndices",data=np.array(self.djkInst.endpointIndices))
             h5File.create_dataset("allowedEndpoints",data=self.djkInst.allowedEndpoints)
@@ -315,6 +933,8 @@ class DijkstraLogger:
 
         """
         h5File = h5py.File(self.fileName,"a")
+        #For the grid-sized datasets
+        compressionKwargs = _compression_kwargs(self.loggerSettings)
         for (var, nm) in zip(variables,variableNames):
             #Unfortunately this doesn't seem to be abstractable, but perhaps I
             #don't need it to be
@@ -324,49 +944,34 @@ class DijkstraLogger:
                 arr = np.zeros(var.shape,dtype=dtype)
                 arr["data"] = var.data
                 arr["mask"] = var.mask
-                h5File.create_dataset(nm,data=arr)
-            elif nm == "neighborsVisitDict":
-                dtype = np.dtype([("key",int,(self.djkInst.nDims,)),\
-                                  ("val",int,(self.djkInst.nDims,))])
-                arr = np.zeros(len(var.keys()),dtype=dtype)
-                for (keyIter,key) in enumerate(var.keys()):
-                    arr[keyIter]["key"] = key
-                    arr[keyIter]["val"] = var[key]
-                h5File.create_dataset(nm,data=arr)
-            elif nm == "allPathsIndsDict":
-                maxSize = np.max([len(path) for path in var.values()])
-                dtype = np.dtype([("finalInd",int,(self.djkInst.nDims,)),\
+                h5File.create_dataset(nm,data=arr,**compressionKwargs)
+            elif nm in ["previousIndsArr","actionField"]:
+                h5File.create_dataset(nm,data=var,**compressionKwargs)
+            elif nm == "previousFlatInds":
+                #Of the grid's shape; the flat index of the node each node was
+                #reached from, or -1. The paths are traced back from it when
+                #loaded (see _PredecessorPathDict)
+                dtype = np.int32 if var.size < 2**31 else np.int64
+                h5File.create_dataset(nm,data=var.astype(dtype),**compressionKwargs)
+            elif nm in ["allPathsIndsDict","pathArrDict"]:
+                keyNm, pathNm, dataType = {"allPathsIndsDict":("finalInd","pathInds",int),\
+                                           "pathArrDict":("finalPoint","path",float)}[nm]
+                paths, nPts = _pad_paths(var.values())
+                dtype = np.dtype([(keyNm,dataType,(self.djkInst.nDims,)),\
                                   ("nPts",int),\
-                                  ("pathInds",int,(maxSize,self.djkInst.nDims))])
+                                  (pathNm,dataType,paths.shape[1:])])
                 #Only the first nPts points are valid
-                arr = np.zeros(len(var.keys()),dtype=dtype)
-                for (keyIter,key) in enumerate(var.keys()):
-                    arr["finalInd"][keyIter] = np.array(key)
-                    path = np.array(var[key])
-                    nPts = path.shape[0]
-                    arr["nPts"][keyIter] = nPts
-                    arr["pathInds"][keyIter,:nPts] = path
-                h5File.create_dataset(nm,data=arr)
-            elif nm == "pathArrDict":
-                maxSize = np.max([path.shape[0] for path in var.values()])
-                dtype = np.dtype([("finalPoint",float,(self.djkInst.nDims,)),\
-                                  ("nPts",int),\
-                                  ("path",float,(maxSize,self.djkInst.nDims))])
-                #Only the first nPts points are valid
-                arr = np.zeros(len(var.keys()),dtype=dtype)
-                for (keyIter,key) in enumerate(var.keys()):
-                    arr["finalPoint"][keyIter] = np.array(key)
-                    path = np.array(var[key])
-                    nPts = path.shape[0]
-                    arr["nPts"][keyIter] = nPts
-                    arr["path"][keyIter,:nPts] = path
-                h5File.create_dataset(nm,data=arr)
+                arr = np.zeros(len(var),dtype=dtype)
+                arr[keyNm] = np.array(list(var.keys()))
+                arr["nPts"] = nPts
+                arr[pathNm] = paths
+                h5File.create_dataset(nm,data=arr,**compressionKwargs)
             elif nm == "endptOut":
                 h5File.attrs.create("minimalEndpt",np.array(var))
             elif nm == "endpointIndsList":
                 if len(var) > 0:
                     h5File.create_dataset("unvisitedEndpoints",data=np.array(var))
-            elif nm == "runTime":
+            elif nm in ["weightsRunTime","runTime"]:
                 h5File.attrs.create(nm,var)
             else:
                 warnings.warn("Variable "+nm+" not logged to HDF5 file")
@@ -414,21 +1019,41 @@ class DijkstraLogger:
                     
         return None
             
-class LoadDijkstraLogger:
-    #Maybe can just be a function
-    def __init__(self,file):
+class LoadDijkstraLogger(_LogLoader):
+    def __init__(self,file,lazy=False):
+        """
+        Loads a DijkstraLogger log.
+        
+        Parameters
+        ----------
+        file : str
+            The .djk file.
+        lazy : bool, optional
+            If True, the file is kept open. The grid-sized datasets are loaded
+            as read-only views, read from disk only when sliced, and 
+            allPathsIndsDict and pathArrDict as read-only dict-like views, that
+            read a path when it is looked up. Call close, or use the loader in
+            a with block, when done. The default is False.
+        
+        """
         if not file.endswith(".djk"):
             raise TypeError("File "+str(file)+" does not have extension .djk")
         
-        scalarAttrs = ["runTime","target_func"]
+        scalarAttrs = ["weightsRunTime","runTime","target_func"]
         tupleAttrs = ["initialInds","initialPoint","minimalEndpt"]
-        expectedDSets = ["allPathsIndsDict","allowedEndpoints","endpointIndices",\
-                         "inertArr","neighborsVisitDict","pathArrDict","potArr",\
-                         "tentativeDistance"]
+        expectedDSets = ["allowedEndpoints","endpointIndices","inertArr","pathArrDict",\
+                         "potArr"]
+        #Written by Dijkstra, or by FastMarching ("actionField")
+        optionalDSets = ["actionField","allPathsIndsDict","previousFlatInds",\
+                         "previousIndsArr","tentativeDistance"]
         dsetsDict = {}
         
         h5File = h5py.File(file,"r")
         
+        self.loggerSettings = _read_logger_settings(h5File)
+        if (self.loggerSettings is not None) and (not self.loggerSettings["writeGrids"]):
+            expectedDSets = [d for d in expectedDSets if d not in ["potArr","inertArr"]]
+        
         for attr in h5File.attrs:
             if attr in scalarAttrs:
                 setattr(self,attr,h5File.attrs[attr])
@@ -437,49 +1062,84 @@ class LoadDijkstraLogger:
             else:
                 warnings.warn("Attribute "+attr+" not recognized; will not be loaded")
                 
-        for d in expectedDSets:
+        try:
+            for d in expectedDSets:
+                if d not in h5File:
+                    raise ValueError("Dataset "+d+" expected but not found")
+                dsetsDict[d] = _get_dataset(h5File,d)
+        except ValueError:
+            h5File.close()
+            raise
+        for d in optionalDSets:
             if d in h5File:
-                dsetsDict[d] = np.array(h5File[d])
-            else:
-                h5File.close()
-                raise ValueError("Dataset "+d+" expected but not found")
+                dsetsDict[d] = h5File[d]
         
         self.uniqueCoords = [np.array(h5File["uniqueCoords"][c]) for c in h5File["uniqueCoords"]]
         
-        h5File.close()
+        self._set_attrs(dsetsDict,lazy)
         
-        self._set_attrs(dsetsDict)
+        self.h5File = h5File
+        if not lazy:
+            self.close()
         
-    def _set_attrs(self,dsetsDict):
-        #Tested via Spyder console, but not rigorously
-        self.allPathsIndsDict = {}
-        for (i,p) in enumerate(dsetsDict["allPathsIndsDict"]):
-            self.allPathsIndsDict[tuple(p["finalInd"])] = \
-                [tuple(val) for val in p["pathInds"][:p["nPts"]]]
-                
-        self.allowedEndpoints = dsetsDict["allowedEndpoints"]
-        self.endpointIndices = [tuple(val) for val in dsetsDict["endpointIndices"]]
-        self.inertArr = np.array(dsetsDict["inertArr"])
-        
-        self.neighborsVisitDict = {}
-        for (i,p) in enumerate(dsetsDict["neighborsVisitDict"]):
-            self.neighborsVisitDict[tuple(p["key"])] = tuple(p["val"])
-            
-        self.pathArrDict = {}
-        for (i,p) in enumerate(dsetsDict["pathArrDict"]):
-            self.pathArrDict[tuple(p["finalPoint"])] = \
-                np.array(p["path"][:p["nPts"]])
+    def _set_attrs(self,dsetsDict,lazy=False):
+        #dsetsDict holds the h5py datasets; they are read here unless lazy
+        if "allPathsIndsDict" in dsetsDict:
+            if lazy:
+                self.allPathsIndsDict = _LazyPathDict(dsetsDict["allPathsIndsDict"],\
+                                                      "finalInd",_path_inds_from_row)
+            else:
+                self.allPathsIndsDict = {}
+                for p in dsetsDict["allPathsIndsDict"][()]:
+                    self.allPathsIndsDict[tuple(p["finalInd"])] = _path_inds_from_row(p)
                 
-        self.potArr = dsetsDict["potArr"]
+        self.allowedEndpoints = np.array(dsetsDict["allowedEndpoints"])
+        self.endpointIndices = [tuple(val) for val in dsetsDict["endpointIndices"][()]]
         
-        self.tentativeDistance = \
-            np.ma.masked_array(dsetsDict["tentativeDistance"]["data"],\
-                               mask=dsetsDict["tentativeDistance"]["mask"])
+        #None if not logged (see loggerSettings["writeGrids"])
+        self.inertArr = None
+        self.potArr = None
+        gridDSets = {"inertArr":None,"potArr":None,"previousIndsArr":None,\
+                     "actionField":None,"tentativeDistance":_masked_from_struct}
+        for (d,convert) in gridDSets.items():
+            if d not in dsetsDict:
+                continue
+            if lazy:
+                setattr(self,d,_LazyDataset(dsetsDict[d],convert=convert))
+            else:
+                arr = dsetsDict[d][()]
+                if convert is not None:
+                    arr = convert(arr)
+                setattr(self,d,arr)
+            
+        #Logs from Dijkstra store the flat predecessor indices, and not 
+        #previousIndsArr or allPathsIndsDict
+        if "previousFlatInds" in dsetsDict:
+            dset = dsetsDict["previousFlatInds"]
+            unravel = functools.partial(_unravel_previous,gridShape=dset.shape)
+            if lazy:
+                self.previousFlatInds = _LazyDataset(dset)
+                self.previousIndsArr = _LazyDataset(dset,convert=unravel)
+            else:
+                self.previousFlatInds = dset[()]
+                self.previousIndsArr = unravel(self.previousFlatInds)
+            self.allPathsIndsDict = _PredecessorPathDict(self.previousFlatInds,\
+                                                         self.initialInds,self.endpointIndices)
+            
+        if lazy:
+            self.pathArrDict = _LazyPathDict(dsetsDict["pathArrDict"],"finalPoint",\
+                                             _path_from_row)
+        else:
+            self.pathArrDict = {}
+            for p in dsetsDict["pathArrDict"][()]:
+                self.pathArrDict[tuple(p["finalPoint"])] = _path_from_row(p)
             
         return None
     
 class DPMLogger:
-    def __init__(self,classInst,logLevel=1,fName=None):
+    def __init__(self,classInst,logLevel=1,fName=None,loggerSettings={}):
+        #See _fill_grid_logger_settings for loggerSettings
+        self.loggerSettings = _fill_grid_logger_settings(loggerSettings)
         os.makedirs("logs",exist_ok=True)
         
         if fName is None:
@@ -507,13 +1167,8 @@ class DPMLogger:
             for (cIter, coord) in enumerate(self.classInst.uniqueCoords):
                 h5File["uniqueCoords"].create_dataset("coord_"+str(cIter),\
                                                       data=np.array(coord))
-            h5File.create_dataset("potArr",data=self.classInst.potArr)
-            if self.classInst.trimVals[0] is not None:
-                h5File["potArr"].attrs.create("minTrim",data=self.classInst.trimVals[0])
-            if self.classInst.trimVals[1] is not None:
-                h5File["potArr"].attrs.create("maxTrim",data=self.classInst.trimVals[1])
-                
-            h5File.create_dataset("inertArr",data=self.classInst.inertArr)
+            _write_grids(h5File,self.classInst,self.loggerSettings)
+            _write_logger_settings(h5File,self.loggerSettings)
             
             h5File.create_dataset("endpointIndices",data=np.array(self.classInst.endpointIndices))
             h5File.create_dataset("allowedEndpoints",data=self.classInst.allowedEndpoints)
@@ -521,9 +1176,10 @@ class DPMLogger:
             #Initializing datasets
             previousIndsArrInit = -1*np.ones(self.classInst.potArr.shape+(self.classInst.nDims,),\
                                              dtype=int)
-            h5File.create_dataset("previousIndsArr",data=previousIndsArrInit)
+            compressionKwargs = _compression_kwargs(self.loggerSettings)
+            h5File.create_dataset("previousIndsArr",data=previousIndsArrInit,**compressionKwargs)
             distArrInit = np.inf*np.ones(self.classInst.potArr.shape)
-            h5File.create_dataset("distArr",data=distArrInit)
+            h5File.create_dataset("distArr",data=distArrInit,**compressionKwargs)
             
             h5File.close()
         
@@ -581,8 +1237,22 @@ class DPMLogger:
                     
         return None
     
-class LoadDPMLogger:
-    def __init__(self,fName):
+class LoadDPMLogger(_LogLoader):
+    def __init__(self,fName,lazy=False):
+        """
+        Loads a DPMLogger log.
+        
+        Parameters
+        ----------
+        fName : str
+            The .dpm file.
+        lazy : bool, optional
+            If True, the file is kept open and distArr, potArr and 
+            previousIndsArr are loaded as read-only views, read from disk only
+            when sliced. Call close, or use the loader in a with block, when
+            done. The default is False.
+        
+        """
         if not fName.endswith(".dpm"):
             raise TypeError("File "+str(fName)+" does not have extension .dpm")
         
@@ -594,6 +1264,12 @@ class LoadDPMLogger:
         
         h5File = h5py.File(fName,"r")
         
+        self.loggerSettings = _read_logger_settings(h5File)
+        #None if not logged (see loggerSettings["writeGrids"])
+        self.potArr = None
+        if (self.loggerSettings is not None) and (not self.loggerSettings["writeGrids"]):
+            expectedDSets = [d for d in expectedDSets if d != "potArr"]
+        
         for attr in h5File.attrs:
             if attr in scalarAttrs:
                 setattr(self,attr,h5File.attrs[attr])
@@ -602,12 +1278,17 @@ class LoadDPMLogger:
             else:
                 warnings.warn("Attribute "+attr+" not recognized; will not be loaded")
                 
-        for d in expectedDSets:
-            if d in h5File:
-                setattr(self,d,np.array(h5File[d]))
-            else:
-                h5File.close()
-                raise ValueError("Dataset "+d+" expected but not found")
+        try:
+            for d in expectedDSets:
+                if d not in h5File:
+                    raise ValueError("Dataset "+d+" expected but not found")
+                if lazy and (d in ["distArr","potArr","previousIndsArr"]):
+                    setattr(self,d,_LazyDataset(_get_dataset(h5File,d)))
+                else:
+                    setattr(self,d,np.array(_get_dataset(h5File,d)))
+        except ValueError:
+            h5File.close()
+            raise
         
         self.uniqueCoords = [np.array(h5File["uniqueCoords"][c]) for c in h5File["uniqueCoords"]]
         
@@ -619,5 +1300,7 @@ class LoadDPMLogger:
             self.pathIndsDict[key] = np.array(h5File["endpoints"][gp]["inds"])
             self.pathDict[key] = np.array(h5File["endpoints"][gp]["points"])
         
-        h5File.close()
+        self.h5File = h5File
+        if not lazy:
+            self.close()
         
\ No newline at end of file
@@ -7,11 +7,15 @@ import numpy as np
 import itertools
 
 from scipy.integrate import solve_bvp
+from scipy.interpolate import RegularGridInterpolator
 
 import h5py
+import os
+import shutil
 import sys
 import time
 import warnings
+import heapq
 
 from utilities import *
 from fileio import *
@@ -24,7 +28,211 @@ CONVENTIONS:
     -Similarly, functions (e.g. the action) that take in many points should also
         assume the first index iterates over the points
 """
-    
+
+class BandForces:
+    """
+    Whole-band force components of the nudged elastic band, shared by
+    LeastActionPath and MinimumEnergyPath. Defined for namespace purposes.
+
+    Every method acts on the last two axes of its inputs, so a band is of shape
+    (nPts,nDims), with energies of shape (nPts,). Leading axes are carried through
+    unchanged.
+
+    :Maintainer: Daniel
+    """
+    @staticmethod
+    def select_bands(param,bandInds=None):
+        """
+        Selects the entries of a per-band NEB parameter.
+
+        Parameters
+        ----------
+        param : float or ndarray
+            A scalar, applied to every band, or an array of shape (nBands,).
+        bandInds : ndarray of ints, optional
+            The bands to select. The default is None, which selects every band.
+
+        Returns
+        -------
+        float or ndarray
+
+        """
+        param = np.asarray(param)
+        if (param.ndim == 0) or (bandInds is None):
+            return param
+        return param[bandInds]
+
+    @staticmethod
+    def tangents(points,energies):
+        """
+        Energy-weighted tangent vectors, from https://doi.org/10.1063/1.1323224
+        eqns 8-11. Tangents on the endpoints do not appear in the formulas, and
+        are left as zero.
+
+        Parameters
+        ----------
+        points : ndarray
+            The band. Of shape (...,nPts,nDims).
+        energies : ndarray
+            The energy at every image. Of shape (...,nPts).
+
+        Returns
+        -------
+        tangents : ndarray
+            The normalized tangent vectors. Of shape (...,nPts,nDims).
+
+        """
+        tangents = np.zeros(points.shape)
+
+        tp = points[...,2:,:] - points[...,1:-1,:]
+        tm = points[...,1:-1,:] - points[...,:-2,:]
+
+        enegPlus = energies[...,2:]
+        enegCurrent = energies[...,1:-1]
+        enegMinus = energies[...,:-2]
+
+        dVPlus = np.absolute(enegPlus - enegCurrent)
+        dVMinus = np.absolute(enegMinus - enegCurrent)
+        dVMax = np.maximum(dVPlus,dVMinus)[...,None]
+        dVMin = np.minimum(dVPlus,dVMinus)[...,None]
+
+        isIncreasing = ((enegPlus > enegCurrent) & (enegCurrent > enegMinus))[...,None]
+        isDecreasing = ((enegPlus < enegCurrent) & (enegCurrent < enegMinus))[...,None]
+        plusIsLarger = (enegPlus > enegMinus)[...,None]
+
+        tangents[...,1:-1,:] = \
+            np.where(isIncreasing,tp,
+                     np.where(isDecreasing,tm,
+                              np.where(plusIsLarger,tp*dVMax + tm*dVMin,
+                                       tp*dVMin + tm*dVMax)))
+
+        #Normalizing vectors, without throwing errors about zero tangent vector
+        norms = np.linalg.norm(tangents,axis=-1,keepdims=True)
+        np.divide(tangents,norms,out=tangents,where=(norms!=0))
+
+        return tangents
+
+    @staticmethod
+    def spring_force(points,tangents,k,endpointSpringForce):
+        """
+        Spring force taken from https://doi.org/10.1063/1.5007180 eqns 20-22
+
+        Parameters
+        ----------
+        points : ndarray
+            The band. Of shape (...,nPts,nDims).
+        tangents : ndarray
+            The tangent vectors. Of shape (...,nPts,nDims).
+        k : float or ndarray
+            The spring constant. If an array, of shape points.shape[:-2].
+        endpointSpringForce : tuple of bools
+            Whether to apply the spring force to the first and last image.
+
+        Returns
+        -------
+        springForce : ndarray
+            Of shape (...,nPts,nDims).
+
+        """
+        k = np.asarray(k)[...,None,None]
+        springForce = np.zeros(points.shape)
+
+        segLengths = np.linalg.norm(np.diff(points,axis=-2),axis=-1)
+        springForce[...,1:-1,:] = \
+            k*(segLengths[...,1:] - segLengths[...,:-1])[...,None]*tangents[...,1:-1,:]
+
+        if endpointSpringForce[0]:
+            springForce[...,0,:] = k[...,0,:]*(points[...,1,:] - points[...,0,:])
+
+        if endpointSpringForce[1]:
+            springForce[...,-1,:] = k[...,0,:]*(points[...,-2,:] - points[...,-1,:])
+
+        return springForce
+
+    @staticmethod
+    def perpendicular_component(force,tangents):
+        """
+        Removes the component of force parallel to tangents, at every image.
+
+        Parameters
+        ----------
+        force : ndarray
+            Of shape (...,nPts,nDims).
+        tangents : ndarray
+            The normalized tangent vectors. Of shape (...,nPts,nDims).
+
+        Returns
+        -------
+        perpForce : ndarray
+            Of shape (...,nPts,nDims).
+
+        """
+        projection = np.sum(force*tangents,axis=-1,keepdims=True)
+        return force - projection*tangents
+
+    @staticmethod
+    def net_force(perpForce,springForce,endpointForce,energies,kappa,constraintEneg,\
+                  endpointHarmonicForce):
+        """
+        Assembles the force on the band. Interior images feel the perpendicular
+        force plus the spring force; the endpoints feel the spring force and,
+        optionally, a harmonic force that pulls them onto the constraintEneg
+        contour along the direction of endpointForce.
+
+        Parameters
+        ----------
+        perpForce : ndarray
+            Of shape (...,nPts,nDims).
+        springForce : ndarray
+            Of shape (...,nPts,nDims).
+        endpointForce : ndarray
+            The force whose direction is used for the endpoint harmonic force.
+            Of shape (...,nPts,nDims). Only the endpoints are used.
+        energies : ndarray
+            Of shape (...,nPts).
+        kappa : float or ndarray
+            The harmonic force constant. If an array, of shape energies.shape[:-1].
+        constraintEneg : float or ndarray
+            The energy the endpoints are pulled towards. If an array, of shape
+            energies.shape[:-1].
+        endpointHarmonicForce : tuple of bools
+            Whether to apply the harmonic force to the first and last image.
+
+        Returns
+        -------
+        netForce : ndarray
+            Of shape (...,nPts,nDims).
+
+        """
+        kappa = np.asarray(kappa)[...,None]
+        constraintEneg = np.asarray(constraintEneg)[...,None]
+
+        netForce = np.zeros(perpForce.shape)
+        netForce[...,1:-1,:] = perpForce[...,1:-1,:] + springForce[...,1:-1,:]
+
+        for (endIdx, useHarmonic) in zip([0,-1],endpointHarmonicForce):
+            spring = springForce[...,endIdx,:]
+            if not useHarmonic:
+                netForce[...,endIdx,:] = spring
+                continue
+
+            #Avoids throwing divide-by-zero errors, but also deals with points with
+            #gradient within the finite-difference error from 0. Simplest example
+            #is V(x,y) = x^2+y^2, at the origin. There, the gradient is the finite
+            #difference value fdTol, in both directions, and so normalizing the
+            #force artificially creates a force that should not be present
+            force = endpointForce[...,endIdx,:]
+            isNegligible = np.all(np.absolute(force) <= fdTol,axis=-1,keepdims=True)
+            forceNorm = np.linalg.norm(force,axis=-1,keepdims=True)
+            normForce = np.zeros(force.shape)
+            np.divide(force,forceNorm,out=normForce,where=~isNegligible)
+
+            projection = np.sum(spring*normForce,axis=-1,keepdims=True)
+            harmonic = kappa*(energies[...,endIdx,None] - constraintEneg)
+            netForce[...,endIdx,:] = spring - (projection - harmonic)*normForce
+
+        return netForce
+
 class LeastActionPath:
     """
     class documentation...?
@@ -34,14 +242,19 @@ class LeastActionPath:
     def __init__(self,potential,nPts,nDims,mass=None,endpointSpringForce=True,\
                  endpointHarmonicForce=True,target_func=TargetFunctions.action,\
                  target_func_grad=GradientApproximations().forward_action_grad,\
-                 nebParams={},logLevel=1,loggerSettings={}):
+                 nebParams={},logLevel=1,loggerSettings={},\
+                 target_func_batch_grad=GradientApproximations().forward_action_batch_grad):
         """
         asdf
 
         Parameters
         ----------
         potential : Function
-            To be called as potential(path). Is passed to "target_func".
+            To be called as potential(path). Is passed to "target_func". If it
+            has a grad method (see utilities._has_analytic_grad), the default
+            target_func_grad uses it rather than finite differences. May be
+            wrapped in an EvaluationCache (as may mass), which is cleared at
+            the start of every force evaluation.
         endpointSpringForce : Bool or tuple of bools
             If a single bool, behavior is applied to both endpoints. If is a tuple
             of bools, the first stands for the index 0 on the path; the second stands
@@ -54,7 +267,8 @@ class LeastActionPath:
             when working with (Q20,Q30), nDims = 2.
         mass : Function, optional
             To be called as mass(path). Is passed to "target_func". If mass == None,
-            the collective inertia is the identity matrix. The default is None.
+            the collective inertia is the identity matrix. May have a grad method,
+            as for potential. The default is None.
         target_func : Function, optional
             The approximation of the action integral. Should take as arguments
             (path, potential, mass). Should return (action, potentialAtPath, massesAtPath).
@@ -64,12 +278,21 @@ class LeastActionPath:
             Should take as arguments 
                 (path, potentialFunc, potentialOnPath, massFunc, massOnPath, target_func),
             where target_func is the action integral approximation. Should return 
-            (gradOfAction, gradOfPes). The default is forward_action_grad.
+            (gradOfAction, gradOfPes). The default is forward_action_grad. For
+            a parallel gradient, use e.g.
+                GradientApproximations(executor=GradientExecutor(...)).discrete_sqr_action_grad_mp;
+            the executor's workers are kept for the whole run, and shut down
+            by self.shutdown_workers.
         nebParams : Dict, optional
             Keyword arguments for the nudged elastic band (NEB) method. Controls
             the spring force and the harmonic oscillator potential. Default
             parameters are controlled by a dictionary in the __init__ method.
+            Values may be arrays of length nBands, for use with compute_batch_force.
             The default is {}.
+        target_func_batch_grad : Function, optional
+            As target_func_grad, but for a stack of paths of shape (nBands,nPts,nDims).
+            Used by compute_batch_force. The default is forward_action_batch_grad.
+            If None, target_func_grad is called on each band in turn.
 
         Returns
         -------
@@ -108,85 +331,57 @@ class LeastActionPath:
         self.nDims = nDims
         self.target_func = target_func
         self.target_func_grad = target_func_grad
+        self.target_func_batch_grad = target_func_batch_grad
         
         self.logger = ForceLogger(self,logLevel,loggerSettings,".lap")
     
+    def _clear_caches(self):
+        """
+        Clears the stored values of self.potential and self.mass, if they are
+        EvaluationCache instances, so that memory does not grow over the run.
+        """
+        for func in [self.potential,self.mass]:
+            if isinstance(func,EvaluationCache):
+                func.clear()
+        return None
+    
     def _compute_tangents(self,points,energies):
         """
-        Here for testing sphinx autodoc
-        
+        Wrapper for BandForces.tangents
+
         Parameters
         ----------
-        points : TYPE
-            DESCRIPTION.
-        energies : TYPE
-            DESCRIPTION.
+        points : ndarray
+            The band. Of shape (nPts,nDims).
+        energies : ndarray
+            The energy at every image. Of shape (nPts,).
 
         Returns
         -------
-        tangents : TYPE
-            DESCRIPTION.
+        tangents : ndarray
+            The normalized tangent vectors. Of shape (nPts,nDims).
 
         """
-        tangents = np.zeros((self.nPts,self.nDims))
-        
-        #Range selected to exclude endpoints. Tangents on the endpoints do not
-        #appear in the formulas.
-        for ptIter in range(1,self.nPts-1):
-            tp = points[ptIter+1] - points[ptIter]
-            tm = points[ptIter] - points[ptIter-1]
-            dVMax = np.max(np.absolute([energies[ptIter+1]-energies[ptIter],\
-                                        energies[ptIter-1]-energies[ptIter]]))
-            dVMin = np.min(np.absolute([energies[ptIter+1]-energies[ptIter],\
-                                        energies[ptIter-1]-energies[ptIter]]))
-                
-            if (energies[ptIter+1] > energies[ptIter]) and \
-                (energies[ptIter] > energies[ptIter-1]):
-                tangents[ptIter] = tp
-            elif (energies[ptIter+1] < energies[ptIter]) and \
-                (energies[ptIter] < energies[ptIter-1]):
-                tangents[ptIter] = tm
-            elif energies[ptIter+1] > energies[ptIter-1]:
-                tangents[ptIter] = tp*dVMax + tm*dVMin
-            else:
-                tangents[ptIter] = tp*dVMin + tm*dVMax
-                
-            #Normalizing vectors, without throwing errors about zero tangent vector
-            if not np.array_equal(tangents[ptIter],np.zeros(self.nDims)):
-                tangents[ptIter] = tangents[ptIter]/np.linalg.norm(tangents[ptIter])
-        
-        return tangents
+        return BandForces.tangents(points,energies)
     
     def _spring_force(self,points,tangents):
         """
-        Spring force taken from https://doi.org/10.1063/1.5007180 eqns 20-22
+        Wrapper for BandForces.spring_force
 
         Parameters
         ----------
-        points : TYPE
-            DESCRIPTION.
-        tangents : TYPE
-            DESCRIPTION.
+        points : ndarray
+            The band. Of shape (nPts,nDims).
+        tangents : ndarray
+            The tangent vectors. Of shape (nPts,nDims).
 
         Returns
         -------
-        springForce : TYPE
-            DESCRIPTION.
+        springForce : ndarray
+            Of shape (nPts,nDims).
 
         """
-        springForce = np.zeros((self.nPts,self.nDims))
-        for i in range(1,self.nPts-1):
-            forwardDist = np.linalg.norm(points[i+1] - points[i])
-            backwardsDist = np.linalg.norm(points[i] - points[i-1])
-            springForce[i] = self.k*(forwardDist - backwardsDist)*tangents[i]
-            
-        if self.endpointSpringForce[0]:
-            springForce[0] = self.k*(points[1] - points[0])
-        
-        if self.endpointSpringForce[1]:
-            springForce[-1] = self.k*(points[self.nPts-2] - points[self.nPts-1])
-        
-        return springForce
+        return BandForces.spring_force(points,tangents,self.k,self.endpointSpringForce)
     
     def compute_force(self,points):
         expectedShape = (self.nPts,self.nDims)
@@ -198,6 +393,7 @@ class LeastActionPath:
                 sys.exit("Err: points "+str(points)+\
                          " does not match expected shape in LeastActionPath")
         
+        self._clear_caches()
         integVal, energies, masses = self.target_func(points,self.potential,self.mass)
         tangents = self._compute_tangents(points,energies)
         
@@ -207,55 +403,113 @@ class LeastActionPath:
             self.target_func_grad(points,self.potential,energies,self.mass,masses,\
                                   self.target_func)
                 
-        negIntegGrad = -gradOfAction.copy()
-        trueForce = -gradOfPes.copy()
-        
-        projection = np.array([np.dot(negIntegGrad[i],tangents[i]) \
-                               for i in range(self.nPts)])
-
-        parallelForce = np.array([projection[i]*tangents[i] for i in range(self.nPts)])
-
+        negIntegGrad = -gradOfAction
+        trueForce = -gradOfPes
         
-        perpForce = negIntegGrad - parallelForce
+        perpForce = BandForces.perpendicular_component(negIntegGrad,tangents)
         springForce = self._spring_force(points,tangents)
         
         #Computing optimal tunneling path force
-        netForce = np.zeros(points.shape)
-        for i in range(1,self.nPts-1):
-            netForce[i] = perpForce[i] + springForce[i]
-        #TODO: add check if force is very small...?
+        netForce = BandForces.net_force(perpForce,springForce,trueForce,energies,\
+                                        self.kappa,self.constraintEneg,\
+                                        self.endpointHarmonicForce)
         
-        #Avoids throwing divide-by-zero errors, but also deals with points with
-            #gradient within the finite-difference error from 0. Simplest example
-            #is V(x,y) = x^2+y^2, at the origin. There, the gradient is the finite
-            #difference value fdTol, in both directions, and so normalizing the
-            #force artificially creates a force that should not be present
-        if not np.allclose(trueForce[0],np.zeros(self.nDims),atol=fdTol):
-            normForce = trueForce[0]/np.linalg.norm(trueForce[0])
-        else:
-            normForce = np.zeros(self.nDims)
+        variablesDict = {"points":points,"tangents":tangents,"springForce":springForce,\
+                         "netForce":netForce}
+        self.logger.log(variablesDict)
         
-        if self.endpointHarmonicForce[0]:
-            netForce[0] = springForce[0] - (np.dot(springForce[0],normForce)-\
-                                            self.kappa*(energies[0]-self.constraintEneg))*normForce
-        else:
-            netForce[0] = springForce[0]
+        return netForce
+    
+    def compute_batch_force(self,points,bandInds=None):
+        """
+        Computes the force on a stack of bands at once. The potential and mass
+        are each called once on all of the images, rather than once per band.
+        The gradient is computed with self.target_func_batch_grad, if set, and
+        with self.target_func_grad on each band otherwise.
         
-        if not np.allclose(trueForce[-1],np.zeros(self.nDims),atol=fdTol):
-            normForce = trueForce[-1]/np.linalg.norm(trueForce[-1])
+        Per-iteration logging is not done for batches.
+
+        Parameters
+        ----------
+        points : ndarray
+            The bands. Of shape (nBands,nPts,nDims).
+        bandInds : ndarray of ints, optional
+            Which entries of any array-valued nebParams belong to the bands in
+            points. The default is None, in which case all entries are used.
+
+        Returns
+        -------
+        netForce : ndarray
+            Of shape (nBands,nPts,nDims).
+
+        """
+        expectedShape = (self.nPts,self.nDims)
+        if (points.ndim != 3) or (points.shape[1:] != expectedShape):
+            raise ValueError("points.shape is "+str(points.shape)+\
+                             "; required shape is (nBands,)+"+str(expectedShape))
+        nBands = points.shape[0]
+        flatPoints = points.reshape((-1,self.nDims))
+        
+        self._clear_caches()
+        potOnPoints = self.potential(flatPoints).reshape((nBands,self.nPts))
+        if self.mass is None:
+            massOnPoints = nBands*[None]
         else:
-            normForce = np.zeros(self.nDims)
-        if self.endpointHarmonicForce[1]:
-            netForce[-1] = springForce[-1] - (np.dot(springForce[-1],normForce)-\
-                                              self.kappa*(energies[-1]-self.constraintEneg))*normForce
+            massOnPoints = self.mass(flatPoints).reshape((nBands,self.nPts,self.nDims,self.nDims))
+        
+        #self.target_func is given arrays, so it does not call the potential again.
+        #It's still called to apply any processing it does, such as clipping
+        energies = np.zeros((nBands,self.nPts))
+        masses = None if self.mass is None else np.zeros(massOnPoints.shape)
+        for bandIter in range(nBands):
+            _, energies[bandIter], massOut = \
+                self.target_func(points[bandIter],potOnPoints[bandIter],massOnPoints[bandIter])
+            if masses is not None:
+                masses[bandIter] = massOut
+        
+        tangents = BandForces.tangents(points,energies)
+        if self.target_func_batch_grad is None:
+            gradOfAction = np.zeros(points.shape)
+            gradOfPes = np.zeros(points.shape)
+            for bandIter in range(nBands):
+                massOnBand = None if masses is None else masses[bandIter]
+                gradOfAction[bandIter], gradOfPes[bandIter] = \
+                    self.target_func_grad(points[bandIter],self.potential,energies[bandIter],\
+                                          self.mass,massOnBand,self.target_func)
         else:
-            netForce[-1] = springForce[-1]
-        
-        variablesDict = {"points":points,"tangents":tangents,"springForce":springForce,\
-                         "netForce":netForce}
-        self.logger.log(variablesDict)
+            gradOfAction, gradOfPes = \
+                self.target_func_batch_grad(points,self.potential,energies,self.mass,masses,\
+                                            self.target_func)
+        
+        perpForce = BandForces.perpendicular_component(-gradOfAction,tangents)
+        springForce = BandForces.spring_force(points,tangents,\
+                                              BandForces.select_bands(self.k,bandInds),\
+                                              self.endpointSpringForce)
+        netForce = BandForces.net_force(perpForce,springForce,-gradOfPes,energies,\
+                                        BandForces.select_bands(self.kappa,bandInds),\
+                                        BandForces.select_bands(self.constraintEneg,bandInds),\
+                                        self.endpointHarmonicForce)
         
         return netForce
+    
+    def shutdown_workers(self):
+        """
+        Shuts down the workers of self.target_func_grad and of
+        self.target_func_batch_grad, if they are methods of an object with a
+        GradientExecutor (such as GradientApproximations). Called by the
+        minimizers when a run ends.
+        
+        Returns
+        -------
+        None.
+        
+        """
+        for grad_func in [self.target_func_grad,self.target_func_batch_grad]:
+            gradObj = getattr(grad_func,"__self__",grad_func)
+            executor = getattr(gradObj,"executor",None)
+            if executor is not None:
+                executor.shutdown()
+        return None
 
 class MinimumEnergyPath:
     """
@@ -271,7 +525,11 @@ class MinimumEnergyPath:
         ----------
         potential : Function
             To be called as potential(path). This is the PES function. 
-            Is passed to "target_func".
+            Is passed to "target_func". If it has a grad method (see 
+            utilities._has_analytic_grad), the default target_func_grad uses it
+            rather than finite differences. May be wrapped in an EvaluationCache
+            (as may auxFunc), which is cleared at the start of every force 
+            evaluation.
         endpointSpringForce : Bool or tuple of bools
             If a single bool, behavior is applied to both endpoints. If is a tuple
             of bools, the first stands for the index 0 on the path; the second stands
@@ -299,6 +557,7 @@ class MinimumEnergyPath:
             Keyword arguments for the nudged elastic band (NEB) method. Controls
             the spring force and the harmonic oscillator potential. Default
             parameters are controlled by a dictionary in the __init__ method.
+            Values may be arrays of length nBands, for use with compute_batch_force.
             The default is {}.
 
         Returns
@@ -338,82 +597,53 @@ class MinimumEnergyPath:
         
         self.logger = ForceLogger(self,logLevel,loggerSettings,".mep")
     
+    def _clear_caches(self):
+        """
+        Clears the stored values of self.potential and self.auxFunc, if they are
+        EvaluationCache instances, so that memory does not grow over the run.
+        """
+        for func in [self.potential,self.auxFunc]:
+            if isinstance(func,EvaluationCache):
+                func.clear()
+        return None
+    
     def _compute_tangents(self,points,energies):
         """
-        Here for testing sphinx autodoc
-        
+        Wrapper for BandForces.tangents
+
         Parameters
         ----------
-        points : TYPE
-            DESCRIPTION.
-        energies : TYPE
-            DESCRIPTION.
+        points : ndarray
+            The band. Of shape (nPts,nDims).
+        energies : ndarray
+            The energy at every image. Of shape (nPts,).
 
         Returns
         -------
-        tangents : TYPE
-            DESCRIPTION.
+        tangents : ndarray
+            The normalized tangent vectors. Of shape (nPts,nDims).
 
         """
-        tangents = np.zeros((self.nPts,self.nDims))
-        
-        #Range selected to exclude endpoints. Tangents on the endpoints do not
-        #appear in the formulas.
-        for ptIter in range(1,self.nPts-1):
-            tp = points[ptIter+1] - points[ptIter]
-            tm = points[ptIter] - points[ptIter-1]
-            dVMax = np.max(np.absolute([energies[ptIter+1]-energies[ptIter],\
-                                        energies[ptIter-1]-energies[ptIter]]))
-            dVMin = np.min(np.absolute([energies[ptIter+1]-energies[ptIter],\
-                                        energies[ptIter-1]-energies[ptIter]]))
-                
-            if (energies[ptIter+1] > energies[ptIter]) and \
-                (energies[ptIter] > energies[ptIter-1]):
-                tangents[ptIter] = tp
-            elif (energies[ptIter+1] < energies[ptIter]) and \
-                (energies[ptIter] < energies[ptIter-1]):
-                tangents[ptIter] = tm
-            elif energies[ptIter+1] > energies[ptIter-1]:
-                tangents[ptIter] = tp*dVMax + tm*dVMin
-            else:
-                tangents[ptIter] = tp*dVMin + tm*dVMax
-                
-            #Normalizing vectors, without throwing errors about zero tangent vector
-            if not np.array_equal(tangents[ptIter],np.zeros(self.nDims)):
-                tangents[ptIter] = tangents[ptIter]/np.linalg.norm(tangents[ptIter])
-        
-        return tangents
+        return BandForces.tangents(points,energies)
     
     def _spring_force(self,points,tangents):
         """
-        Spring force taken from https://doi.org/10.1063/1.5007180 eqns 20-22
+        Wrapper for BandForces.spring_force
 
         Parameters
         ----------
-        points : TYPE
-            DESCRIPTION.
-        tangents : TYPE
-            DESCRIPTION.
+        points : ndarray
+            The band. Of shape (nPts,nDims).
+        tangents : ndarray
+            The tangent vectors. Of shape (nPts,nDims).
 
         Returns
         -------
-        springForce : TYPE
-            DESCRIPTION.
+        springForce : ndarray
+            Of shape (nPts,nDims).
 
         """
-        springForce = np.zeros((self.nPts,self.nDims))
-        for i in range(1,self.nPts-1):
-            forwardDist = np.linalg.norm(points[i+1] - points[i])
-            backwardsDist = np.linalg.norm(points[i] - points[i-1])
-            springForce[i] = self.k*(forwardDist - backwardsDist)*tangents[i]
-            
-        if self.endpointSpringForce[0]:
-            springForce[0] = self.k*(points[1] - points[0])
-        
-        if self.endpointSpringForce[1]:
-            springForce[-1] = self.k*(points[self.nPts-2] - points[self.nPts-1])
-        
-        return springForce
+        return BandForces.spring_force(points,tangents,self.k,self.endpointSpringForce)
     
     def compute_force(self,points):
         expectedShape = (self.nPts,self.nDims)
@@ -424,6 +654,7 @@ class MinimumEnergyPath:
             else:
                 sys.exit("Err: points "+str(points)+\
                          " does not match expected shape in MinimumEnergyPath")
+        self._clear_caches()
         PESEnergies, auxEnergies = self.target_func(points,self.potential,self.auxFunc)
         tangents = self._compute_tangents(points,PESEnergies)
         gradOfPES, gradOfAux = \
@@ -434,41 +665,13 @@ class MinimumEnergyPath:
             gradForce = trueForce + negAuxGrad
         else:
             gradForce = trueForce
-        projection = np.array([np.dot(gradForce[i],tangents[i]) \
-                               for i in range(self.nPts)])
-        parallelForce = np.array([projection[i]*tangents[i] for i in range(self.nPts)])
-        perpForce =  gradForce - parallelForce
+        perpForce = BandForces.perpendicular_component(gradForce,tangents)
         springForce = self._spring_force(points,tangents)
-        #Computing optimal tunneling path force
-        netForce = np.zeros(points.shape)
-        
-        for i in range(1,self.nPts-1):
-            netForce[i] = perpForce[i] + springForce[i]
-        #Avoids throwing divide-by-zero errors, but also deals with points with
-            #gradient within the finite-difference error from 0. Simplest example
-            #is V(x,y) = x^2+y^2, at the origin. There, the gradient is the finite
-            #difference value fdTol, in both directions, and so normalizing the
-            #force artificially creates a force that should not be present
-        if not np.allclose(gradForce[0],np.zeros(self.nDims),atol=fdTol):
-            normForce = gradForce[0]/np.linalg.norm(gradForce[0])
-        else:
-            normForce = np.zeros(self.nDims)
-        
-        if self.endpointHarmonicForce[0]:
-            netForce[0] = springForce[0] - (np.dot(springForce[0],normForce)-\
-                                            self.kappa*(PESEnergies[0]-self.constraintEneg))*normForce
-        else:
-            netForce[0] = springForce[0]
         
-        if not np.allclose(gradForce[-1],np.zeros(self.nDims),atol=fdTol):
-            normForce = gradForce[-1]/np.linalg.norm(gradForce[-1])
-        else:
-            normForce = np.zeros(self.nDims)
-        if self.endpointHarmonicForce[1]:
-            netForce[-1] = springForce[-1] - (np.dot(springForce[-1],normForce)-\
-                                              self.kappa*(PESEnergies[-1]-self.constraintEneg))*normForce
-        else:
-            netForce[-1] = springForce[-1]
+        #Computing optimal tunneling path force
+        netForce = BandForces.net_force(perpForce,springForce,gradForce,PESEnergies,\
+                                        self.kappa,self.constraintEneg,\
+                                        self.endpointHarmonicForce)
             
         variablesDict = {"points":points,"tangents":tangents,"springForce":springForce,\
                          "netForce":netForce}
@@ -476,11 +679,254 @@ class MinimumEnergyPath:
             
         return netForce
     
+    def compute_batch_force(self,points,bandInds=None):
+        """
+        Computes the force on a stack of bands at once. Assumes self.target_func
+        and self.target_func_grad act on each point independently (as do the
+        defaults), so that they can be called once on all of the images.
+        
+        Per-iteration logging is not done for batches.
+
+        Parameters
+        ----------
+        points : ndarray
+            The bands. Of shape (nBands,nPts,nDims).
+        bandInds : ndarray of ints, optional
+            Which entries of any array-valued nebParams belong to the bands in
+            points. The default is None, in which case all entries are used.
+
+        Returns
+        -------
+        netForce : ndarray
+            Of shape (nBands,nPts,nDims).
+
+        """
+        expectedShape = (self.nPts,self.nDims)
+        if (points.ndim != 3) or (points.shape[1:] != expectedShape):
+            raise ValueError("points.shape is "+str(points.shape)+\
+                             "; required shape is (nBands,)+"+str(expectedShape))
+        nBands = points.shape[0]
+        flatPoints = points.reshape((-1,self.nDims))
+        
+        self._clear_caches()
+        PESEnergies, _ = self.target_func(flatPoints,self.potential,self.auxFunc)
+        PESEnergies = PESEnergies.reshape((nBands,self.nPts))
+        gradOfPES, gradOfAux = \
+            self.target_func_grad(flatPoints,self.potential,self.auxFunc)
+        
+        gradForce = -gradOfPES.reshape(points.shape)
+        if gradOfAux is not None:
+            gradForce = gradForce - gradOfAux.reshape(points.shape)
+        
+        tangents = BandForces.tangents(points,PESEnergies)
+        perpForce = BandForces.perpendicular_component(gradForce,tangents)
+        springForce = BandForces.spring_force(points,tangents,\
+                                              BandForces.select_bands(self.k,bandInds),\
+                                              self.endpointSpringForce)
+        netForce = BandForces.net_force(perpForce,springForce,gradForce,PESEnergies,\
+                                        BandForces.select_bands(self.kappa,bandInds),\
+                                        BandForces.select_bands(self.constraintEneg,bandInds),\
+                                        self.endpointHarmonicForce)
+        
+        return netForce
+    
+def _fill_default_params(params,defaultParams,paramsName):
+    """
+    Checks params for unrecognized keys, and fills in missing keys from
+    defaultParams. As in VerletMinimization.fire, params is modified in place.
+
+    Parameters
+    ----------
+    params : dict
+        The user-supplied parameters.
+    defaultParams : dict
+        The allowed keys, and their default values.
+    paramsName : str
+        Name used in the error message.
+
+    Raises
+    ------
+    ValueError
+        If params contains a key not in defaultParams.
+
+    Returns
+    -------
+    params : dict
+
+    """
+    for key in params.keys():
+        if key not in defaultParams.keys():
+            raise ValueError("Key "+key+" in "+paramsName+" not allowed")
+            
+    for key in defaultParams.keys():
+        if key not in params.keys():
+            params[key] = defaultParams[key]
+            
+    return params
+
+def _default_fire_params(nDims,fire2=False):
+    """
+    The allowed keys of fireParams, and their default values, for 
+    VerletMinimization.fire (or fire2, if fire2) and the methods sharing its
+    parameters. A new dict every call, as maxmove is an array.
+    """
+    defaultFireParams = \
+        {"dtMax":10.,"dtMin":0.001,"nAccel":10,"fInc":1.1,"fAlpha":0.99,\
+         "fDecel":0.5,"aStart":0.1,"maxmove":np.full(nDims,1.0)}
+    if fire2:
+        defaultFireParams.update({"dtMin":0.02,"minDecelIter":20})
+    return defaultFireParams
+
+def _clip_to_maxmove(shift,maxmove):
+    """
+    Rescales the shift of every image so that no component is larger than maxmove.
+    The whole vector is rescaled, so the direction of the shift is unchanged.
+
+    Parameters
+    ----------
+    shift : ndarray
+        Of shape (...,nDims).
+    maxmove : ndarray
+        The largest allowed step in each dimension. Of shape (nDims,).
+
+    Returns
+    -------
+    ndarray
+        The rescaled shift. Of shape (...,nDims).
+
+    """
+    absShift = np.absolute(shift)
+    isTooLarge = absShift > maxmove
+    ratio = np.full(shift.shape,np.inf)
+    np.divide(maxmove,absShift,out=ratio,where=isTooLarge)
+    scale = np.minimum(np.min(ratio,axis=-1,keepdims=True),1.)
+    return shift*scale
+    
+def _image_dots(arr1,arr2):
+    """
+    The dot product on every image, np.dot(arr1[ptIter],arr2[ptIter]), for 
+    arrays of shape (...,nDims).
+    """
+    return np.einsum("...a,...a->...",arr1,arr2)
+
+def _sequential_sum(arr):
+    """
+    Sums the 1D array arr from the first entry to the last, rounding as a 
+    Python loop would. np.sum uses pairwise summation, which rounds differently;
+    with finite-difference forces, the difference in the last bits grows over
+    an optimization until trajectories visibly separate.
+    """
+    return np.cumsum(arr)[-1]
+    
+class _TrajectoryHistory:
+    """
+    Array-like storage of allPts, allVelocities or allForces during a run of
+    VerletMinimization, indexed by iteration as the full array would be. Only
+    the most recent windowSize iterations are held in a ring buffer; older
+    iterations are dropped, except those selected by keep_iter, which are
+    copied out when their slot is reused. Iterations that were never written
+    read as zeros, as in a preallocated array.
+    
+    Supports integer indices (optionally followed by further indices, as in
+    allVelocities[step,ptIter]), negative indices relative to the current 
+    length, and slices over iterations still in memory.
+    """
+    def __init__(self,length,shape,windowSize,keep_iter=None):
+        self.length = length
+        self.shape = shape
+        self.windowSize = min(windowSize,length)
+        self.keep_iter = keep_iter
+        
+        self.window = np.zeros((self.windowSize,)+shape)
+        #The iteration held in every slot; -1 if none
+        self.slotIters = np.full(self.windowSize,-1)
+        self.firstIter = length
+        self.lastIter = -1
+        self.kept = {}
+        
+    def _iter_index(self,idx):
+        if idx < 0:
+            idx += self.length
+        if (idx < 0) or (idx >= self.length):
+            raise IndexError("Iteration "+str(idx)+" out of range for length "+\
+                             str(self.length))
+        return idx
+    
+    def _locate(self,idx,forWriting=False):
+        """
+        Returns the array holding iteration idx, and the index of idx in it.
+        """
+        slot = idx % self.windowSize
+        heldIter = self.slotIters[slot]
+        if heldIter == idx:
+            return self.window, (slot,)
+        if idx in self.kept:
+            return self.kept[idx], ()
+        if (not forWriting) and ((idx < self.firstIter) or (heldIter < idx)):
+            return np.zeros(self.shape), ()
+        if heldIter > idx:
+            raise IndexError("Iteration "+str(idx)+" is no longer stored")
+        
+        if (heldIter >= 0) and (heldIter + self.windowSize > self.lastIter + 1):
+            #idx is ahead of the run, e.g. the final band after an early abort.
+            #Stored separately, so that the latest iterations are not overwritten
+            self.kept[idx] = np.zeros(self.shape)
+            return self.kept[idx], ()
+        
+        if (heldIter >= 0) and (self.keep_iter is not None) and self.keep_iter(heldIter):
+            self.kept[heldIter] = self.window[slot].copy()
+        self.window[slot] = 0.
+        self.slotIters[slot] = idx
+        self.firstIter = min(self.firstIter,idx)
+        self.lastIter = max(self.lastIter,idx)
+        return self.window, (slot,)
+    
+    def _split_key(self,key):
+        if isinstance(key,tuple):
+            return key[0], key[1:]
+        return key, ()
+    
+    def __getitem__(self,key):
+        idx, rest = self._split_key(key)
+        if isinstance(idx,slice):
+            return np.stack([self[(i,)+rest] for i in range(*idx.indices(self.length))]+\
+                            [np.zeros(self.shape)[rest]])[:-1]
+        arr, arrIdx = self._locate(self._iter_index(idx))
+        return arr[arrIdx+rest]
+    
+    def __setitem__(self,key,val):
+        idx, rest = self._split_key(key)
+        arr, arrIdx = self._locate(self._iter_index(idx),forWriting=True)
+        arr[arrIdx+rest] = val
+        return None
+    
+    def __len__(self):
+        return self.length
+    
+    def truncate(self,length):
+        """
+        Shortens the history to its first length iterations, as slicing
+        [:length] does for an array.
+        """
+        self.length = min(length,self.length)
+        return None
+    
+    def stored(self,iters):
+        """
+        Stacks the iterations iters, which must be in memory, into an array.
+        """
+        out = np.zeros((len(iters),)+self.shape)
+        for (outIter,idx) in enumerate(iters):
+            arr, arrIdx = self._locate(idx)
+            out[outIter] = arr[arrIdx]
+        return out
+    
 class VerletMinimization:
     """
     :Maintainer: Daniel
     """
-    def __init__(self,nebObj,initialPoints):
+    def __init__(self,nebObj,initialPoints,storage="full",storageParams={},\
+                 checkpointParams={}):
         """
         
 
@@ -490,6 +936,28 @@ class VerletMinimization:
             DESCRIPTION.
         initialPoints : TYPE
             DESCRIPTION.
+        storage : str, optional
+            Which iterations of allPts, allVelocities and allForces are kept
+            in memory during a run. Allowed values are
+                -"full": every iteration
+                -"every": every storageParams["freq"]-th iteration, starting at 0
+                -"last": the last storageParams["nKeep"] iterations reached
+                -"final": the last iteration reached
+            After a run, allVelocities and allForces hold the iterations 
+            self.storedIters; allPts holds the same iterations, followed by
+            the final band. For "full", this is the usual layout of the arrays
+            (including after an early stop). The early stop and early abort
+            checks work in every mode. The default is "full".
+        storageParams : dict, optional
+            Defaults are {"freq":10,"nKeep":10}. The default is {}.
+        checkpointParams : dict, optional
+            Checkpoints of velocity_verlet, fire and fire2 are written to
+            checkpointParams["fileName"] (if not None) every 
+            checkpointParams["freq"] iterations. A checkpoint holds every
+            iteration reached, the time steps, FIRE parameters and iteration
+            counter, and is an HDF5 file. Runs are resumed from it with the
+            resumeFrom argument of these methods. Defaults are 
+            {"fileName":None,"freq":50}. The default is {}.
 
         Raises
         ------
@@ -514,30 +982,274 @@ class VerletMinimization:
             raise ValueError("Obj "+str(self.nebObj)+" and initialPoints have "\
                              +"a different number of points")
                 
+        allowedStorage = ["full","every","last","final"]
+        if storage not in allowedStorage:
+            raise ValueError("storage "+str(storage)+" not allowed; allowed values are "+\
+                             str(allowedStorage))
+        self.storage = storage
+        self.storageParams = _fill_default_params(storageParams.copy(),\
+                                                  {"freq":10,"nKeep":10},"storageParams")
+        self.checkpointParams = _fill_default_params(checkpointParams.copy(),\
+                                                     {"fileName":None,"freq":50},\
+                                                     "checkpointParams")
+        #Forces read from a log, in reverse order, when resuming from one
+        self.replayForces = []
+                
         self.allPts = None
         self.allVelocities = None
         self.allForces = None
+        self.storedIters = None
         
-    def velocity_verlet(self,tStep,maxIters,dampingParameter=0):
+    def _init_history(self,maxIters,nCheckIters=0):
         """
-        Implements Algorithm 6 of https://doi.org/10.1021/acs.jctc.7b00360
-        with optional damping force.
-        
-        TODO: that paper has many errors, esp. off-by-one errors. Could lead
-        to issues. Consult http://dx.doi.org/10.1063/1.2841941 instead.
-        
-        Parameters
-        ----------
-        tStep : TYPE
-            DESCRIPTION.
-        maxIters : TYPE
-            DESCRIPTION.
-        dampingParameter : TYPE, optional
-            DESCRIPTION. The default is 0.
-
-        Returns
-        -------
-        allPts : TYPE
+        Sets allPts, allVelocities and allForces to _TrajectoryHistory objects
+        holding the iterations required by self.storage, and the nCheckIters
+        iterations read by the early stop/abort checks.
+        """
+        nStored = {"full":maxIters+2,"every":1,"last":self.storageParams["nKeep"],\
+                   "final":1}[self.storage]
+        if self.storage == "every":
+            freq = self.storageParams["freq"]
+            keep_iter = lambda idx: (idx % freq == 0)
+        else:
+            keep_iter = None
+        nCheckpointIters = 0
+        if self.checkpointParams["fileName"] is not None:
+            nCheckpointIters = self.checkpointParams["freq"]
+        #The current iteration, plus the ones before and after it
+        windowSize = max(nStored,nCheckIters,nCheckpointIters) + 3
+        
+        self.allPts = _TrajectoryHistory(maxIters+2,(self.nPts,self.nDims),windowSize,keep_iter)
+        self.allVelocities = _TrajectoryHistory(maxIters+1,(self.nPts,self.nDims),windowSize,keep_iter)
+        self.allForces = _TrajectoryHistory(maxIters+1,(self.nPts,self.nDims),windowSize,keep_iter)
+        return None
+    
+    def _finalize_history(self):
+        """
+        Replaces the _TrajectoryHistory objects with arrays of the stored 
+        iterations, and sets self.storedIters.
+        """
+        if not isinstance(self.allPts,_TrajectoryHistory):
+            return None
+        nIters = len(self.allVelocities)
+        
+        if self.storage == "full":
+            self.storedIters = np.arange(nIters)
+            for nm in ["allPts","allVelocities","allForces"]:
+                history = getattr(self,nm)
+                setattr(self,nm,history.window[:len(history)])
+            return None
+        
+        lastIter = min(nIters-1,self.allVelocities.lastIter)
+        if self.storage == "every":
+            self.storedIters = np.arange(0,lastIter+1,self.storageParams["freq"])
+        else:
+            nKeep = self.storageParams["nKeep"] if self.storage == "last" else 1
+            self.storedIters = np.arange(max(0,lastIter+1-nKeep),lastIter+1)
+            
+        self.allPts = np.concatenate((self.allPts.stored(self.storedIters),\
+                                      self.allPts.stored([len(self.allPts)-1])))
+        self.allVelocities = self.allVelocities.stored(self.storedIters)
+        self.allForces = self.allForces.stored(self.storedIters)
+        return None
+    
+    def _compute_force(self,points):
+        """
+        Returns nebObj.compute_force(points), or the next force read from a
+        log, when resuming from one.
+        """
+        if len(self.replayForces) > 0:
+            return self.replayForces.pop()
+        return self.nebObj.compute_force(points)
+    
+    def _checkpoint_params(self,resumeFrom,gpNm):
+        """
+        Returns the parameters in the group gpNm of the checkpoint resumeFrom,
+        or {} if not resuming from a checkpoint.
+        """
+        if (resumeFrom is None) or (resumeFrom[-4:] in [".lap",".mep"]):
+            return {}
+        h5File = h5py.File(resumeFrom,"r")
+        params = dict(h5File[gpNm].attrs)
+        h5File.close()
+        return params
+    
+    def _resume(self,resumeFrom,method,runParams,runArrs={},ptsOffset=0):
+        """
+        Prepares a run of method: creates the checkpoint file, if any, and
+        resumes from resumeFrom, if not None. 
+        
+        If resumeFrom is a .lap or .mep log, the forces logged are used in
+        place of nebObj.compute_force for as many iterations as were logged,
+        and the log is continued. As the log is in single precision, the run
+        then agrees with an uninterrupted one to about that precision. 
+        
+        If resumeFrom is a checkpoint written by method, the iterations in it
+        are loaded into allPts (which has ptsOffset more iterations than 
+        allVelocities), allVelocities and allForces, and the arrays in runArrs
+        (tStep and alpha), in place. The log the checkpoint refers to is 
+        continued, if nebObj logs.
+        
+        Returns
+        -------
+        startStep : int
+            The first iteration to run. If 0, the initial band has yet to be
+            set up.
+        stepsSinceReset : np.ndarray or int or None
+            The value in the checkpoint, or None.
+        
+        """
+        startStep, stepsSinceReset = 0, None
+        if (resumeFrom is not None) and (resumeFrom[-4:] in [".lap",".mep"]):
+            h5File = h5py.File(resumeFrom,"r")
+            #Replaying the forces requires every evaluation to be logged
+            if "logger_settings" in h5File:
+                stride = int(h5File["logger_settings"].attrs["stride"])
+            else:
+                stride = 1
+            if (stride != 1) or ("netForce" not in h5File):
+                h5File.close()
+                raise ValueError("Log "+resumeFrom+" cannot be resumed from; it "+\
+                                 "must log netForce with stride 1")
+            #Only the rows written are replayed, not the rest of the last chunk
+            nLogged = int(h5File.attrs.get("loggedRows",h5File["netForce"].shape[0]))
+            forces = np.array(h5File["netForce"][:nLogged],dtype=float)
+            h5File.close()
+            
+            self.replayForces = list(forces[::-1])
+            self.nebObj.logger.resume(resumeFrom,len(forces))
+        elif resumeFrom is not None:
+            h5File = h5py.File(resumeFrom,"r")
+            ckptMethod = h5File.attrs["method"]
+            if ckptMethod != method:
+                h5File.close()
+                raise ValueError("Checkpoint "+resumeFrom+" was written by "+\
+                                 str(ckptMethod)+", not "+method)
+            lastStep = int(h5File.attrs["step"])
+            if lastStep >= len(self.allVelocities):
+                h5File.close()
+                raise ValueError("Checkpoint "+resumeFrom+" is at iteration "+\
+                                 str(lastStep)+", past maxIters")
+            
+            nRows = {"allPts":lastStep+1+ptsOffset,"allVelocities":lastStep+1,\
+                     "allForces":lastStep+1}
+            #Read in blocks, and set one iteration at a time, so that only the
+            #iterations kept by self.storage stay in memory
+            blockSize = 100
+            for (nm,rows) in nRows.items():
+                history = getattr(self,nm)
+                for blockStart in range(0,rows,blockSize):
+                    block = h5File[nm][blockStart:min(blockStart+blockSize,rows)]
+                    for (rowIter,row) in enumerate(block):
+                        history[blockStart+rowIter] = row
+            for (nm,arr) in runArrs.items():
+                if h5File[nm].shape[1:] != arr.shape[1:]:
+                    h5File.close()
+                    raise ValueError("Checkpoint "+resumeFrom+" has "+nm+" of shape "+\
+                                     str(h5File[nm].shape[1:])+" per iteration, expected "+\
+                                     str(arr.shape[1:]))
+                arr[:lastStep+1] = h5File[nm][:lastStep+1]
+            if "stepsSinceReset" in h5File:
+                stepsSinceReset = h5File["stepsSinceReset"][()]
+            
+            if (self.nebObj.logger.logLevel != 0) and ("logName" in h5File.attrs):
+                self.nebObj.logger.resume(h5File.attrs["logName"],int(h5File.attrs["logIters"]))
+            h5File.close()
+            startStep = lastStep + 1
+        
+        fileName = self.checkpointParams["fileName"]
+        if fileName is None:
+            return startStep, stepsSinceReset
+        
+        if startStep == 0:
+            h5File = h5py.File(fileName,"w")
+            shape = (self.nPts,self.nDims)
+            for nm in ["allPts","allVelocities","allForces"]:
+                h5File.create_dataset(nm,(0,)+shape,maxshape=(None,)+shape,dtype=float)
+            for (nm,arr) in runArrs.items():
+                h5File.create_dataset(nm,(0,)+arr.shape[1:],maxshape=(None,)+arr.shape[1:],\
+                                      dtype=float)
+        else:
+            #Continues the checkpoint resumed from, dropping iterations after it
+            if os.path.abspath(fileName) != os.path.abspath(resumeFrom):
+                shutil.copyfile(resumeFrom,fileName)
+            h5File = h5py.File(fileName,"a")
+            for nm in ["allPts","allVelocities","allForces"]+list(runArrs.keys()):
+                rows = nRows.get(nm,lastStep+1)
+                h5File[nm].resize((rows,)+h5File[nm].shape[1:])
+                
+        h5File.attrs.create("method",method)
+        h5File.attrs.create("step",startStep-1)
+        for (gpNm,params) in runParams.items():
+            if gpNm in h5File:
+                del h5File[gpNm]
+            h5File.create_group(gpNm)
+            for (key,val) in params.items():
+                h5File[gpNm].attrs.create(key,val)
+        h5File.close()
+        
+        return startStep, stepsSinceReset
+    
+    def _write_checkpoint(self,step,runArrs={},stepsSinceReset=None,ptsOffset=0):
+        """
+        Appends the iterations since the last checkpoint, up to step, to the
+        checkpoint file, every checkpointParams["freq"] iterations. The last
+        iteration already written is rewritten, as fire2 may have changed 
+        allPts there.
+        """
+        fileName = self.checkpointParams["fileName"]
+        if (fileName is None) or (step % self.checkpointParams["freq"] != 0):
+            return None
+        
+        h5File = h5py.File(fileName,"a")
+        sources = {"allPts":self.allPts,"allVelocities":self.allVelocities,\
+                   "allForces":self.allForces}
+        sources.update(runArrs)
+        for (nm,src) in sources.items():
+            rows = step + 1 + (ptsOffset if nm == "allPts" else 0)
+            start = max(0,h5File[nm].shape[0]-1)
+            h5File[nm].resize((rows,)+h5File[nm].shape[1:])
+            h5File[nm][start:rows] = src[start:rows]
+            
+        if stepsSinceReset is not None:
+            if "stepsSinceReset" in h5File:
+                del h5File["stepsSinceReset"]
+            h5File.create_dataset("stepsSinceReset",data=stepsSinceReset)
+            
+        if self.nebObj.logger.logLevel != 0:
+            self.nebObj.logger.flush()
+            h5File.attrs.create("logName",self.nebObj.logger.fileName)
+            h5File.attrs.create("logIters",self.nebObj.logger.evalCounter)
+        
+        #Written last: a resumed run reads the iterations up to step only
+        h5File.attrs.create("step",step)
+        h5File.close()
+        return None
+    
+    def velocity_verlet(self,tStep,maxIters,dampingParameter=0,resumeFrom=None):
+        """
+        Implements Algorithm 6 of https://doi.org/10.1021/acs.jctc.7b00360
+        with optional damping force.
+        
+        TODO: that paper has many errors, esp. off-by-one errors. Could lead
+        to issues. Consult http://dx.doi.org/10.1063/1.2841941 instead.
+        
+        Parameters
+        ----------
+        tStep : TYPE
+            DESCRIPTION.
+        maxIters : TYPE
+            DESCRIPTION.
+        dampingParameter : TYPE, optional
+            DESCRIPTION. The default is 0.
+        resumeFrom : str, optional
+            A checkpoint written by velocity_verlet (see checkpointParams in
+            __init__), or a .lap/.mep log, to resume the run from. The default
+            is None.
+
+        Returns
+        -------
+        allPts : TYPE
             DESCRIPTION.
         allVelocities : TYPE
             DESCRIPTION.
@@ -550,32 +1262,32 @@ class VerletMinimization:
         velocity/force computed should be used to update the points one 
         last time (else that's computational time that's wasted)
         """
-        self.allPts = np.zeros((maxIters+2,self.nPts,self.nDims))
-        self.allVelocities = np.zeros((maxIters+1,self.nPts,self.nDims))
-        self.allForces = np.zeros((maxIters+1,self.nPts,self.nDims))
-
-        self.allPts[0] = self.initialPoints
-        self.allForces[0] = self.nebObj.compute_force(self.allPts[0])
-        self.allVelocities[0] = tStep*self.allForces[0]
-        self.allPts[1] = self.allPts[0] + \
-            self.allVelocities[0]*tStep + 0.5*self.allForces[0]*tStep**2
-         
-        vProj = np.zeros((self.nPts,self.nDims))
+        self._init_history(maxIters)
+        
+        runParams = {"verlet_params":{"tStep":tStep,"dampingParameter":dampingParameter}}
+        startStep, _ = self._resume(resumeFrom,"velocity_verlet",runParams,ptsOffset=1)
+        
+        if startStep == 0:
+            self.allPts[0] = self.initialPoints
+            self.allForces[0] = self._compute_force(self.allPts[0])
+            self.allVelocities[0] = tStep*self.allForces[0]
+            self.allPts[1] = self.allPts[0] + \
+                self.allVelocities[0]*tStep + 0.5*self.allForces[0]*tStep**2
+            startStep = 1
         
         t0 = time.time()
         try:
-            for step in range(1,maxIters+1):
-                self.allForces[step] = self.nebObj.compute_force(self.allPts[step])
+            for step in range(startStep,maxIters+1):
+                self.allForces[step] = self._compute_force(self.allPts[step])
+                
+                #Projection of the velocity on the force, on images where v.f > 0
+                force = self.allForces[step]
+                product = _image_dots(self.allVelocities[step-1],force)[:,None]
+                fdotf = _image_dots(force,force)[:,None]
+                
+                vProj = np.zeros(force.shape)
+                np.divide(product*force,fdotf,out=vProj,where=(product>0))
                 
-                for ptIter in range(self.nPts):
-                    product = np.dot(self.allVelocities[step-1,ptIter],self.allForces[step,ptIter])
-                    if product > 0:
-                        vProj[ptIter] = \
-                            product*self.allForces[step,ptIter]/\
-                                np.dot(self.allForces[step,ptIter],self.allForces[step,ptIter])
-                    else:
-                        vProj[ptIter] = np.zeros(self.nDims)
-                        
                 #Damping term. Algorithm 6 uses allVelocities[step], but that hasn't
                 #been computed yet. Note that this isn't applied to compute allPts[1].
                 accel = self.allForces[step] - dampingParameter*self.allVelocities[step-1]                
@@ -583,8 +1295,11 @@ class VerletMinimization:
                 
                 self.allPts[step+1] = self.allPts[step] + self.allVelocities[step]*tStep + \
                     0.5*accel*tStep**2
+                
+                self._write_checkpoint(step,ptsOffset=1)
         finally:
             t1 = time.time()
+            self._finalize_history()
             
             if sys.exc_info()[0] is None:
                 endsWithoutError = True
@@ -594,11 +1309,14 @@ class VerletMinimization:
             t1 = time.time()
             self.nebObj.logger.flush()
             self.nebObj.logger.write_runtime(t1-t0)
+            self.nebObj.logger.close()
+            if hasattr(self.nebObj,"shutdown_workers"):
+                self.nebObj.shutdown_workers()
             
             return endsWithoutError
     
     def fire(self,tStep,maxIters,fireParams={},useLocal=True,earlyStop=True,
-             earlyStopParams={},earlyAbort=False,earlyAbortParams={}):
+             earlyStopParams={},earlyAbort=False,earlyAbortParams={},resumeFrom=None):
         """
         Wrapper for fast inertial relaxation engine.
         FIRE step taken from http://dx.doi.org/10.1103/PhysRevLett.97.170201
@@ -620,6 +1338,10 @@ class VerletMinimization:
             DESCRIPTION. The default is {}.
         useLocal : TYPE, optional
             DESCRIPTION. The default is False.
+        resumeFrom : str, optional
+            A checkpoint written by this method (see checkpointParams in 
+            __init__), or a .lap/.mep log, to resume the run from. Parameters
+            not passed are taken from the checkpoint. The default is None.
 
         Raises
         ------
@@ -631,18 +1353,15 @@ class VerletMinimization:
         None.
         """
         
-        defaultFireParams = \
-            {"dtMax":10.,"dtMin":0.001,"nAccel":10,"fInc":1.1,"fAlpha":0.99,\
-             "fDecel":0.5,"aStart":0.1,"maxmove":np.full(self.nDims,1.0)}
-            
-        for key in fireParams.keys():
-            if key not in defaultFireParams.keys():
-                raise ValueError("Key "+key+" in fireParams not allowed")
-                
-        for key in defaultFireParams.keys():
-            if key not in fireParams.keys():
-                fireParams[key] = defaultFireParams[key]
-                
+        if resumeFrom is not None:
+            fireParams = {**self._checkpoint_params(resumeFrom,"fire_params"),**fireParams}
+            earlyStopParams = {**self._checkpoint_params(resumeFrom,"early_stop_params"),\
+                               **earlyStopParams}
+            earlyAbortParams = {**self._checkpoint_params(resumeFrom,"early_abort_params"),\
+                                **earlyAbortParams}
+        
+        _fill_default_params(fireParams,_default_fire_params(self.nDims),"fireParams")
+        
         defaultStopParams = {"startCheckIter":300,"nStabIters":50,"checkFreq":10,\
                              "stabPerc":0.002}
         
@@ -665,12 +1384,9 @@ class VerletMinimization:
             if key not in earlyAbortParams.keys():
                 earlyAbortParams[key] = defaultAbortParams[key]
         
-        self.allPts = np.zeros((maxIters+2,self.nPts,self.nDims))
-        self.allVelocities = np.zeros((maxIters+1,self.nPts,self.nDims))
-        self.allForces = np.zeros((maxIters+1,self.nPts,self.nDims))
-
-        self.allPts[0] = self.initialPoints
-        self.allForces[0] = self.nebObj.compute_force(self.allPts[0])
+        nCheckIters = max(earlyStop*earlyStopParams["nStabIters"],\
+                          earlyAbort*earlyAbortParams["nStabIters"])
+        self._init_history(maxIters,nCheckIters)
         
         if useLocal:
             tStepArr = np.zeros((maxIters+1,self.nPts))
@@ -685,11 +1401,23 @@ class VerletMinimization:
         tStepArr[0] = tStep
         alphaArr[0] = fireParams["aStart"]
         
+        runParams = {"fire_params":fireParams,"early_stop_params":earlyStopParams,\
+                     "early_abort_params":earlyAbortParams}
+        runArrs = {"tStep":tStepArr,"alpha":alphaArr}
+        startStep, ckptStepsSinceReset = self._resume(resumeFrom,"fire",runParams,runArrs)
+        if ckptStepsSinceReset is not None:
+            stepsSinceReset = ckptStepsSinceReset
+        
+        if startStep == 0:
+            self.allPts[0] = self.initialPoints
+            self.allForces[0] = self._compute_force(self.allPts[0])
+            startStep = 1
+        
         endsWithoutError = True
         
         t0 = time.time()
         try:
-            for step in range(1,maxIters+1):
+            for step in range(startStep,maxIters+1):
                 #TODO: check potential off-by-one indexing on tStep
                 if useLocal:
                     tStepArr,alphaArr,stepsSinceReset = \
@@ -703,9 +1431,9 @@ class VerletMinimization:
                 if earlyStop:
                     stopBool = self._check_early_stop(step,earlyStopParams)
                     if stopBool:
-                        self.allPts = self.allPts[:step+2]
-                        self.allVelocities = self.allVelocities[:step]
-                        self.allForces = self.allForces[:step]
+                        self.allPts.truncate(step+2)
+                        self.allVelocities.truncate(step)
+                        self.allForces.truncate(step)
                         
                         tStepArr = tStepArr[:step]
                         alphaArr = alphaArr[:step]
@@ -716,75 +1444,66 @@ class VerletMinimization:
                     if stopBool:
                         endsWithoutError = False
                         break
+                
+                self._write_checkpoint(step,runArrs,stepsSinceReset)
                     
             #Final iteration
             if useLocal:
                 tStepFinal = tStepArr[-1].reshape((-1,1))
                 shift = tStepFinal*self.allVelocities[-1] + \
                     0.5*self.allForces[-1]*tStepFinal**2
-    
-                for ptIter in range(self.nPts):
-                    for dimIter in range(self.nDims):
-                        if(abs(shift[ptIter,dimIter])>fireParams["maxmove"][dimIter]):
-                            shift[ptIter] = shift[ptIter] * \
-                                fireParams["maxmove"][dimIter]/abs(shift[ptIter,dimIter])
-    
-                self.allPts[-1] = self.allPts[-2] + shift
+                
+                self.allPts[-1] = self.allPts[-2] + _clip_to_maxmove(shift,fireParams["maxmove"])
             else:
                 self.allPts[-1] = self.allPts[-2] + tStepArr[-1]*self.allVelocities[-1] + \
                     0.5*self.allForces[-1]*tStepArr[-1]**2
         finally:
             t1 = time.time()
+            self._finalize_history()
             self.nebObj.logger.flush()
             self.nebObj.logger.write_fire_params(tStepArr,alphaArr,stepsSinceReset,fireParams)
             self.nebObj.logger.write_runtime(t1-t0)
             if earlyStop:
                 self.nebObj.logger.write_early_stop_params(earlyStopParams)
+            self.nebObj.logger.close()
+            if hasattr(self.nebObj,"shutdown_workers"):
+                self.nebObj.shutdown_workers()
         
             return tStepArr, alphaArr, stepsSinceReset, endsWithoutError
     
     def _local_fire_iter(self,step,tStepArr,alphaArr,stepsSinceReset,fireParams):
         tStepPrev = tStepArr[step-1].reshape((-1,1)) #For multiplication below
+        velPrev = self.allVelocities[step-1]
+        forcePrev = self.allForces[step-1]
         
-        shift = tStepPrev*self.allVelocities[step-1] + \
-                0.5*self.allForces[step-1]*tStepPrev**2
-
-        for ptIter in range(self.nPts):
-            for dimIter in range(self.nDims):
-                if(abs(shift[ptIter,dimIter])>fireParams["maxmove"][dimIter]):
-                    shift[ptIter] = shift[ptIter] * \
-                        fireParams["maxmove"][dimIter]/abs(shift[ptIter,dimIter])
-
-        self.allPts[step] = self.allPts[step-1] + shift
+        shift = tStepPrev*velPrev + 0.5*forcePrev*tStepPrev**2
+        self.allPts[step] = self.allPts[step-1] + _clip_to_maxmove(shift,fireParams["maxmove"])
         
-        self.allForces[step] = self.nebObj.compute_force(self.allPts[step])
+        force = self._compute_force(self.allPts[step])
+        self.allForces[step] = force
         #What the Wikipedia article on velocity Verlet uses
-        self.allVelocities[step] = \
-            0.5*tStepPrev*(self.allForces[step]+self.allForces[step-1])
-        
-        for ptIter in range(self.nPts):
-            alpha = alphaArr[step-1,ptIter]
-            
-            product = np.dot(self.allVelocities[step-1,ptIter],self.allForces[step,ptIter])
-            if product > 0:
-                vMag = np.linalg.norm(self.allVelocities[step-1,ptIter])
-                fHat = self.allForces[step,ptIter]/np.linalg.norm(self.allForces[step,ptIter])
-                self.allVelocities[step,ptIter] += (1-alpha)*self.allVelocities[step-1,ptIter] + \
-                    alpha*vMag*fHat
-                
-                if stepsSinceReset[ptIter] > fireParams["nAccel"]:
-                    tStepArr[step,ptIter] = \
-                        min(tStepArr[step-1,ptIter]*fireParams["fInc"],fireParams["dtMax"])
-                    alphaArr[step,ptIter] = alpha*fireParams["fAlpha"]
-                else:
-                    tStepArr[step,ptIter] = tStepArr[step-1,ptIter]
-                
-                stepsSinceReset[ptIter] += 1
-            else:
-                tStepArr[step,ptIter] = \
-                    max(tStepArr[step-1,ptIter]*fireParams["fDecel"],fireParams["dtMin"])
-                alphaArr[step,ptIter] = fireParams["aStart"]
-                stepsSinceReset[ptIter] = 0
+        vel = 0.5*tStepPrev*(force+forcePrev)
+        
+        #Per-image FIRE mixing, on images where v.f > 0
+        isPositive = _image_dots(velPrev,force) > 0
+        
+        vMag = np.sqrt(_image_dots(velPrev,velPrev))[:,None]
+        fHat = np.zeros(force.shape)
+        np.divide(force,np.sqrt(_image_dots(force,force))[:,None],out=fHat,\
+                  where=isPositive[:,None])
+        alpha = alphaArr[step-1].reshape((-1,1))
+        mixing = (1-alpha)*velPrev + alpha*vMag*fHat
+        self.allVelocities[step] = vel + np.where(isPositive[:,None],mixing,0.)
+        
+        isAccel = isPositive & (stepsSinceReset > fireParams["nAccel"])
+        tStepArr[step] = \
+            np.where(isAccel,np.minimum(tStepArr[step-1]*fireParams["fInc"],fireParams["dtMax"]),
+                     np.where(isPositive,tStepArr[step-1],
+                              np.maximum(tStepArr[step-1]*fireParams["fDecel"],fireParams["dtMin"])))
+        alphaArr[step] = \
+            np.where(isAccel,alphaArr[step-1]*fireParams["fAlpha"],
+                     np.where(isPositive,alphaArr[step],fireParams["aStart"]))
+        stepsSinceReset[:] = np.where(isPositive,stepsSinceReset+1,0)
         
         return tStepArr, alphaArr, stepsSinceReset
 
@@ -820,9 +1539,7 @@ class VerletMinimization:
             DESCRIPTION.
 
         """
-        vdotf = 0.
-        for ptIter in range(self.nPts):
-            vdotf += np.dot(self.allVelocities[step-1,ptIter],self.allForces[step-1,ptIter])
+        vdotf = _sequential_sum(_image_dots(self.allVelocities[step-1],self.allForces[step-1]))
         
         if vdotf > 0:
             stepsSinceReset += 1
@@ -835,18 +1552,18 @@ class VerletMinimization:
                 alphaArr[step] = alphaArr[step-1]            
         else:
             stepsSinceReset = 0
-            self.allVelocities[step-1,ptIter] = np.zeros(self.nDims)
+            #Only the last image is reset, as in the original per-image loop
+            self.allVelocities[step-1,-1] = 0.
             tStepArr[step] = max(tStepArr[step-1]*fireParams["fDecel"],fireParams["dtMin"])
             alphaArr[step] = fireParams["aStart"]
             
         #Semi-implicit Euler integration
         self.allVelocities[step] = self.allVelocities[step-1] + tStepArr[step]*self.allForces[step-1]
         
-        vdotv = 0.
-        fdotf = 0.
-        for ptIter in range(self.nPts):
-            vdotv += np.linalg.norm(self.allVelocities[step,ptIter])
-            fdotf += np.linalg.norm(self.allForces[step-1,ptIter])
+        vdotv = _sequential_sum(np.sqrt(_image_dots(self.allVelocities[step],\
+                                                    self.allVelocities[step])))
+        fdotf = _sequential_sum(np.sqrt(_image_dots(self.allForces[step-1],\
+                                                    self.allForces[step-1])))
         
         if fdotf > 10**(-16):
             scale = vdotv/fdotf
@@ -856,21 +1573,14 @@ class VerletMinimization:
         self.allVelocities[step] = (1-alphaArr[step]) * self.allVelocities[step]\
             + alphaArr[step] * scale * self.allForces[step-1]
         
-        shift = tStepArr[step]*self.allVelocities[step]
-        
-        for ptIter in range(self.nPts):
-            for dimIter in range(self.nDims):
-                if(abs(shift[ptIter,dimIter])>fireParams["maxmove"][dimIter]):
-                    shift[ptIter] = shift[ptIter] * \
-                        fireParams["maxmove"][dimIter]/abs(shift[ptIter,dimIter])
-        
+        shift = _clip_to_maxmove(tStepArr[step]*self.allVelocities[step],fireParams["maxmove"])
         self.allPts[step] = self.allPts[step-1] + shift
-        self.allForces[step] = self.nebObj.compute_force(self.allPts[step])
+        self.allForces[step] = self._compute_force(self.allPts[step])
         
         return tStepArr, alphaArr, stepsSinceReset
     
     def fire2(self,tStep,maxIters,fireParams={},useLocal=False,earlyStop=False,
-              earlyStopParams={}):
+              earlyStopParams={},resumeFrom=None):
         """
         Wrapper for fast inertial relaxation engine 2.
         FIRE step taken from http://dx.doi.org/10.1103/PhysRevLett.97.170201
@@ -888,6 +1598,10 @@ class VerletMinimization:
             DESCRIPTION. The default is {}.
         useLocal : TYPE, optional
             DESCRIPTION. The default is False.
+        resumeFrom : str, optional
+            A checkpoint written by this method (see checkpointParams in 
+            __init__), or a .lap/.mep log, to resume the run from. Parameters
+            not passed are taken from the checkpoint. The default is None.
 
         Raises
         ------
@@ -899,19 +1613,14 @@ class VerletMinimization:
         None.
         """
         
-        defaultFireParams = \
-            {"dtMax":10.,"dtMin":0.02,"nAccel":10,"fInc":1.1,"fAlpha":0.99,\
-             "fDecel":0.5,"aStart":0.1,"maxmove":np.full(self.nDims,1.0),\
-             "minDecelIter":20}
-            
-        for key in fireParams.keys():
-            if key not in defaultFireParams.keys():
-                raise ValueError("Key "+key+" in fireParams not allowed")
-                
-        for key in defaultFireParams.keys():
-            if key not in fireParams.keys():
-                fireParams[key] = defaultFireParams[key]
-                
+        if resumeFrom is not None:
+            fireParams = {**self._checkpoint_params(resumeFrom,"fire_params"),**fireParams}
+            earlyStopParams = {**self._checkpoint_params(resumeFrom,"early_stop_params"),\
+                               **earlyStopParams}
+        
+        _fill_default_params(fireParams,_default_fire_params(self.nDims,fire2=True),\
+                             "fireParams")
+        
         defaultStopParams = {"startCheckIter":300,"nStabIters":50,"checkFreq":10,\
                              "stabPerc":0.002}
         
@@ -923,12 +1632,7 @@ class VerletMinimization:
             if key not in earlyStopParams.keys():
                 earlyStopParams[key] = defaultStopParams[key]
                 
-        self.allPts = np.zeros((maxIters+2,self.nPts,self.nDims))
-        self.allVelocities = np.zeros((maxIters+1,self.nPts,self.nDims))
-        self.allForces = np.zeros((maxIters+1,self.nPts,self.nDims))
-
-        self.allPts[0] = self.initialPoints
-        self.allForces[0] = self.nebObj.compute_force(self.allPts[0])
+        self._init_history(maxIters,earlyStop*earlyStopParams["nStabIters"])
         
         if useLocal:
             tStepArr = tStep*np.ones((maxIters+1,self.nPts))
@@ -942,9 +1646,20 @@ class VerletMinimization:
         tStepArr[0] = tStep
         alphaArr[0] = fireParams["aStart"]
         
+        runParams = {"fire_params":fireParams,"early_stop_params":earlyStopParams}
+        runArrs = {"tStep":tStepArr,"alpha":alphaArr}
+        startStep, ckptStepsSinceReset = self._resume(resumeFrom,"fire2",runParams,runArrs)
+        if ckptStepsSinceReset is not None:
+            stepsSinceReset = ckptStepsSinceReset
+        
+        if startStep == 0:
+            self.allPts[0] = self.initialPoints
+            self.allForces[0] = self._compute_force(self.allPts[0])
+            startStep = 1
+        
         t0 = time.time()
         try:
-            for step in range(1,maxIters+1):
+            for step in range(startStep,maxIters+1):
                 if useLocal:
                     tStepArr,alphaArr,stepsSinceReset = \
                         self._local_fire2_iter(step,tStepArr,alphaArr,stepsSinceReset,\
@@ -957,39 +1672,164 @@ class VerletMinimization:
                 if earlyStop:
                     stopBool = self._check_early_stop(step,earlyStopParams)
                     if stopBool:
-                        self.allPts = self.allPts[:step+2]
-                        self.allVelocities = self.allVelocities[:step]
-                        self.allForces = self.allForces[:step]
+                        self.allPts.truncate(step+2)
+                        self.allVelocities.truncate(step)
+                        self.allForces.truncate(step)
                         
                         tStepArr = tStepArr[:step]
                         alphaArr = alphaArr[:step]
                         break
+                
+                self._write_checkpoint(step,runArrs,stepsSinceReset)
             
             if useLocal:
                 tStepFinal = tStepArr[-1].reshape((-1,1))
                 shift = tStepFinal*self.allVelocities[-1] + \
                     0.5*self.allForces[-1]*tStepFinal**2
-    
-                for ptIter in range(self.nPts):
-                    for dimIter in range(self.nDims):
-                        if(abs(shift[ptIter,dimIter])>fireParams["maxmove"][dimIter]):
-                            shift[ptIter] = shift[ptIter] * \
-                                fireParams["maxmove"][dimIter]/abs(shift[ptIter,dimIter])
-    
-                self.allPts[-1] = self.allPts[-2] + shift
+                
+                self.allPts[-1] = self.allPts[-2] + _clip_to_maxmove(shift,fireParams["maxmove"])
             else:
                 self.allPts[-1] = self.allPts[-2] + tStepArr[-1]*self.allVelocities[-1] + \
                     0.5*self.allForces[-1]*tStepArr[-1]**2
         finally:
             t1 = time.time()
+            self._finalize_history()
             self.nebObj.logger.flush()
             self.nebObj.logger.write_fire_params(tStepArr,alphaArr,stepsSinceReset,fireParams)
             self.nebObj.logger.write_runtime(t1-t0)
             if earlyStop:
                 self.nebObj.logger.write_early_stop_params(earlyStopParams)
+            self.nebObj.logger.close()
+            if hasattr(self.nebObj,"shutdown_workers"):
+                self.nebObj.shutdown_workers()
             
             return tStepArr, alphaArr, stepsSinceReset
     
+    def iterate_fire(self,tStep,maxIters=None,fireParams={},useLocal=True,fire2=False,\
+                     computeAction=True):
+        """
+        Generator version of fire (or of fire2, if fire2 is True), yielding the
+        state after every iteration. Only the last few iterations are held in
+        memory, so that maxIters may be None, and the caller decides when to
+        stop, as in
+        
+            for state in minObj.iterate_fire(0.1):
+                if state["forceNorm"] < 10**(-4):
+                    break
+                
+        The iterations are those of fire/fire2 with earlyStop=False. Once the
+        generator is exhausted or closed, allPts, allVelocities and allForces 
+        hold the last iteration reached (listed in self.storedIters); the final
+        update made by fire is not applied. In the global fire2 iterations,
+        the next iteration may move the yielded points back by half a step,
+        as fire2 does in allPts.
+        
+        Parameters
+        ----------
+        tStep : float
+            The initial time step.
+        maxIters : int, optional
+            The number of iterations. If None, iterates until the generator is
+            closed. The default is None.
+        fireParams : dict, optional
+            As in fire or fire2. The default is {}.
+        useLocal : bool, optional
+            Whether to use a time step per image. The default is True.
+        fire2 : bool, optional
+            Whether to use the FIRE 2.0 iterations. The default is False.
+        computeAction : bool, optional
+            Whether to evaluate the action of every iteration, for a 
+            LeastActionPath. This calls the potential (and mass) on the band 
+            once more per iteration, unless they are wrapped in an 
+            EvaluationCache. The default is True.
+        
+        Raises
+        ------
+        ValueError
+            If fireParams contains a key not in the defaults.
+        
+        Yields
+        ------
+        state : dict
+            "step" : the iteration.
+            "points" : a copy of the points after the iteration.
+            "forceNorm" : the norm of the force on the whole band.
+            "tStep", "alpha" : the time step and FIRE mixing parameter. Arrays 
+                of shape (nPts,) if useLocal, else floats.
+            "action" : the action of the band, or None if computeAction is 
+                False or nebObj is not a LeastActionPath.
+        
+        """
+        fireParams = _fill_default_params(fireParams.copy(),\
+                                          _default_fire_params(self.nDims,fire2=fire2),\
+                                          "fireParams")
+        
+        if fire2:
+            iter_func = self._local_fire2_iter if useLocal else self._global_fire2_iter
+        else:
+            iter_func = self._local_fire_iter if useLocal else self._global_fire_iter
+        
+        if maxIters is None:
+            length = sys.maxsize
+            steps = itertools.count(1)
+        else:
+            length = maxIters + 2
+            steps = range(1,maxIters+1)
+        #The previous, current, and next iterations
+        windowSize = 3
+        
+        self.allPts = _TrajectoryHistory(length,(self.nPts,self.nDims),windowSize)
+        self.allVelocities = _TrajectoryHistory(length,(self.nPts,self.nDims),windowSize)
+        self.allForces = _TrajectoryHistory(length,(self.nPts,self.nDims),windowSize)
+        
+        if useLocal:
+            tStepArr = _TrajectoryHistory(length,(self.nPts,),windowSize)
+            alphaArr = _TrajectoryHistory(length,(self.nPts,),windowSize)
+            stepsSinceReset = np.zeros((self.nPts))
+        else:
+            tStepArr = _TrajectoryHistory(length,(),windowSize)
+            alphaArr = _TrajectoryHistory(length,(),windowSize)
+            stepsSinceReset = 0
+        
+        tStepArr[0] = tStep
+        alphaArr[0] = fireParams["aStart"]
+        
+        self.allPts[0] = self.initialPoints
+        self.allForces[0] = self._compute_force(self.allPts[0])
+        
+        step = 0
+        t0 = time.time()
+        try:
+            for step in steps:
+                tStepArr,alphaArr,stepsSinceReset = \
+                    iter_func(step,tStepArr,alphaArr,stepsSinceReset,fireParams)
+                
+                points = self.allPts[step].copy()
+                action = None
+                if computeAction and isinstance(self.nebObj,LeastActionPath):
+                    action = self.nebObj.target_func(points,self.nebObj.potential,\
+                                                     self.nebObj.mass)[0]
+                    
+                state = {"step":step,"points":points,\
+                         "forceNorm":np.linalg.norm(self.allForces[step]),\
+                         "tStep":tStepArr[step].copy(),"alpha":alphaArr[step].copy(),\
+                         "action":action}
+                yield state
+        finally:
+            t1 = time.time()
+            self.storedIters = np.array([step])
+            for nm in ["allPts","allVelocities","allForces"]:
+                setattr(self,nm,getattr(self,nm).stored(self.storedIters))
+            
+            self.nebObj.logger.flush()
+            self.nebObj.logger.write_fire_params(tStepArr.stored(self.storedIters),\
+                                                 alphaArr.stored(self.storedIters),\
+                                                 stepsSinceReset,fireParams)
+            self.nebObj.logger.write_runtime(t1-t0)
+            self.nebObj.logger.close()
+            if hasattr(self.nebObj,"shutdown_workers"):
+                self.nebObj.shutdown_workers()
+    
     def _local_fire2_iter(self,step,tStepArr,alphaArr,stepsSinceReset,fireParams):
         warnings.warn("Local FIRE2 currently calls local FIRE update")
         return self._local_fire_iter(step,tStepArr,alphaArr,stepsSinceReset,fireParams)
@@ -1024,9 +1864,7 @@ class VerletMinimization:
             DESCRIPTION.
 
         """
-        vdotf = 0.0
-        for ptIter in range(self.nPts):
-            vdotf += np.dot(self.allVelocities[step-1,ptIter],self.allForces[step-1,ptIter])
+        vdotf = _sequential_sum(_image_dots(self.allVelocities[step-1],self.allForces[step-1]))
 
         if vdotf > 0.0:
             stepsSinceReset += 1
@@ -1050,55 +1888,527 @@ class VerletMinimization:
         #Semi-implicit Euler integration
         self.allVelocities[step] = self.allVelocities[step-1] + tStepArr[step] * self.allForces[step-1]
         
-        #For mixing
-        vdotv = 0.0
-        fdotf = 0.0
-        for ptIter in range(self.nPts):
-            vdotv += np.dot(self.allVelocities[step,ptIter],self.allVelocities[step,ptIter])
-            fdotf += np.dot(self.allForces[step-1,ptIter],self.allForces[step-1,ptIter])
-        #Only vanishes if net force on all particles is zero, in which case this is zeroed out
-        #later anyways. Handled here to prevent nuisance exception-throwing
-        if fdotf > 10**(-16):
-            scale = np.sqrt(vdotv/fdotf)
+        #For mixing
+        vdotv = _sequential_sum(_image_dots(self.allVelocities[step],self.allVelocities[step]))
+        fdotf = _sequential_sum(_image_dots(self.allForces[step-1],self.allForces[step-1]))
+        #Only vanishes if net force on all particles is zero, in which case this is zeroed out
+        #later anyways. Handled here to prevent nuisance exception-throwing
+        if fdotf > 10**(-16):
+            scale = np.sqrt(vdotv/fdotf)
+        else:
+            scale = 0.0
+        
+        self.allVelocities[step] = (1-alphaArr[step])*self.allVelocities[step] + \
+            alphaArr[step] * scale * self.allForces[step-1]
+        
+        shift = _clip_to_maxmove(tStepArr[step]*self.allVelocities[step],fireParams["maxmove"])
+        self.allPts[step] = self.allPts[step-1] + shift
+        self.allForces[step] = self._compute_force(self.allPts[step])
+        
+        return tStepArr, alphaArr, stepsSinceReset
+    
+    def _check_early_stop(self,currentIter,stopParams):
+        """
+        Computes standard deviation in location of every image over the previous
+        stopParams["nStabIters"] iterations. Returns True if std is less than
+        stopParams["stabPerc"] for every image.
+
+        Parameters
+        ----------
+        currentIter : TYPE
+            DESCRIPTION.
+        stopParams : TYPE
+            DESCRIPTION.
+
+        Returns
+        -------
+        ret : TYPE
+            DESCRIPTION.
+
+        """
+        ret = False
+        
+        startCheckIter = stopParams["startCheckIter"]
+        stabPerc = stopParams["stabPerc"]
+        nStabIters = stopParams["nStabIters"]
+        checkFreq = stopParams["checkFreq"]
+        
+        if (currentIter >= startCheckIter) and (currentIter % checkFreq == 0):
+            std = np.std(self.allPts[currentIter-nStabIters:currentIter],axis=0)
+            if np.all(std <= stabPerc):
+                ret = True
+        
+        return ret
+    
+    def _check_early_abort(self,currentIter,breakParams):
+        
+        ret = False
+        
+        startCheckIter = breakParams["startCheckIter"]
+        allowedVariance = breakParams["variance"]
+        nStabIters = breakParams["nStabIters"]
+        checkFreq = breakParams["checkFreq"]
+        
+        if (currentIter >= startCheckIter) and (currentIter % checkFreq == 0):
+            std = np.std(self.allPts[currentIter-nStabIters:currentIter],axis=0)
+            if np.any(std >= allowedVariance):
+                ret = True
+        return ret
+    
+class BatchVerletMinimization:
+    """
+    Relaxes several bands in lockstep. The bands are stored as one array of
+    shape (nBands,nPts,nDims), so that every iteration makes a single call to
+    nebObj.compute_batch_force for all of the bands. Each band keeps its own
+    optimizer state, and stops independently of the others. With one band,
+    the trajectory is that of VerletMinimization.
+    
+    :Maintainer: Daniel
+    """
+    def __init__(self,nebObj,initialPoints):
+        """
+        
+        Parameters
+        ----------
+        nebObj : LeastActionPath or MinimumEnergyPath
+            Any object with a compute_batch_force method.
+        initialPoints : ndarray
+            The initial bands. Of shape (nBands,nPts,nDims).
+
+        Raises
+        ------
+        AttributeError
+            If nebObj has no compute_batch_force method.
+        ValueError
+            If initialPoints has the wrong shape.
+
+        Returns
+        -------
+        None.
+        """
+        if not hasattr(nebObj,"compute_batch_force"):
+            raise AttributeError("Object "+str(nebObj)+" has no attribute compute_batch_force")
+        
+        if initialPoints.ndim != 3:
+            raise ValueError("initialPoints.shape is "+str(initialPoints.shape)+\
+                             "; required shape is (nBands,nPts,nDims)")
+            
+        self.nebObj = nebObj
+        self.initialPoints = initialPoints
+        self.nBands, self.nPts, self.nDims = initialPoints.shape
+        
+        if self.nPts != self.nebObj.nPts:
+            raise ValueError("Obj "+str(self.nebObj)+" and initialPoints have "\
+                             +"a different number of points")
+                
+        self.allPts = None
+        self.allVelocities = None
+        self.allForces = None
+        #The iteration on which each band stopped updating
+        self.stopIters = None
+        
+    def _per_band(self,tStep):
+        return np.broadcast_to(np.asarray(tStep,dtype=float),(self.nBands,)).copy()
+    
+    def velocity_verlet(self,tStep,maxIters,dampingParameter=0):
+        """
+        Batched version of VerletMinimization.velocity_verlet.
+
+        Parameters
+        ----------
+        tStep : float or ndarray
+            The time step. If an array, of shape (nBands,).
+        maxIters : int
+            The number of iterations.
+        dampingParameter : float, optional
+            The damping force coefficient. The default is 0.
+
+        Returns
+        -------
+        None.
+
+        """
+        tStep = self._per_band(tStep)[:,None,None]
+        
+        self.allPts = np.zeros((maxIters+2,self.nBands,self.nPts,self.nDims))
+        self.allVelocities = np.zeros((maxIters+1,self.nBands,self.nPts,self.nDims))
+        self.allForces = np.zeros((maxIters+1,self.nBands,self.nPts,self.nDims))
+        self.stopIters = np.full(self.nBands,maxIters)
+        
+        self.allPts[0] = self.initialPoints
+        self.allForces[0] = self.nebObj.compute_batch_force(self.allPts[0])
+        self.allVelocities[0] = tStep*self.allForces[0]
+        self.allPts[1] = self.allPts[0] + \
+            self.allVelocities[0]*tStep + 0.5*self.allForces[0]*tStep**2
+        
+        t0 = time.time()
+        try:
+            for step in range(1,maxIters+1):
+                self.allForces[step] = self.nebObj.compute_batch_force(self.allPts[step])
+                
+                force = self.allForces[step]
+                product = np.sum(self.allVelocities[step-1]*force,axis=-1,keepdims=True)
+                fdotf = np.sum(force*force,axis=-1,keepdims=True)
+                
+                vProj = np.zeros(force.shape)
+                np.divide(product*force,fdotf,out=vProj,where=(product>0))
+                
+                accel = force - dampingParameter*self.allVelocities[step-1]
+                self.allVelocities[step] = vProj + tStep*accel
+                
+                self.allPts[step+1] = self.allPts[step] + self.allVelocities[step]*tStep + \
+                    0.5*accel*tStep**2
+        finally:
+            t1 = time.time()
+            self.nebObj.logger.write_runtime(t1-t0)
+            self.nebObj.logger.close()
+            if hasattr(self.nebObj,"shutdown_workers"):
+                self.nebObj.shutdown_workers()
+            
+        return None
+    
+    def fire(self,tStep,maxIters,fireParams={},useLocal=True,earlyStop=True,
+             earlyStopParams={},earlyAbort=False,earlyAbortParams={}):
+        """
+        Batched version of VerletMinimization.fire. A band that meets the
+        early stop (or early abort) criterion stops updating; its final points
+        are copied forward through self.allPts, and the iteration it stopped on is
+        stored in self.stopIters. The loop ends once every band has stopped.
+
+        Parameters
+        ----------
+        tStep : float or ndarray
+            The initial time step. If an array, of shape (nBands,).
+        maxIters : int
+            The maximum number of iterations.
+        fireParams : dict, optional
+            As in VerletMinimization.fire. The default is {}.
+        useLocal : bool, optional
+            Whether to use a time step per image, or per band. The default is True.
+        earlyStop : bool, optional
+            The default is True.
+        earlyStopParams : dict, optional
+            As in VerletMinimization.fire. The default is {}.
+        earlyAbort : bool, optional
+            The default is False.
+        earlyAbortParams : dict, optional
+            As in VerletMinimization.fire. The default is {}.
+
+        Returns
+        -------
+        tStepArr : ndarray
+            Of shape (nIters,nBands,nPts) if useLocal, else (nIters,nBands).
+        alphaArr : ndarray
+            Same shape as tStepArr.
+        stepsSinceReset : ndarray
+            Of shape (nBands,nPts) if useLocal, else (nBands,).
+        endsWithoutError : ndarray of bools
+            False for the bands that were aborted. Of shape (nBands,).
+        """
+        _fill_default_params(fireParams,_default_fire_params(self.nDims),"fireParams")
+        
+        defaultStopParams = {"startCheckIter":300,"nStabIters":50,"checkFreq":10,\
+                             "stabPerc":0.002}
+        _fill_default_params(earlyStopParams,defaultStopParams,"earlyStopParams")
+        
+        defaultAbortParams = {"startCheckIter":20,"nStabIters":10,"checkFreq":10,\
+                              "variance":1}
+        _fill_default_params(earlyAbortParams,defaultAbortParams,"earlyAbortParams")
+        
+        if useLocal:
+            step_func = self._local_fire_iter
+        else:
+            step_func = self._global_fire_iter
+            
+        return self._run_fire(step_func,tStep,maxIters,fireParams,useLocal,earlyStop,\
+                              earlyStopParams,earlyAbort,earlyAbortParams)
+    
+    def fire2(self,tStep,maxIters,fireParams={},useLocal=False,earlyStop=False,
+              earlyStopParams={}):
+        """
+        Batched version of VerletMinimization.fire2. Stopping is handled as in
+        BatchVerletMinimization.fire.
+
+        Parameters
+        ----------
+        tStep : float or ndarray
+            The initial time step. If an array, of shape (nBands,).
+        maxIters : int
+            The maximum number of iterations.
+        fireParams : dict, optional
+            As in VerletMinimization.fire2. The default is {}.
+        useLocal : bool, optional
+            The default is False.
+        earlyStop : bool, optional
+            The default is False.
+        earlyStopParams : dict, optional
+            As in VerletMinimization.fire2. The default is {}.
+
+        Returns
+        -------
+        tStepArr : ndarray
+        alphaArr : ndarray
+        stepsSinceReset : ndarray
+        """
+        _fill_default_params(fireParams,_default_fire_params(self.nDims,fire2=True),\
+                             "fireParams")
+        
+        defaultStopParams = {"startCheckIter":300,"nStabIters":50,"checkFreq":10,\
+                             "stabPerc":0.002}
+        _fill_default_params(earlyStopParams,defaultStopParams,"earlyStopParams")
+        
+        if useLocal:
+            warnings.warn("Local FIRE2 currently calls local FIRE update")
+            step_func = self._local_fire_iter
+        else:
+            step_func = self._global_fire2_iter
+        
+        tStepArr, alphaArr, stepsSinceReset, _ = \
+            self._run_fire(step_func,tStep,maxIters,fireParams,useLocal,earlyStop,\
+                           earlyStopParams,False,{})
+        
+        return tStepArr, alphaArr, stepsSinceReset
+    
+    def _run_fire(self,step_func,tStep,maxIters,fireParams,useLocal,earlyStop,\
+                  earlyStopParams,earlyAbort,earlyAbortParams):
+        tStep = self._per_band(tStep)
+        
+        self.allPts = np.zeros((maxIters+2,self.nBands,self.nPts,self.nDims))
+        self.allVelocities = np.zeros((maxIters+1,self.nBands,self.nPts,self.nDims))
+        self.allForces = np.zeros((maxIters+1,self.nBands,self.nPts,self.nDims))
+        
+        self.allPts[0] = self.initialPoints
+        self.allForces[0] = self.nebObj.compute_batch_force(self.allPts[0])
+        
+        if useLocal:
+            tStepArr = np.zeros((maxIters+1,self.nBands,self.nPts))
+            tStepArr[:] = tStep[:,None]
+            alphaArr = np.zeros((maxIters+1,self.nBands,self.nPts))
+            stepsSinceReset = np.zeros((self.nBands,self.nPts))
+        else:
+            tStepArr = np.zeros((maxIters+1,self.nBands))
+            tStepArr[0] = tStep
+            alphaArr = np.zeros((maxIters+1,self.nBands))
+            stepsSinceReset = np.zeros(self.nBands,dtype=int)
+        alphaArr[0] = fireParams["aStart"]
+        
+        self.stopIters = np.full(self.nBands,maxIters)
+        isActive = np.ones(self.nBands,dtype=bool)
+        isEarlyStopped = np.zeros(self.nBands,dtype=bool)
+        endsWithoutError = np.ones(self.nBands,dtype=bool)
+        
+        t0 = time.time()
+        try:
+            for step in range(1,maxIters+1):
+                activeInds = np.nonzero(isActive)[0]
+                if activeInds.size == 0:
+                    break
+                
+                step_func(step,activeInds,tStepArr,alphaArr,stepsSinceReset,fireParams)
+                
+                if earlyStop:
+                    stopped = activeInds[self._check_early_stop(step,activeInds,earlyStopParams)]
+                    #Same final update as VerletMinimization.fire, after it truncates
+                    #its arrays
+                    shift = self._final_shift(step-1,stopped,tStepArr,useLocal,fireParams)
+                    self.allPts[step+1:,stopped] = self.allPts[step,stopped] + shift
+                    
+                    self.stopIters[stopped] = step
+                    isActive[stopped] = False
+                    isEarlyStopped[stopped] = True
+                    activeInds = np.nonzero(isActive)[0]
+                    
+                if earlyAbort:
+                    aborted = activeInds[self._check_early_abort(step,activeInds,earlyAbortParams)]
+                    self.allPts[step+1:,aborted] = self.allPts[step,aborted]
+                    
+                    self.stopIters[aborted] = step
+                    isActive[aborted] = False
+                    endsWithoutError[aborted] = False
+            
+            #Final iteration, for the bands that ran through maxIters
+            activeInds = np.nonzero(isActive)[0]
+            shift = self._final_shift(maxIters,activeInds,tStepArr,useLocal,fireParams)
+            self.allPts[-1,activeInds] = self.allPts[-2,activeInds] + shift
+            
+            if np.all(isEarlyStopped):
+                lastIter = np.max(self.stopIters)
+                self.allPts = self.allPts[:lastIter+2]
+                self.allVelocities = self.allVelocities[:lastIter]
+                self.allForces = self.allForces[:lastIter]
+                
+                tStepArr = tStepArr[:lastIter]
+                alphaArr = alphaArr[:lastIter]
+        finally:
+            t1 = time.time()
+            self.nebObj.logger.write_fire_params(tStepArr,alphaArr,stepsSinceReset,fireParams)
+            self.nebObj.logger.write_runtime(t1-t0)
+            if earlyStop:
+                self.nebObj.logger.write_early_stop_params(earlyStopParams)
+            self.nebObj.logger.close()
+            if hasattr(self.nebObj,"shutdown_workers"):
+                self.nebObj.shutdown_workers()
+        
+        return tStepArr, alphaArr, stepsSinceReset, endsWithoutError
+    
+    def _final_shift(self,idx,bandInds,tStepArr,useLocal,fireParams):
+        velocities = self.allVelocities[idx,bandInds]
+        forces = self.allForces[idx,bandInds]
+        if useLocal:
+            tStep = tStepArr[idx,bandInds][:,:,None]
+            shift = tStep*velocities + 0.5*forces*tStep**2
+            shift = _clip_to_maxmove(shift,fireParams["maxmove"])
+        else:
+            tStep = tStepArr[idx,bandInds][:,None,None]
+            shift = tStep*velocities + 0.5*forces*tStep**2
+        return shift
+    
+    def _local_fire_iter(self,step,activeInds,tStepArr,alphaArr,stepsSinceReset,fireParams):
+        """
+        Batched version of VerletMinimization._local_fire_iter. Updates the
+        bands activeInds in place.
+        """
+        a = activeInds
+        velPrev = self.allVelocities[step-1,a]
+        forcePrev = self.allForces[step-1,a]
+        tStepPrev = tStepArr[step-1,a]
+        
+        shift = tStepPrev[:,:,None]*velPrev + 0.5*forcePrev*tStepPrev[:,:,None]**2
+        self.allPts[step,a] = self.allPts[step-1,a] + _clip_to_maxmove(shift,fireParams["maxmove"])
+        
+        force = self.nebObj.compute_batch_force(self.allPts[step,a],bandInds=a)
+        self.allForces[step,a] = force
+        #What the Wikipedia article on velocity Verlet uses
+        vel = 0.5*tStepPrev[:,:,None]*(force+forcePrev)
+        
+        product = np.sum(velPrev*force,axis=-1)
+        isPositive = product > 0
+        
+        vMag = np.linalg.norm(velPrev,axis=-1,keepdims=True)
+        fNorm = np.linalg.norm(force,axis=-1,keepdims=True)
+        fHat = np.zeros(force.shape)
+        np.divide(force,fNorm,out=fHat,where=isPositive[:,:,None])
+        alpha = alphaArr[step-1,a][:,:,None]
+        mixing = (1-alpha)*velPrev + alpha*vMag*fHat
+        self.allVelocities[step,a] = vel + np.where(isPositive[:,:,None],mixing,0.)
+        
+        isAccel = isPositive & (stepsSinceReset[a] > fireParams["nAccel"])
+        tStepArr[step,a] = \
+            np.where(isAccel,np.minimum(tStepPrev*fireParams["fInc"],fireParams["dtMax"]),
+                     np.where(isPositive,tStepPrev,
+                              np.maximum(tStepPrev*fireParams["fDecel"],fireParams["dtMin"])))
+        alphaArr[step,a] = \
+            np.where(isAccel,alphaArr[step-1,a]*fireParams["fAlpha"],
+                     np.where(isPositive,alphaArr[step,a],fireParams["aStart"]))
+        stepsSinceReset[a] = np.where(isPositive,stepsSinceReset[a]+1,0)
+        
+        return tStepArr, alphaArr, stepsSinceReset
+    
+    def _global_fire_iter(self,step,activeInds,tStepArr,alphaArr,stepsSinceReset,fireParams):
+        """
+        Batched version of VerletMinimization._global_fire_iter. Updates the
+        bands activeInds in place.
+        """
+        a = activeInds
+        forcePrev = self.allForces[step-1,a]
+        
+        vdotf = np.sum(self.allVelocities[step-1,a]*forcePrev,axis=(1,2))
+        isPositive = vdotf > 0
+        
+        stepsSinceReset[a] = np.where(isPositive,stepsSinceReset[a]+1,0)
+        isAccel = isPositive & (stepsSinceReset[a] > fireParams["nAccel"])
+        
+        tStepPrev = tStepArr[step-1,a]
+        alphaPrev = alphaArr[step-1,a]
+        tStepArr[step,a] = \
+            np.where(isAccel,np.minimum(tStepPrev*fireParams["fInc"],fireParams["dtMax"]),
+                     np.where(isPositive,tStepPrev,
+                              np.maximum(tStepPrev*fireParams["fDecel"],fireParams["dtMin"])))
+        #Exponent and single-image velocity reset match VerletMinimization._global_fire_iter
+        alphaArr[step,a] = \
+            np.where(isAccel,alphaPrev**fireParams["fAlpha"],
+                     np.where(isPositive,alphaPrev,fireParams["aStart"]))
+        self.allVelocities[step-1,a[~isPositive],-1] = 0.
+        
+        tStep = tStepArr[step,a][:,None,None]
+        alpha = alphaArr[step,a][:,None,None]
+        
+        #Semi-implicit Euler integration
+        vel = self.allVelocities[step-1,a] + tStep*forcePrev
+        
+        vdotv = np.sum(np.linalg.norm(vel,axis=-1),axis=-1)
+        fdotf = np.sum(np.linalg.norm(forcePrev,axis=-1),axis=-1)
+        scale = np.zeros(vdotv.shape)
+        np.divide(vdotv,fdotf,out=scale,where=(fdotf>10**(-16)))
+        
+        vel = (1-alpha)*vel + alpha*scale[:,None,None]*forcePrev
+        self.allVelocities[step,a] = vel
+        
+        shift = _clip_to_maxmove(tStep*vel,fireParams["maxmove"])
+        self.allPts[step,a] = self.allPts[step-1,a] + shift
+        self.allForces[step,a] = self.nebObj.compute_batch_force(self.allPts[step,a],bandInds=a)
+        
+        return tStepArr, alphaArr, stepsSinceReset
+    
+    def _global_fire2_iter(self,step,activeInds,tStepArr,alphaArr,stepsSinceReset,fireParams):
+        """
+        Batched version of VerletMinimization._global_fire2_iter. Updates the
+        bands activeInds in place.
+        """
+        a = activeInds
+        forcePrev = self.allForces[step-1,a]
+        
+        vdotf = np.sum(self.allVelocities[step-1,a]*forcePrev,axis=(1,2))
+        isPositive = vdotf > 0
+        
+        stepsSinceReset[a] = np.where(isPositive,stepsSinceReset[a]+1,stepsSinceReset[a])
+        isAccel = isPositive & (stepsSinceReset[a] > fireParams["nAccel"])
+        
+        tStepPrev = tStepArr[step-1,a]
+        alphaPrev = alphaArr[step-1,a]
+        if step > fireParams["minDecelIter"]:
+            tStepDecel = np.maximum(tStepPrev*fireParams["fDecel"],fireParams["dtMin"])
         else:
-            scale = 0.0
+            tStepDecel = tStepPrev
+        tStepArr[step,a] = \
+            np.where(isAccel,np.minimum(tStepPrev*fireParams["fInc"],fireParams["dtMax"]),
+                     np.where(isPositive,tStepPrev,tStepDecel))
+        alphaArr[step,a] = \
+            np.where(isAccel,alphaPrev*fireParams["fAlpha"],
+                     np.where(isPositive,alphaPrev,fireParams["aStart"]))
+        
+        reset = a[~isPositive]
+        self.allPts[step-1,reset] -= \
+            0.5*tStepArr[step,reset][:,None,None]*self.allVelocities[step-1,reset]
+        self.allVelocities[step-1,reset] = 0.
+        
+        tStep = tStepArr[step,a][:,None,None]
+        alpha = alphaArr[step,a][:,None,None]
         
-        self.allVelocities[step] = (1-alphaArr[step])*self.allVelocities[step] + \
-            alphaArr[step] * scale * self.allForces[step-1]
+        #Semi-implicit Euler integration
+        vel = self.allVelocities[step-1,a] + tStep*forcePrev
         
-        shift = tStepArr[step]*self.allVelocities[step]
+        vdotv = np.sum(vel*vel,axis=(1,2))
+        fdotf = np.sum(forcePrev*forcePrev,axis=(1,2))
+        scale = np.zeros(vdotv.shape)
+        np.divide(vdotv,fdotf,out=scale,where=(fdotf>10**(-16)))
+        scale = np.sqrt(scale)
         
-        for ptIter in range(self.nPts):
-            for dimIter in range(self.nDims):
-                if(abs(shift[ptIter,dimIter])>fireParams["maxmove"][dimIter]):
-                    shift[ptIter] = shift[ptIter] * \
-                        fireParams["maxmove"][dimIter]/abs(shift[ptIter,dimIter])
+        vel = (1-alpha)*vel + alpha*scale[:,None,None]*forcePrev
+        self.allVelocities[step,a] = vel
         
-        self.allPts[step] = self.allPts[step-1] + shift
-        self.allForces[step] = self.nebObj.compute_force(self.allPts[step])
+        shift = _clip_to_maxmove(tStep*vel,fireParams["maxmove"])
+        self.allPts[step,a] = self.allPts[step-1,a] + shift
+        self.allForces[step,a] = self.nebObj.compute_batch_force(self.allPts[step,a],bandInds=a)
         
         return tStepArr, alphaArr, stepsSinceReset
     
-    def _check_early_stop(self,currentIter,stopParams):
+    def _check_early_stop(self,currentIter,activeInds,stopParams):
         """
-        Computes standard deviation in location of every image over the previous
-        stopParams["nStabIters"] iterations. Returns True if std is less than
-        stopParams["stabPerc"] for every image.
-
-        Parameters
-        ----------
-        currentIter : TYPE
-            DESCRIPTION.
-        stopParams : TYPE
-            DESCRIPTION.
-
-        Returns
-        -------
-        ret : TYPE
-            DESCRIPTION.
-
+        As VerletMinimization._check_early_stop, for every band in activeInds.
+        Returns a boolean array of shape activeInds.shape.
         """
-        ret = False
+        ret = np.zeros(activeInds.shape,dtype=bool)
         
         startCheckIter = stopParams["startCheckIter"]
         stabPerc = stopParams["stabPerc"]
@@ -1106,15 +2416,17 @@ class VerletMinimization:
         checkFreq = stopParams["checkFreq"]
         
         if (currentIter >= startCheckIter) and (currentIter % checkFreq == 0):
-            std = np.std(self.allPts[currentIter-nStabIters:currentIter],axis=0)
-            if np.all(std <= stabPerc):
-                ret = True
+            std = np.std(self.allPts[currentIter-nStabIters:currentIter,activeInds],axis=0)
+            ret = np.all(std <= stabPerc,axis=(1,2))
         
         return ret
     
-    def _check_early_abort(self,currentIter,breakParams):
-        
-        ret = False
+    def _check_early_abort(self,currentIter,activeInds,breakParams):
+        """
+        As VerletMinimization._check_early_abort, for every band in activeInds.
+        Returns a boolean array of shape activeInds.shape.
+        """
+        ret = np.zeros(activeInds.shape,dtype=bool)
         
         startCheckIter = breakParams["startCheckIter"]
         allowedVariance = breakParams["variance"]
@@ -1122,9 +2434,8 @@ class VerletMinimization:
         checkFreq = breakParams["checkFreq"]
         
         if (currentIter >= startCheckIter) and (currentIter % checkFreq == 0):
-            std = np.std(self.allPts[currentIter-nStabIters:currentIter],axis=0)
-            if np.any(std >= allowedVariance):
-                ret = True
+            std = np.std(self.allPts[currentIter-nStabIters:currentIter,activeInds],axis=0)
+            ret = np.any(std >= allowedVariance,axis=(1,2))
         return ret
     
 class EulerLagrangeSolver:
@@ -1198,7 +2509,7 @@ class EulerLagrangeVerifier:
             DESCRIPTION. The default is None.
         grad_approx : Function, optional
             For computing gradients of the potential and inertia tensor. 
-            The default is midpoint_grad.
+            The default is midpoint_grad, which uses eneg_func.grad if it exists.
 
         Raises
         ------
@@ -1285,7 +2596,8 @@ class Dijkstra:
     """
     def __init__(self,initialPoint,coordMeshTuple,potArr,inertArr=None,\
                  target_func=TargetFunctions.action,allowedEndpoints=None,\
-                 trimVals=[10**(-4),None],logLevel=1,fName=None):
+                 trimVals=[10**(-4),None],logLevel=1,fName=None,loggerSettings={},\
+                 maxWeightsMemory=2**30):
         """
         Some indexing is done to deal with the default shape of np.meshgrid.
         For D dimensions, the output is of shape (N2,N1,N3,...,ND), while the
@@ -1317,6 +2629,13 @@ class Dijkstra:
             DESCRIPTION. The default is None.
         trimVals : TYPE, optional
             DESCRIPTION. The default is [10**(-4),None].
+        loggerSettings : dict, optional
+            Compression, precision and grid store settings for the log; see
+            fileio._fill_grid_logger_settings. The default is {}.
+        maxWeightsMemory : int, optional
+            The largest size, in bytes, of the edge weights of the whole grid
+            for them to be computed before the search. Above it, the weights
+            of each node are computed when it is visited. The default is 2**30.
 
         Raises
         ------
@@ -1370,8 +2689,10 @@ class Dijkstra:
             self.inertArr = inertArr
         else:
             #Simplifies things in self._construct_path_dict if I set this to the 
-            #identity here
-            self.inertArr = np.full(self.potArr.shape+2*(self.nDims,),np.identity(self.nDims))
+            #identity here. A read-only view, so that large grids don't store
+            #nDims**2 copies of the identity
+            self.inertArr = np.broadcast_to(np.identity(self.nDims),\
+                                            self.potArr.shape+2*(self.nDims,))
         
         if allowedEndpoints is None:
             self.allowedEndpoints, self.endpointIndices \
@@ -1393,7 +2714,7 @@ class Dijkstra:
                              str(self.endpointIndices.shape)+"; dimension 1 must be "\
                              +str(self.nDims))
         
-        self.endpointIndices = [tuple(row) for row in self.endpointIndices]
+        self.endpointIndices = [tuple(row) for row in self.endpointIndices.tolist()]
         
         #Clip the potential to the min/max. Done after finding possible endpoints.
         self.trimVals = trimVals
@@ -1412,14 +2733,27 @@ class Dijkstra:
         #and self.initialInds[1] <= Nx
         self.initialInds[[1,0]] = self.initialInds[[0,1]]
         self.initialInds = tuple(self.initialInds)
+        self.maxWeightsMemory = maxWeightsMemory
         
-        self.djkLogger = DijkstraLogger(self,logLevel=logLevel,fName=fName)
+        self.djkLogger = DijkstraLogger(self,logLevel=logLevel,fName=fName,\
+                                        loggerSettings=loggerSettings)
     
     def _construct_path_dict(self):
         """
         Uses Dijkstra's algorithm to determine the previous node visited
         for every node in the PES. See e.g. 
         https://en.wikipedia.org/wiki/Dijkstra%27s_algorithm
+        
+        The next node is taken from a binary heap, with lazy deletion of stale
+        entries. Ties are broken by the flattened index of the node, as with
+        np.argmin over the whole grid, so the paths do not depend on the heap.
+        Stops once every endpoint has been visited.
+        
+        The weights of every edge are computed beforehand, by 
+        SurfaceUtils.grid_edge_weights. This stores 3**nDims-1 floats per node,
+        so if that is more than self.maxWeightsMemory bytes, the weights of 
+        each node are instead computed when it is visited, by 
+        SurfaceUtils.node_edge_weights.
 
         TODO: allow for non-grid PES, like if we trimmed off high-energy regions
         Maybe fill to a grid, and set those guys to infinite energy so they're
@@ -1429,133 +2763,132 @@ class Dijkstra:
         
         Returns
         -------
-        None.
+        tentativeDistance : masked array
+            The distance to every node. The mask is True for visited nodes.
+        previousIndsArr : ndarray of ints
+            The indices of the previous node on the shortest path to every node.
+            Of shape self.potArr.shape + (self.nDims,). -1 where no path was found.
+        endpointIndsList : list
+            The endpoints that were not visited.
 
         """
         t0 = time.time()
         
-        suggestedMaxSize = 50000
-        if self.potArr.size >= suggestedMaxSize:
-            warnings.warn("Number of nodes is "+str(self.potArr.size)+\
-                          "; recommended maximum method to finish is "\
-                          +str(suggestedMaxSize))
+        gridShape = self.potArr.shape
         
-        #Use a masked array to both track the distance and the visited values
-        tentativeDistance = \
-            np.ma.masked_array(np.inf*np.ones(self.potArr.shape),np.zeros(self.potArr.shape))
+        tentativeDistance = np.full(gridShape,np.inf)
+        isVisited = np.zeros(gridShape,dtype=bool)
+        #Flattened index of the previous node; -1 if it has not been reached
+        previousFlatInds = -1*np.ones(self.potArr.size,dtype=int)
+        #Views, for bookkeeping with flattened indices
+        tentativeDistanceFlat = tentativeDistance.reshape(-1)
+        isVisitedFlat = isVisited.reshape(-1)
         
         #For current indices, to get to a neighbor, subtract one tuple from
         #relativeNeighborInds
         relativeNeighborInds = list(itertools.product([-1,0,1],repeat=self.nDims))
         relativeNeighborInds.remove(self.nDims*(0,))
-        
-        currentInds = self.initialInds
-        tentativeDistance[currentInds] = 0
-        
-        neighborsVisitDict = {}
-        endpointIndsList = self.endpointIndices.copy() #May need indices later
-        
-        #Index swapping like mentioned in self.__init__
-        maxInds = np.array([len(c) for c in self.uniqueCoords])
-        maxInds[[1,0]] = maxInds[[0,1]]
-        
-        #Ends when all endpoints have been reached, or it has iterated over every
-        #node. Latter should not be possible; is a check in case something goes wrong.
-        for i in range(self.potArr.size):
-            neighborInds = np.array(currentInds) - relativeNeighborInds
-            #Removing indices that take us off-grid. See e.g.
-            #https://stackoverflow.com/a/20528566
-            isNegativeBool = [neighborInds[:,i] < 0 for i in range(self.nDims)]
-            neighborInds = \
-                neighborInds[np.logical_not(np.logical_or.reduce(isNegativeBool))]
-            isTooBigBool = [neighborInds[:,i] >= maxInds[i] for i in range(self.nDims)]
-            neighborInds = \
-                neighborInds[np.logical_not(np.logical_or.reduce(isTooBigBool))]
-            #Removing visited indices
-            neighborInds = [tuple(n) for n in neighborInds if not tentativeDistance.mask[tuple(n)]]
+        relativeNeighborInds = np.array(relativeNeighborInds)
+        flatStrides = np.array([np.prod(gridShape[i+1:],dtype=int) for i in range(self.nDims)])
+        relativeNeighborFlatInds = relativeNeighborInds @ flatStrides
+        
+        #Infinite for off-grid neighbors, which are then never updated
+        weightsMemory = self.potArr.size*relativeNeighborInds.shape[0]*np.dtype(float).itemsize
+        precomputeWeights = (weightsMemory <= self.maxWeightsMemory)
+        if precomputeWeights:
+            edgeWeights = SurfaceUtils.grid_edge_weights(self.coordMeshTuple,self.potArr,\
+                                                         relativeNeighborInds,self.inertArr,\
+                                                         self.target_func)
+            edgeWeights = edgeWeights.reshape((-1,relativeNeighborInds.shape[0]))
+        weightsRunTime = time.time() - t0
+        
+        unvisitedEndpoints = set(np.ravel_multi_index(tuple(np.array(self.endpointIndices).T),\
+                                                      gridShape).tolist())
+        
+        tentativeDistance[self.initialInds] = 0
+        heap = [(0.,np.ravel_multi_index(self.initialInds,gridShape).item())]
+        
+        while heap and unvisitedEndpoints:
+            currentDist, currentFlatInd = heapq.heappop(heap)
+            #Stale entry, for a node that was reached again at a shorter distance
+            if isVisitedFlat[currentFlatInd]:
+                continue
+            
+            if precomputeWeights:
+                currentWeights = edgeWeights[currentFlatInd]
+            else:
+                currentWeights = \
+                    SurfaceUtils.node_edge_weights(self.coordMeshTuple,self.potArr,\
+                                                   np.unravel_index(currentFlatInd,gridShape),\
+                                                   relativeNeighborInds,self.inertArr,\
+                                                   self.target_func)
+            
+            #Removing neighbors that are off-grid, and visited neighbors
+            isAllowed = currentWeights < np.inf
+            neighborFlatInds = currentFlatInd - relativeNeighborFlatInds[isAllowed]
+            isAllowed[isAllowed] = ~isVisitedFlat[neighborFlatInds]
+            neighborFlatInds = currentFlatInd - relativeNeighborFlatInds[isAllowed]
             
             if self.djkLogger.logLevel == 2:
+                currentInds = np.unravel_index(currentFlatInd,gridShape)
                 print(50*"*")
                 print("Current inds: ",currentInds)
                 print("Current point: ",np.array([c[currentInds] for c in self.coordMeshTuple]))
-                print("Neighbor inds:\n",neighborInds)
-                if self.potArr.size <= 50: #Any larger is too big to be useful
-                    with np.printoptions(precision=2):
-                        print("Updated data:\n",tentativeDistance.data)
-                        print("Mask:\n",tentativeDistance.mask)
-            
-            #For feeding into self.target_func
-            coords = np.zeros((2,self.nDims))
-            coords[0] = np.array([c[currentInds] for c in self.coordMeshTuple])
-            
-            enegs = np.zeros(2)
-            enegs[0] = self.potArr[currentInds]
-            
-            masses = np.zeros((2,)+2*(self.nDims,))
-            masses[0] = self.inertArr[currentInds]
-            
-            for (neighIter, n) in enumerate(neighborInds):
-                coords[1] = [c[n] for c in self.coordMeshTuple]
-                enegs[1] = self.potArr[n]
-                masses[1] = self.inertArr[n]
-                
-                #self.target_func returns the action (distance), plus energies and masses
-                distThroughCurrent = tentativeDistance[currentInds] + \
-                    self.target_func(coords,enegs,masses)[0]
-                    
-                if self.djkLogger.logLevel == 2:
-                    print("Neighbor inds: ",n)
-                    print("Neighbor point: ",coords[1])
-                    print("Current distance: ",tentativeDistance[n])
-                    print("Dist through current: ",distThroughCurrent)
-                    print("Updating neighbor: ",distThroughCurrent<tentativeDistance[n])
-                
-                if distThroughCurrent < tentativeDistance[n]:
-                    tentativeDistance[n] = distThroughCurrent
-                    neighborsVisitDict[n] = currentInds
-            tentativeDistance.mask[currentInds] = True
-            
-            #For checking when we want to stop
-            try:
-                endpointIndsList.remove(currentInds)
-            except:
-                pass
-                
-            currentInds = np.unravel_index(np.argmin(tentativeDistance),\
-                                           tentativeDistance.shape)
+                print("Neighbor inds:\n",np.array(np.unravel_index(neighborFlatInds,gridShape)).T)
             
-            #Will exit early if all of the endpoints have been visited
-            if not endpointIndsList:
-                break
+            distThroughCurrent = currentDist + currentWeights[isAllowed]
+            isShorter = distThroughCurrent < tentativeDistanceFlat[neighborFlatInds]
+            
+            shorterDists = distThroughCurrent[isShorter]
+            shorterFlatInds = neighborFlatInds[isShorter]
+            tentativeDistanceFlat[shorterFlatInds] = shorterDists
+            previousFlatInds[shorterFlatInds] = currentFlatInd
+            for heapEntry in zip(shorterDists.tolist(),shorterFlatInds.tolist()):
+                heapq.heappush(heap,heapEntry)
+            
+            isVisitedFlat[currentFlatInd] = True
+            unvisitedEndpoints.discard(currentFlatInd)
+            
+        tentativeDistance = np.ma.masked_array(tentativeDistance,isVisited)
+        
+        previousIndsArr = -1*np.ones(gridShape+(self.nDims,),dtype=int)
+        isReached = previousFlatInds >= 0
+        previousIndsArr.reshape((-1,self.nDims))[isReached] = \
+            np.array(np.unravel_index(previousFlatInds[isReached],gridShape)).T
+        
+        endpointIndsList = [e for e in self.endpointIndices if not isVisited[e]]
             
         t1 = time.time()
         runTime = t1 - t0
-            
-        var = (tentativeDistance,neighborsVisitDict,endpointIndsList,runTime)
-        nms = ("tentativeDistance","neighborsVisitDict","endpointIndsList","runTime")
+        
+        #Logged as flat indices, which is nDims times smaller than previousIndsArr.
+        #The paths in _get_paths are traced back from it when loaded
+        var = (tentativeDistance,previousFlatInds.reshape(gridShape),endpointIndsList,\
+               weightsRunTime,runTime)
+        nms = ("tentativeDistance","previousFlatInds","endpointIndsList","weightsRunTime",\
+               "runTime")
         
         self.djkLogger.log(var,nms)
         
-        return tentativeDistance, neighborsVisitDict, endpointIndsList
+        return tentativeDistance, previousIndsArr, endpointIndsList
     
-    def _get_paths(self,neighborsVisitDict):
+    def _get_paths(self,previousIndsArr):
         allPathsIndsDict = {}
         for endptInds in self.endpointIndices:
             path = []
             step = endptInds
             while step != self.initialInds:
                 path.append(step)
-                step = neighborsVisitDict[step]
+                step = tuple(previousIndsArr[step].tolist())
+                if step[0] < 0:
+                    raise ValueError("No path found to endpoint indices "+str(endptInds))
             path.append(self.initialInds)
             path.reverse()
             
             allPathsIndsDict[endptInds] = path
         
-        var = (allPathsIndsDict,)
-        nms = ("allPathsIndsDict",)
-        
-        self.djkLogger.log(var,nms)
-        
+        #Not logged, as LoadDijkstraLogger traces the paths back through the 
+        #logged previousFlatInds
         return allPathsIndsDict
     
     def __call__(self,returnAll=False):
@@ -1576,25 +2909,22 @@ class Dijkstra:
         None.
 
         """
-        tentativeDistance, neighborsVisitDict, endpointIndsList = \
+        tentativeDistance, previousIndsArr, endpointIndsList = \
             self._construct_path_dict()
         
         #Warns if any endpoint isn't visited
         if endpointIndsList:
             warnings.warn("Endpoint indices\n"+str(endpointIndsList)+\
                           "\nnot visited")
-        pathIndsDict = self._get_paths(neighborsVisitDict)
+        pathIndsDict = self._get_paths(previousIndsArr)
         
         pathIndsDictRet = {} #Returns with the keys equal to the final point, not the index
         pathArrDict = {}
         distanceDict = {}
         for finalInds in pathIndsDict.keys():
             finalPt = np.array([c[finalInds] for c in self.coordMeshTuple])
-            actualPath = np.zeros((0,self.nDims))
-            for pathInd in pathIndsDict[finalInds]:
-                toAppend = \
-                    np.array([c[pathInd] for c in self.coordMeshTuple]).reshape((1,-1))
-                actualPath = np.append(actualPath,toAppend,axis=0)
+            pathInds = tuple(np.array(pathIndsDict[finalInds]).T)
+            actualPath = np.array([c[pathInds] for c in self.coordMeshTuple],dtype=float).T
             
             pathIndsDictRet[tuple(finalPt.tolist())] = pathIndsDict[finalInds]
             pathArrDict[tuple(finalPt.tolist())] = actualPath
@@ -1621,10 +2951,504 @@ class Dijkstra:
         self.djkLogger.log((endptOut,),("endptOut",))
         return endptOut
 
+class FastMarching(Dijkstra):
+    """
+    Computes the action field S(x) from the initial point with a fast marching
+    method, then back-traces paths from the endpoints by gradient descent on the
+    field. Unlike Dijkstra, paths are not restricted to the grid edges, so the
+    action does not carry the metrication error of the 3**nDims-1 stencil.
+    
+    The grid handling (index swapping, allowed endpoints, trimming the potential)
+    and the logging are the same as in Dijkstra, and the action is always
+    TargetFunctions.action.
+    
+    :Maintainer: Daniel
+    """
+    def __init__(self,initialPoint,coordMeshTuple,potArr,inertArr=None,\
+                 allowedEndpoints=None,trimVals=[10**(-4),None],logLevel=1,fName=None,\
+                 loggerSettings={}):
+        """
+        See Dijkstra.__init__ for the index conventions.
+        
+        Parameters
+        ----------
+        initialPoint : ndarray
+            The point the action is measured from. Must lie on the grid.
+        coordMeshTuple : tuple of ndarrays
+            The output of np.meshgrid.
+        potArr : ndarray
+            The potential on the grid. Points with infinite energy are never
+            reached.
+        inertArr : ndarray, optional
+            The inertia tensor on the grid, of shape potArr.shape+(nDims,nDims).
+            The default is None, for the identity.
+        allowedEndpoints : ndarray, optional
+            The endpoints to back-trace paths from. The default is None, in which
+            case they are found with SurfaceUtils.find_endpoints_on_grid.
+        trimVals : list, optional
+            The values to clip the potential to. The default is [10**(-4),None].
+        logLevel : int, optional
+            The default is 1.
+        fName : str, optional
+            The log file name. The default is None.
+        loggerSettings : dict, optional
+            Compression, precision and grid store settings for the log; see
+            fileio._fill_grid_logger_settings. The default is {}.
+        
+        Returns
+        -------
+        None.
+        
+        """
+        super().__init__(initialPoint,coordMeshTuple,potArr,inertArr=inertArr,\
+                         target_func=TargetFunctions.action,\
+                         allowedEndpoints=allowedEndpoints,trimVals=trimVals,\
+                         logLevel=logLevel,fName=fName,loggerSettings=loggerSettings)
+        self.isIdentityInertia = inertArr is None
+        
+        #Internal axis i is along coordinate axisCoordInds[i]
+        self.axisCoordInds = np.arange(self.nDims)
+        self.axisCoordInds[[1,0]] = self.axisCoordInds[[0,1]]
+        
+        self.relativeNeighborInds, self.stencilSimplices = self._stencil_simplices()
+    
+    def _stencil_simplices(self):
+        """
+        Triangulates the shell of the 3**nDims-1 stencil. Every face of the
+        shell is the simplex with vertices s*(e_{p_1}), s*(e_{p_1}+e_{p_2}), ...,
+        for a choice of signs s and a permutation p of the axes (the Kuhn
+        triangulation of the cube). The update of a node considers all of the
+        sub-simplices of these faces.
+        
+        Returns
+        -------
+        relativeNeighborInds : ndarray of ints
+            The offsets of the neighbors, of shape (3**nDims-1,nDims). As in
+            Dijkstra, the neighbor of a node is found by subtracting an offset.
+        stencilSimplices : list of lists of ndarrays
+            stencilSimplices[j][k] is an array of shape (nSimplices,k+1), with
+            the offset indices of every sub-simplex with k+1 vertices that
+            contains offset j. The first column is always j.
+        
+        """
+        relativeNeighborInds = list(itertools.product([-1,0,1],repeat=self.nDims))
+        relativeNeighborInds.remove(self.nDims*(0,))
+        offsetIndexDict = {o:i for (i,o) in enumerate(relativeNeighborInds)}
+        relativeNeighborInds = np.array(relativeNeighborInds)
+        
+        simplexSet = set()
+        for signs in itertools.product([-1,1],repeat=self.nDims):
+            for perm in itertools.permutations(range(self.nDims)):
+                vertex = np.zeros(self.nDims,dtype=int)
+                faceInds = []
+                for p in perm:
+                    vertex[p] = signs[p]
+                    faceInds.append(offsetIndexDict[tuple(vertex.tolist())])
+                for k in range(1,self.nDims+1):
+                    for sub in itertools.combinations(faceInds,k):
+                        simplexSet.add(tuple(sorted(sub)))
+        
+        stencilSimplices = [[[] for k in range(self.nDims)] for j in offsetIndexDict]
+        for simplex in sorted(simplexSet):
+            for j in simplex:
+                stencilSimplices[j][len(simplex)-1].append((j,)+tuple(v for v in simplex if v != j))
+        
+        stencilSimplices = [[np.array(s,dtype=int).reshape((-1,k+1)) for (k,s) in enumerate(sList)]\
+                            for sList in stencilSimplices]
+        
+        return relativeNeighborInds, stencilSimplices
+    
+    @staticmethod
+    def _simplex_action(displacements,actionVals,speed,inertArr):
+        """
+        The semi-Lagrangian update of a node from one simplex of accepted nodes:
+        the minimum over the simplex of S(y) + sqrt(2 V(x)) ||y - x||_M(x),
+        with S interpolated linearly on the simplex. V and M are taken at the
+        updated node x. The minimizer on the plane of the simplex has a closed
+        form; if it lies outside of the simplex, the value is infinite, and
+        the minimum is instead found on one of the sub-simplices.
+        
+        Parameters
+        ----------
+        displacements : ndarray
+            The vertices of the simplices, relative to the updated nodes. Of
+            shape (nSimplices,k+1,nDims).
+        actionVals : ndarray
+            The action at the vertices, of shape (nSimplices,k+1).
+        speed : ndarray
+            sqrt(2 V(x)) for every simplex, of shape (nSimplices,).
+        inertArr : ndarray or None
+            M(x) for every simplex, of shape (nSimplices,nDims,nDims). None for
+            the identity.
+        
+        Returns
+        -------
+        ndarray
+            The candidate action, of shape (nSimplices,).
+        
+        """
+        d0 = displacements[:,0]
+        if inertArr is None:
+            md0 = d0
+        else:
+            md0 = np.einsum("sab,sb->sa",inertArr,d0)
+        d0Norm2 = np.einsum("sa,sa->s",d0,md0)
+        
+        if displacements.shape[1] == 1:
+            return actionVals[:,0] + speed*np.sqrt(d0Norm2)
+        
+        #Edges of the simplex from vertex 0, and the projection of d0 onto them
+        edges = displacements[:,1:] - d0[:,None]
+        if inertArr is None:
+            gram = np.einsum("ska,sla->skl",edges,edges)
+        else:
+            gram = np.einsum("ska,sab,slb->skl",edges,inertArr,edges)
+        proj = np.einsum("ska,sa->sk",edges,md0)
+        delta = actionVals[:,1:] - actionVals[:,:1]
+        
+        gramInv = np.linalg.inv(gram)
+        gramInvProj = np.einsum("skl,sl->sk",gramInv,proj)
+        gramInvDelta = np.einsum("skl,sl->sk",gramInv,delta)
+        
+        #Squared norms of the part of d0 normal to the simplex, and of the
+        #gradient of S along it
+        perpNorm2 = (d0Norm2 - np.einsum("sk,sk->s",proj,gramInvProj)).clip(0)
+        gradNorm2 = np.einsum("sk,sk->s",delta,gramInvDelta)
+        
+        out = np.full(d0.shape[0],np.inf)
+        isValid = gradNorm2 < speed**2
+        
+        speedValid = speed[isValid]
+        perpDist = np.sqrt(perpNorm2[isValid]/(1 - gradNorm2[isValid]/speedValid**2))
+        weights = -(gramInvProj[isValid] + (perpDist/speedValid)[:,None]*gramInvDelta[isValid])
+        
+        tol = 10**(-12)
+        isInside = np.all(weights >= -tol,axis=1) & (weights.sum(axis=1) <= 1 + tol)
+        
+        validInds = np.nonzero(isValid)[0][isInside]
+        out[validInds] = actionVals[validInds,0] + \
+            np.einsum("sk,sk->s",delta[validInds],weights[isInside]) + \
+            speedValid[isInside]*perpDist[isInside]
+        
+        return out
+    
+    def _march(self):
+        """
+        Computes the action field with a fast marching method: nodes are
+        accepted in order of increasing action, taken from a binary heap as
+        in Dijkstra._construct_path_dict. When a node is accepted, its
+        neighbors are updated from every simplex of accepted nodes that
+        contains it.
+        
+        This is a first-order method. For a strongly anisotropic inertia
+        tensor, the characteristic direction can leave the simplices
+        of the stencil, in which case the field is no longer exact for a
+        constant potential, and the error is comparable to Dijkstra's.
+        
+        Stops once every endpoint and its neighbors have been accepted, so
+        that the gradient of the field near the endpoints is well-defined.
+        
+        Returns
+        -------
+        actionField : ndarray
+            The action at every node. Infinite where the node was not reached.
+        endpointIndsList : list
+            The endpoints that were not reached.
+        
+        """
+        t0 = time.time()
+        
+        gridShape = self.potArr.shape
+        nDims = self.nDims
+        
+        coordsFlat = np.stack([c.reshape(-1) for c in self.coordMeshTuple],axis=-1)
+        speedFlat = np.sqrt(2*self.potArr.clip(0)).reshape(-1)
+        if self.isIdentityInertia:
+            inertFlat = None
+        else:
+            inertFlat = self.inertArr.reshape((-1,nDims,nDims))
+        
+        actionFlat = np.full(self.potArr.size,np.inf)
+        isAcceptedFlat = np.zeros(self.potArr.size,dtype=bool)
+        
+        relativeNeighborInds = self.relativeNeighborInds
+        flatStrides = np.array([np.prod(gridShape[i+1:],dtype=int) for i in range(nDims)])
+        relativeNeighborFlatInds = relativeNeighborInds @ flatStrides
+        
+        #The simplices of the neighbor along offset j are in rows
+        #simplexStarts[j]:simplexStarts[j]+simplexCounts[j] of allSimplices. Padded
+        #to nDims vertices by repeating the first one, so that they fit in one array
+        allSimplices = []
+        simplexSizes = []
+        for sList in self.stencilSimplices:
+            for simplices in sList:
+                padding = np.repeat(simplices[:,:1],nDims-simplices.shape[1],axis=1)
+                allSimplices.append(np.hstack((simplices,padding)))
+                simplexSizes.append(np.full(simplices.shape[0],simplices.shape[1]))
+        allSimplices = np.concatenate(allSimplices)
+        simplexSizes = np.concatenate(simplexSizes)
+        simplexCounts = np.array([np.sum([s.shape[0] for s in sList]) for sList in self.stencilSimplices])
+        simplexStarts = np.cumsum(simplexCounts) - simplexCounts
+        
+        #Accepting the neighbors of the endpoints as well
+        unacceptedTargets = set()
+        for endptInds in self.endpointIndices:
+            neighborInds = np.array(endptInds) - relativeNeighborInds
+            isOnGrid = np.all((neighborInds >= 0) & (neighborInds < gridShape),axis=1)
+            unacceptedTargets.update(np.ravel_multi_index(tuple(neighborInds[isOnGrid].T),\
+                                                          gridShape).tolist())
+            unacceptedTargets.add(np.ravel_multi_index(endptInds,gridShape).item())
+        
+        initialFlatInd = np.ravel_multi_index(self.initialInds,gridShape).item()
+        actionFlat[initialFlatInd] = 0
+        heap = [(0.,initialFlatInd)]
+        
+        while heap and unacceptedTargets:
+            currentAction, currentFlatInd = heapq.heappop(heap)
+            if isAcceptedFlat[currentFlatInd]:
+                continue
+            isAcceptedFlat[currentFlatInd] = True
+            unacceptedTargets.discard(currentFlatInd)
+            
+            #Neighbor n is reached along offset j, so that the current node is
+            #at relativeNeighborInds[j] from it
+            currentInds = np.array(np.unravel_index(currentFlatInd,gridShape))
+            neighborInds = currentInds - relativeNeighborInds
+            isAllowed = np.all((neighborInds >= 0) & (neighborInds < gridShape),axis=1)
+            isAllowed[isAllowed] = ~isAcceptedFlat[currentFlatInd - relativeNeighborFlatInds[isAllowed]]
+            isAllowed[isAllowed] = speedFlat[currentFlatInd - relativeNeighborFlatInds[isAllowed]] < np.inf
+            
+            offsetInds = np.nonzero(isAllowed)[0]
+            if offsetInds.size == 0:
+                continue
+            neighborInds = neighborInds[offsetInds]
+            neighborFlatInds = currentFlatInd - relativeNeighborFlatInds[offsetInds]
+            
+            counts = simplexCounts[offsetInds]
+            rowNeighbors = np.repeat(np.arange(offsetInds.size),counts)
+            rows = np.arange(counts.sum()) + np.repeat(simplexStarts[offsetInds] - \
+                                                       (np.cumsum(counts) - counts),counts)
+            vertexOffsets = allSimplices[rows]
+            
+            #All vertices have to be on the grid and accepted
+            vertexInds = neighborInds[rowNeighbors,None] + relativeNeighborInds[vertexOffsets]
+            isUsable = np.all((vertexInds >= 0) & (vertexInds < gridShape),axis=(1,2))
+            vertexFlatInds = neighborFlatInds[rowNeighbors[isUsable],None] + \
+                relativeNeighborFlatInds[vertexOffsets[isUsable]]
+            isUsable[isUsable] = np.all(isAcceptedFlat[vertexFlatInds],axis=1)
+            
+            rows = rows[isUsable]
+            rowNeighbors = rowNeighbors[isUsable]
+            vertexFlatInds = neighborFlatInds[rowNeighbors,None] + \
+                relativeNeighborFlatInds[allSimplices[rows]]
+            updatedFlatInds = neighborFlatInds[rowNeighbors]
+            sizes = simplexSizes[rows]
+            
+            newAction = actionFlat[neighborFlatInds].copy()
+            for size in range(1,nDims+1):
+                isSize = sizes == size
+                if not np.any(isSize):
+                    continue
+                sizeFlatInds = vertexFlatInds[isSize,:size]
+                sizeUpdatedInds = updatedFlatInds[isSize]
+                
+                displacements = coordsFlat[sizeFlatInds] - coordsFlat[sizeUpdatedInds,None]
+                if inertFlat is None:
+                    sizeInert = None
+                else:
+                    sizeInert = inertFlat[sizeUpdatedInds]
+                candidates = self._simplex_action(displacements,actionFlat[sizeFlatInds],\
+                                                  speedFlat[sizeUpdatedInds],sizeInert)
+                np.minimum.at(newAction,rowNeighbors[isSize],candidates)
+            
+            isShorter = newAction < actionFlat[neighborFlatInds]
+            shorterActions = newAction[isShorter]
+            shorterFlatInds = neighborFlatInds[isShorter]
+            actionFlat[shorterFlatInds] = shorterActions
+            for heapEntry in zip(shorterActions.tolist(),shorterFlatInds.tolist()):
+                heapq.heappush(heap,heapEntry)
+        
+        actionFlat[~isAcceptedFlat] = np.inf
+        actionField = actionFlat.reshape(gridShape)
+        
+        endpointIndsList = [e for e in self.endpointIndices if actionField[e] == np.inf]
+        
+        t1 = time.time()
+        runTime = t1 - t0
+        
+        var = (actionField,endpointIndsList,runTime)
+        nms = ("actionField","endpointIndsList","runTime")
+        self.djkLogger.log(var,nms)
+        
+        return actionField, endpointIndsList
+    
+    def _trace_path(self,actionField,endptInds,stepSize):
+        """
+        Follows the characteristic from an endpoint back to the initial point,
+        x' = -M^{-1} grad S / ||M^{-1} grad S||, with midpoint (RK2) steps.
+        The gradient of the action field is computed with upwind differences,
+        and interpolated linearly. Where the field has a ridge (where two
+        paths of the same action meet), a central difference would vanish
+        across it, and the path would run along the ridge; the upwind
+        difference instead picks one side.
+        
+        Parameters
+        ----------
+        actionField : ndarray
+            The output of self._march.
+        endptInds : tuple
+            The indices of the endpoint.
+        stepSize : float
+            The length of every step.
+        
+        Returns
+        -------
+        path : ndarray
+            The path, from the initial point to the endpoint. Of shape
+            (nPoints,nDims).
+        
+        """
+        axisCoords = [self.uniqueCoords[c] for c in self.axisCoordInds]
+        
+        #Unreached nodes are set above every reached node, so that the path
+        #never moves towards them
+        isReached = actionField < np.inf
+        field = np.where(isReached,actionField,2*actionField[isReached].max()+1)
+        
+        grad = []
+        for (axis,c) in enumerate(axisCoords):
+            #Along the first axis, for simplicity
+            axisField = np.moveaxis(field,axis,0)
+            diffs = np.diff(axisField,axis=0)/np.diff(c).reshape((-1,)+(self.nDims-1)*(1,))
+            
+            prevVals = np.full(axisField.shape,np.inf)
+            prevVals[1:] = axisField[:-1]
+            nextVals = np.full(axisField.shape,np.inf)
+            nextVals[:-1] = axisField[1:]
+            backDiffs = np.zeros(axisField.shape)
+            backDiffs[1:] = diffs
+            fwdDiffs = np.zeros(axisField.shape)
+            fwdDiffs[:-1] = diffs
+            
+            #Differences to the neighbor with the smaller action; zero at a minimum
+            axisGrad = np.where(prevVals <= nextVals,backDiffs,fwdDiffs)
+            axisGrad[np.minimum(prevVals,nextVals) >= axisField] = 0
+            grad.append(np.moveaxis(axisGrad,0,axis))
+        grad = np.stack([grad[a] for a in self.axisCoordInds],axis=-1)
+        grad_interp = RegularGridInterpolator(axisCoords,grad)
+        if not self.isIdentityInertia:
+            inert_interp = RegularGridInterpolator(axisCoords,self.inertArr)
+        
+        def direction(point):
+            gridPoint = point[self.axisCoordInds].reshape((1,-1))
+            vec = grad_interp(gridPoint)[0]
+            if not self.isIdentityInertia:
+                vec = np.linalg.solve(inert_interp(gridPoint)[0],vec)
+            vecNorm = np.linalg.norm(vec)
+            if vecNorm == 0:
+                return None
+            return -vec/vecNorm
+        
+        initialPoint = np.array([c[self.initialInds] for c in self.coordMeshTuple])
+        lowerBounds = np.array([c[0] for c in self.uniqueCoords])
+        upperBounds = np.array([c[-1] for c in self.uniqueCoords])
+        maxSteps = 10*int(np.sum(upperBounds - lowerBounds)/stepSize) + 100
+        
+        point = np.array([c[endptInds] for c in self.coordMeshTuple])
+        path = [point]
+        for stepIter in range(maxSteps):
+            if np.linalg.norm(point - initialPoint) <= stepSize:
+                break
+            
+            k1 = direction(point)
+            if k1 is not None:
+                k2 = direction((point + stepSize/2*k1).clip(lowerBounds,upperBounds))
+            if k1 is None or k2 is None:
+                warnings.warn("Gradient of the action field vanishes at "+str(point)+\
+                              "; path from endpoint indices "+str(endptInds)+\
+                              " stopped early")
+                break
+            
+            point = (point + stepSize*k2).clip(lowerBounds,upperBounds)
+            path.append(point)
+        else:
+            warnings.warn("Path from endpoint indices "+str(endptInds)+\
+                          " did not reach the initial point in "+str(maxSteps)+" steps")
+        
+        path.append(initialPoint)
+        path.reverse()
+        
+        return np.array(path)
+    
+    def __call__(self,returnAll=False,nImages=None,stepSize=None):
+        """
+        Computes the action field, and back-traces a path to every endpoint
+        that was reached.
+        
+        Parameters
+        ----------
+        returnAll : bool, optional
+            Whether to return the paths to all endpoints, or only to the one
+            with the least action. The default is False.
+        nImages : int, optional
+            If given, the paths are resampled to nImages points, equally spaced
+            in arc length. The default is None, in which case every step is
+            kept.
+        stepSize : float, optional
+            The step size of the back-tracing. The default is None, in which
+            case half of the smallest grid spacing is used.
+        
+        Returns
+        -------
+        pathArrDict : dict
+            The paths, with the endpoints as keys. If returnAll is False, only
+            the path to the endpoint with the least action.
+        actionDict : dict
+            The action at the endpoints, read off of the action field. If
+            returnAll is False, only the action at the endpoint with the
+            least action.
+        
+        """
+        actionField, endpointIndsList = self._march()
+        
+        if endpointIndsList:
+            warnings.warn("Endpoint indices\n"+str(endpointIndsList)+\
+                          "\nnot visited")
+        
+        if stepSize is None:
+            stepSize = 0.5*min([np.diff(c).min() for c in self.uniqueCoords])
+        
+        pathArrDict = {}
+        actionDict = {}
+        for finalInds in self.endpointIndices:
+            if finalInds in endpointIndsList:
+                continue
+            finalPt = tuple([c[finalInds] for c in self.coordMeshTuple])
+            
+            path = self._trace_path(actionField,finalInds,stepSize)
+            if nImages is not None:
+                arcLength = np.append(0,np.cumsum(np.linalg.norm(np.diff(path,axis=0),axis=1)))
+                sampleLength = np.linspace(0,arcLength[-1],nImages)
+                path = np.stack([np.interp(sampleLength,arcLength,p) for p in path.T],axis=-1)
+            
+            pathArrDict[finalPt] = path
+            actionDict[finalPt] = actionField[finalInds]
+        
+        var = (pathArrDict,)
+        nms = ("pathArrDict",)
+        self.djkLogger.log(var,nms)
+        
+        if returnAll:
+            return pathArrDict, actionDict
+        else:
+            endptOut = self.minimum_endpoint(actionDict)
+            return pathArrDict[endptOut], actionDict[endptOut]
+
 class DynamicProgramming:
     def __init__(self,initialPoint,coordMeshTuple,potArr,inertArr=None,allowedMask=None,\
                  target_func=TargetFunctions.action,allowedEndpoints=None,\
-                 trimVals=[10**(-4),None],logLevel=1,fName=None,logFreq=50):
+                 trimVals=[10**(-4),None],logLevel=1,fName=None,logFreq=50,\
+                 chunkSize=2**22,loggerSettings={}):
         self.initialPoint = initialPoint
         self.coordMeshTuple = coordMeshTuple
         self.uniqueCoords = [np.unique(c) for c in self.coordMeshTuple]
@@ -1680,8 +3504,10 @@ class DynamicProgramming:
                                  "; required shape is "+inertArrRequiredShape)
             self.inertArr = inertArr
         else:
-            #Simplifies things if I set this to the identity here
-            self.inertArr = np.full(self.potArr.shape+2*(self.nDims,),np.identity(self.nDims))
+            #Simplifies things if I set this to the identity here. A read-only
+            #view, as in Dijkstra
+            self.inertArr = np.broadcast_to(np.identity(self.nDims),\
+                                            self.potArr.shape+2*(self.nDims,))
         
         if allowedEndpoints is None:
             self.allowedEndpoints, self.endpointIndices \
@@ -1726,15 +3552,18 @@ class DynamicProgramming:
         
         self.uniqueSliceInds = [np.arange(self.potArr.shape[0]),[]]
         for s in self.potArr.shape[2:]:
-            self.uniqueSliceInds.append([np.arange(s)])
+            self.uniqueSliceInds.append(np.arange(s))
         
         #Index swapping like mentioned above. Now, self.initialInds[0] <= Ny,
         #and self.initialInds[1] <= Nx
         self.initialInds[[1,0]] = self.initialInds[[0,1]]
         self.initialInds = tuple(self.initialInds)
         
-        self.logger = DPMLogger(self,logLevel=logLevel,fName=fName)
+        self.logger = DPMLogger(self,logLevel=logLevel,fName=fName,\
+                                loggerSettings=loggerSettings)
         self.logFreq = logFreq
+        #Maximum number of (previous, current) pairs evaluated at once
+        self.chunkSize = chunkSize
     
     def _gen_slice_inds(self,constInd):
         sliceCopy = self.uniqueSliceInds.copy()
@@ -1742,8 +3571,39 @@ class DynamicProgramming:
         
         return list(itertools.product(*sliceCopy))
     
-    def _select_prior_points(self,currentIdx,previousIndsArr,distArr):
-        previousInds = self._gen_slice_inds(currentIdx-1)
+    def _select_prior_points(self,currentIdx,previousIndsArr,distArr,searchRange=None):
+        """
+        Finds the best point in the previous slice for every point in the current
+        slice. Points with infinite energy, or that are not in self.allowedMask,
+        are neither updated nor used as previous points.
+        
+        Without a searchRange, all (previous, current) pairs are evaluated as one
+        array, in chunks of at most self.chunkSize pairs. With a searchRange,
+        only previous points within the window around each current point are
+        considered; see DynamicProgramming._window_weights.
+        
+        Ties are broken by the first previous point, in the order of 
+        self._gen_slice_inds, either way.
+
+        Parameters
+        ----------
+        currentIdx : int
+            The index of the current slice, along axis 1 of self.potArr.
+        previousIndsArr : ndarray of ints
+            Of shape self.potArr.shape+(self.nDims,). Updated in-place.
+        distArr : ndarray
+            Of shape self.potArr.shape. Updated in-place.
+        searchRange : int or list of ints, optional
+            The radius of the window, in grid points, along each coordinate
+            other than the first. The default is None, in which case every
+            point in the previous slice is considered.
+
+        Returns
+        -------
+        previousIndsArr : ndarray of ints
+        distArr : ndarray
+
+        """
         #Use scipy.ndimage.label to only select previous indices that are connected
         #to the current one. Imperfect - on vertical OTL, will choose from far
         #away points - but unclear if/when that happens. More sophisticated
@@ -1753,40 +3613,211 @@ class DynamicProgramming:
         #around at the end, but they will no longer pass over the region outside
         #the OTL, except for a bit near the OTL. "Connected" in this case means
         #the mask saying which indices are allowed is connected in these two slices.
-        currentInds = self._gen_slice_inds(currentIdx)
-        
-        for idx in currentInds:
-            coords = np.zeros((2,self.nDims))
-            coords[1] = [c[idx] for c in self.coordMeshTuple]
+        previousSlice = (slice(None),currentIdx-1)
+        currentSlice = (slice(None),currentIdx)
+        sliceShape = self.potArr[currentSlice].shape
+        
+        #Flattened in C order, which matches the order of self._gen_slice_inds
+        previousEnegs = self.potArr[previousSlice].reshape(-1)
+        currentEnegs = self.potArr[currentSlice].reshape(-1)
+        
+        isPreviousAllowed = self.allowedMask[previousSlice].reshape(-1) & \
+            (previousEnegs != np.inf)
+        isCurrentAllowed = self.allowedMask[currentSlice].reshape(-1) & \
+            (currentEnegs != np.inf)
+        previousDist = np.where(isPreviousAllowed,distArr[previousSlice].reshape(-1),np.inf)
+        currentDist = distArr[currentSlice].reshape(-1)
+        currentPrevious = previousIndsArr[currentSlice].reshape((-1,self.nDims))
+        
+        nPrevious = previousEnegs.shape[0]
+        nCurrent = currentEnegs.shape[0]
+        
+        if searchRange is None:
+            previousCoords = np.stack([c[previousSlice].reshape(-1) for c in \
+                                       self.coordMeshTuple],axis=-1)
+            currentCoords = np.stack([c[currentSlice].reshape(-1) for c in \
+                                      self.coordMeshTuple],axis=-1)
+            previousMasses = self.inertArr[previousSlice].reshape((-1,)+2*(self.nDims,))
+            currentMasses = self.inertArr[currentSlice].reshape((-1,)+2*(self.nDims,))
+            terms_func = TargetFunctions.get_terms_func(self.target_func)
+            chunkLen = max(self.chunkSize//nPrevious,1)
+        else:
+            windowOffsets = self._window_offsets(searchRange)
+            weights = self._window_weights(currentIdx,windowOffsets).reshape((nCurrent,-1))
+            #Flattened index of every previous point in the window, or -1 if
+            #it is off the grid
+            windowInds = np.indices(sliceShape).reshape((len(sliceShape),-1)).T[:,None,:] + \
+                windowOffsets
+            isInWindow = np.all((windowInds >= 0) & (windowInds < sliceShape),axis=-1)
+            windowFlatInds = np.where(isInWindow,\
+                                      np.ravel_multi_index(tuple(np.moveaxis(windowInds,-1,0)),\
+                                                           sliceShape,mode="clip"),-1)
+            chunkLen = max(self.chunkSize//windowOffsets.shape[0],1)
+        
+        for chunkStart in range(0,nCurrent,chunkLen):
+            chunk = slice(chunkStart,min(chunkStart+chunkLen,nCurrent))
+            chunkArange = np.arange(chunk.stop-chunk.start)
             
-            enegs = np.zeros((2,))
-            enegs[1] = self.potArr[idx]
-            if enegs[1] == np.inf:
-                continue
+            if searchRange is None:
+                chunkShape = (nPrevious,chunk.stop-chunk.start)
+                #Of shape (nPrevious,chunkLen); the path goes from the previous point
+                #to the current one
+                if terms_func is not None:
+                    coordDiffs = currentCoords[None,chunk] - previousCoords[:,None]
+                    weights = terms_func(coordDiffs,\
+                                         np.broadcast_to(currentEnegs[chunk],chunkShape),\
+                                         np.broadcast_to(currentMasses[chunk],\
+                                                         chunkShape+2*(self.nDims,)))
+                else:
+                    weights = self._pairwise_weights(previousCoords,currentCoords[chunk],\
+                                                     previousEnegs,currentEnegs[chunk],\
+                                                     previousMasses,currentMasses[chunk])
+                
+                tentDist = previousDist[:,None] + weights
+                tentDist[np.isnan(tentDist)] = np.inf
+                
+                #np.argmin returns the first of any tied minima
+                bestPrevious = np.argmin(tentDist,axis=0)
+                bestDist = tentDist[bestPrevious,chunkArange]
+            else:
+                #Of shape (chunkLen,nWindow). The window offsets are sorted, so
+                #the previous points are in the same order as above
+                tentDist = np.where(windowFlatInds[chunk] >= 0,\
+                                    previousDist[windowFlatInds[chunk]] + weights[chunk],\
+                                    np.inf)
+                tentDist[np.isnan(tentDist)] = np.inf
+                
+                bestWindowInds = np.argmin(tentDist,axis=1)
+                bestPrevious = windowFlatInds[chunk][chunkArange,bestWindowInds]
+                bestDist = tentDist[chunkArange,bestWindowInds]
             
-            masses = np.zeros((2,self.nDims,self.nDims))
-            masses[1] = self.inertArr[idx]
+            #distArr is initialized to infinity
+            isUpdated = isCurrentAllowed[chunk] & (bestDist < currentDist[chunk])
+            currentDist[chunk][isUpdated] = bestDist[isUpdated]
             
-            for p in previousInds:
-                coords[0] = [c[p] for c in self.coordMeshTuple]
-                enegs[0] = self.potArr[p]
+            bestPreviousInds = np.array(np.unravel_index(bestPrevious[isUpdated],sliceShape))
+            bestPreviousInds = np.insert(bestPreviousInds,1,currentIdx-1,axis=0).T
+            currentPrevious[chunk][isUpdated] = bestPreviousInds
+        
+        distArr[currentSlice] = currentDist.reshape(sliceShape)
+        previousIndsArr[currentSlice] = currentPrevious.reshape(sliceShape+(self.nDims,))
+        
+        return previousIndsArr, distArr
+    
+    def _window_offsets(self,searchRange):
+        """
+        The offsets, in the indices of a slice, of every point in the window
+        around a point. Sorted in lexicographic order.
+        
+        Parameters
+        ----------
+        searchRange : int or list of ints
+            The radius along each coordinate other than the first.
+        
+        Returns
+        -------
+        windowOffsets : ndarray of ints
+            Of shape (nWindow,self.nDims-1).
+        
+        """
+        searchRange = np.array(searchRange,dtype=int).reshape(-1)
+        if searchRange.shape == (1,):
+            searchRange = np.full(self.nDims-1,searchRange[0])
+        if searchRange.shape != (self.nDims-1,):
+            raise ValueError("searchRange.shape is "+str(searchRange.shape)+\
+                             "; required shape is "+str((self.nDims-1,)))
+        if np.any(searchRange < 0):
+            raise ValueError("searchRange "+str(searchRange)+" must be nonnegative")
+        
+        #The slice axes are ordered as the coordinates; see self.__init__. Offsets
+        #past the edge of the slice never point to a grid point
+        sliceShape = self.potArr[:,0].shape
+        searchRange = np.minimum(searchRange,np.array(sliceShape)-1)
+        
+        return np.array(list(itertools.product(*[np.arange(-r,r+1) for r in searchRange])),\
+                        dtype=int).reshape((-1,self.nDims-1))
+    
+    def _window_weights(self,currentIdx,windowOffsets):
+        """
+        The weight of the path from every point in the window in the previous
+        slice to every point in the current slice, computed one offset at a 
+        time by SurfaceUtils.grid_edge_weights.
+        
+        Returns
+        -------
+        weights : ndarray
+            Of shape self.potArr[:,currentIdx].shape + (nWindow,). np.inf where
+            the previous point is off the grid.
+        
+        """
+        twoSlices = (slice(None),slice(currentIdx-1,currentIdx+1))
+        #The previous point is at idx - offset, with the current point at idx
+        relativeNeighborInds = np.insert(-windowOffsets,1,1,axis=1)
+        
+        weights = SurfaceUtils.grid_edge_weights(tuple(c[twoSlices] for c in self.coordMeshTuple),\
+                                                 self.potArr[twoSlices],relativeNeighborInds,\
+                                                 self.inertArr[twoSlices],self.target_func,\
+                                                 incoming=True)
+        return weights[:,1]
+    
+    def _pairwise_weights(self,previousCoords,currentCoords,previousEnegs,\
+                          currentEnegs,previousMasses,currentMasses):
+        """
+        Calls self.target_func once for every (previous, current) pair, for
+        target functions that cannot be evaluated on arrays of pairs.
+        
+        Returns
+        -------
+        weights : ndarray
+            Of shape (previousCoords.shape[0],currentCoords.shape[0]).
+
+        """
+        coords = np.zeros((2,self.nDims))
+        enegs = np.zeros((2,))
+        masses = np.zeros((2,self.nDims,self.nDims))
+        
+        weights = np.full((previousCoords.shape[0],currentCoords.shape[0]),np.inf)
+        for curIter in range(currentCoords.shape[0]):
+            coords[1] = currentCoords[curIter]
+            enegs[1] = currentEnegs[curIter]
+            masses[1] = currentMasses[curIter]
+            if enegs[1] == np.inf:
+                continue
+            for prevIter in range(previousCoords.shape[0]):
+                coords[0] = previousCoords[prevIter]
+                enegs[0] = previousEnegs[prevIter]
                 if enegs[0] == np.inf:
                     continue
-                masses[0] = self.inertArr[p]
+                masses[0] = previousMasses[prevIter]
                 
-                tentDist = distArr[p] + self.target_func(coords,enegs,masses)[0]
-                if tentDist < distArr[idx]: #distArr is initialized to infinity
-                    previousIndsArr[idx] = p
-                    distArr[idx] = tentDist
+                weights[prevIter,curIter] = self.target_func(coords,enegs,masses)[0]
         
-        return previousIndsArr, distArr
+        return weights
     
     def __call__(self,searchRange=None,pathAsText=True):
-        # if searchRange is None:
-        #     uniqueSliceInds = [np.arange(self.potArr.shape[0]),[]]
-        #     for s in self.potArr.shape[2:]:
-        #         uniqueSliceInds.append([np.arange(s)])
-        # elif 
+        """
+        Runs the dynamic programming method, marching along the first coordinate.
+        
+        Parameters
+        ----------
+        searchRange : int or list of ints, optional
+            Limits the previous points of a point to a window of this radius,
+            in grid points, along each coordinate other than the first. The 
+            default is None, in which case every point in the previous slice is
+            considered.
+        pathAsText : bool, optional
+            Passed to the logger. The default is True.
+        
+        Returns
+        -------
+        minIndsDict : dict
+        minPathDict : dict
+        distsDict : dict
+        
+        """
+        if searchRange is not None:
+            #Checks the shape before starting
+            self._window_offsets(searchRange)
         
         t0 = time.time()
         
@@ -1803,7 +3834,7 @@ class DynamicProgramming:
         
         for q2Idx in range(self.initialInds[1]+1,finalIdx+1):
             previousIndsArr, distArr = \
-                self._select_prior_points(q2Idx,previousIndsArr,distArr)
+                self._select_prior_points(q2Idx,previousIndsArr,distArr,searchRange)
             if q2Idx % self.logFreq == 0:
                 updateRange = (q2Idx-self.logFreq,q2Idx)
                 self.logger.log(previousIndsArr,distArr,updateRange)
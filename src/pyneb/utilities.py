@@ -4,27 +4,135 @@ import numpy as np
 #import numdifftools as nd
 import numdifftools as nd
 import sys
+import os
+import h5py
 import matplotlib.pyplot as plt
 import itertools
 
 from scipy.interpolate import interpnd, RectBivariateSpline, splprep, splev
 from scipy.ndimage import filters, morphology #For minimum finding
 from pathos.multiprocessing import ProcessingPool as Pool
+from pathos.pools import ThreadPool
 import warnings
 
 global fdTol
 fdTol = 10**(-8)
 
+def _mass_dist(coordDiffs,massArr=None,massIsDiagonal=False):
+    """
+    Computes dist = M_{ab} dx^a dx^b for stacks of displacements. The products
+    are taken in the same order as np.dot(dx,np.dot(M,dx)), so that the two 
+    agree to the last bit for small nDims. If massIsDiagonal, massArr is the
+    diagonal of M, of shape (...,nDims); otherwise it is the full tensor, of
+    shape (...,nDims,nDims).
+    """
+    if massArr is None:
+        return np.sum(coordDiffs**2,axis=-1)
+    if massIsDiagonal:
+        return np.sum(massArr*coordDiffs**2,axis=-1)
+    return np.einsum("...a,...a->...",coordDiffs,\
+                     np.einsum("...ab,...b->...a",massArr,coordDiffs))
+
+def _eval_on_path(path,potential,masses=None):
+    """
+    Evaluates the potential and the inertia tensor on a path of shape 
+    (nPoints,nDims), or on a stack of paths of shape (...,nPoints,nDims). 
+    Functions are called once, on the points of all paths.
+    
+    Returns potArr, of shape path.shape[:-1], massArr, which is None for
+    the identity, of shape path.shape for a diagonal inertia tensor, and of 
+    shape path.shape + (nDims,) otherwise, and massIsDiagonal.
+    """
+    if path.ndim < 2:
+        raise ValueError("Dimension of path is "+str(path.shape)+\
+                         "; required shape is (...,nPoints,nDims). See action function.")
+    nDims = path.shape[-1]
+    flatPath = path.reshape((-1,nDims))
+    
+    if masses is None:
+        massArr = None
+    else:
+        if not isinstance(masses,np.ndarray):
+            massArr = masses(flatPath)
+            if (path.ndim > 2) and (massArr.shape[:1] == flatPath.shape[:1]):
+                massArr = massArr.reshape(path.shape[:-1]+massArr.shape[1:])
+        else:
+            massArr = masses
+            
+        massDim = path.shape + (nDims,)
+        if massArr.shape not in (massDim,path.shape):
+            raise ValueError("Dimension of massArr is "+str(massArr.shape)+\
+                             "; required shape is "+str(massDim)+", or "+\
+                             str(path.shape)+" for a diagonal inertia tensor."+\
+                             " See action function.")
+    
+    if not isinstance(potential,np.ndarray):
+        potArr = potential(flatPath)
+        if (path.ndim > 2) and (potArr.shape == flatPath.shape[:1]):
+            potArr = potArr.reshape(path.shape[:-1])
+    else:
+        potArr = potential
+    
+    potShape = path.shape[:-1]
+    if potArr.shape != potShape:
+        raise ValueError("Dimension of potArr is "+str(potArr.shape)+\
+                         "; required shape is "+str(potShape)+". See action function.")
+    
+    #The full tensor has one more axis than path, so the two cannot be confused
+    massIsDiagonal = (massArr is not None) and (massArr.shape == path.shape)
+    
+    return potArr, massArr, massIsDiagonal
+
+def _full_mass(path,massArr,massIsDiagonal=False):
+    """
+    The inertia tensor on path in the form returned by TargetFunctions.action,
+    of shape path.shape + (nDims,). The identity is a read-only view, and 
+    does not allocate.
+    """
+    nDims = path.shape[-1]
+    if massArr is None:
+        return np.broadcast_to(np.identity(nDims),path.shape+(nDims,))
+    if massIsDiagonal:
+        return massArr[...,None]*np.identity(nDims)
+    return massArr
+
+def _dist_and_grads(coordDiffs,massArr=None):
+    """
+    Computes dist = M_{ab} dx^a dx^b, and its derivatives with respect to dx and M.
+    If massArr is None, the identity is used, and the derivative with respect
+    to M is None. Otherwise, massArr is the full tensor, of shape (...,nDims,nDims).
+    """
+    dist = _mass_dist(coordDiffs,massArr)
+    if massArr is None:
+        gradOfDist = 2*coordDiffs
+        gradOfDistWrtMass = None
+    else:
+        gradOfDist = np.einsum("...ab,...b->...a",massArr+np.swapaxes(massArr,-1,-2),\
+                               coordDiffs)
+        gradOfDistWrtMass = coordDiffs[...,:,None]*coordDiffs[...,None,:]
+    return dist, gradOfDist, gradOfDistWrtMass
+
+def _has_analytic_grad(func):
+    """
+    Whether func follows the analytic gradient protocol: it has a method grad,
+    called as func.grad(points) on points of shape (nPoints,nDims). For a 
+    scalar function, func.grad returns shape (nPoints,nDims); for the inertia
+    tensor, it returns shape (nPoints,nDims,nDims,nDims), with the derivative
+    along the last axis. Plain functions can opt in by setting the attribute,
+    e.g. potential.grad = potential_gradient.
+    """
+    return callable(getattr(func,"grad",None))
+
 class TargetFunctions:
     #No need to do any compatibility checking with gradients here.
     @staticmethod
     def action(path,potential,masses=None):
         """
         
-        TODO: docs
         Allowed masses:
             -Constant mass; set masses = None
-            -Array of values; set masses to a numpy array of shape (nPoints, nDims, nDims)
+            -Array of values; set masses to a numpy array of shape (nPoints, nDims, nDims),
+             or (nPoints, nDims) for a diagonal inertia tensor
             -A function; set masses to a function
         Allowed potential:
             -Array of values; set potential to a numpy array of shape (nPoints,)
@@ -33,49 +141,31 @@ class TargetFunctions:
         Computes action as
             $ S = sum_{i=1}^{nPoints} sqrt{2 E(x_i) M_{ab}(x_i) (x_i-x_{i-1})^a(x_i-x_{i-1})^b} $
             
-        :Maintainer: Daniel
-        """
-        nPoints, nDims = path.shape
+        A stack of paths, of shape (nPaths,nPoints,nDims), may be passed instead.
+        Then, arrays have a leading axis of length nPaths, functions are called 
+        once on all points (of shape (nPaths*nPoints,nDims)), and one action per
+        path is returned.
         
-        if masses is None:
-            massArr = np.full((nPoints,nDims,nDims),np.identity(nDims))
-        elif not isinstance(masses,np.ndarray):
-            massArr = masses(path)
-        else:
-            massArr = masses
+        If masses is None, the returned massArr is a read-only view of the
+        identity. A diagonal inertia tensor is returned as a full tensor.
             
-        massDim = (nPoints, nDims, nDims)
-        if massArr.shape != massDim:
-            raise ValueError("Dimension of massArr is "+str(massArr.shape)+\
-                             "; required shape is "+str(massDim)+". See action function.")
-        
-        if not isinstance(potential,np.ndarray):
-            potArr = potential(path)
-        else:
-            potArr = potential
-        
-        potShape = (nPoints,)
-        if potArr.shape != potShape:
-            raise ValueError("Dimension of potArr is "+str(potArr.shape)+\
-                             "; required shape is "+str(potShape)+". See action function.")
+        :Maintainer: Daniel
+        """
+        potArr, massArr, massIsDiagonal = _eval_on_path(path,potential,masses)
         
         #TODO: check if we actually want this. Maybe with a warning?
         potArr = potArr.clip(0)
-            
-        #Actual calculation
-        actOut = 0
-        for ptIter in range(1,nPoints):
-            coordDiff = path[ptIter] - path[ptIter - 1]
-            dist = np.dot(coordDiff,np.dot(massArr[ptIter],coordDiff)) #The M_{ab} dx^a dx^b bit
-            if dist<0:
-                dist = 0
-            #     print(dist)
-            #     print(path)
-            #     print(potArr)
-            #     print(massArr)
-            actOut += np.sqrt(2*potArr[ptIter]*dist)
         
-        return actOut, potArr, massArr
+        #Actual calculation. Slices out the first point of every path
+        tail = (path.ndim-2)*(slice(None),) + (slice(1,None),)
+        terms = TargetFunctions.action_terms(np.diff(path,axis=-2),potArr[tail],\
+                                             None if massArr is None else massArr[tail],\
+                                             massIsDiagonal=massIsDiagonal)
+        #Summed in order, as a Python loop would, so that finite-difference
+        #gradients match the unvectorized sum to the last bit
+        actOut = np.cumsum(terms,axis=-1)[...,-1]
+        
+        return actOut, potArr, _full_mass(path,massArr,massIsDiagonal)
     
     @staticmethod
     def term_in_action_sum(points,potential,masses=None):
@@ -146,6 +236,8 @@ class TargetFunctions:
         ----------
         path : ndarray
             np.ndarray of shape (Nimgs,nDim) containing postions of all images.
+            May also be a stack of paths, of shape (nPaths,Nimgs,nDim); see
+            TargetFunctions.action.
         potential : object or ndarray
             Allowed potential:
             -Array of values; set potential to a numpy array of shape (nPoints,)
@@ -153,7 +245,8 @@ class TargetFunctions:
         masses : object or ndarray, Optional
             Allowed masses:
             -Constant mass; set masses = None
-            -Array of values; set masses to a numpy array of shape (nPoints, nDims, nDims)
+            -Array of values; set masses to a numpy array of shape (nPoints, nDims, nDims),
+             or (nPoints, nDims) for a diagonal inertia tensor
             -A function; set masses to a function
 
         Raises
@@ -164,7 +257,7 @@ class TargetFunctions:
         Returns
         -------
         actOut : float
-            
+            One per path, for a stack of paths.
         potArr : ndarray
             ndarray of shape (Nimgs,1) containing the PES values for each image in path
         massArr : ndarray
@@ -176,37 +269,18 @@ class TargetFunctions:
         Computes action as
             $ S = sum_{i=1}^{nPoints} E(x_i) M_{ab}(x_i) (x_i-x_{i-1})^a(x_i-x_{i-1})^b $
         """
-        nPoints, nDims = path.shape
-        
-        if masses is None:
-            massArr = np.full((nPoints,nDims,nDims),np.identity(nDims))
-        elif not isinstance(masses,np.ndarray):
-            massArr = masses(path)
-        else:
-            massArr = masses
-            
-        massDim = (nPoints, nDims, nDims)
-        if massArr.shape != massDim:
-            raise ValueError("Dimension of massArr is "+str(massArr.shape)+\
-                             "; required shape is "+str(massDim)+". See action function.")
-        
-        if not isinstance(potential,np.ndarray):
-            potArr = potential(path)
-        else:
-            potArr = potential
-        
-        potShape = (nPoints,)
-        if potArr.shape != potShape:
-            raise ValueError("Dimension of potArr is "+str(potArr.shape)+\
-                             "; required shape is "+str(potShape)+". See action function.")
+        potArr, massArr, massIsDiagonal = _eval_on_path(path,potential,masses)
             
-        #Actual calculation
-        actOut = 0
-        for ptIter in range(1,nPoints):
-            coordDiff = path[ptIter] - path[ptIter - 1]
-            dist = np.dot(coordDiff,np.dot(massArr[ptIter],coordDiff)) #The M_{ab} dx^a dx^b bit
-            actOut += potArr[ptIter]*dist
-        return actOut, potArr, massArr
+        #Actual calculation. Slices out the first point of every path
+        tail = (path.ndim-2)*(slice(None),) + (slice(1,None),)
+        terms = TargetFunctions.action_squared_terms(np.diff(path,axis=-2),potArr[tail],\
+                                                     None if massArr is None else massArr[tail],\
+                                                     massIsDiagonal=massIsDiagonal)
+        #Summed in order, as a Python loop would, so that finite-difference
+        #gradients match the unvectorized sum to the last bit
+        actOut = np.cumsum(terms,axis=-1)[...,-1]
+        
+        return actOut, potArr, _full_mass(path,massArr,massIsDiagonal)
     
     @staticmethod
     def term_in_action_squared_sum(points,potential,masses=None):
@@ -269,6 +343,142 @@ class TargetFunctions:
         
         return actOut, potArr, massArr
     
+    @staticmethod
+    def action_terms(coordDiffs,potArr,massArr=None,massIsDiagonal=False):
+        """
+        The individual terms of the sum in TargetFunctions.action, evaluated
+        for arbitrarily-shaped stacks of displacements.
+
+        Computes
+            $ sqrt{2 E M_{ab} dx^a dx^b} $
+
+        Parameters
+        ----------
+        coordDiffs : ndarray
+            Displacements dx. Of shape complexShape + (nDims,).
+        potArr : ndarray
+            The potential at the end of each displacement. Of shape complexShape.
+        massArr : ndarray, optional
+            The inertia tensor at the end of each displacement. Of shape
+            complexShape + (nDims,nDims), or complexShape + (nDims,) if 
+            massIsDiagonal. If None, the identity is used. The default is None.
+        massIsDiagonal : bool, optional
+            Whether massArr holds only the diagonal of the inertia tensor. The
+            default is False.
+
+        Returns
+        -------
+        terms : ndarray
+            Of shape complexShape.
+
+        :Maintainer: Daniel
+        """
+        dist = _mass_dist(coordDiffs,massArr,massIsDiagonal)
+
+        return np.sqrt(2*potArr.clip(0)*dist.clip(0))
+
+    @staticmethod
+    def action_squared_terms(coordDiffs,potArr,massArr=None,massIsDiagonal=False):
+        """
+        The individual terms of the sum in TargetFunctions.action_squared. See
+        TargetFunctions.action_terms for the calling signature.
+
+        Computes
+            $ E M_{ab} dx^a dx^b $
+
+        :Maintainer: Daniel
+        """
+        dist = _mass_dist(coordDiffs,massArr,massIsDiagonal)
+
+        return potArr*dist
+
+    @staticmethod
+    def get_terms_func(target_func):
+        """
+        Returns the function computing the individual terms of a sum-like 
+        target_func, such as TargetFunctions.action_terms for TargetFunctions.action.
+
+        Parameters
+        ----------
+        target_func : function
+
+        Returns
+        -------
+        function or None
+            None if the terms of target_func are not known.
+
+        :Maintainer: Daniel
+        """
+        if target_func is TargetFunctions.action:
+            return TargetFunctions.action_terms
+        elif target_func is TargetFunctions.action_squared:
+            return TargetFunctions.action_squared_terms
+        return None
+
+    @staticmethod
+    def action_terms_grad(coordDiffs,potArr,massArr=None):
+        """
+        Partial derivatives of TargetFunctions.action_terms, with respect to
+        each of its arguments.
+
+        Parameters
+        ----------
+        coordDiffs : ndarray
+            Displacements dx. Of shape complexShape + (nDims,).
+        potArr : ndarray
+            The potential at the end of each displacement. Of shape complexShape.
+        massArr : ndarray, optional
+            The full inertia tensor, of shape complexShape + (nDims,nDims), as
+            in TargetFunctions.action_terms. The default is None.
+
+        Returns
+        -------
+        gradOfCoordDiffs : ndarray
+            Of shape complexShape + (nDims,).
+        gradOfPot : ndarray
+            Of shape complexShape. Zero where the potential is clipped.
+        gradOfMass : ndarray or None
+            Of shape complexShape + (nDims,nDims). None if massArr is None.
+
+        :Maintainer: Daniel
+        """
+        dist, gradOfDist, gradOfDistWrtMass = _dist_and_grads(coordDiffs,massArr)
+        clippedPot = potArr.clip(0)
+        terms = np.sqrt(2*clippedPot*dist.clip(0))
+
+        #The square root is not differentiable where the term vanishes
+        isNonzero = terms > 0
+        safeTerms = np.where(isNonzero,terms,1.)
+        gradWrtDist = np.where(isNonzero,clippedPot/safeTerms,0.)
+        gradOfPot = np.where(isNonzero & (potArr > 0),dist/safeTerms,0.)
+
+        gradOfCoordDiffs = gradWrtDist[...,None]*gradOfDist
+        if gradOfDistWrtMass is None:
+            gradOfMass = None
+        else:
+            gradOfMass = gradWrtDist[...,None,None]*gradOfDistWrtMass
+
+        return gradOfCoordDiffs, gradOfPot, gradOfMass
+
+    @staticmethod
+    def action_squared_terms_grad(coordDiffs,potArr,massArr=None):
+        """
+        Partial derivatives of TargetFunctions.action_squared_terms. See
+        TargetFunctions.action_terms_grad for the calling signature.
+
+        :Maintainer: Daniel
+        """
+        dist, gradOfDist, gradOfDistWrtMass = _dist_and_grads(coordDiffs,massArr)
+
+        gradOfCoordDiffs = potArr[...,None]*gradOfDist
+        gradOfPot = dist
+        if gradOfDistWrtMass is None:
+            gradOfMass = None
+        else:
+            gradOfMass = potArr[...,None,None]*gradOfDistWrtMass
+
+        return gradOfCoordDiffs, gradOfPot, gradOfMass
+
     @staticmethod
     def mep_default(points,potential,auxFunc=None):
         '''
@@ -314,12 +524,499 @@ class TargetFunctions:
         else:
             auxEnergies = auxFunc(points)
         
-        energies  = potential(points)    
+        energies = potArr
         
         return energies, auxEnergies
 
+class GradientExecutor:
+    """
+    A long-lived pool of workers, for gradients that are split over chunks of
+    images (see GradientApproximations().discrete_sqr_action_grad_mp). The
+    workers are started on the first call to map_chunks, and are reused until
+    shutdown is called, so that they are not started at every force evaluation.
+    A solver that uses the executor shuts it down when its run ends (see
+    LeastActionPath.shutdown_workers).
+    
+    :Maintainer: Daniel
+    """
+    def __init__(self,kind="process",nWorkers=None,chunkSize=None):
+        """
+        Parameters
+        ----------
+        kind : str, optional
+            Either "process" or "thread". Threads avoid pickling the function
+            and its arguments, but only run in parallel when the function
+            releases the GIL (as numpy mostly does). The default is "process".
+        nWorkers : int, optional
+            The number of workers. The default is None, in which case
+            os.cpu_count() is used.
+        chunkSize : int, optional
+            The number of images in every task. The default is None, in which
+            case the images are split evenly over the workers.
+        
+        Raises
+        ------
+        ValueError
+            If kind is not allowed.
+        
+        Returns
+        -------
+        None.
+        
+        """
+        allowedKinds = {"process":Pool,"thread":ThreadPool}
+        if kind not in allowedKinds:
+            raise ValueError("kind "+str(kind)+" not allowed; allowed values are "+\
+                             str(list(allowedKinds.keys())))
+        self.kind = kind
+        self.pool_class = allowedKinds[kind]
+        
+        if nWorkers is None:
+            nWorkers = os.cpu_count()
+        self.nWorkers = nWorkers
+        self.chunkSize = chunkSize
+        
+        self.pool = None
+    
+    def __getstate__(self):
+        #The pool can't be pickled, and isn't needed in a worker
+        state = self.__dict__.copy()
+        state["pool"] = None
+        return state
+    
+    def map_chunks(self,func,arrays,constArgs=()):
+        """
+        Calls func(*constArgs,*chunks) on the workers, where chunks are
+        consecutive slices along the first axis of every array in arrays, and
+        concatenates the outputs along the first axis.
+        
+        Parameters
+        ----------
+        func : function
+        arrays : list of ndarrays
+            All with the same length along the first axis.
+        constArgs : tuple, optional
+            Arguments passed unchanged to every call. The default is ().
+        
+        Returns
+        -------
+        ndarray
+        
+        """
+        nItems = arrays[0].shape[0]
+        if self.chunkSize is None:
+            chunkSize = -(-nItems//self.nWorkers)
+        else:
+            chunkSize = self.chunkSize
+        chunkStarts = range(0,nItems,chunkSize)
+        
+        argLists = [len(chunkStarts)*[arg] for arg in constArgs] + \
+            [[arr[start:start+chunkSize] for start in chunkStarts] for arr in arrays]
+        
+        if self.pool is None:
+            self.pool = self.pool_class(nodes=self.nWorkers)
+        
+        return np.concatenate(self.pool.map(func,*argLists))
+    
+    def shutdown(self):
+        """
+        Stops the workers. They are started again if map_chunks is called.
+        """
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            #pathos caches pools by their number of workers; this removes it
+            self.pool.clear()
+            self.pool = None
+        return None
+    
+class EvaluationCache:
+    """
+    Wraps a pointwise function, such as the potential or the inertia tensor,
+    and remembers its values at the points it has been called on. Points are
+    keyed on the exact bytes of their coordinates, so only identical points
+    are reused, and values are unchanged. Within one call, repeated points
+    are evaluated once, and func is only called on points not seen before.
+    
+    Pass an EvaluationCache as the potential (or mass) of LeastActionPath or
+    MinimumEnergyPath; they clear it at the start of every force evaluation.
+    Within one force evaluation, the path is evaluated by target_func and again
+    by target_func_grad, and every finite-difference step of e.g.
+    GradientApproximations().forward_action_grad only moves one image, so most
+    of the evaluations are reused.
+    
+    Attributes other than the ones below, such as func.grad, are forwarded
+    to func (uncached).
+    
+    :Maintainer: Daniel
+    """
+    def __init__(self,func):
+        """
+        Parameters
+        ----------
+        func : function
+            Called as func(points), with points of shape (nPoints,nDims). Must
+            act on every point independently, and return an array of shape
+            (nPoints,...).
+        
+        Returns
+        -------
+        None.
+        
+        """
+        self.func = func
+        self.values = {}
+        
+        self.nHits = 0
+        self.nMisses = 0
+        self.nCalls = 0
+    
+    def __getattr__(self,name):
+        #Only called when normal lookup fails. Guards against recursion when
+        #self.func is not yet set, e.g. when unpickling
+        if name == "func":
+            raise AttributeError(name)
+        return getattr(self.func,name)
+    
+    def __call__(self,points):
+        """
+        Parameters
+        ----------
+        points : ndarray
+            Of shape (...,nDims). A single point, of shape (nDims,), is
+            treated as shape (1,nDims).
+        
+        Raises
+        ------
+        ValueError
+            If func does not return one value per point.
+        
+        Returns
+        -------
+        ndarray
+            Of shape points.shape[:-1] + (the shape of func per point).
+        
+        """
+        points = np.asarray(points)
+        nDims = points.shape[-1]
+        flatPoints = points.reshape((-1,nDims))
+        keys = [pt.tobytes() for pt in np.ascontiguousarray(flatPoints,dtype=float)]
+        
+        #Maps new keys to the first point they appear at
+        newKeys = {}
+        for (ptIter,key) in enumerate(keys):
+            if (key not in self.values) and (key not in newKeys):
+                newKeys[key] = ptIter
+        
+        if len(newKeys) > 0:
+            newVals = np.asarray(self.func(flatPoints[list(newKeys.values())]))
+            self.nCalls += 1
+            if newVals.shape[:1] != (len(newKeys),):
+                raise ValueError("func returned shape "+str(newVals.shape)+\
+                                 " for "+str(len(newKeys))+" points")
+            for (key,val) in zip(newKeys.keys(),newVals):
+                self.values[key] = val
+        
+        self.nMisses += len(newKeys)
+        self.nHits += len(keys) - len(newKeys)
+        
+        valsOut = np.array([self.values[key] for key in keys])
+        if points.ndim == 1:
+            return valsOut
+        return valsOut.reshape(points.shape[:-1]+valsOut.shape[1:])
+    
+    def clear(self):
+        """
+        Forgets all stored values. The hit and miss counts are kept.
+        """
+        self.values = {}
+        return None
+    
+    def stats(self):
+        """
+        Returns
+        -------
+        dict
+            The number of points looked up that were already stored ("hits"),
+            that had to be evaluated ("misses"), and the number of calls to
+            func ("calls"), since the cache was created.
+        
+        """
+        return {"hits":self.nHits,"misses":self.nMisses,"calls":self.nCalls}
+    
+class DiskEvaluationCache:
+    """
+    Wraps a slow pointwise function, such as a potential computed by an 
+    external code, and stores its values in an HDF5 file. Reruns on the same
+    surface (e.g. with different nebParams), and restarts, only evaluate func
+    at points that are not in the file yet.
+    
+    Points are keyed on their coordinates rounded to a multiple of tol, so
+    points closer than about tol share a value. tol should be well below any
+    finite-difference step (see fdTol), so that the steps are not merged with
+    the points they are taken from.
+    
+    New values are written to the file once writeFreq of them have been
+    evaluated; call flush to write the rest (e.g. at the end of a run). The
+    number of complete rows is stored in the file after the rows themselves,
+    so a run that stops while writing leaves the file readable. If
+    maxEntries is set, the least recently used points are removed when the 
+    file grows past it, a tenth of maxEntries at a time. The usage record
+    that selects them is written by flush, and when points are removed. Copies made by 
+    pickling (e.g. for worker processes) read the stored values, but do not
+    write to the file. Not thread-safe.
+    
+    Can be passed as the potential or mass of LeastActionPath, MinimumEnergyPath,
+    or EulerLagrangeSolver. Unlike EvaluationCache, it is not cleared between
+    force evaluations. The two may be stacked, as 
+    EvaluationCache(DiskEvaluationCache(func,fName)).
+    
+    Attributes other than the ones below, such as func.grad, are forwarded
+    to func (uncached).
+    
+    :Maintainer: Daniel
+    """
+    def __init__(self,func,fName,tol=10**(-12),maxEntries=None,writeFreq=1):
+        """
+        Parameters
+        ----------
+        func : function
+            Called as func(points), with points of shape (nPoints,nDims). Must
+            act on every point independently, and return an array of shape
+            (nPoints,...).
+        fName : str
+            The HDF5 file. Created if it does not exist.
+        tol : float, optional
+            The coordinate resolution of the keys. Must match the value the
+            file was created with. The default is 10**(-12).
+        maxEntries : int, optional
+            The maximum number of points stored. The default is None, for no
+            limit.
+        writeFreq : int, optional
+            The number of new values held in memory before they are written.
+            Values not yet written are lost if the run crashes. The default
+            is 1, which writes after every call that evaluates new points.
+        
+        Raises
+        ------
+        ValueError
+            If the file was created with a different tol.
+        
+        Returns
+        -------
+        None.
+        
+        """
+        self.func = func
+        self.fName = fName
+        self.tol = tol
+        self.maxEntries = maxEntries
+        self.writeFreq = writeFreq
+        self.writable = True
+        self.nPending = 0
+        
+        self.nHits = 0
+        self.nMisses = 0
+        self.nCalls = 0
+        
+        #Stored rows are the first nStored of keyArr, valArr, and lastUsed,
+        #which grow in chunks
+        self.keyArr = None
+        self.valArr = None
+        self.lastUsed = None
+        self.nStored = 0
+        self.nWritten = 0
+        self.rowOfKey = {}
+        self.useCounter = 0
+        
+        if os.path.isfile(fName):
+            with h5py.File(fName,"r") as h5File:
+                if h5File.attrs["tol"] != tol:
+                    raise ValueError("File "+str(fName)+" was created with tol "+\
+                                     str(h5File.attrs["tol"])+"; received tol "+str(tol))
+                nRows = int(h5File.attrs.get("nRows",0))
+                if nRows > 0:
+                    self._set_stored(h5File["keys"][:nRows],h5File["values"][:nRows],\
+                                     h5File["lastUsed"][:nRows])
+                    self.nWritten = nRows
+                    self.useCounter = self.lastUsed.max() + 1
+        else:
+            with h5py.File(fName,"w") as h5File:
+                h5File.attrs.create("tol",tol)
+    
+    def __getattr__(self,name):
+        #Only called when normal lookup fails. Guards against recursion when
+        #self.func is not yet set, e.g. when unpickling
+        if name == "func":
+            raise AttributeError(name)
+        return getattr(self.func,name)
+    
+    def __getstate__(self):
+        #Copies, e.g. in worker processes, would write to the same file at once
+        state = self.__dict__.copy()
+        state["writable"] = False
+        return state
+    
+    def _set_stored(self,keyArr,valArr,lastUsed):
+        self.keyArr = keyArr
+        self.valArr = valArr
+        self.lastUsed = lastUsed
+        self.nStored = len(keyArr)
+        self.rowOfKey = {key.tobytes():rowIter for (rowIter,key) in enumerate(keyArr)}
+        return None
+    
+    def _add_rows(self,newKeyArr,newVals):
+        nNew = len(newKeyArr)
+        if self.keyArr is None:
+            self.keyArr = np.zeros((0,)+newKeyArr.shape[1:],dtype=np.int64)
+            self.valArr = np.zeros((0,)+newVals.shape[1:])
+            self.lastUsed = np.zeros(0,dtype=np.int64)
+        #Doubles the capacity, so that adding n rows costs O(n) copies overall
+        if self.nStored + nNew > len(self.keyArr):
+            newSize = max(2*len(self.keyArr),self.nStored+nNew)
+            for nm in ["keyArr","valArr","lastUsed"]:
+                arr = getattr(self,nm)
+                grownArr = np.zeros((newSize,)+arr.shape[1:],dtype=arr.dtype)
+                grownArr[:self.nStored] = arr[:self.nStored]
+                setattr(self,nm,grownArr)
+        
+        self.keyArr[self.nStored:self.nStored+nNew] = newKeyArr
+        self.valArr[self.nStored:self.nStored+nNew] = newVals
+        self.lastUsed[self.nStored:self.nStored+nNew] = 0
+        self.nStored += nNew
+        return None
+    
+    def _keys(self,flatPoints):
+        scaledPoints = np.round(np.asarray(flatPoints,dtype=float)/self.tol)
+        if np.any(np.abs(scaledPoints) >= 2**62):
+            raise ValueError("Coordinates are too large to be keyed with tol "+\
+                             str(self.tol))
+        return scaledPoints.astype(np.int64)
+    
+    def __call__(self,points):
+        """
+        Parameters
+        ----------
+        points : ndarray
+            Of shape (...,nDims). A single point, of shape (nDims,), is
+            treated as shape (1,nDims).
+        
+        Raises
+        ------
+        ValueError
+            If func does not return one value per point.
+        
+        Returns
+        -------
+        ndarray
+            Of shape points.shape[:-1] + (the shape of func per point).
+        
+        """
+        points = np.asarray(points)
+        nDims = points.shape[-1]
+        flatPoints = points.reshape((-1,nDims))
+        keyArr = self._keys(flatPoints)
+        keys = [key.tobytes() for key in keyArr]
+        
+        #Maps new keys to the first point they appear at
+        newKeys = {}
+        for (ptIter,key) in enumerate(keys):
+            if (key not in self.rowOfKey) and (key not in newKeys):
+                newKeys[key] = ptIter
+        
+        if len(newKeys) > 0:
+            newInds = list(newKeys.values())
+            newVals = np.asarray(self.func(flatPoints[newInds]),dtype=float)
+            self.nCalls += 1
+            if newVals.shape[:1] != (len(newKeys),):
+                raise ValueError("func returned shape "+str(newVals.shape)+\
+                                 " for "+str(len(newKeys))+" points")
+            
+            for (rowIter,key) in enumerate(newKeys.keys()):
+                self.rowOfKey[key] = self.nStored + rowIter
+            self._add_rows(keyArr[newInds],newVals)
+        
+        self.nMisses += len(newKeys)
+        self.nHits += len(keys) - len(newKeys)
+        
+        rowInds = np.array([self.rowOfKey[key] for key in keys],dtype=int)
+        self.lastUsed[rowInds] = self.useCounter
+        self.useCounter += 1
+        
+        valsOut = self.valArr[rowInds]
+        
+        self.nPending += len(newKeys)
+        if (self.maxEntries is not None) and (self.nStored > self.maxEntries):
+            self._evict()
+        elif self.nPending >= self.writeFreq:
+            self._append_to_file()
+        
+        if points.ndim == 1:
+            return valsOut
+        return valsOut.reshape(points.shape[:-1]+valsOut.shape[1:])
+    
+    def _write_rows(self,h5File,startRow):
+        #Rows are written before nRows, which marks them as complete
+        for (nm,arr) in [("keys",self.keyArr),("values",self.valArr),\
+                         ("lastUsed",self.lastUsed)]:
+            if nm not in h5File:
+                h5File.create_dataset(nm,shape=(0,)+arr.shape[1:],dtype=arr.dtype,\
+                                      maxshape=(None,)+arr.shape[1:],chunks=True)
+            if h5File[nm].shape[0] < self.nStored:
+                h5File[nm].resize(max(2*h5File[nm].shape[0],self.nStored),axis=0)
+            h5File[nm][startRow:self.nStored] = arr[startRow:self.nStored]
+        h5File.attrs["nRows"] = self.nStored
+        self.nWritten = self.nStored
+        return None
+    
+    def _append_to_file(self):
+        self.nPending = 0
+        if (not self.writable) or (self.nWritten == self.nStored):
+            return None
+        with h5py.File(self.fName,"a") as h5File:
+            self._write_rows(h5File,self.nWritten)
+        return None
+    
+    def _evict(self):
+        #Keeps the most recently used points, in the order they were stored
+        nKeep = self.maxEntries - self.maxEntries//10
+        lastUsed = self.lastUsed[:self.nStored]
+        keepInds = np.sort(np.argsort(-lastUsed,kind="stable")[:nKeep])
+        self._set_stored(self.keyArr[keepInds],self.valArr[keepInds],lastUsed[keepInds])
+        self.nPending = 0
+        if self.writable:
+            with h5py.File(self.fName,"a") as h5File:
+                #The rows are rewritten in place, so none are complete until
+                #they are all written
+                h5File.attrs["nRows"] = 0
+                self._write_rows(h5File,0)
+        return None
+    
+    def flush(self):
+        """
+        Writes any values not yet written, and the usage record, used to 
+        select the points removed once maxEntries is reached, to the file.
+        """
+        self._append_to_file()
+        if self.writable and (self.nWritten > 0):
+            with h5py.File(self.fName,"a") as h5File:
+                h5File["lastUsed"][:self.nWritten] = self.lastUsed[:self.nWritten]
+        return None
+    
+    def stats(self):
+        """
+        Returns
+        -------
+        dict
+            The number of points looked up that were already stored ("hits"),
+            that had to be evaluated ("misses"), and the number of calls to
+            func ("calls"), since this object was created.
+        
+        """
+        return {"hits":self.nHits,"misses":self.nMisses,"calls":self.nCalls}
+    
 class GradientApproximations:
-    def __init__(self):
+    def __init__(self,executor=None):
         """
         
         When calling a method of GradientApproximations, we always supply a
@@ -327,6 +1024,13 @@ class GradientApproximations:
         only want the gradient wrt one term in the sum that makes up target_func.
         So, we map target_func to a function that evaluates exactly one component
         in the sum. This mapping is defined here.
+        
+        Parameters
+        ----------
+        executor : GradientExecutor, optional
+            The workers used by the parallel gradients, such as
+            discrete_sqr_action_grad_mp. The default is None, in which case
+            one is created on first use.
 
         Returns
         -------
@@ -334,19 +1038,24 @@ class GradientApproximations:
         
         :Maintainer: Daniel
         """
+        self.executor = executor
         self.targetFuncToComponentMap = \
             {"action":TargetFunctions.term_in_action_sum,
              "action_squared":TargetFunctions.term_in_action_squared_sum}
+        self.targetFuncToTermsGradMap = \
+            {"action":TargetFunctions.action_terms_grad,
+             "action_squared":TargetFunctions.action_squared_terms_grad}
     
     def discrete_element(self,mass,path,gradOfPes,dr,drp1,beff,beffp1,beffm1,pot,potp1,potm1):
         """
-        
+        Gradient of the discrete action squared at image i, or at a chunk of
+        consecutive images, with every argument then stacked along the first axis.
 
         Parameters
         ----------
         mass : function
             Callable mass function
-        path : float
+        path : float array
             Point i
         gradOfPes : float array
             Gradient of PES at point i
@@ -370,34 +1079,40 @@ class GradientApproximations:
         Returns
         -------
         gradOfAction : float array
-            Gradient of action at point i
+            Gradient of action at point i. Of shape (nImages,nDims), with
+            nImages = 1 for a single image.
             
         :Maintainer: Kyle
         """
         eps = fdTol
         gradOfBeff = beff_grad(mass,path,dr,eps=eps)
-        dnorm=np.linalg.norm(dr)
-        dnormP1=np.linalg.norm(drp1)
+        dnorm = np.linalg.norm(dr,axis=-1,keepdims=True)
+        dnormP1 = np.linalg.norm(drp1,axis=-1,keepdims=True)
         dhat = dr/dnorm
         dhatP1 = drp1/dnormP1
+        beff, beffp1, beffm1, pot, potp1, potm1 = \
+            [np.asarray(arr)[...,None] for arr in (beff,beffp1,beffm1,pot,potp1,potm1)]
         gradOfAction = 0.5*(\
             (beff*pot + beffm1*potm1)*dhat-\
             (beff*pot + beffp1*potp1)*dhatP1+\
             (beff*gradOfPes + pot*gradOfBeff)*(dnorm+dnormP1))
         return gradOfAction
+    
     def discrete_sqr_action_grad_mp(self,path,potential,potentialOnPath,mass,massOnPath,\
                                  target_func):
         """
         
         Performs discretized action gradient, needs numerical PES still
         
+        The images are split into chunks, which are computed in parallel
+        with self.executor. It is created on first use if not given to
+        GradientApproximations, and is kept until it is shut down (see
+        GradientExecutor.shutdown).
         
         :Maintainer: Kyle
         """
         eps = fdTol
         
-        gradOfPes = np.zeros(path.shape)
-        gradOfBeff = np.zeros(path.shape)
         gradOfAction = np.zeros(path.shape)
         dr = np.zeros(path.shape)
         beff = np.zeros(potentialOnPath.shape)
@@ -407,21 +1122,20 @@ class GradientApproximations:
         #Build grad of potential
         gradOfPes = midpoint_grad(potential,path,eps=eps)
 
-        dr[1:,:] = np.array([path[ptIter] - path[ptIter-1] \
-                               for ptIter in range(1,nPts)])
+        dr[1:,:] = np.diff(path,axis=0)
         
-        beff[1:] = np.array([np.dot(np.dot(massOnPath[ptIter],dr[ptIter]),dr[ptIter])/np.sum(dr[ptIter,:]**2) \
-                               for ptIter in range(1,nPts)])
-        pool = Pool(6)
-
-        mapOut = pool.map(self.discrete_element, \
-                itertools.repeat(mass,nPts-1),path[1:nPts-1,:], \
-                gradOfPes[1:nPts-1],dr[1:nPts-1,:], dr[2:nPts,:], \
-                beff[1:nPts-1], beff[2:nPts], beff[0:nPts-2], \
-                potentialOnPath[1:nPts-1], potentialOnPath[2:nPts], potentialOnPath[0:nPts-2])
-        mapped = np.array(mapOut)
-
-        gradOfAction[1:nPts-1,:] = mapped[:,0,:]
+        beff[1:] = _mass_dist(dr[1:],massOnPath[1:])/np.sum(dr[1:]**2,axis=1)
+        
+        if self.executor is None:
+            self.executor = GradientExecutor(nWorkers=6)
+        
+        gradOfAction[1:nPts-1,:] = \
+            self.executor.map_chunks(self.discrete_element,\
+                                     [path[1:nPts-1,:],gradOfPes[1:nPts-1],dr[1:nPts-1,:],\
+                                      dr[2:nPts,:],beff[1:nPts-1],beff[2:nPts],beff[0:nPts-2],\
+                                      potentialOnPath[1:nPts-1],potentialOnPath[2:nPts],\
+                                      potentialOnPath[0:nPts-2]],\
+                                     constArgs=(mass,))
         return gradOfAction, gradOfPes
     
     def discrete_sqr_action_grad(self,path,potential,potentialOnPath,mass,massOnPath,\
@@ -434,7 +1148,6 @@ class GradientApproximations:
         """
         eps = fdTol
         
-        gradOfPes = np.zeros(path.shape)
         gradOfBeff = np.zeros(path.shape)
         gradOfAction = np.zeros(path.shape)
         dr = np.zeros(path.shape)
@@ -445,27 +1158,25 @@ class GradientApproximations:
         #Build grad of potential
         gradOfPes = midpoint_grad(potential,path,eps=eps)
         
-        dr[1:,:] = np.array([path[ptIter] - path[ptIter-1] \
-                               for ptIter in range(1,nPts)])
-
-        beff[1] = np.dot(np.dot(massOnPath[1],dr[1]),dr[1])/np.sum(dr[1,:]**2)
+        dr[1:,:] = np.diff(path,axis=0)
+        
+        beff[1:] = _mass_dist(dr[1:],massOnPath[1:])/np.sum(dr[1:]**2,axis=1)
         
         if mass is not None:
-            for ptIter in range(1,nPts-1):
-                gradOfBeff[ptIter] = beff_grad(mass,path[ptIter],dr[ptIter],eps=eps)
+            gradOfBeff[1:nPts-1] = beff_grad(mass,path[1:nPts-1],dr[1:nPts-1],eps=eps)
         
-        for ptIter in range(1,nPts-1):
-            beff[ptIter+1] = np.dot(np.dot(massOnPath[ptIter+1],dr[ptIter+1]),dr[ptIter+1])/np.sum(dr[ptIter+1,:]**2)
-            
-            dnorm=np.linalg.norm(dr[ptIter])
-            dnormP1=np.linalg.norm(dr[ptIter+1])
-            dhat = dr[ptIter]/dnorm
-            dhatP1 = dr[ptIter+1]/dnormP1
-
-            gradOfAction[ptIter] = 0.5*(\
-                (beff[ptIter]*potentialOnPath[ptIter] + beff[ptIter-1]*potentialOnPath[ptIter-1])*dhat-\
-                (beff[ptIter]*potentialOnPath[ptIter] + beff[ptIter+1]*potentialOnPath[ptIter+1])*dhatP1+\
-                (beff[ptIter]*gradOfPes[ptIter] + potentialOnPath[ptIter]*gradOfBeff[ptIter])*(dnorm+dnormP1))
+        #For images 1,...,nPts-2
+        dnorm = np.linalg.norm(dr[1:nPts-1],axis=1)[:,None]
+        dnormP1 = np.linalg.norm(dr[2:nPts],axis=1)[:,None]
+        dhat = dr[1:nPts-1]/dnorm
+        dhatP1 = dr[2:nPts]/dnormP1
+        beffPot = (beff*potentialOnPath)[:,None]
+        
+        gradOfAction[1:nPts-1] = 0.5*(\
+            (beffPot[1:nPts-1] + beffPot[0:nPts-2])*dhat-\
+            (beffPot[1:nPts-1] + beffPot[2:nPts])*dhatP1+\
+            (beff[1:nPts-1,None]*gradOfPes[1:nPts-1] + \
+             potentialOnPath[1:nPts-1,None]*gradOfBeff[1:nPts-1])*(dnorm+dnormP1))
         
         return gradOfAction, gradOfPes
     
@@ -479,8 +1190,6 @@ class GradientApproximations:
         """
         eps = fdTol
 
-        gradOfPes = np.zeros(path.shape)
-        gradOfBeff = np.zeros(path.shape)
         gradOfAction = np.zeros(path.shape)
         dr = np.zeros(path.shape)
         beff = np.zeros(potentialOnPath.shape)
@@ -490,29 +1199,26 @@ class GradientApproximations:
         #Build grad of potential
         gradOfPes = midpoint_grad(potential,path,eps=eps)
 
-        dr[1:,:] = np.array([path[ptIter] - path[ptIter-1] \
-                               for ptIter in range(1,nPts)])
-
-        beff[1] = np.dot(np.dot(massOnPath[1],dr[1]),dr[1])/np.sum(dr[1,:]**2)
-
-        for ptIter in range(1,nPts-1):
-
-            gradOfBeff[ptIter] = beff_grad(mass,path[ptIter],dr[ptIter],eps=eps)
-
-            beff[ptIter+1] = np.dot(np.dot(massOnPath[ptIter+1],dr[ptIter+1]),dr[ptIter+1])/np.sum(dr[ptIter+1,:]**2)
+        dr[1:,:] = np.diff(path,axis=0)
 
-            dnorm=np.linalg.norm(dr[ptIter])
-            dnormP1=np.linalg.norm(dr[ptIter+1])
-            dhat = dr[ptIter]/dnorm
-            dhatP1 = dr[ptIter+1]/dnormP1
-            bv_root = np.sqrt(2.0*beff[ptIter]*potentialOnPath[ptIter])
-            bv_rootm1 = np.sqrt(2.0*beff[ptIter-1]*potentialOnPath[ptIter-1])
-            bv_rootp1 = np.sqrt(2.0*beff[ptIter+1]*potentialOnPath[ptIter+1])
-            gradOfAction[ptIter] = 0.5*(\
-                (bv_root + bv_rootm1)*dhat-\
-                (bv_root + bv_rootp1)*dhatP1+\
-                (beff[ptIter]*gradOfPes[ptIter] + potentialOnPath[ptIter]*gradOfBeff[ptIter])*\
-                    (dnorm+dnormP1)/bv_root)
+        beff[1:] = _mass_dist(dr[1:],massOnPath[1:])/np.sum(dr[1:]**2,axis=1)
+        
+        gradOfBeff = np.zeros(path.shape)
+        gradOfBeff[1:nPts-1] = beff_grad(mass,path[1:nPts-1],dr[1:nPts-1],eps=eps)
+        
+        #For images 1,...,nPts-2
+        dnorm = np.linalg.norm(dr[1:nPts-1],axis=1)[:,None]
+        dnormP1 = np.linalg.norm(dr[2:nPts],axis=1)[:,None]
+        dhat = dr[1:nPts-1]/dnorm
+        dhatP1 = dr[2:nPts]/dnormP1
+        bvRoot = np.sqrt(2.0*beff*potentialOnPath)[:,None]
+        
+        gradOfAction[1:nPts-1] = 0.5*(\
+            (bvRoot[1:nPts-1] + bvRoot[0:nPts-2])*dhat-\
+            (bvRoot[1:nPts-1] + bvRoot[2:nPts])*dhatP1+\
+            (beff[1:nPts-1,None]*gradOfPes[1:nPts-1] + \
+             potentialOnPath[1:nPts-1,None]*gradOfBeff[1:nPts-1])*\
+                (dnorm+dnormP1)/bvRoot[1:nPts-1])
 
         return gradOfAction, gradOfPes
 
@@ -551,6 +1257,73 @@ class GradientApproximations:
         
         return gradOfAction, gradOfPes
     
+    def _use_analytic_grad(self,potential,mass,target_func):
+        return (_has_analytic_grad(potential) or _has_analytic_grad(mass)) and \
+            (getattr(target_func,"__name__",None) in self.targetFuncToTermsGradMap)
+    
+    def analytic_action_grad(self,path,potential,potentialOnPath,mass,massOnPath,\
+                             target_func):
+        """
+        Gradient of a sum-like action (see TargetFunctions.action) by the chain
+        rule, using potential.grad and mass.grad where available (see
+        _has_analytic_grad). A function without a grad method is differentiated
+        with midpoint_grad. Works on a single path, or on a stack of paths.
+        
+        Unlike the finite difference approximations, gradOfPes is the gradient
+        of the potential itself, not of the potential as clipped by target_func.
+
+        Parameters
+        ----------
+        path : ndarray
+            The path(s). Of shape (...,nPts,nDims).
+        potential : function
+        potentialOnPath : ndarray
+            Potential on the path(s), as returned by target_func. Of shape (...,nPts).
+        mass : function or None
+        massOnPath : ndarray or None
+            Mass on the path(s). If not None, of shape (...,nPts,nDims,nDims).
+        target_func : function
+            Either TargetFunctions.action or TargetFunctions.action_squared.
+
+        Returns
+        -------
+        gradOfAction : ndarray
+            Of shape path.shape.
+        gradOfPes : ndarray
+            Of shape path.shape.
+
+        :Maintainer: Daniel
+        """
+        terms_grad = self.targetFuncToTermsGradMap[target_func.__name__]
+        
+        nDims = path.shape[-1]
+        flatPath = path.reshape((-1,nDims))
+        
+        gradOfPes = midpoint_grad(potential,flatPath,eps=fdTol).reshape(path.shape)
+        if mass is None:
+            massOnTerms = None
+        else:
+            massOnTerms = massOnPath[...,1:,:,:]
+        
+        coordDiffs = np.diff(path,axis=-2)
+        gradOfCoordDiffs, gradOfPot, gradOfMass = \
+            terms_grad(coordDiffs,potentialOnPath[...,1:],massOnTerms)
+        
+        #Term i depends on images i-1 and i through the displacement, and on
+        #image i through the potential and mass
+        gradOfAction = np.zeros(path.shape)
+        gradOfAction[...,1:,:] += gradOfCoordDiffs
+        gradOfAction[...,:-1,:] -= gradOfCoordDiffs
+        gradOfAction[...,1:,:] += gradOfPot[...,None]*gradOfPes[...,1:,:]
+        
+        if mass is not None:
+            gradOfMassFunc = midpoint_grad(mass,flatPath,eps=fdTol)
+            gradOfMassFunc = gradOfMassFunc.reshape(path.shape+(nDims,nDims))
+            gradOfAction[...,1:,:] += \
+                np.einsum("...ab,...abc->...c",gradOfMass,gradOfMassFunc[...,1:,:,:,:])
+        
+        return gradOfAction, gradOfPes
+    
     def forward_action_grad(self,path,potential,potentialOnPath,mass,massOnPath,\
                             target_func):
         """
@@ -558,6 +1331,9 @@ class GradientApproximations:
         See e.g. TargetFunctions.action. Note that the full action is computed
         at every finite difference step.
         
+        If potential or mass has a grad method, and target_func is known to
+        GradientApproximations().analytic_action_grad, that is used instead.
+        
         Does not return the gradient of the mass function, as that's not used 
         elsewhere.
 
@@ -583,6 +1359,10 @@ class GradientApproximations:
         
         :Maintainer: Daniel
         """
+        if self._use_analytic_grad(potential,mass,target_func):
+            return self.analytic_action_grad(path,potential,potentialOnPath,mass,\
+                                             massOnPath,target_func)
+        
         eps = fdTol
         
         gradOfPes = np.zeros(path.shape)
@@ -621,19 +1401,191 @@ class GradientApproximations:
         ----------
         path : ndarray
             The path. Of shape (nPoints,nDims)
-        potential : function.
-            Must take as input an array of shape path.shape
+        potential : function.
+            Must take as input an array of shape path.shape
+        potentialOnPath : ndarray
+            Potential on the path. Of shape (nPoints,).
+        mass : function or None
+        massOnPath : ndarray or None
+            Mass on path. If not None, of shape (nPoints,nDims,nDims).
+        target_func : function
+            Any term in TargetFunctions that is the sum of some constituent
+            terms (e.g. TargetFunctions.action). Uses target_func.__name__
+            to select the gradient of a term in the sum, such as 
+            TargetFunctions.term_in_action_sum
+            
+        As in GradientApproximations().forward_action_grad, potential.grad and
+        mass.grad are used where available.
+
+        Returns
+        -------
+        gradOfAction : ndarray
+        gradOfPes : ndarray
+        
+        :Maintainer: Daniel
+        """
+        if self._use_analytic_grad(potential,mass,target_func):
+            return self.analytic_action_grad(path,potential,potentialOnPath,mass,\
+                                             massOnPath,target_func)
+        
+        targetFuncName = target_func.__name__
+        tf_component = self.targetFuncToComponentMap[targetFuncName]
+        
+        eps = fdTol
+        
+        gradOfPes = np.zeros(path.shape)
+        gradOut = np.zeros(path.shape)
+        
+        nPts, nDims = path.shape
+        
+        if massOnPath is None:
+            massOnPath = np.full((nPts,nDims,nDims),np.identity(nDims))
+        
+        #Treat the endpoints separately
+        for ptIter in range(1,nPts-1):
+            for dimIter in range(nDims):
+                points = path[ptIter-1:ptIter+1].copy()
+                actTermAtPt, _, _ = \
+                    tf_component(points,potentialOnPath[ptIter],massOnPath[ptIter])
+                
+                points[1,dimIter] += eps
+                actTermAtStep, potAtStep, massAtStep = \
+                    tf_component(points,potential,mass)
+                
+                gradOfPes[ptIter,dimIter] = \
+                    (potAtStep - potentialOnPath[ptIter])/eps
+                gradOut[ptIter,dimIter] = (actTermAtStep - actTermAtPt)/eps
+        
+        #Handling endpoints
+        for dimIter in range(nDims):
+            pt = path[0].copy()
+            pt[dimIter] += eps
+            potAtStep = potential(pt)
+            gradOfPes[0,dimIter] = (potAtStep - potentialOnPath[0])/eps
+            
+            pt = path[-1].copy()
+            pt[dimIter] += eps
+            potAtStep = potential(pt)
+            gradOfPes[-1,dimIter] = (potAtStep - potentialOnPath[-1])/eps
+            
+        return gradOut, gradOfPes
+
+    def forward_action_batch_grad(self,paths,potential,potentialOnPaths,mass,\
+                                  massOnPaths,target_func):
+        """
+        Forwards finite difference approx of a sum-like action (see
+        TargetFunctions.action), for a stack of paths at once.
+
+        Moving image j only changes terms j and j+1 in the sum, so only those
+        are recomputed. All of the nBands*nPts*nDims perturbed points are
+        evaluated with a single call to potential (and to mass).
+        As in GradientApproximations().forward_action_grad, potential.grad and
+        mass.grad are used where available.
+
+        Parameters
+        ----------
+        paths : ndarray
+            The paths. Of shape (nBands,nPts,nDims)
+        potential : function
+            Must take as input an array of shape (nPoints,nDims)
+        potentialOnPaths : ndarray
+            Potential on the paths. Of shape (nBands,nPts).
+        mass : function or None
+        massOnPaths : ndarray or None
+            Mass on the paths. If not None, of shape (nBands,nPts,nDims,nDims).
+        target_func : function
+            Either TargetFunctions.action or TargetFunctions.action_squared.
+            See TargetFunctions.get_terms_func.
+
+        Returns
+        -------
+        gradOfAction : ndarray
+            Of shape (nBands,nPts,nDims).
+        gradOfPes : ndarray
+            Of shape (nBands,nPts,nDims).
+
+        :Maintainer: Daniel
+        """
+        if self._use_analytic_grad(potential,mass,target_func):
+            return self.analytic_action_grad(paths,potential,potentialOnPaths,mass,\
+                                             massOnPaths,target_func)
+        
+        terms_func = TargetFunctions.get_terms_func(target_func)
+        if terms_func is None:
+            raise ValueError("target_func "+str(target_func)+" does not have known terms;"+\
+                             " allowed are TargetFunctions.action and action_squared")
+
+        eps = fdTol
+
+        nBands, nPts, nDims = paths.shape
+        stepArr = eps*np.identity(nDims)
+
+        #Index order is (band, image, perturbed dimension, coordinate)
+        steps = paths[:,:,None,:] + stepArr
+        flatSteps = steps.reshape((-1,nDims))
+
+        potAtStep = potential(flatSteps).reshape((nBands,nPts,nDims))
+        if terms_func is TargetFunctions.action_terms:
+            #As TargetFunctions.action clips the potential it returns
+            potAtStep = potAtStep.clip(0)
+        gradOfPes = (potAtStep - potentialOnPaths[:,:,None])/eps
+
+        if mass is None:
+            massAtStep = None
+            massOnTerms = None
+            massOnUnchanged = None
+        else:
+            massAtStep = mass(flatSteps).reshape((nBands,nPts,nDims,nDims,nDims))[:,1:]
+            massOnTerms = massOnPaths[:,1:]
+            massOnUnchanged = massOnTerms[:,:,None]
+
+        #coordDiffs[:,i] is the displacement ending on image i+1
+        coordDiffs = np.diff(paths,axis=1)
+        terms = terms_func(coordDiffs,potentialOnPaths[:,1:],massOnTerms)[:,:,None]
+
+        gradOfAction = np.zeros(paths.shape)
+
+        #Moving image j changes the term ending on j...
+        termsAtStep = terms_func(coordDiffs[:,:,None,:] + stepArr,potAtStep[:,1:],massAtStep)
+        gradOfAction[:,1:] += (termsAtStep - terms)/eps
+
+        #...and the term starting on j, for which the potential and mass are unchanged
+        termsAtStep = terms_func(coordDiffs[:,:,None,:] - stepArr,\
+                                 potentialOnPaths[:,1:,None],massOnUnchanged)
+        gradOfAction[:,:-1] += (termsAtStep - terms)/eps
+
+        return gradOfAction, gradOfPes
+
+    def forward_action_local_grad(self,path,potential,potentialOnPath,mass,massOnPath,\
+                                  target_func):
+        """
+        Forwards finite difference approx of a sum-like action (see
+        TargetFunctions.action), for a single path. A drop-in replacement for
+        GradientApproximations().forward_action_grad.
+        
+        forward_action_grad recomputes the full action for each of the
+        nPts*nDims steps, so it evaluates the potential (and mass) 
+        nPts**2*nDims times. Moving image j only changes terms j and j+1 in 
+        the sum, so here only those are recomputed, and the potential (and 
+        mass) are evaluated once, on all nPts*nDims perturbed points. See
+        GradientApproximations().forward_action_batch_grad.
+        
+        If the terms of target_func are not known, falls back to forward_action_grad.
+        
+        Parameters
+        ----------
+        path : ndarray
+            The path. Of shape (nPoints,nDims)
+        potential : function
+            Must take as input an array of shape (nPoints,nDims)
         potentialOnPath : ndarray
             Potential on the path. Of shape (nPoints,).
         mass : function or None
         massOnPath : ndarray or None
             Mass on path. If not None, of shape (nPoints,nDims,nDims).
         target_func : function
-            Any term in TargetFunctions that is the sum of some constituent
-            terms (e.g. TargetFunctions.action). Uses target_func.__name__
-            to select the gradient of a term in the sum, such as 
-            TargetFunctions.term_in_action_sum
-
+            Function whose gradient is being computed
+        
         Returns
         -------
         gradOfAction : ndarray
@@ -641,47 +1593,17 @@ class GradientApproximations:
         
         :Maintainer: Daniel
         """
-        targetFuncName = target_func.__name__
-        tf_component = self.targetFuncToComponentMap[targetFuncName]
+        if TargetFunctions.get_terms_func(target_func) is None:
+            return self.forward_action_grad(path,potential,potentialOnPath,mass,\
+                                            massOnPath,target_func)
         
-        eps = fdTol
-        
-        gradOfPes = np.zeros(path.shape)
-        gradOut = np.zeros(path.shape)
-        
-        nPts, nDims = path.shape
-        
-        if massOnPath is None:
-            massOnPath = np.full((nPts,nDims,nDims),np.identity(nDims))
-        
-        #Treat the endpoints separately
-        for ptIter in range(1,nPts-1):
-            for dimIter in range(nDims):
-                points = path[ptIter-1:ptIter+1].copy()
-                actTermAtPt, _, _ = \
-                    tf_component(points,potentialOnPath[ptIter],massOnPath[ptIter])
-                
-                points[1,dimIter] += eps
-                actTermAtStep, potAtStep, massAtStep = \
-                    tf_component(points,potential,mass)
-                
-                gradOfPes[ptIter,dimIter] = \
-                    (potAtStep - potentialOnPath[ptIter])/eps
-                gradOut[ptIter,dimIter] = (actTermAtStep - actTermAtPt)/eps
+        if massOnPath is not None:
+            massOnPath = massOnPath[None]
+        gradOfAction, gradOfPes = \
+            self.forward_action_batch_grad(path[None],potential,potentialOnPath[None],\
+                                           mass,massOnPath,target_func)
         
-        #Handling endpoints
-        for dimIter in range(nDims):
-            pt = path[0].copy()
-            pt[dimIter] += eps
-            potAtStep = potential(pt)
-            gradOfPes[0,dimIter] = (potAtStep - potentialOnPath[0])/eps
-            
-            pt = path[-1].copy()
-            pt[dimIter] += eps
-            potAtStep = potential(pt)
-            gradOfPes[-1,dimIter] = (potAtStep - potentialOnPath[-1])/eps
-            
-        return gradOut, gradOfPes
+        return gradOfAction[0], gradOfPes[0]
 
 def potential_central_grad(points,potential,auxFunc=None):
     '''
@@ -717,7 +1639,6 @@ def potential_central_grad(points,potential,auxFunc=None):
 
 def midpoint_grad(func,points,eps=10**(-8)):
     """
-    TODO: allow for arbitrary shaped outputs, for use with inertia tensor
     TODO: maybe only have one gradient approx ever
     
     Midpoint finite difference. Probably best if not used with actual DFT calculations,
@@ -725,55 +1646,64 @@ def midpoint_grad(func,points,eps=10**(-8)):
     Assumes func only depends on a single point (vs the action, which depends on
           all of the points)
     
+    The forward and backward steps along every dimension, for all points, are
+    stacked into a single array of shape (2*nDims*nPoints,nDims), so that func
+    is called once.
+    
+    If func has a grad method (see _has_analytic_grad), func.grad(points) is 
+    returned instead. func may return any shape (nPoints,...), such as the
+    inertia tensor; the output is then of shape (nPoints,...,nDims).
+    
     :Maintainer: Eric
     """
     if len(points.shape) == 1:
         points = points.reshape((1,-1))
+    if _has_analytic_grad(func):
+        return func.grad(points)
+    
     nPoints, nDims = points.shape
-    gradOut = np.zeros((nPoints,nDims))
-    for dimIter in range(nDims):
-        step = np.zeros(nDims)
-        step[dimIter] = 1
-        
-        forwardStep = points + eps/2*step
-        backwardStep = points - eps/2*step
-        
-        forwardEval = func(forwardStep)
-        backwardEval = func(backwardStep)
-
-        gradOut[:,dimIter] = (forwardEval-backwardEval)/eps
+    
+    #Index order is (forward/backward, dimension, point, coordinate)
+    stepArr = eps/2*np.identity(nDims)[:,None,:]
+    steps = np.stack((points + stepArr,points - stepArr))
+    
+    evals = np.asarray(func(steps.reshape((-1,nDims))))
+    evals = evals.reshape((2,nDims,nPoints)+evals.shape[1:])
+    
+    diff = (evals[0]-evals[1])/eps
+    gradOut = np.moveaxis(diff,0,-1)
     
     return gradOut
 
 def beff_grad(func,points,dr,eps=10**(-8)):
     """
-    Midpoint finite difference of B_eff mass.
+    Midpoint finite difference of B_eff mass, B_eff = M_{ab} dr^a dr^b/|dr|^2. If
+    func has a grad method (see _has_analytic_grad), that is used instead.
+    
+    dr is either a single displacement, used for all points, or one displacement
+    per point, of shape (nPoints,nDims). As in midpoint_grad, func is called
+    once, on all of the forward and backward steps.
     
     :Maintainer: Kyle
     """
     if len(points.shape) == 1:
         points = points.reshape((1,-1))
-        #dr = dr.reshape((1,-1))
     nPoints, nDims = points.shape
-
-    gradOut = np.zeros((nPoints,nDims))
-
-    ds = np.sum(dr[:]**2)
-
-    for dimIter in range(nDims):
-        step = np.zeros(nDims)
-        step[dimIter] = 1
-
-        forwardStep = points + eps/2*step
-        backwardStep = points - eps/2*step
-
-        massP1 = func(forwardStep)
-        massM1 = func(backwardStep)
-
-        forwardEval = np.dot(np.dot(massP1,dr),dr)/ds
-        backwardEval = np.dot(np.dot(massM1,dr),dr)/ds
-
-        gradOut[:,dimIter] = (forwardEval-backwardEval)/eps 
+    
+    dr = np.broadcast_to(dr,(nPoints,nDims))
+    ds = np.sum(dr**2,axis=-1)
+    
+    if _has_analytic_grad(func):
+        return np.einsum("pabc,pa,pb->pc",func.grad(points),dr,dr)/ds[:,None]
+    
+    #Index order is (forward/backward, dimension, point, coordinate)
+    stepArr = eps/2*np.identity(nDims)[:,None,:]
+    steps = np.stack((points + stepArr,points - stepArr))
+    
+    massAtSteps = func(steps.reshape((-1,nDims))).reshape((2,nDims,nPoints,nDims,nDims))
+    beffAtSteps = _mass_dist(dr,massAtSteps)/ds
+    
+    gradOut = ((beffAtSteps[0]-beffAtSteps[1])/eps).T
     return gradOut
 
 
@@ -1123,6 +2053,158 @@ class SurfaceUtils:
         else:
             return allowedEndpoints
 
+    @staticmethod
+    def grid_edge_weights(coordMeshTuple,potArr,relativeNeighborInds,inertArr=None,\
+                          target_func=TargetFunctions.action,incoming=False):
+        """
+        Computes the weight of the edge from every grid point to each of its
+        neighbors. The neighbor of the point at index idx is at idx - offset,
+        for every offset in relativeNeighborInds, and the weight is
+            target_func([coords[idx],coords[idx-offset]],...)[0].
+        For TargetFunctions.action and TargetFunctions.action_squared, each offset
+        is computed with shifted-array operations over the whole grid. Other
+        target functions are called once per edge.
+
+        The output uses len(relativeNeighborInds) times the memory of potArr.
+
+        Parameters
+        ----------
+        coordMeshTuple : tuple of ndarrays
+            The coordinate meshes, indexed in the same order as potArr.
+        potArr : ndarray
+        relativeNeighborInds : ndarray of ints
+            Of shape (nOffsets,nDims).
+        inertArr : ndarray, optional
+            Of shape potArr.shape+(nDims,nDims). The default is None, in which
+            case the identity is used.
+        target_func : function, optional
+            The default is TargetFunctions.action.
+        incoming : bool, optional
+            If True, computes the weight of the edge from the neighbor to idx,
+                target_func([coords[idx-offset],coords[idx]],...)[0],
+            instead. The default is False.
+
+        Returns
+        -------
+        weights : ndarray
+            Of shape potArr.shape+(nOffsets,). np.inf where the neighbor is
+            off the grid.
+
+        :Maintainer: Daniel
+        """
+        nDims = len(coordMeshTuple)
+        relativeNeighborInds = np.array(relativeNeighborInds,dtype=int).reshape((-1,nDims))
+        if inertArr is None:
+            inertArr = np.broadcast_to(np.identity(nDims),potArr.shape+2*(nDims,))
+
+        weights = np.full(potArr.shape+(relativeNeighborInds.shape[0],),np.inf)
+        terms_func = TargetFunctions.get_terms_func(target_func)
+
+        for (offsetIter,offset) in enumerate(relativeNeighborInds):
+            #Slices selecting every point with an on-grid neighbor, and those neighbors
+            currentSlice = tuple(slice(max(o,0),max(s+min(o,0),0)) for (o,s) in \
+                                 zip(offset,potArr.shape))
+            neighborSlice = tuple(slice(max(-o,0),max(s+min(-o,0),0)) for (o,s) in \
+                                  zip(offset,potArr.shape))
+            if incoming:
+                startSlice, endSlice = neighborSlice, currentSlice
+            else:
+                startSlice, endSlice = currentSlice, neighborSlice
+
+            if terms_func is not None:
+                coordDiffs = np.stack([c[endSlice]-c[startSlice] for c in \
+                                       coordMeshTuple],axis=-1)
+                weights[currentSlice+(offsetIter,)] = \
+                    terms_func(coordDiffs,potArr[endSlice],inertArr[endSlice])
+                continue
+
+            #For feeding into target_func
+            coords = np.zeros((2,nDims))
+            enegs = np.zeros(2)
+            masses = np.zeros((2,)+2*(nDims,))
+
+            offsetWeights = weights[currentSlice+(offsetIter,)]
+            for idx in np.ndindex(offsetWeights.shape):
+                startIdx = tuple(i+s.start for (i,s) in zip(idx,startSlice))
+                endIdx = tuple(i+s.start for (i,s) in zip(idx,endSlice))
+                
+                coords[0] = [c[startIdx] for c in coordMeshTuple]
+                coords[1] = [c[endIdx] for c in coordMeshTuple]
+                enegs[0] = potArr[startIdx]
+                enegs[1] = potArr[endIdx]
+                masses[0] = inertArr[startIdx]
+                masses[1] = inertArr[endIdx]
+
+                offsetWeights[idx] = target_func(coords,enegs,masses)[0]
+
+        return weights
+
+    @staticmethod
+    def node_edge_weights(coordMeshTuple,potArr,inds,relativeNeighborInds,inertArr=None,\
+                          target_func=TargetFunctions.action):
+        """
+        The weights of the edges from the grid point at inds to each of its
+        neighbors, as SurfaceUtils.grid_edge_weights(...)[inds] (with 
+        incoming=False), but without computing those of the rest of the grid.
+        For when the weights of the whole grid do not fit in memory.
+        
+        Parameters
+        ----------
+        coordMeshTuple : tuple of ndarrays
+            The coordinate meshes, indexed in the same order as potArr.
+        potArr : ndarray
+        inds : tuple of ints
+            The index of the grid point.
+        relativeNeighborInds : ndarray of ints
+            Of shape (nOffsets,nDims).
+        inertArr : ndarray, optional
+            Of shape potArr.shape+(nDims,nDims). The default is None, in which
+            case the identity is used.
+        target_func : function, optional
+            The default is TargetFunctions.action.
+        
+        Returns
+        -------
+        weights : ndarray
+            Of shape (nOffsets,). np.inf where the neighbor is off the grid.
+        
+        :Maintainer: Daniel
+        """
+        nDims = len(coordMeshTuple)
+        relativeNeighborInds = np.array(relativeNeighborInds,dtype=int).reshape((-1,nDims))
+        if inertArr is None:
+            inertArr = np.broadcast_to(np.identity(nDims),potArr.shape+2*(nDims,))
+        
+        neighborInds = np.array(inds) - relativeNeighborInds
+        isOnGrid = np.all((neighborInds >= 0) & (neighborInds < potArr.shape),axis=1)
+        neighborInds = tuple(neighborInds[isOnGrid].T)
+        
+        weights = np.full(relativeNeighborInds.shape[0],np.inf)
+        terms_func = TargetFunctions.get_terms_func(target_func)
+        
+        if terms_func is not None:
+            coordDiffs = np.stack([c[neighborInds]-c[inds] for c in coordMeshTuple],axis=-1)
+            weights[isOnGrid] = terms_func(coordDiffs,potArr[neighborInds],\
+                                           inertArr[neighborInds])
+            return weights
+        
+        #For feeding into target_func
+        coords = np.zeros((2,nDims))
+        enegs = np.zeros(2)
+        masses = np.zeros((2,)+2*(nDims,))
+        
+        coords[0] = [c[inds] for c in coordMeshTuple]
+        enegs[0] = potArr[inds]
+        masses[0] = inertArr[inds]
+        for (offsetIter,endIdx) in zip(np.nonzero(isOnGrid)[0],zip(*neighborInds)):
+            coords[1] = [c[endIdx] for c in coordMeshTuple]
+            enegs[1] = potArr[endIdx]
+            masses[1] = inertArr[endIdx]
+            
+            weights[offsetIter] = target_func(coords,enegs,masses)[0]
+            
+        return weights
+
 def shift_func(func_in,shift=10**(-4)):
     """
     Shifts func_in output down by shift. Especially for use with interpolators 
@@ -1253,6 +2335,10 @@ class NDInterpWithBoundary:
             raise ValueError("boundaryHandler '%s' is not defined" % boundaryHandler)
         
         self.boundaryHandler = bdyHandlerFuncs[boundaryHandler]
+        bdyHandlerVectorizedFuncs = {"exponential":self._exp_boundary_handler_vectorized}
+        self.boundaryHandlerVectorized = bdyHandlerVectorizedFuncs[boundaryHandler]
+        bdyHandlerGradFuncs = {"exponential":self._exp_boundary_handler_with_grad}
+        self.boundaryHandlerWithGrad = bdyHandlerGradFuncs[boundaryHandler]
         
         if symmExtend is None:
             symmExtend = np.array([False,True]+(self.nDims-2)*[False],dtype=bool)
@@ -1269,6 +2355,8 @@ class NDInterpWithBoundary:
         
         self.gridPoints = tuple([np.asarray(p) for p in gridPoints])
         self.gridVals = _get_correct_shape(gridPoints,gridVals)
+        self.lowerBounds = np.array([g[0] for g in self.gridPoints])
+        self.upperBounds = np.array([g[-1] for g in self.gridPoints])
         
         for i, p in enumerate(gridPoints):
             if not np.all(np.diff(p) > 0.):
@@ -1278,12 +2366,19 @@ class NDInterpWithBoundary:
         if self.nDims == 2:
             self.rbv = RectBivariateSpline(*gridPoints,self.gridVals.T,**splKWargs)
             self._call = self._call_2d
+            self._call_vectorized = self._call_2d_vectorized
+            self._call_with_grad = self._call_2d_with_grad
         else:
             self._call = self._call_nd
+            self._call_vectorized = self._call_nd_vectorized
+            self._call_with_grad = self._call_nd_with_grad
             
         postEvalDict = {"identity":self._identity_transform_function,
                         "smooth_abs":self._smooth_abs_transform_function}
         self.post_eval = postEvalDict[transformFuncName]
+        postEvalGradDict = {"identity":self._identity_transform_grad,
+                            "smooth_abs":self._smooth_abs_transform_grad}
+        self.post_eval_grad = postEvalGradDict[transformFuncName]
 
     def __call__(self,points):
         """
@@ -1310,31 +2405,121 @@ class NDInterpWithBoundary:
                              "%d, but this NDInterpWithBoundary expects "
                              "dimension %d" % (points.shape[-1], self.nDims))
         
-        points = points.reshape((-1,self.nDims))
+        #Copied so that the symmetric extension does not modify the input
+        points = points.reshape((-1,self.nDims)).copy()
         
         #Dealing with symmetric extension
         for dimIter in range(self.nDims):
             if self.symmExtend[dimIter]:
                 points[:,dimIter] = np.abs(points[:,dimIter])
         
-        #Checking if each point is acceptable, and interpolating individual points.
-        result = np.zeros(points.shape[0])
-        
-        for (ptIter, point) in enumerate(points):
-            isInBounds = np.zeros((2,self.nDims),dtype=bool)
-            isInBounds[0] = (np.array([g[0] for g in self.gridPoints]) <= point)
-            isInBounds[1] = (point <= np.array([g[-1] for g in self.gridPoints]))
-            
-            if np.count_nonzero(~isInBounds) == 0:
-                result[ptIter] = self._call(point)
-            else:
-                result[ptIter] = self.boundaryHandler(point,isInBounds)
+        #Evaluating all points at once. As in self._exp_boundary_handler, points
+        #out of bounds are also evaluated with self._call, before being scaled
+        isOutOfBounds = self._out_of_bounds(points)
+        result = self._call_vectorized(points)
+        if np.any(isOutOfBounds):
+            result[isOutOfBounds] = \
+                self.boundaryHandlerVectorized(points[isOutOfBounds],result[isOutOfBounds])
         
         result = self.post_eval(result)
         result = result.reshape(originalShape)
         
         return result
     
+    def value_and_gradient(self,points):
+        """
+        Interpolation and its gradient at coordinates, evaluated for all points
+        at once. Includes the chain rule through the symmetric extension,
+        the boundary handler, and the transform function.
+        
+        Parameters
+        ----------
+        points : ndarray
+            The coordinates to sample the gridded data at. Of shape
+            complexShape + (self.nDims,).
+            
+        Returns
+        -------
+        result : ndarray
+            The interpolated function evaluated at points. Is of shape complexShape.
+        gradient : ndarray
+            The gradient of result. Is of shape complexShape + (self.nDims,).
+        
+        """
+        originalShape = points.shape[:-1]
+        if originalShape == ():
+            originalShape = (1,)
+        
+        if points.shape[-1] != self.nDims:
+            raise ValueError("The requested sample points have dimension "
+                             "%d, but this NDInterpWithBoundary expects "
+                             "dimension %d" % (points.shape[-1], self.nDims))
+        
+        points = points.reshape((-1,self.nDims)).copy()
+        
+        #Dealing with symmetric extension. The derivative of abs is the sign
+        symmSign = np.ones(points.shape)
+        for dimIter in range(self.nDims):
+            if self.symmExtend[dimIter]:
+                symmSign[:,dimIter] = np.sign(points[:,dimIter])
+                points[:,dimIter] = np.abs(points[:,dimIter])
+        
+        isOutOfBounds = self._out_of_bounds(points)
+        
+        #As in self._exp_boundary_handler, points out of bounds are also evaluated
+        #with self._call, before being scaled
+        result, gradient = self._call_with_grad(points)
+        if np.any(isOutOfBounds):
+            result[isOutOfBounds], gradient[isOutOfBounds] = \
+                self.boundaryHandlerWithGrad(points[isOutOfBounds],result[isOutOfBounds],\
+                                             gradient[isOutOfBounds])
+        
+        gradient = self.post_eval_grad(result)[:,None] * gradient * symmSign
+        result = self.post_eval(result)
+        
+        return result.reshape(originalShape), gradient.reshape(originalShape+(self.nDims,))
+    
+    def _out_of_bounds(self,points):
+        """
+        Whether each point is outside of the grid region.
+
+        Parameters
+        ----------
+        points : ndarray
+            Of shape (nPoints,self.nDims).
+
+        Returns
+        -------
+        ndarray of bools
+            Of shape (nPoints,).
+
+        """
+        return np.any((points < self.lowerBounds) | (points > self.upperBounds),axis=1)
+    
+    def gradient(self,points):
+        """
+        The gradient of the interpolated function. See self.value_and_gradient.
+
+        Parameters
+        ----------
+        points : ndarray
+            Of shape complexShape + (self.nDims,).
+
+        Returns
+        -------
+        gradient : ndarray
+            Of shape complexShape + (self.nDims,).
+
+        """
+        return self.value_and_gradient(points)[1]
+    
+    def grad(self,points):
+        """
+        Alias of self.gradient, so that the interpolator is used by the analytic
+        gradient protocol (see _has_analytic_grad).
+        """
+        return self.gradient(points)
+    
     def _call_2d(self,point):
         """
         Evaluates the RectBivariateSpline instance at a single point. Defined
@@ -1391,6 +2576,115 @@ class NDInterpWithBoundary:
         
         return value
     
+    def _call_2d_vectorized(self,points):
+        """
+        Evaluates the RectBivariateSpline instance at several points at once.
+
+        Parameters
+        ----------
+        points : ndarray
+            Of shape (nPoints,2).
+
+        Returns
+        -------
+        ndarray
+            Of shape (nPoints,).
+
+        """
+        return self.rbv(points[:,0],points[:,1],grid=False)
+    
+    def _call_nd_vectorized(self,points):
+        """
+        Repeated linear interpolation at several points at once. See self._call_nd.
+
+        Parameters
+        ----------
+        points : ndarray
+            Of shape (nPoints,self.nDims).
+
+        Returns
+        -------
+        value : ndarray
+            Of shape (nPoints,).
+
+        """
+        indices, normDistances = self._find_indices(points.T)
+        
+        value = np.zeros(points.shape[0])
+        #Each edge is the lower (0) or upper (1) neighbor in every dimension
+        for edge in itertools.product(*(self.nDims*[[0,1]])):
+            weight = 1.
+            for (e,yi) in zip(edge,normDistances):
+                weight = weight * (yi if e else 1 - yi)
+            value += weight * self.gridVals[tuple(i + e for (i,e) in zip(indices,edge))]
+        
+        return value
+    
+    def _call_2d_with_grad(self,points):
+        """
+        Evaluates the RectBivariateSpline instance, and its first derivatives,
+        at several points.
+
+        Parameters
+        ----------
+        points : ndarray
+            Of shape (nPoints,2).
+
+        Returns
+        -------
+        value : ndarray
+            Of shape (nPoints,).
+        gradient : ndarray
+            Of shape (nPoints,2).
+
+        """
+        x, y = points[:,0], points[:,1]
+        value = self.rbv(x,y,grid=False)
+        gradient = np.array([self.rbv(x,y,dx=1,grid=False),\
+                             self.rbv(x,y,dy=1,grid=False)]).T
+        
+        #Outside of the grid, the spline is constant along the out-of-bounds
+        #coordinate, but its derivative is extrapolated
+        gradient[(points < self.lowerBounds) | (points > self.upperBounds)] = 0.
+        return value, gradient
+    
+    def _call_nd_with_grad(self,points):
+        """
+        Repeated linear interpolation, and its gradient, at several points.
+        See self._call_nd.
+
+        Parameters
+        ----------
+        points : ndarray
+            Of shape (nPoints,self.nDims).
+
+        Returns
+        -------
+        value : ndarray
+            Of shape (nPoints,).
+        gradient : ndarray
+            Of shape (nPoints,self.nDims).
+
+        """
+        indices, normDistances = self._find_indices(points.T)
+        spacings = np.array([grid[i+1] - grid[i] for (grid,i) in zip(self.gridPoints,indices)])
+        
+        value = np.zeros(points.shape[0])
+        gradient = np.zeros(points.shape)
+        
+        #Each edge is the lower (0) or upper (1) neighbor in every dimension
+        for edge in itertools.product(*(self.nDims*[[0,1]])):
+            factors = np.array([yi if e else 1 - yi for (e,yi) in zip(edge,normDistances)])
+            factorGrads = np.array([(1. if e else -1.)/h for (e,h) in zip(edge,spacings)])
+            gridVal = self.gridVals[tuple(i + e for (i,e) in zip(indices,edge))]
+            
+            value += np.prod(factors,axis=0) * gridVal
+            for dimIter in range(self.nDims):
+                otherFactors = np.prod(np.delete(factors,dimIter,axis=0),axis=0)
+                gradient[:,dimIter] += otherFactors * factorGrads[dimIter] * gridVal
+        
+        return value, gradient
+    
     def _find_indices(self,points):
         """
         Finds indices of nearest gridpoint, utilizing the regularity of the grid.
@@ -1505,6 +2799,66 @@ class NDInterpWithBoundary:
         result = valAtNearest*np.exp(np.sqrt(dist))
         return result
     
+    def _exp_boundary_handler_vectorized(self,points,valAtPoints):
+        """
+        Vectorized version of self._exp_boundary_handler. The nearest allowed
+        point is the projection of each point onto the grid region.
+
+        Parameters
+        ----------
+        points : ndarray
+            Points that are out of bounds. Of shape (nPoints,self.nDims).
+        valAtPoints : ndarray
+            self._call evaluated at points. Of shape (nPoints,).
+
+        Returns
+        -------
+        result : ndarray
+            The scaled result. Of shape (nPoints,).
+
+        """
+        nearestAllowed = np.clip(points,self.lowerBounds,self.upperBounds)
+        dist = np.linalg.norm(nearestAllowed-points,axis=1)
+        
+        #Yes, I mean to take an additional square root here
+        result = valAtPoints*np.exp(np.sqrt(dist))
+        return result
+    
+    def _exp_boundary_handler_with_grad(self,points,valAtPoints,gradAtPoints):
+        """
+        Vectorized version of self._exp_boundary_handler, which also scales the
+        gradient.
+
+        Parameters
+        ----------
+        points : ndarray
+            Points that are out of bounds. Of shape (nPoints,self.nDims).
+        valAtPoints : ndarray
+            self._call evaluated at points. Of shape (nPoints,).
+        gradAtPoints : ndarray
+            The gradient of self._call at points. Of shape (nPoints,self.nDims).
+
+        Returns
+        -------
+        result : ndarray
+            The scaled result. Of shape (nPoints,).
+        gradient : ndarray
+            The gradient of result. Of shape (nPoints,self.nDims).
+
+        """
+        nearestAllowed = np.clip(points,self.lowerBounds,self.upperBounds)
+        
+        diff = points - nearestAllowed
+        dist = np.linalg.norm(diff,axis=1)
+        scale = np.exp(np.sqrt(dist))
+        
+        #d(sqrt(dist))/dx = diff/(2 dist^(3/2)); dist > 0 out of bounds
+        gradOfScale = scale[:,None] * diff/(2*dist[:,None]**1.5)
+        
+        result = valAtPoints*scale
+        gradient = gradAtPoints*scale[:,None] + valAtPoints[:,None]*gradOfScale
+        return result, gradient
+    
     def _identity_transform_function(self,normalEvaluation):
         """
         Not sure if it's faster to have this dummy function in place, or to have
@@ -1527,6 +2881,12 @@ class NDInterpWithBoundary:
     def _smooth_abs_transform_function(self,normalEvaluation):
         return np.sqrt(normalEvaluation**2 + 10**(-4))
     
+    def _identity_transform_grad(self,normalEvaluation):
+        return np.ones(normalEvaluation.shape)
+    
+    def _smooth_abs_transform_grad(self,normalEvaluation):
+        return normalEvaluation/np.sqrt(normalEvaluation**2 + 10**(-4))
+    
 class PositiveSemidefInterpolator:
     def __init__(self,gridPoints,listOfVals,ndInterpKWargs={}):
         """
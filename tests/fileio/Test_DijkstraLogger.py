@@ -0,0 +1,82 @@
+from context import *
+
+import unittest
+import tempfile
+import warnings
+
+print("\nRunning "+os.path.relpath(__file__))
+
+class __init___(unittest.TestCase):
+    def setUp(self):
+        #DijkstraLogger writes to logs/ in the working directory
+        self.cwd = os.getcwd()
+        self.tmpDir = tempfile.TemporaryDirectory()
+        os.chdir(self.tmpDir.name)
+        
+        x1 = np.linspace(0,1,30)
+        x2 = np.linspace(0,1,25)
+        self.coordMeshTuple = np.meshgrid(x1,x2)
+        self.zz = self.coordMeshTuple[0] + 2*self.coordMeshTuple[1]
+        return None
+    
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmpDir.cleanup()
+        return None
+    
+    def _run(self,fName,loggerSettings):
+        dijkstra = Dijkstra(np.array([0.,0]),self.coordMeshTuple,self.zz,\
+                            allowedEndpoints=np.array([1.,1]),fName=fName,\
+                            loggerSettings=loggerSettings)
+        dijkstra()
+        return LoadDijkstraLogger("logs/"+fName+".djk")
+    
+    def test_default_settings(self):
+        log = self._run("default",{})
+        self.assertTrue(log.loggerSettings["writeGrids"])
+        #The potential is clipped below by the default trimVals
+        self.assertTrue(np.array_equal(log.potArr,np.clip(self.zz,10**(-4),None)))
+        return None
+    
+    def test_without_grids(self):
+        default = self._run("default",{})
+        log = self._run("compressed",{"writeGrids":False,"compression":"gzip",\
+                                      "shuffle":True})
+        self.assertIsNone(log.potArr)
+        self.assertIsNone(log.inertArr)
+        self.assertEqual(log.loggerSettings["compression"],"gzip")
+        
+        self.assertTrue(np.array_equal(log.tentativeDistance.data,\
+                                       default.tentativeDistance.data))
+        self.assertTrue(np.array_equal(log.previousIndsArr,default.previousIndsArr))
+        self.assertLess(os.path.getsize("logs/compressed.djk"),\
+                        os.path.getsize("logs/default.djk"))
+        return None
+    
+    def test_grid_store(self):
+        default = self._run("default",{})
+        logs = [self._run(fName,{"gridStore":"grids"}) for fName in ["run1","run2"]]
+        #One file each for potArr and inertArr, linked to from both logs
+        self.assertEqual(len(os.listdir("grids")),2)
+        for log in logs:
+            self.assertTrue(np.array_equal(log.potArr,default.potArr))
+            self.assertTrue(np.array_equal(log.inertArr,default.inertArr))
+        
+        #The links are relative to the log, so the two can be moved together
+        os.makedirs("moved/nested")
+        os.rename("logs","moved/nested/logs")
+        with self.assertRaises(ValueError):
+            LoadDijkstraLogger("moved/nested/logs/run1.djk")
+        os.rename("grids","moved/nested/grids")
+        log = LoadDijkstraLogger("moved/nested/logs/run1.djk")
+        self.assertTrue(np.array_equal(log.potArr,default.potArr))
+        return None
+    
+    def test_wrong_settings(self):
+        with self.assertRaises(ValueError):
+            self._run("log",{"compresion":"gzip"})
+        return None
+    
+if __name__ == "__main__":
+    warnings.simplefilter("default")
+    unittest.main()
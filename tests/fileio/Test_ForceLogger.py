@@ -0,0 +1,177 @@
+from context import *
+
+import unittest
+import tempfile
+import warnings
+
+print("\nRunning "+os.path.relpath(__file__))
+
+def pot(coords):
+    return coords[:,0]**2 + coords[:,1]**2
+
+class ForceLoggerTestCase(unittest.TestCase):
+    def setUp(self):
+        #ForceLogger writes to logs/ in the working directory
+        self.cwd = os.getcwd()
+        self.tmpDir = tempfile.TemporaryDirectory()
+        os.chdir(self.tmpDir.name)
+        
+        self.variablesList = []
+        for logIter in range(9):
+            variablesDict = {nm:np.random.rand(3,2) for nm in \
+                             ["points","tangents","springForce","netForce"]}
+            self.variablesList.append(variablesDict)
+        return None
+    
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmpDir.cleanup()
+        return None
+    
+    def _logger(self,logName,asyncWrite,**kwargs):
+        loggerSettings = {"logName":logName,"writeFreq":4,"asyncWrite":asyncWrite}
+        loggerSettings.update(kwargs)
+        lap = LeastActionPath(pot,3,2,logLevel=1,loggerSettings=loggerSettings)
+        return lap.logger
+    
+class __init___(ForceLoggerTestCase):
+    def test_wrong_variables(self):
+        with self.assertRaises(ValueError):
+            self._logger("log",False,variables=["points","energies"])
+        with self.assertRaises(ValueError):
+            self._logger("log",False,dtype={"tangents":"f8"},variables=["points"])
+        return None
+    
+class log_(ForceLoggerTestCase):
+    def test_async_matches_sync(self):
+        for asyncWrite in [False,True]:
+            logger = self._logger(str(asyncWrite),asyncWrite)
+            for variablesDict in self.variablesList:
+                logger.log(variablesDict)
+            logger.flush()
+            logger.write_runtime(1.)
+            logger.close()
+            
+        syncLog = LoadForceLogger("logs/False.lap")
+        asyncLog = LoadForceLogger("logs/True.lap")
+        for nm in self.variablesList[0]:
+            self.assertTrue(np.array_equal(getattr(syncLog,nm),getattr(asyncLog,nm)))
+        self.assertEqual(asyncLog.runTime,1.)
+        
+        return None
+    
+    def test_async_keeps_file_open(self):
+        logger = self._logger("log",True)
+        for variablesDict in self.variablesList[:4]:
+            logger.log(variablesDict)
+        
+        writer = logger.writer
+        for variablesDict in self.variablesList[4:]:
+            logger.log(variablesDict)
+        self.assertIs(logger.writer,writer)
+        
+        logger.close()
+        self.assertIsNone(logger.writer)
+        return None
+    
+    def test_settings_round_trip(self):
+        logger = self._logger("log",False,variables=["points","netForce"],\
+                              dtype={"points":"f8"},compression="gzip",\
+                              compressionOpts=4,shuffle=True)
+        for variablesDict in self.variablesList:
+            logger.log(variablesDict)
+        logger.flush()
+        logger.close()
+        
+        log = LoadForceLogger("logs/log.lap")
+        self.assertFalse(hasattr(log,"tangents"))
+        self.assertEqual(log.points.dtype,np.float64)
+        self.assertEqual(log.netForce.dtype,np.float32)
+        expected = np.array([variablesDict["points"] for variablesDict in \
+                             self.variablesList])
+        self.assertTrue(np.array_equal(log.points,expected))
+        
+        self.assertEqual(log.loggerSettings["variables"],["points","netForce"])
+        self.assertEqual(log.loggerSettings["compression"],"gzip")
+        self.assertEqual(log.loggerSettings["compressionOpts"],4)
+        self.assertTrue(log.loggerSettings["shuffle"])
+        return None
+    
+    def test_stride(self):
+        for asyncWrite in [False,True]:
+            logger = self._logger(str(asyncWrite),asyncWrite,stride=3)
+            for variablesDict in self.variablesList:
+                logger.log(variablesDict)
+            logger.flush()
+            logger.close()
+            
+            log = LoadForceLogger("logs/"+str(asyncWrite)+".lap")
+            self.assertTrue(np.array_equal(log.loggedIters,[0,3,6]))
+            expected = np.array([self.variablesList[i]["points"] for i in [0,3,6]])
+            self.assertTrue(np.allclose(log.points,expected))
+        return None
+    
+class flush_(ForceLoggerTestCase):
+    def test_partial_chunk(self):
+        #Chunks of 4 are written by log; flush writes the rest
+        for (nLogged,asyncWrite) in [(7,False),(7,True),(8,False),(8,True)]:
+            logger = self._logger("log"+str(nLogged)+str(asyncWrite),asyncWrite)
+            for variablesDict in self.variablesList[:nLogged]:
+                logger.log(variablesDict)
+            logger.flush()
+            
+            h5File = h5py.File(logger.fileName,"r")
+            points = np.array(h5File["points"])
+            h5File.close()
+            logger.close()
+            
+            expected = np.array([variablesDict["points"] for variablesDict in \
+                                 self.variablesList[:nLogged]])
+            self.assertTrue(np.allclose(points,expected))
+            
+        return None
+    
+class resume_(ForceLoggerTestCase):
+    def test_same_log_name(self):
+        logger = self._logger("log",False)
+        for variablesDict in self.variablesList[:6]:
+            logger.log(variablesDict)
+        logger.flush()
+        
+        #A new logger with the same name does not overwrite the log before resuming
+        logger = self._logger("log",False)
+        logger.resume("logs/log.lap",6)
+        for variablesDict in self.variablesList[6:]:
+            logger.log(variablesDict)
+        logger.flush()
+        
+        log = LoadForceLogger("logs/log.lap")
+        expected = np.array([variablesDict["points"] for variablesDict in \
+                             self.variablesList])
+        self.assertTrue(np.allclose(log.points,expected))
+        return None
+    
+    def test_rows_not_written(self):
+        #The datasets are created with writeFreq rows, but none are written
+        logger = self._logger("log",False)
+        logger.write_runtime(1.)
+        
+        with self.assertRaises(ValueError):
+            self._logger("other",False).resume("logs/log.lap",2)
+        return None
+    
+class close_(ForceLoggerTestCase):
+    def test_reraises_write_errors(self):
+        logger = self._logger("log",True)
+        logger.write_runtime(1.)
+        logger.write_early_stop_params({"nStabIters":10})
+        #The group already exists; the error is raised on the writer's thread
+        logger.write_early_stop_params({"nStabIters":10})
+        with self.assertRaises(ValueError):
+            logger.close()
+        return None
+    
+if __name__ == "__main__":
+    warnings.simplefilter("default")
+    warnings.filterwarnings("ignore",message=".*should_run_async.*")
+    unittest.main()
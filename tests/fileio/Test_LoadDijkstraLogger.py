@@ -0,0 +1,67 @@
+from context import *
+
+import unittest
+import tempfile
+import warnings
+
+print("\nRunning "+os.path.relpath(__file__))
+
+class __init___(unittest.TestCase):
+    def setUp(self):
+        #DijkstraLogger writes to logs/ in the working directory
+        self.cwd = os.getcwd()
+        self.tmpDir = tempfile.TemporaryDirectory()
+        os.chdir(self.tmpDir.name)
+        
+        x1 = np.linspace(0,1,30)
+        x2 = np.linspace(0,1,25)
+        coordMeshTuple = np.meshgrid(x1,x2)
+        zz = coordMeshTuple[0] + 2*coordMeshTuple[1]
+        allowedEndpoints = np.array([[1.,1],[1.,0.5]])
+        dijkstra = Dijkstra(np.array([0.,0]),coordMeshTuple,zz,\
+                            allowedEndpoints=allowedEndpoints,fName="log")
+        self.pathIndsDict = dijkstra(returnAll=True)[0]
+        #To compare with, without a log
+        self.dijkstra = Dijkstra(np.array([0.,0]),coordMeshTuple,zz,\
+                                 allowedEndpoints=allowedEndpoints,logLevel=0)
+        return None
+    
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmpDir.cleanup()
+        return None
+    
+    def test_lazy_matches_eager(self):
+        log = LoadDijkstraLogger("logs/log.djk")
+        with LoadDijkstraLogger("logs/log.djk",lazy=True) as lazyLog:
+            self.assertEqual(set(lazyLog.pathArrDict.keys()),set(log.pathArrDict.keys()))
+            for (key,path) in log.pathArrDict.items():
+                self.assertTrue(np.array_equal(lazyLog.pathArrDict[key],path))
+            self.assertEqual(dict(lazyLog.allPathsIndsDict),log.allPathsIndsDict)
+            
+            self.assertTrue(np.array_equal(lazyLog.potArr[3],log.potArr[3]))
+            self.assertTrue(np.array_equal(np.array(lazyLog.previousIndsArr),\
+                                           log.previousIndsArr))
+            tentativeDistance = lazyLog.tentativeDistance[()]
+            self.assertTrue(np.array_equal(tentativeDistance.mask,log.tentativeDistance.mask))
+            self.assertTrue(np.ma.allequal(tentativeDistance,log.tentativeDistance))
+            
+        self.assertIsNone(lazyLog.h5File)
+        return None
+    
+    def test_paths_from_predecessors(self):
+        _, previousIndsArr, _ = self.dijkstra._construct_path_dict()
+        allPathsIndsDict = self.dijkstra._get_paths(previousIndsArr)
+        for lazy in [False,True]:
+            with LoadDijkstraLogger("logs/log.djk",lazy=lazy) as log:
+                self.assertEqual(log.previousFlatInds.dtype,np.int32)
+                self.assertTrue(np.array_equal(np.array(log.previousIndsArr),previousIndsArr))
+                self.assertTrue(np.array_equal(log.previousIndsArr[2:4],previousIndsArr[2:4]))
+                self.assertEqual(dict(log.allPathsIndsDict),allPathsIndsDict)
+                
+        self.assertEqual(sorted(allPathsIndsDict.values()),sorted(self.pathIndsDict.values()))
+        return None
+    
+if __name__ == "__main__":
+    warnings.simplefilter("default")
+    unittest.main()
@@ -0,0 +1,58 @@
+from context import *
+
+import unittest
+import tempfile
+import warnings
+
+print("\nRunning "+os.path.relpath(__file__))
+
+def pot(coords):
+    return coords[:,0]**2 + coords[:,1]**2
+
+class __init___(unittest.TestCase):
+    def setUp(self):
+        #ForceLogger writes to logs/ in the working directory
+        self.cwd = os.getcwd()
+        self.tmpDir = tempfile.TemporaryDirectory()
+        os.chdir(self.tmpDir.name)
+        
+        lap = LeastActionPath(pot,3,2,logLevel=1,\
+                              loggerSettings={"logName":"log","writeFreq":4})
+        self.points = np.random.rand(9,3,2)
+        for points in self.points:
+            lap.logger.log({nm:points for nm in ["points","tangents","springForce",\
+                                                 "netForce"]})
+        lap.logger.flush()
+        lap.logger.write_runtime(1.)
+        lap.logger.close()
+        return None
+    
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmpDir.cleanup()
+        return None
+    
+    def test_lazy_matches_eager(self):
+        log = LoadForceLogger("logs/log.lap")
+        with LoadForceLogger("logs/log.lap",lazy=True) as lazyLog:
+            self.assertEqual(lazyLog.points.shape,(9,3,2))
+            self.assertTrue(np.array_equal(lazyLog.points[2:5],log.points[2:5]))
+            self.assertTrue(np.array_equal(np.array(lazyLog.points),log.points))
+            self.assertTrue(np.array_equal(lazyLog.points.final,log.points[-1]))
+            self.assertEqual(lazyLog.runTime,log.runTime)
+            
+        self.assertIsNone(lazyLog.h5File)
+        self.assertTrue(np.allclose(log.points,self.points))
+        return None
+    
+    def test_eager_closes_file(self):
+        log = LoadForceLogger("logs/log.lap")
+        self.assertIsNone(log.h5File)
+        #The file can be written to again
+        h5File = h5py.File("logs/log.lap","a")
+        h5File.close()
+        return None
+    
+if __name__ == "__main__":
+    warnings.simplefilter("default")
+    unittest.main()
@@ -0,0 +1,140 @@
+from context import *
+
+import unittest
+import warnings
+
+print("\nRunning "+os.path.relpath(__file__))
+
+def pot(coords):
+    return (coords[:,0]**2 - 1)**2 + 2*coords[:,1]**2 + 0.3*coords[:,0]*coords[:,1]
+
+def initial_bands(nBands,nPts):
+    initialPoints = np.array([np.linspace([-1.,0.2*b],[1.,-0.1*b],nPts) for b in range(nBands)])
+    initialPoints[:,1:-1] += 0.3
+    return initialPoints
+
+class compute_batch_force_(unittest.TestCase):
+    def test_mep_matches_compute_force(self):
+        nBands, nPts, nDims = 3, 6, 2
+        mep = MinimumEnergyPath(pot,nPts,nDims,logLevel=0)
+        initialPoints = initial_bands(nBands,nPts)
+        
+        batchForce = mep.compute_batch_force(initialPoints)
+        correctForce = np.array([mep.compute_force(p) for p in initialPoints])
+        
+        self.assertIsNone(np.testing.assert_allclose(batchForce,correctForce))
+        return None
+    
+    def test_lap_matches_compute_force(self):
+        nBands, nPts, nDims = 3, 6, 2
+        lap = LeastActionPath(pot,nPts,nDims,logLevel=0)
+        initialPoints = initial_bands(nBands,nPts)
+        
+        batchForce = lap.compute_batch_force(initialPoints)
+        correctForce = np.array([lap.compute_force(p) for p in initialPoints])
+        
+        #Both use forward finite differences, with different perturbed terms
+        self.assertIsNone(np.testing.assert_allclose(batchForce,correctForce,atol=1e-5))
+        return None
+    
+    def test_per_band_spring_constant(self):
+        nBands, nPts, nDims = 2, 6, 2
+        kArr = np.array([1.,5.])
+        mep = MinimumEnergyPath(pot,nPts,nDims,nebParams={"k":kArr},logLevel=0)
+        initialPoints = initial_bands(nBands,nPts)
+        
+        batchForce = mep.compute_batch_force(initialPoints)
+        for b in range(nBands):
+            singleMep = MinimumEnergyPath(pot,nPts,nDims,nebParams={"k":kArr[b]},logLevel=0)
+            correctForce = singleMep.compute_force(initialPoints[b])
+            self.assertIsNone(np.testing.assert_allclose(batchForce[b],correctForce))
+        
+        #Only the selected bands
+        batchForce = mep.compute_batch_force(initialPoints[1:],bandInds=np.array([1]))
+        singleMep = MinimumEnergyPath(pot,nPts,nDims,nebParams={"k":kArr[1]},logLevel=0)
+        self.assertIsNone(np.testing.assert_allclose(batchForce[0],\
+                                                     singleMep.compute_force(initialPoints[1])))
+        return None
+    
+    def test_wrong_shape(self):
+        mep = MinimumEnergyPath(pot,6,2,logLevel=0)
+        with self.assertRaises(ValueError):
+            mep.compute_batch_force(initial_bands(1,6)[0])
+        return None
+    
+class velocity_verlet_(unittest.TestCase):
+    def test_matches_single_bands(self):
+        nBands, nPts, nDims = 3, 6, 2
+        initialPoints = initial_bands(nBands,nPts)
+        
+        mep = MinimumEnergyPath(pot,nPts,nDims,logLevel=0)
+        minObj = BatchVerletMinimization(mep,initialPoints)
+        minObj.velocity_verlet(0.05,50)
+        
+        for b in range(nBands):
+            singleObj = VerletMinimization(mep,initialPoints[b])
+            singleObj.velocity_verlet(0.05,50)
+            self.assertIsNone(np.testing.assert_allclose(minObj.allPts[:,b],singleObj.allPts))
+        return None
+    
+class fire_(unittest.TestCase):
+    def test_local_matches_single_bands(self):
+        nBands, nPts, nDims = 3, 6, 2
+        initialPoints = initial_bands(nBands,nPts)
+        
+        mep = MinimumEnergyPath(pot,nPts,nDims,logLevel=0)
+        minObj = BatchVerletMinimization(mep,initialPoints)
+        tStepArr, alphaArr, stepsSinceReset, endsWithoutError = \
+            minObj.fire(0.05,100,earlyStop=False)
+        
+        for b in range(nBands):
+            singleObj = VerletMinimization(mep,initialPoints[b])
+            singleTStep, singleAlpha, _, _ = singleObj.fire(0.05,100,earlyStop=False)
+            self.assertIsNone(np.testing.assert_allclose(minObj.allPts[:,b],singleObj.allPts))
+            self.assertIsNone(np.testing.assert_allclose(tStepArr[:,b],singleTStep))
+            self.assertIsNone(np.testing.assert_allclose(alphaArr[:,b],singleAlpha))
+        self.assertTrue(np.all(endsWithoutError))
+        return None
+    
+    def test_bands_stop_independently(self):
+        nBands, nPts, nDims = 3, 6, 2
+        initialPoints = initial_bands(nBands,nPts)
+        earlyStopParams = {"startCheckIter":20,"nStabIters":10,"checkFreq":10,"stabPerc":0.01}
+        
+        mep = MinimumEnergyPath(pot,nPts,nDims,logLevel=0)
+        #A band that is already converged stops at the first check
+        singleObj = VerletMinimization(mep,initialPoints[0])
+        singleObj.fire(0.05,500,earlyStop=False)
+        initialPoints[0] = singleObj.allPts[-1]
+        
+        minObj = BatchVerletMinimization(mep,initialPoints)
+        minObj.fire(0.05,100,earlyStopParams=earlyStopParams)
+        
+        self.assertEqual(minObj.stopIters[0],20)
+        self.assertTrue(np.all(minObj.stopIters[1:] > 20))
+        #Stopped bands are frozen at their final points
+        self.assertIsNone(np.testing.assert_array_equal(minObj.allPts[21:,0],\
+            np.broadcast_to(minObj.allPts[-1,0],minObj.allPts[21:,0].shape)))
+        return None
+    
+class fire2_(unittest.TestCase):
+    def test_global_matches_single_bands(self):
+        nBands, nPts, nDims = 3, 6, 2
+        initialPoints = initial_bands(nBands,nPts)
+        
+        mep = MinimumEnergyPath(pot,nPts,nDims,logLevel=0)
+        minObj = BatchVerletMinimization(mep,initialPoints)
+        minObj.fire2(0.05,50)
+        
+        for b in range(nBands):
+            singleObj = VerletMinimization(mep,initialPoints[b])
+            singleObj.fire2(0.05,50)
+            #Sums are taken in a different order than in the single-band loops
+            self.assertIsNone(np.testing.assert_allclose(minObj.allPts[:,b],singleObj.allPts,\
+                                                         rtol=1e-6,atol=1e-8))
+        return None
+    
+if __name__ == "__main__":
+    warnings.simplefilter("default")
+    warnings.filterwarnings("ignore",message=".*should_run_async.*")
+    unittest.main()
@@ -1,6 +1,7 @@
 from context import *
 
 import unittest
+import itertools
 import warnings
 
 print("\nRunning "+os.path.relpath(__file__))
@@ -33,20 +34,115 @@ class _construct_path_dict_(unittest.TestCase):
         
         dijkstra = Dijkstra(initialPoint,coordMeshTuple,zz,target_func=dist_func,\
                             allowedEndpoints=finalPoint,logLevel=0)
-        dist, visitDict, endptList = \
+        dist, previousIndsArr, endptList = \
             dijkstra._construct_path_dict()
         
         #Checked by hand
         correctDistances = np.array([[0.,1.],[0.5,2],[1.5,3.5]])
-        correctVisitDict = \
-            {(1,0):(0,0),(0,1):(0,0),(1,1):(0,1),(2,0):(1,0),(2,1):(1,1)}
+        correctPreviousInds = -1*np.ones((3,2,2),dtype=int)
+        for (key,val) in {(1,0):(0,0),(0,1):(0,0),(1,1):(0,1),(2,0):(1,0),(2,1):(1,1)}.items():
+            correctPreviousInds[key] = val
             
         self.assertIsNone(np.testing.assert_array_equal(correctDistances,dist.data))
-        self.assertDictEqual(visitDict,correctVisitDict)
+        self.assertIsNone(np.testing.assert_array_equal(previousIndsArr,correctPreviousInds))
         self.assertListEqual(endptList,[])
         
         return None
     
+    def test_stops_at_endpoint(self):
+        x1 = np.arange(10.)
+        x2 = np.arange(8.)
+        
+        coordMeshTuple = np.meshgrid(x1,x2)
+        zz = coordMeshTuple[0] + coordMeshTuple[1]
+        initialPoint = np.array([0.,0])
+        finalPoint = np.array([1.,1])
+        
+        dijkstra = Dijkstra(initialPoint,coordMeshTuple,zz,\
+                            allowedEndpoints=finalPoint,logLevel=0)
+        dist, previousIndsArr, endptList = \
+            dijkstra._construct_path_dict()
+        
+        #Far-away nodes are never visited
+        self.assertTrue(dist.mask[1,1])
+        self.assertFalse(dist.mask[-1,-1])
+        self.assertTrue(np.all(previousIndsArr[-1,-1] == -1))
+        self.assertListEqual(endptList,[])
+        
+        return None
+    
+    def test_matches_argmin_scan(self):
+        #Compares against the distances found by scanning the whole grid for
+        #the closest unvisited node, as was done prior to using a heap
+        def dist_func(coords,enegs,masses):
+            return (1+enegs[1])*np.linalg.norm(coords[1]-coords[0]), enegs, masses
+        
+        x1 = np.linspace(0,1,7)
+        x2 = np.linspace(0,1,6)
+        
+        coordMeshTuple = np.meshgrid(x1,x2)
+        zz = np.random.rand(*coordMeshTuple[0].shape)
+        initialPoint = np.array([0.,0])
+        finalPoint = np.array([1.,1])
+        
+        dijkstra = Dijkstra(initialPoint,coordMeshTuple,zz,target_func=dist_func,\
+                            allowedEndpoints=finalPoint,logLevel=0)
+        dist, _, _ = dijkstra._construct_path_dict()
+        
+        correctDist = np.ma.masked_array(np.full(zz.shape,np.inf),mask=False)
+        correctDist[0,0] = 0
+        relativeNeighborInds = list(itertools.product([-1,0,1],repeat=2))
+        relativeNeighborInds.remove((0,0))
+        while not np.all(correctDist.mask):
+            currentInds = np.unravel_index(np.argmin(correctDist),zz.shape)
+            for r in relativeNeighborInds:
+                n = tuple(np.array(currentInds) - np.array(r))
+                if min(n) < 0 or n[0] >= zz.shape[0] or n[1] >= zz.shape[1]:
+                    continue
+                coords = np.array([[c[currentInds] for c in coordMeshTuple],\
+                                   [c[n] for c in coordMeshTuple]])
+                d = correctDist.data[currentInds] + \
+                    dist_func(coords,np.array([zz[currentInds],zz[n]]),None)[0]
+                if d < correctDist.data[n]:
+                    correctDist.data[n] = d
+            correctDist[currentInds] = np.ma.masked
+        
+        self.assertIsNone(np.testing.assert_allclose(dist.data[-1,-1],\
+                                                     correctDist.data[-1,-1]))
+        
+        return None
+    
+    def test_weights_per_node(self):
+        #Weights computed as nodes are visited, rather than for the whole grid
+        def dist_func(coords,enegs,masses):
+            return (1+enegs[1])*np.linalg.norm(coords[1]-coords[0]), enegs, masses
+        
+        x1 = np.linspace(0,1,7)
+        x2 = np.linspace(0,1,6)
+        
+        coordMeshTuple = np.meshgrid(x1,x2)
+        zz = np.random.rand(*coordMeshTuple[0].shape)
+        inertArr = np.zeros(zz.shape+(2,2))
+        inertArr[...,0,0] = 1 + coordMeshTuple[1]**2
+        inertArr[...,1,1] = 2
+        inertArr[...,0,1] = 0.1*coordMeshTuple[0]
+        inertArr[...,1,0] = inertArr[...,0,1]
+        initialPoint = np.array([0.,0])
+        finalPoint = np.array([1.,1])
+        
+        for target_func in [TargetFunctions.action,dist_func]:
+            outputs = []
+            for maxWeightsMemory in [2**30,0]:
+                dijkstra = Dijkstra(initialPoint,coordMeshTuple,zz,inertArr=inertArr,\
+                                    target_func=target_func,allowedEndpoints=finalPoint,\
+                                    logLevel=0,maxWeightsMemory=maxWeightsMemory)
+                outputs.append(dijkstra._construct_path_dict())
+            
+            self.assertIsNone(np.testing.assert_allclose(outputs[0][0],outputs[1][0]))
+            self.assertIsNone(np.testing.assert_array_equal(outputs[0][1],outputs[1][1]))
+        
+        return None
+    
 class _get_paths_(unittest.TestCase):
     def test_2d_grid_two_endpoints(self):
         x1 = np.array([0.,1])
@@ -61,8 +157,10 @@ class _get_paths_(unittest.TestCase):
                        logLevel=0)
         
         #Taken from _construct_path_dict_.test_2d_grid
-        visitDict = {(1,0):(0,0),(0,1):(0,0),(1,1):(0,1),(2,0):(1,0),(2,1):(1,1)}
-        allPaths = djk._get_paths(visitDict)
+        previousIndsArr = -1*np.ones((3,2,2),dtype=int)
+        for (key,val) in {(1,0):(0,0),(0,1):(0,0),(1,1):(0,1),(2,0):(1,0),(2,1):(1,1)}.items():
+            previousIndsArr[key] = val
+        allPaths = djk._get_paths(previousIndsArr)
         
         correctPaths = {(2,0):[(0,0),(1,0),(2,0)],\
                         (2,1):[(0,0),(0,1),(1,1),(2,1)]}
@@ -83,9 +83,161 @@ class _select_prior_points_(unittest.TestCase):
         correctNewDistArr[2,1] = 2.401270497049426
         
         self.assertIsNone(np.testing.assert_allclose(newDistArr,correctNewDistArr))
+
+        return None
+
+    def test_3d_grid_with_inertia(self):
+        x1 = np.linspace(0,1,4)
+        x2 = np.linspace(0,1,3)
+        x3 = np.linspace(-1,1,5)
+
+        coordMeshTuple = np.meshgrid(x1,x2,x3)
+        zz = 1 + coordMeshTuple[0] + coordMeshTuple[1]**2 + np.cos(coordMeshTuple[2])
+        inertArr = np.zeros(zz.shape+(3,3))
+        inertArr[...,0,0] = 1 + coordMeshTuple[2]**2
+        inertArr[...,1,1] = 2
+        inertArr[...,2,2] = 1
+        inertArr[...,0,2] = 0.3*coordMeshTuple[1]
+        inertArr[...,2,0] = inertArr[...,0,2]
+        initialPoint = np.array([0.,0,0])
+        finalPoint = np.array([1.,1,1])
+
+        dp = DynamicProgramming(initialPoint,coordMeshTuple,zz,inertArr=inertArr,\
+                                allowedEndpoints=finalPoint,logLevel=0,chunkSize=7)
+
+        previousIndsArr = -1*np.ones(zz.shape+(3,),dtype=int)
+        distArr = np.inf*np.ones(zz.shape)
+        distArr[:,1] = np.arange(15).reshape((3,5))
+        currentIdx = 2
+
+        correctIndsArr = previousIndsArr.copy()
+        correctDistArr = distArr.copy()
+
+        newIndsArr, newDistArr = dp._select_prior_points(currentIdx,previousIndsArr,distArr)
+
+        #One pair at a time
+        for idx in dp._gen_slice_inds(currentIdx):
+            for p in dp._gen_slice_inds(currentIdx-1):
+                coords = np.array([[c[p] for c in dp.coordMeshTuple],\
+                                   [c[idx] for c in dp.coordMeshTuple]])
+                enegs = np.array([dp.potArr[p],dp.potArr[idx]])
+                masses = np.array([dp.inertArr[p],dp.inertArr[idx]])
+                tentDist = correctDistArr[p] + TargetFunctions.action(coords,enegs,masses)[0]
+                if tentDist < correctDistArr[idx]:
+                    correctIndsArr[idx] = p
+                    correctDistArr[idx] = tentDist
+
+        self.assertIsNone(np.testing.assert_array_equal(newIndsArr,correctIndsArr))
+        self.assertIsNone(np.testing.assert_allclose(newDistArr,correctDistArr))
+
+        return None
+
+    def test_allowed_mask_and_infinite_energy(self):
+        x1 = np.array([0.,0.3,0.6,1])
+        x2 = np.array([0.,0.5,1])
+
+        coordMeshTuple = np.meshgrid(x1,x2)
+        zz = coordMeshTuple[0] + 2*coordMeshTuple[1] #Is x+2y
+        zz[2,1] = np.inf
+        allowedMask = np.ones(zz.shape,dtype=bool)
+        allowedMask[1,1] = False
+        initialPoint = np.array([0.,0])
+        finalPoint = np.array([1.,1])
+
+        dp = DynamicProgramming(initialPoint,coordMeshTuple,zz,allowedMask=allowedMask,\
+                                allowedEndpoints=finalPoint,logLevel=0)
+
+        previousIndsArr = -1*np.ones(zz.shape+(2,),dtype=int)
+        distArr = np.inf*np.ones(zz.shape)
+        distArr[:,1] = [1.,0.,0.]
+
+        newIndsArr, newDistArr = dp._select_prior_points(2,previousIndsArr,distArr)
+
+        #Every point in slice 2 comes from (0,1), the only allowed point with
+        #finite energy in slice 1
+        self.assertTrue(np.all(newIndsArr[:,2] == [0,1]))
+        self.assertTrue(np.all(newDistArr[:,2] > 1))
+
+        #Neither the disallowed point nor the infinite-energy point is updated
+        previousIndsArr = -1*np.ones(zz.shape+(2,),dtype=int)
+        distArr = np.inf*np.ones(zz.shape)
+        distArr[dp.initialInds] = 0
+
+        newIndsArr, newDistArr = dp._select_prior_points(1,previousIndsArr,distArr)
+        self.assertIsNone(np.testing.assert_array_equal(newIndsArr[0,1],[0,0]))
+        self.assertIsNone(np.testing.assert_array_equal(newIndsArr[1:,1],-1))
+        self.assertTrue(np.all(newDistArr[1:,1] == np.inf))
+
+        return None
+
+    def test_search_range(self):
+        x1 = np.linspace(0,1,5)
+        x2 = np.linspace(0,1,6)
+        x3 = np.linspace(-1,1,4)
+        
+        coordMeshTuple = np.meshgrid(x1,x2,x3)
+        zz = 1 + np.sin(3*coordMeshTuple[1])*coordMeshTuple[2]**2
+        initialPoint = np.array([0.,0,-1])
+        finalPoint = np.array([1.,1,1])
+        
+        dp = DynamicProgramming(initialPoint,coordMeshTuple,zz,\
+                                allowedEndpoints=finalPoint,logLevel=0)
+        
+        previousIndsArr = -1*np.ones(zz.shape+(3,),dtype=int)
+        distArr = np.inf*np.ones(zz.shape)
+        distArr[:,1] = np.random.rand(6,4)
+        currentIdx = 2
+        
+        fullIndsArr, fullDistArr = \
+            dp._select_prior_points(currentIdx,previousIndsArr.copy(),distArr.copy())
+        
+        #A window covering the whole slice is the same as no window
+        windowIndsArr, windowDistArr = \
+            dp._select_prior_points(currentIdx,previousIndsArr.copy(),distArr.copy(),\
+                                    searchRange=10)
+        self.assertIsNone(np.testing.assert_array_equal(windowIndsArr,fullIndsArr))
+        self.assertIsNone(np.testing.assert_array_equal(windowDistArr,fullDistArr))
+        
+        #Otherwise, the previous point is the best one in the window
+        searchRange = [1,2]
+        windowIndsArr, windowDistArr = \
+            dp._select_prior_points(currentIdx,previousIndsArr.copy(),distArr.copy(),\
+                                    searchRange=searchRange)
+        for idx in dp._gen_slice_inds(currentIdx):
+            correctDist = np.inf
+            for p in dp._gen_slice_inds(currentIdx-1):
+                if abs(p[0]-idx[0]) > searchRange[0] or abs(p[2]-idx[2]) > searchRange[1]:
+                    continue
+                coords = np.array([[c[p] for c in dp.coordMeshTuple],\
+                                   [c[idx] for c in dp.coordMeshTuple]])
+                enegs = np.array([dp.potArr[p],dp.potArr[idx]])
+                tentDist = distArr[p] + TargetFunctions.action(coords,enegs)[0]
+                if tentDist < correctDist:
+                    correctDist = tentDist
+                    correctInds = p
+            
+            self.assertEqual(tuple(windowIndsArr[idx]),correctInds)
+            self.assertAlmostEqual(windowDistArr[idx],correctDist)
         
         return None
     
+    def test_wrong_search_range_shape(self):
+        x1 = np.array([0.,0.3,0.6,1])
+        x2 = np.array([0.,0.5,1])
+        
+        coordMeshTuple = np.meshgrid(x1,x2)
+        zz = coordMeshTuple[0] + 2*coordMeshTuple[1] #Is x+2y
+        initialPoint = np.array([0.,0])
+        finalPoint = np.array([1.,1])
+        
+        dp = DynamicProgramming(initialPoint,coordMeshTuple,zz,\
+                                allowedEndpoints=finalPoint,logLevel=0)
+        
+        with self.assertRaises(ValueError):
+            dp(searchRange=[1,1])
+        
+        return None
+
 class __call___(unittest.TestCase):
     def test_larger_grid(self):
         def dist_func(coords,enegs,masses):
@@ -159,6 +311,38 @@ class __call___(unittest.TestCase):
         
         return None
     
+    def test_search_range(self):
+        def dist_func(coords,enegs,masses):
+            val = 0
+            for ptIter in range(1,coords.shape[0]):
+                val += np.sqrt(enegs[ptIter])*np.linalg.norm(coords[ptIter]-coords[ptIter-1])
+            
+            return val, enegs, masses
+        
+        x1 = np.array([0.,0.3,0.6,1])
+        x2 = np.array([0.,0.5,1])
+        
+        coordMeshTuple = np.meshgrid(x1,x2)
+        zz = coordMeshTuple[0] + 2*coordMeshTuple[1] #Is x+2y
+        initialPoint = np.array([0.,0])
+        finalPoint = np.array([1.,1])
+        
+        dp = DynamicProgramming(initialPoint,coordMeshTuple,zz,target_func=dist_func,\
+                                allowedEndpoints=finalPoint,logLevel=0)
+            
+        minIndsDict, minPathDict, distsDict = dp(searchRange=1)
+        
+        #Same as test_larger_grid, which only ever steps by one point in y
+        correctMinIndsDict = {tuple(finalPoint):[(0,0),(0,1),(1,2),(2,3)]}
+        self.assertEqual(minIndsDict,correctMinIndsDict)
+        self.assertAlmostEqual(distsDict[tuple(finalPoint)],2.0109339744759227)
+        
+        #Cannot reach y = 1 from y = 0 in three steps of zero
+        minIndsDict, minPathDict, distsDict = dp(searchRange=0)
+        self.assertEqual(distsDict[tuple(finalPoint)],np.inf)
+        
+        return None
+    
 if __name__ == "__main__":
     warnings.simplefilter("default")
     warnings.filterwarnings("ignore",message=".*should_run_async.*")
@@ -0,0 +1,213 @@
+from context import *
+
+import unittest
+import warnings
+
+print("\nRunning "+os.path.relpath(__file__))
+
+class _stencil_simplices_(unittest.TestCase):
+    def test_2d_stencil(self):
+        x = np.arange(3.)
+        coordMeshTuple = np.meshgrid(x,x)
+        zz = np.ones(coordMeshTuple[0].shape)
+        
+        fm = FastMarching(np.zeros(2),coordMeshTuple,zz,allowedEndpoints=np.array([2.,2]),\
+                          logLevel=0)
+        relativeNeighborInds, stencilSimplices = fm._stencil_simplices()
+        
+        self.assertEqual(relativeNeighborInds.shape,(8,2))
+        for (j,sList) in enumerate(stencilSimplices):
+            #Every offset is a vertex of its own
+            self.assertIsNone(np.testing.assert_array_equal(sList[0],[[j]]))
+            #The 8 triangles of the stencil share an edge with the axis offsets,
+            #and with the diagonal offsets
+            self.assertEqual(sList[1].shape,(2,2))
+            self.assertTrue(np.all(sList[1][:,0] == j))
+            for k in sList[1][:,1]:
+                self.assertEqual(np.abs(relativeNeighborInds[j]-relativeNeighborInds[k]).sum(),1)
+        
+        return None
+    
+    def test_3d_stencil(self):
+        x = np.arange(3.)
+        coordMeshTuple = np.meshgrid(x,x,x)
+        zz = np.ones(coordMeshTuple[0].shape)
+        
+        fm = FastMarching(np.zeros(3),coordMeshTuple,zz,allowedEndpoints=np.array([2.,2,2]),\
+                          logLevel=0)
+        relativeNeighborInds, stencilSimplices = fm._stencil_simplices()
+        
+        #The 48 faces of the Kuhn triangulation of the cube
+        nFaces = len(set(tuple(sorted(s)) for sList in stencilSimplices for s in sList[2].tolist()))
+        self.assertEqual(nFaces,48)
+        
+        return None
+
+class _simplex_action_(unittest.TestCase):
+    def test_matches_minimum_on_edge(self):
+        displacements = np.array([[[1.,0],[1.,1]]])
+        actionVals = np.array([[0.7,0.]])
+        speed = np.array([1.2])
+        inertArr = np.array([[[2.,0.5],[0.5,1]]])
+        
+        out = FastMarching._simplex_action(displacements,actionVals,speed,inertArr)
+        
+        mu = np.linspace(0,1,100001)
+        points = (1-mu)[:,None]*displacements[0,0] + mu[:,None]*displacements[0,1]
+        bruteForce = (1-mu)*actionVals[0,0] + mu*actionVals[0,1] + \
+            speed[0]*np.sqrt(np.einsum("ia,ab,ib->i",points,inertArr[0],points))
+        
+        #Inside of the edge
+        self.assertTrue(0 < np.argmin(bruteForce) < mu.size-1)
+        self.assertAlmostEqual(out[0],bruteForce.min(),places=8)
+        
+        return None
+    
+    def test_outside_simplex(self):
+        #The minimum is at the vertex with the lower action, not inside the edge
+        displacements = np.array([[[1.,0],[1.,1]]])
+        actionVals = np.array([[5.,0.]])
+        speed = np.array([1.])
+        
+        out = FastMarching._simplex_action(displacements,actionVals,speed,None)
+        
+        self.assertEqual(out[0],np.inf)
+        
+        return None
+
+class _march_(unittest.TestCase):
+    def test_constant_potential(self):
+        x = np.linspace(0,1,41)
+        coordMeshTuple = np.meshgrid(x,x)
+        #sqrt(2V) = 1, so that the action is the distance
+        zz = 0.5*np.ones(coordMeshTuple[0].shape)
+        finalPoint = np.array([1.,0.6])
+        
+        fm = FastMarching(np.zeros(2),coordMeshTuple,zz,allowedEndpoints=finalPoint,\
+                          logLevel=0)
+        actionField, endptList = fm._march()
+        djkDist, _, _ = Dijkstra(np.zeros(2),coordMeshTuple,zz,allowedEndpoints=finalPoint,\
+                                 logLevel=0)._construct_path_dict()
+        
+        endptInds = fm.endpointIndices[0]
+        exact = np.linalg.norm(finalPoint)
+        self.assertListEqual(endptList,[])
+        self.assertLess(abs(actionField[endptInds]-exact),0.01)
+        self.assertLess(abs(actionField[endptInds]-exact),abs(djkDist.data[endptInds]-exact))
+        #Exact along the axes and the diagonals
+        self.assertIsNone(np.testing.assert_allclose(actionField[0,:21],x[:21],atol=10**(-12)))
+        self.assertIsNone(np.testing.assert_allclose(np.diag(actionField)[:21],\
+                                                     np.sqrt(2)*x[:21],atol=10**(-12)))
+        
+        return None
+    
+    def test_anisotropic_inertia(self):
+        x = np.linspace(0,1,41)
+        coordMeshTuple = np.meshgrid(x,x)
+        zz = 0.5*np.ones(coordMeshTuple[0].shape)
+        mass = np.array([[2.,0.5],[0.5,1]])
+        inertArr = np.broadcast_to(mass,zz.shape+(2,2))
+        finalPoint = np.array([1.,0.6])
+        
+        fm = FastMarching(np.zeros(2),coordMeshTuple,zz,inertArr=inertArr,\
+                          allowedEndpoints=finalPoint,logLevel=0)
+        actionField, endptList = fm._march()
+        
+        exact = np.sqrt(finalPoint @ mass @ finalPoint)
+        self.assertLess(abs(actionField[fm.endpointIndices[0]]-exact),0.01)
+        
+        return None
+    
+    def test_infinite_energy(self):
+        x = np.arange(5.)
+        coordMeshTuple = np.meshgrid(x,x)
+        zz = 0.5*np.ones(coordMeshTuple[0].shape)
+        #A wall along x = 2, with a gap at y = 4
+        zz[:4,2] = np.inf
+        
+        fm = FastMarching(np.zeros(2),coordMeshTuple,zz,allowedEndpoints=np.array([4.,0]),\
+                          logLevel=0)
+        actionField, endptList = fm._march()
+        
+        self.assertTrue(np.all(actionField[:4,2] == np.inf))
+        #Around the wall, which is longer than the straight line
+        self.assertGreater(actionField[0,4],4+2)
+        
+        return None
+    
+    def test_stops_at_endpoint(self):
+        x = np.arange(20.)
+        coordMeshTuple = np.meshgrid(x,x)
+        zz = 0.5*np.ones(coordMeshTuple[0].shape)
+        
+        fm = FastMarching(np.zeros(2),coordMeshTuple,zz,allowedEndpoints=np.array([2.,2]),\
+                          logLevel=0)
+        actionField, endptList = fm._march()
+        
+        #The endpoint and its neighbors
+        self.assertTrue(np.all(actionField[:4,:4] < np.inf))
+        self.assertTrue(np.all(actionField[10:,10:] == np.inf))
+        
+        return None
+
+class __call___(unittest.TestCase):
+    def test_straight_path(self):
+        x = np.linspace(0,1,41)
+        coordMeshTuple = np.meshgrid(x,x)
+        zz = 0.5*np.ones(coordMeshTuple[0].shape)
+        finalPoint = np.array([1.,0.6])
+        
+        fm = FastMarching(np.zeros(2),coordMeshTuple,zz,allowedEndpoints=finalPoint,\
+                          logLevel=0)
+        path, action = fm(nImages=20)
+        
+        self.assertEqual(path.shape,(20,2))
+        self.assertIsNone(np.testing.assert_array_equal(path[0],np.zeros(2)))
+        self.assertIsNone(np.testing.assert_allclose(path[-1],finalPoint))
+        #Distance from the straight line
+        self.assertLess(np.max(np.abs(path[:,1]-0.6*path[:,0])),0.02)
+        self.assertEqual(action,fm._march()[0][fm.endpointIndices[0]])
+        
+        return None
+    
+    def test_symmetric_barrier(self):
+        #The endpoint is where the paths on both sides of the barrier meet
+        x = np.linspace(-1,1,41)
+        coordMeshTuple = np.meshgrid(x,x)
+        zz = 0.1 + np.exp(-(coordMeshTuple[0]**2+coordMeshTuple[1]**2)/0.1)
+        finalPoint = np.array([1.,0])
+        
+        fm = FastMarching(np.array([-1.,0]),coordMeshTuple,zz,allowedEndpoints=finalPoint,\
+                          logLevel=0)
+        path, action = fm()
+        
+        def potential(coords):
+            return 0.1 + np.exp(-(coords[:,0]**2+coords[:,1]**2)/0.1)
+        pathAction, _, _ = TargetFunctions.action(path,potential)
+        
+        self.assertGreater(np.max(np.abs(path[:,1])),0.3)
+        self.assertLess(abs(pathAction-action),0.02*action)
+        
+        return None
+    
+    def test_return_all(self):
+        x = np.linspace(0,1,11)
+        coordMeshTuple = np.meshgrid(x,x)
+        zz = 0.5*np.ones(coordMeshTuple[0].shape)
+        allowedEndpoints = np.array([[1.,0.5],[0.3,1.]])
+        
+        fm = FastMarching(np.zeros(2),coordMeshTuple,zz,allowedEndpoints=allowedEndpoints,\
+                          logLevel=0)
+        pathArrDict, actionDict = fm(returnAll=True)
+        
+        self.assertEqual(len(pathArrDict),2)
+        for (endpt,path) in pathArrDict.items():
+            self.assertIsNone(np.testing.assert_allclose(path[-1],endpt))
+            self.assertLess(abs(actionDict[endpt]-np.linalg.norm(endpt)),0.02)
+        
+        return None
+    
+if __name__ == "__main__":
+    warnings.simplefilter("default")
+    warnings.filterwarnings("ignore",message=".*should_run_async.*")
+    unittest.main()
@@ -216,6 +216,57 @@ class compute_force_(unittest.TestCase):
         
         return None
     
+    def test_evaluation_cache(self):
+        nEvals = [0]
+        def pot(coordsArr):
+            nEvals[0] += coordsArr.shape[0]
+            return coordsArr[:,0]**2 + coordsArr[:,1]**2 + 1
+        
+        def mass(coordsArr):
+            return np.full((coordsArr.shape[0],2,2),np.identity(2)) + \
+                0.1*coordsArr[:,0,None,None]
+        
+        points = np.array([[0.,0],[1,1.5],[2,2.5],[3,3]])
+        
+        lap = LeastActionPath(pot,4,2,mass=mass,logLevel=0)
+        correctNetForce = lap.compute_force(points)
+        nUncached = nEvals[0]
+        
+        nEvals[0] = 0
+        cachedPot = EvaluationCache(pot)
+        cachedLap = LeastActionPath(cachedPot,4,2,mass=EvaluationCache(mass),logLevel=0)
+        netForce = cachedLap.compute_force(points)
+        
+        self.assertIsNone(np.testing.assert_array_equal(netForce,correctNetForce))
+        #The path, and one point per finite-difference step
+        self.assertEqual(nEvals[0],4+4*2)
+        self.assertLess(nEvals[0],nUncached)
+        
+        #Cleared on the next force evaluation
+        cachedLap.compute_force(points)
+        self.assertEqual(nEvals[0],2*(4+4*2))
+        return None
+    
+class shutdown_workers_(unittest.TestCase):
+    def test_shuts_down_executor(self):
+        def pot(coordsArr):
+            return coordsArr[:,0]**2 + coordsArr[:,1]**2 + 1
+        
+        def mass(coordsArr):
+            return np.full((coordsArr.shape[0],2,2),np.identity(2))
+        
+        executor = GradientExecutor(kind="thread",nWorkers=2)
+        lap = LeastActionPath(pot,4,2,mass=mass,logLevel=0,\
+                              target_func_grad=GradientApproximations(executor=executor).\
+                                  discrete_sqr_action_grad_mp)
+        
+        lap.compute_force(np.array([[0.,0],[1,1],[2,3],[3,3]]))
+        self.assertIsNotNone(executor.pool)
+        
+        lap.shutdown_workers()
+        self.assertIsNone(executor.pool)
+        return None
+    
 if __name__ == "__main__":
     warnings.simplefilter("ignore")
     unittest.main()
\ No newline at end of file
@@ -1,6 +1,7 @@
 from context import *
 
 import unittest
+import tempfile
 import warnings
 
 print("\nRunning "+os.path.relpath(__file__))
@@ -94,6 +95,28 @@ class velocity_verlet_(unittest.TestCase):
         
         return None
     
+    def test_shuts_down_workers(self):
+        def pot(coords):
+            return coords[:,0]**2 + 2*coords[:,1]**2 + 1
+        
+        def mass(coords):
+            return np.full((coords.shape[0],2,2),np.identity(2))
+        
+        executor = GradientExecutor(kind="thread",nWorkers=2)
+        lap = LeastActionPath(pot,4,2,mass=mass,logLevel=0,\
+                              target_func_grad=GradientApproximations(executor=executor).\
+                                  discrete_sqr_action_grad_mp)
+        
+        initialPoints = np.array([[0.,0.],[1.,2.],[2.,3],[3,3]])
+        
+        minObj = VerletMinimization(lap,initialPoints)
+        minObj.velocity_verlet(0.01,3)
+        
+        self.assertIsNone(executor.pool)
+        self.assertTrue(np.all(np.isfinite(minObj.allPts)))
+        
+        return None
+    
 class _local_fire_iter_(unittest.TestCase):
     def test_single_step(self):
         def pot(coords):
@@ -208,8 +231,334 @@ class _global_fire2_iter_(unittest.TestCase):
 
         return None
     
-# class fire_(unittest.TestCase):
-#     def 
+class fire_(unittest.TestCase):
+    def test_maxmove(self):
+        def pot(coords):
+            return coords[:,0]**2 + 2*coords[:,1]**2
+        
+        nPts = 5
+        nDims = 2
+        initialPoints = np.stack((np.linspace(-2,2,nPts),np.array([0.,3,-3,3,0]))).T
+        maxmove = np.array([0.05,0.02])
+        
+        for useLocal in [True,False]:
+            lap = LeastActionPath(pot,nPts,nDims,logLevel=0)
+            minObj = VerletMinimization(lap,initialPoints)
+            minObj.fire(0.5,20,fireParams={"maxmove":maxmove},useLocal=useLocal,\
+                        earlyStop=False)
+            
+            shifts = np.abs(np.diff(minObj.allPts[:-1],axis=0))
+            self.assertTrue(np.all(shifts <= maxmove*(1+10**(-12))))
+            #The largest shifts are clipped exactly onto maxmove
+            self.assertTrue(np.any(np.isclose(shifts,maxmove)))
+        
+        return None
+    
+    def test_storage(self):
+        def pot(coords):
+            return coords[:,0]**2 + 2*coords[:,1]**2
+        
+        nPts = 5
+        nDims = 2
+        initialPoints = np.stack((np.linspace(-2,2,nPts),np.array([0.,3,-3,3,0]))).T
+        
+        lap = LeastActionPath(pot,nPts,nDims,logLevel=0)
+        fullObj = VerletMinimization(lap,initialPoints)
+        fullObj.fire(0.1,30,earlyStop=False)
+        self.assertTrue(np.array_equal(fullObj.storedIters,np.arange(31)))
+        
+        for (storage,storedIters) in [("every",np.arange(0,31,7)),\
+                                      ("last",np.arange(27,31)),\
+                                      ("final",np.array([30]))]:
+            minObj = VerletMinimization(lap,initialPoints,storage=storage,\
+                                        storageParams={"freq":7,"nKeep":4})
+            minObj.fire(0.1,30,earlyStop=False)
+            
+            self.assertTrue(np.array_equal(minObj.storedIters,storedIters))
+            self.assertTrue(np.array_equal(minObj.allPts[:-1],fullObj.allPts[storedIters]))
+            self.assertTrue(np.array_equal(minObj.allPts[-1],fullObj.allPts[-1]))
+            self.assertTrue(np.array_equal(minObj.allVelocities,fullObj.allVelocities[storedIters]))
+            self.assertTrue(np.array_equal(minObj.allForces,fullObj.allForces[storedIters]))
+        
+        return None
+    
+    def test_storage_with_early_stop(self):
+        def pot(coords):
+            return coords[:,0]**2 + 2*coords[:,1]**2
+        
+        nPts = 5
+        nDims = 2
+        initialPoints = np.stack((np.linspace(-2,2,nPts),np.array([0.,3,-3,3,0]))).T
+        stopParams = {"stabPerc":0.1,"nStabIters":5,"checkFreq":5}
+        
+        lap = LeastActionPath(pot,nPts,nDims,logLevel=0)
+        fullObj = VerletMinimization(lap,initialPoints)
+        fullObj.fire(0.1,500,earlyStopParams=stopParams.copy())
+        nIters = len(fullObj.allVelocities)
+        self.assertTrue(nIters < 500)
+        
+        minObj = VerletMinimization(lap,initialPoints,storage="last",\
+                                    storageParams={"nKeep":2})
+        minObj.fire(0.1,500,earlyStopParams=stopParams.copy())
+        
+        self.assertTrue(np.array_equal(minObj.storedIters,np.arange(nIters-2,nIters)))
+        self.assertTrue(np.array_equal(minObj.allPts[:-1],fullObj.allPts[nIters-2:nIters]))
+        self.assertTrue(np.array_equal(minObj.allPts[-1],fullObj.allPts[-1]))
+        self.assertTrue(np.array_equal(minObj.allVelocities,fullObj.allVelocities[-2:]))
+        
+        return None
+    
+class iterate_fire_(unittest.TestCase):
+    def test_matches_fire(self):
+        def pot(coords):
+            return coords[:,0]**2 + 2*coords[:,1]**2
+        
+        nPts = 5
+        nDims = 2
+        initialPoints = np.stack((np.linspace(-2,2,nPts),np.array([0.,3,-3,3,0]))).T
+        
+        for useLocal in [True,False]:
+            lap = LeastActionPath(pot,nPts,nDims,logLevel=0)
+            fullObj = VerletMinimization(lap,initialPoints)
+            tStepArr, alphaArr, _, _ = fullObj.fire(0.1,30,useLocal=useLocal,earlyStop=False)
+            
+            minObj = VerletMinimization(lap,initialPoints)
+            states = list(minObj.iterate_fire(0.1,30,useLocal=useLocal))
+            
+            self.assertEqual([state["step"] for state in states],list(range(1,31)))
+            self.assertTrue(np.array_equal(np.array([state["points"] for state in states]),\
+                                           fullObj.allPts[1:-1]))
+            self.assertTrue(np.array_equal(np.array([state["tStep"] for state in states]),\
+                                           tStepArr[1:]))
+            self.assertTrue(np.array_equal(np.array([state["alpha"] for state in states]),\
+                                           alphaArr[1:]))
+            self.assertTrue(np.array_equal(states[-1]["forceNorm"],\
+                                           np.linalg.norm(fullObj.allForces[-1])))
+            self.assertEqual(states[-1]["action"],\
+                             TargetFunctions.action(fullObj.allPts[-2],pot,None)[0])
+            
+            self.assertTrue(np.array_equal(minObj.storedIters,[30]))
+            self.assertTrue(np.array_equal(minObj.allVelocities,fullObj.allVelocities[-1:]))
+        
+        return None
+    
+    def test_caller_stops(self):
+        def pot(coords):
+            return coords[:,0]**2 + 2*coords[:,1]**2
+        
+        nPts = 5
+        nDims = 2
+        initialPoints = np.stack((np.linspace(-2,2,nPts),np.array([0.,3,-3,3,0]))).T
+        
+        lap = LeastActionPath(pot,nPts,nDims,logLevel=0)
+        minObj = VerletMinimization(lap,initialPoints)
+        for state in minObj.iterate_fire(0.1,fire2=True,computeAction=False):
+            self.assertIsNone(state["action"])
+            if state["step"] == 300:
+                break
+        
+        self.assertTrue(np.array_equal(minObj.storedIters,[300]))
+        self.assertTrue(np.array_equal(minObj.allPts[0],state["points"]))
+        
+        return None
+    
+class InterruptedPotential:
+    """
+    Raises a RuntimeError on call number failAt, as if the run were killed.
+    """
+    def __init__(self,failAt=None):
+        self.nCalls = 0
+        self.failAt = failAt
+        
+    def __call__(self,coords):
+        self.nCalls += 1
+        if self.nCalls == self.failAt:
+            raise RuntimeError("Interrupted")
+        return coords[:,0]**2 + 2*coords[:,1]**2 + 0.3*np.sin(3*coords[:,0])
+    
+class _resume_(unittest.TestCase):
+    def setUp(self):
+        #ForceLogger writes to logs/ in the working directory
+        self.cwd = os.getcwd()
+        self.tmpDir = tempfile.TemporaryDirectory()
+        os.chdir(self.tmpDir.name)
+        
+        nPts = 5
+        self.initialPoints = np.stack((np.linspace(-2,2,nPts),np.array([0.,3,-3,2,0]))).T
+        
+        pot = InterruptedPotential()
+        LeastActionPath(pot,nPts,2,logLevel=0).compute_force(self.initialPoints)
+        self.callsPerForce = pot.nCalls
+        return None
+    
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmpDir.cleanup()
+        return None
+    
+    def _interrupted_run(self,method,nForces,minObjKwargs={},loggerSettings=None,**kwargs):
+        pot = InterruptedPotential(failAt=nForces*self.callsPerForce+1)
+        if loggerSettings is None:
+            lap = LeastActionPath(pot,5,2,logLevel=0)
+        else:
+            lap = LeastActionPath(pot,5,2,logLevel=1,loggerSettings=loggerSettings)
+        minObj = VerletMinimization(lap,self.initialPoints,**minObjKwargs)
+        #The RuntimeError is not reraised, as the methods return in their finally block
+        getattr(minObj,method)(**kwargs)
+        self.assertEqual(pot.nCalls,pot.failAt)
+        return None
+    
+    def test_fire_from_checkpoint(self):
+        runKwargs = {"tStep":0.1,"maxIters":40,"useLocal":True,"earlyStop":False}
+        for storage in ["full","last"]:
+            refObj = VerletMinimization(LeastActionPath(InterruptedPotential(),5,2,logLevel=0),\
+                                        self.initialPoints,storage=storage)
+            refObj.fire(**runKwargs)
+            
+            checkpointParams = {"fileName":"checkpoint.h5","freq":10}
+            self._interrupted_run("fire",25,{"checkpointParams":checkpointParams},**runKwargs)
+            
+            pot = InterruptedPotential()
+            minObj = VerletMinimization(LeastActionPath(pot,5,2,logLevel=0),self.initialPoints,\
+                                        storage=storage)
+            minObj.fire(resumeFrom="checkpoint.h5",**runKwargs)
+            
+            #Resumed after iteration 20
+            self.assertEqual(pot.nCalls,20*self.callsPerForce)
+            for nm in ["allPts","allVelocities","allForces"]:
+                self.assertTrue(np.array_equal(getattr(minObj,nm),getattr(refObj,nm)))
+        
+        return None
+    
+    def test_velocity_verlet_from_checkpoint(self):
+        runKwargs = {"tStep":0.02,"maxIters":40,"dampingParameter":0.1}
+        refObj = VerletMinimization(LeastActionPath(InterruptedPotential(),5,2,logLevel=0),\
+                                    self.initialPoints)
+        refObj.velocity_verlet(**runKwargs)
+        
+        checkpointParams = {"fileName":"checkpoint.h5","freq":10}
+        self._interrupted_run("velocity_verlet",25,{"checkpointParams":checkpointParams},\
+                              **runKwargs)
+        
+        minObj = VerletMinimization(LeastActionPath(InterruptedPotential(),5,2,logLevel=0),\
+                                    self.initialPoints,checkpointParams=checkpointParams)
+        minObj.velocity_verlet(resumeFrom="checkpoint.h5",**runKwargs)
+        
+        self.assertTrue(np.array_equal(minObj.allPts,refObj.allPts))
+        #The resumed run keeps writing to the same checkpoint
+        h5File = h5py.File("checkpoint.h5","r")
+        self.assertEqual(h5File.attrs["step"],40)
+        self.assertTrue(np.array_equal(h5File["allVelocities"],refObj.allVelocities))
+        h5File.close()
+        
+        return None
+    
+    def test_from_log(self):
+        runKwargs = {"tStep":0.1,"maxIters":40,"useLocal":False,"earlyStop":False}
+        refObj = VerletMinimization(LeastActionPath(InterruptedPotential(),5,2,logLevel=0),\
+                                    self.initialPoints)
+        refObj.fire(**runKwargs)
+        
+        self._interrupted_run("fire",25,loggerSettings={"logName":"run","writeFreq":7},\
+                              **runKwargs)
+        
+        pot = InterruptedPotential()
+        lap = LeastActionPath(pot,5,2,logLevel=1,loggerSettings={"writeFreq":7})
+        minObj = VerletMinimization(lap,self.initialPoints)
+        minObj.fire(resumeFrom="logs/run.lap",**runKwargs)
+        
+        #The 25 forces logged are not recomputed, and the log is continued
+        self.assertEqual(pot.nCalls,(41-25)*self.callsPerForce)
+        self.assertEqual(os.listdir("logs"),["run.lap"])
+        log = LoadForceLogger("logs/run.lap")
+        self.assertEqual(log.points.shape,(41,5,2))
+        self.assertEqual(log.tStep.shape,(41,))
+        #The log is in single precision
+        self.assertTrue(np.allclose(minObj.allPts,refObj.allPts,atol=10**(-5)))
+        
+        return None
+    
+    def test_from_log_same_name(self):
+        runKwargs = {"tStep":0.1,"maxIters":40,"useLocal":False,"earlyStop":False}
+        refLap = LeastActionPath(InterruptedPotential(),5,2,logLevel=1,\
+                                 loggerSettings={"logName":"ref"})
+        refObj = VerletMinimization(refLap,self.initialPoints)
+        refObj.fire(**runKwargs)
+        refLog = LoadForceLogger("logs/ref.lap")
+        
+        loggerSettings = {"logName":"run","writeFreq":7}
+        self._interrupted_run("fire",25,loggerSettings=loggerSettings.copy(),**runKwargs)
+        
+        #The resumed run logs to the file it resumes from
+        pot = InterruptedPotential()
+        lap = LeastActionPath(pot,5,2,logLevel=1,loggerSettings=loggerSettings.copy())
+        minObj = VerletMinimization(lap,self.initialPoints)
+        minObj.fire(resumeFrom="logs/run.lap",**runKwargs)
+        
+        self.assertEqual(pot.nCalls,(41-25)*self.callsPerForce)
+        log = LoadForceLogger("logs/run.lap")
+        self.assertEqual(log.points.shape,(41,5,2))
+        self.assertTrue(np.allclose(log.points,refLog.points,atol=10**(-5)))
+        self.assertTrue(np.allclose(minObj.allPts,refObj.allPts,atol=10**(-5)))
+        
+        return None
+    
+    def test_checkpoint_same_log_name(self):
+        runKwargs = {"tStep":0.1,"maxIters":40,"useLocal":True,"earlyStop":False}
+        refLap = LeastActionPath(InterruptedPotential(),5,2,logLevel=1,\
+                                 loggerSettings={"logName":"ref"})
+        refObj = VerletMinimization(refLap,self.initialPoints)
+        refObj.fire(**runKwargs)
+        refLog = LoadForceLogger("logs/ref.lap")
+        
+        checkpointParams = {"fileName":"checkpoint.h5","freq":10}
+        loggerSettings = {"logName":"run","writeFreq":7}
+        self._interrupted_run("fire",25,{"checkpointParams":checkpointParams},\
+                              loggerSettings=loggerSettings.copy(),**runKwargs)
+        
+        lap = LeastActionPath(InterruptedPotential(),5,2,logLevel=1,\
+                              loggerSettings=loggerSettings.copy())
+        minObj = VerletMinimization(lap,self.initialPoints)
+        minObj.fire(resumeFrom="checkpoint.h5",**runKwargs)
+        
+        #The evaluations up to iteration 20 are kept, and the rest are logged again
+        self.assertTrue(np.array_equal(minObj.allPts,refObj.allPts))
+        log = LoadForceLogger("logs/run.lap")
+        self.assertTrue(np.array_equal(log.points,refLog.points))
+        
+        return None
+    
+    def test_from_strided_log(self):
+        runKwargs = {"tStep":0.1,"maxIters":40,"useLocal":False,"earlyStop":False}
+        self._interrupted_run("fire",25,loggerSettings={"logName":"run","stride":2},\
+                              **runKwargs)
+        
+        lap = LeastActionPath(InterruptedPotential(),5,2,logLevel=1)
+        minObj = VerletMinimization(lap,self.initialPoints)
+        #Not every force was logged, so they cannot be replayed
+        with self.assertRaises(ValueError):
+            minObj.fire(resumeFrom="logs/run.lap",**runKwargs)
+            
+        return None
+    
+    def test_wrong_method(self):
+        checkpointParams = {"fileName":"checkpoint.h5","freq":10}
+        self._interrupted_run("fire",25,{"checkpointParams":checkpointParams},\
+                              tStep=0.1,maxIters=40)
+        
+        minObj = VerletMinimization(LeastActionPath(InterruptedPotential(),5,2,logLevel=0),\
+                                    self.initialPoints)
+        with self.assertRaises(ValueError):
+            minObj.fire2(0.1,40,resumeFrom="checkpoint.h5")
+            
+        return None
+    
+class __init___(unittest.TestCase):
+    def test_wrong_storage(self):
+        lap = LeastActionPath(lambda coords: coords[:,0],5,2,logLevel=0)
+        with self.assertRaises(ValueError):
+            VerletMinimization(lap,np.zeros((5,2)),storage="some")
+        return None
     
 if __name__ == "__main__":
     warnings.simplefilter("default")
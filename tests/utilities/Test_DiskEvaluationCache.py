@@ -0,0 +1,186 @@
+from context import *
+
+import unittest
+import pickle
+import tempfile
+import warnings
+
+print("\nRunning "+os.path.relpath(__file__))
+
+class CountingPotential:
+    def __init__(self):
+        self.callShapes = []
+    
+    def __call__(self,coordsArr):
+        self.callShapes.append(coordsArr.shape)
+        return coordsArr[:,0]**2 + np.sin(coordsArr[:,1])
+    
+class DiskCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpDir = tempfile.TemporaryDirectory()
+        self.fName = os.path.join(self.tmpDir.name,"cache.h5")
+        return None
+    
+    def tearDown(self):
+        self.tmpDir.cleanup()
+        return None
+    
+class __init___(DiskCacheTestCase):
+    def test_wrong_tol(self):
+        DiskEvaluationCache(CountingPotential(),self.fName)
+        with self.assertRaises(ValueError):
+            DiskEvaluationCache(CountingPotential(),self.fName,tol=10**(-6))
+        return None
+    
+    def test_incomplete_write(self):
+        points = np.array([[0.,1],[2,3]])
+        DiskEvaluationCache(CountingPotential(),self.fName)(points)
+        
+        #As left by a run stopped after writing the keys of new rows
+        with h5py.File(self.fName,"a") as h5File:
+            h5File["keys"].resize(4,axis=0)
+            h5File["keys"][2:] = 7
+        
+        pot = CountingPotential()
+        cache = DiskEvaluationCache(pot,self.fName)
+        vals = cache(np.vstack((points,[[4.,5]])))
+        
+        self.assertEqual(pot.callShapes,[(1,2)])
+        self.assertIsNone(np.testing.assert_array_equal(vals[:2],pot(points)))
+        return None
+    
+class __call___(DiskCacheTestCase):
+    def test_repeated_points(self):
+        pot = CountingPotential()
+        cache = DiskEvaluationCache(pot,self.fName)
+        
+        points = np.array([[0.,1],[2,3],[0,1],[4,5]])
+        vals = cache(points)
+        
+        self.assertEqual(pot.callShapes,[(3,2)])
+        self.assertIsNone(np.testing.assert_array_equal(vals,pot(points)))
+        self.assertEqual(cache.stats(),{"hits":1,"misses":3,"calls":1})
+        return None
+    
+    def test_reused_by_new_instance(self):
+        points = np.array([[0.,1],[2,3],[4,5]])
+        DiskEvaluationCache(CountingPotential(),self.fName)(points)
+        
+        pot = CountingPotential()
+        cache = DiskEvaluationCache(pot,self.fName)
+        steps = np.vstack((points,[[6.,7]]))
+        vals = cache(steps)
+        
+        self.assertEqual(pot.callShapes,[(1,2)])
+        self.assertIsNone(np.testing.assert_array_equal(vals,pot(steps)))
+        return None
+    
+    def test_tolerance(self):
+        pot = CountingPotential()
+        cache = DiskEvaluationCache(pot,self.fName,tol=10**(-6))
+        
+        points = np.array([[0.,1],[2,3]])
+        cache(points)
+        cache(points+10**(-9))
+        self.assertEqual(len(pot.callShapes),1)
+        
+        #Finite-difference steps are not merged at the default tolerance
+        otherCache = DiskEvaluationCache(pot,os.path.join(self.tmpDir.name,"other.h5"))
+        otherCache(points)
+        otherCache(points+10**(-8))
+        self.assertEqual(len(pot.callShapes),3)
+        return None
+    
+    def test_eviction(self):
+        pot = CountingPotential()
+        cache = DiskEvaluationCache(pot,self.fName,maxEntries=3)
+        
+        cache(np.array([[0.,0],[1,1]]))
+        cache(np.array([[2.,2]]))
+        cache(np.array([[0.,0]]))
+        #Evicts [1,1], the least recently used
+        cache(np.array([[3.,3]]))
+        
+        with h5py.File(self.fName,"r") as h5File:
+            self.assertEqual(h5File.attrs["nRows"],3)
+        
+        nCalls = len(pot.callShapes)
+        reopened = DiskEvaluationCache(pot,self.fName,maxEntries=3)
+        reopened(np.array([[0.,0],[2,2],[3,3]]))
+        self.assertEqual(len(pot.callShapes),nCalls)
+        reopened(np.array([[1.,1]]))
+        self.assertEqual(len(pot.callShapes),nCalls+1)
+        return None
+    
+    def test_write_freq(self):
+        pot = CountingPotential()
+        cache = DiskEvaluationCache(pot,self.fName,writeFreq=3)
+        
+        cache(np.array([[0.,0],[1,1]]))
+        with h5py.File(self.fName,"r") as h5File:
+            self.assertNotIn("nRows",h5File.attrs)
+        
+        cache(np.array([[2.,2]]))
+        cache(np.array([[3.,3]]))
+        with h5py.File(self.fName,"r") as h5File:
+            self.assertEqual(h5File.attrs["nRows"],3)
+        
+        cache.flush()
+        with h5py.File(self.fName,"r") as h5File:
+            self.assertEqual(h5File.attrs["nRows"],4)
+        return None
+    
+    def test_growth(self):
+        pot = CountingPotential()
+        cache = DiskEvaluationCache(pot,self.fName)
+        
+        sizes = set()
+        for ptIter in range(100):
+            cache(np.array([[ptIter,0.]]))
+            sizes.add(len(cache.keyArr))
+        
+        #Grows in doubling chunks, not by one row per call
+        self.assertEqual(sizes,{2**i for i in range(8)})
+        with h5py.File(self.fName,"r") as h5File:
+            self.assertEqual(h5File.attrs["nRows"],100)
+            self.assertEqual(h5File["keys"].shape[0],128)
+        
+        reopened = DiskEvaluationCache(pot,self.fName)
+        vals = reopened(np.array([[ptIter,0.] for ptIter in range(100)]))
+        self.assertEqual(len(pot.callShapes),100)
+        self.assertIsNone(np.testing.assert_array_equal(vals,np.arange(100.)**2))
+        return None
+    
+    def test_copies_do_not_write(self):
+        pot = CountingPotential()
+        cache = DiskEvaluationCache(pot,self.fName)
+        cache(np.array([[0.,1]]))
+        
+        copied = pickle.loads(pickle.dumps(cache))
+        copied(np.array([[2.,3]]))
+        
+        with h5py.File(self.fName,"r") as h5File:
+            self.assertEqual(h5File.attrs["nRows"],1)
+        return None
+    
+    def test_least_action_path(self):
+        def pot(coordsArr):
+            return coordsArr[:,0]**2 + coordsArr[:,1]**2 + 1
+        points = np.array([[0.,0],[1,1.5],[2,2.5],[3,3]])
+        
+        correctNetForce = LeastActionPath(pot,4,2,logLevel=0).compute_force(points)
+        
+        cache = DiskEvaluationCache(pot,self.fName)
+        lap = LeastActionPath(cache,4,2,logLevel=0)
+        netForce = lap.compute_force(points)
+        nMisses = cache.stats()["misses"]
+        lap.compute_force(points)
+        
+        self.assertIsNone(np.testing.assert_array_equal(netForce,correctNetForce))
+        self.assertEqual(cache.stats()["misses"],nMisses)
+        return None
+    
+if __name__ == "__main__":
+    warnings.simplefilter("default")
+    warnings.filterwarnings("ignore",message=".*should_run_async.*")
+    unittest.main()
@@ -0,0 +1,106 @@
+from context import *
+
+import unittest
+import pickle
+import warnings
+
+print("\nRunning "+os.path.relpath(__file__))
+
+class CountingPotential:
+    def __init__(self):
+        self.callShapes = []
+    
+    def __call__(self,coordsArr):
+        self.callShapes.append(coordsArr.shape)
+        return coordsArr[:,0]**2 + np.sin(coordsArr[:,1])
+    
+class __call___(unittest.TestCase):
+    def test_repeated_points(self):
+        pot = CountingPotential()
+        cache = EvaluationCache(pot)
+        
+        points = np.array([[0.,1],[2,3],[0,1],[4,5]])
+        vals = cache(points)
+        
+        self.assertEqual(pot.callShapes,[(3,2)])
+        self.assertIsNone(np.testing.assert_array_equal(vals,pot(points)))
+        self.assertEqual(cache.stats(),{"hits":1,"misses":3,"calls":1})
+        return None
+    
+    def test_across_calls(self):
+        pot = CountingPotential()
+        cache = EvaluationCache(pot)
+        
+        points = np.array([[0.,1],[2,3],[4,5]])
+        cache(points)
+        steps = points.copy()
+        steps[1,0] += 10**(-8)
+        vals = cache(steps)
+        
+        self.assertEqual(pot.callShapes,[(3,2),(1,2)])
+        self.assertIsNone(np.testing.assert_array_equal(vals,pot(steps)))
+        
+        cache(points)
+        self.assertEqual(len(pot.callShapes),3)
+        self.assertEqual(cache.stats(),{"hits":5,"misses":4,"calls":2})
+        return None
+    
+    def test_stacked_points(self):
+        def mass(coordsArr):
+            return coordsArr[:,:,None]*coordsArr[:,None,:]
+        
+        cache = EvaluationCache(mass)
+        points = np.arange(12,dtype=float).reshape((2,3,2))
+        
+        vals = cache(points)
+        
+        self.assertEqual(vals.shape,(2,3,2,2))
+        self.assertIsNone(np.testing.assert_array_equal(vals.reshape((6,2,2)),\
+                                                        mass(points.reshape((6,2)))))
+        return None
+    
+    def test_wrong_output_shape(self):
+        cache = EvaluationCache(lambda coordsArr: np.ones(2))
+        with self.assertRaises(ValueError):
+            cache(np.arange(6,dtype=float).reshape((3,2)))
+        return None
+    
+class clear_(unittest.TestCase):
+    def test_clear(self):
+        pot = CountingPotential()
+        cache = EvaluationCache(pot)
+        points = np.array([[0.,1],[2,3]])
+        
+        cache(points)
+        cache.clear()
+        cache(points)
+        
+        self.assertEqual(pot.callShapes,[(2,2),(2,2)])
+        self.assertEqual(cache.stats(),{"hits":0,"misses":4,"calls":2})
+        return None
+    
+class __getattr___(unittest.TestCase):
+    def test_forwards_grad(self):
+        def pot(coordsArr):
+            return np.sum(coordsArr**2,axis=-1)
+        pot.grad = lambda coordsArr: 2*coordsArr
+        
+        cache = EvaluationCache(pot)
+        
+        self.assertIsNone(np.testing.assert_array_equal(cache.grad(np.ones((2,2))),\
+                                                        2*np.ones((2,2))))
+        self.assertEqual(cache.__qualname__,pot.__qualname__)
+        return None
+    
+    def test_pickle(self):
+        cache = EvaluationCache(CountingPotential())
+        cache(np.ones((2,2)))
+        
+        copied = pickle.loads(pickle.dumps(cache))
+        self.assertEqual(copied.stats(),cache.stats())
+        return None
+    
+if __name__ == "__main__":
+    warnings.simplefilter("default")
+    warnings.filterwarnings("ignore",message=".*should_run_async.*")
+    unittest.main()
@@ -22,10 +22,63 @@ class discrete_sqr_action_grad_(unittest.TestCase):
     #TODO: tests
     def test_1(self):
         return None
+
+class discrete_sqr_action_grad_mp_(unittest.TestCase):
+    def test_matches_serial(self):
+        def potential(path):
+            return path[:,0]**2 + 2*path[:,1]**2 + 0.5
+        
+        def mass(path):
+            massArr = np.full((path.shape[0],2,2),np.identity(2))
+            massArr[:,0,0] += path[:,1]**2
+            massArr[:,0,1] = 0.1*path[:,0]
+            massArr[:,1,0] = 0.1*path[:,0]
+            return massArr
+        
+        path = np.array([[0,0],[1,1],[2,3],[2.5,3],[3,2.5],[4,2],[5,2.2]],dtype=float)
+        potOnPath = potential(path)
+        massOnPath = mass(path)
+        
+        correctGradOfAction, correctGradOfPes = \
+            GradientApproximations().discrete_sqr_action_grad(path,potential,potOnPath,mass,\
+                                                              massOnPath,TargetFunctions.action_squared)
+        for (kind,chunkSize) in [("thread",None),("thread",2),("process",3)]:
+            executor = GradientExecutor(kind=kind,nWorkers=2,chunkSize=chunkSize)
+            gradOfAction, gradOfPes = \
+                GradientApproximations(executor=executor).\
+                    discrete_sqr_action_grad_mp(path,potential,potOnPath,mass,massOnPath,\
+                                                TargetFunctions.action_squared)
+            executor.shutdown()
+            
+            self.assertIsNone(np.testing.assert_allclose(gradOfAction,correctGradOfAction))
+            self.assertIsNone(np.testing.assert_array_equal(gradOfPes,correctGradOfPes))
+        return None
     
 class discrete_action_grad_(unittest.TestCase):
-    #TODO: tests
-    def test_1(self):
+    def test_constant_mass(self):
+        #With a constant, scalar mass, agrees with discrete_action_grad_const
+        def potential(path):
+            return path[:,0]**2 + 2*path[:,1]**2 + 0.5
+        
+        def mass(path):
+            return np.full((path.shape[0],2,2),2*np.identity(2))
+        
+        path = np.array([[0,0],[1,1],[2,3],[2.5,3]],dtype=float)
+        potOnPath = potential(path)
+        massOnPath = mass(path)
+        gradObj = GradientApproximations()
+        
+        gradOfAction, gradOfPes = \
+            gradObj.discrete_action_grad(path,potential,potOnPath,mass,massOnPath,\
+                                         TargetFunctions.action)
+        correctGradOfAction, correctGradOfPes = \
+            gradObj.discrete_action_grad_const(path,potential,potOnPath,mass,massOnPath,\
+                                               TargetFunctions.action)
+        
+        #The first image uses beff = 0 for the image before it
+        self.assertIsNone(np.testing.assert_allclose(gradOfAction[2:],correctGradOfAction[2:]))
+        self.assertIsNone(np.testing.assert_array_equal(gradOfAction[[0,-1]],0))
+        self.assertIsNone(np.testing.assert_allclose(gradOfPes,correctGradOfPes))
         return None
     
 class forward_action_grad_(unittest.TestCase):
@@ -111,6 +164,112 @@ class forward_action_component_grad_(unittest.TestCase):
         
         return None
     
+class forward_action_batch_grad_(unittest.TestCase):
+    def test_matches_forward_action_grad(self):
+        def potential(path):
+            return path[:,0]**2 + 2*path[:,1]**2 + 0.5
+        
+        def mass(path):
+            massArr = np.full((path.shape[0],2,2),np.identity(2))
+            massArr[:,0,0] += path[:,1]**2
+            return massArr
+        
+        paths = np.array([[[0,0],[1,1],[2,3]],[[0,1],[1,0],[2,2]]],dtype=float)
+        gradObj = GradientApproximations()
+        
+        for target_func in [TargetFunctions.action,TargetFunctions.action_squared]:
+            potOnPaths = np.array([potential(p) for p in paths])
+            massOnPaths = np.array([mass(p) for p in paths])
+            gradOfAction, gradOfPes = \
+                gradObj.forward_action_batch_grad(paths,potential,potOnPaths,mass,\
+                                                  massOnPaths,target_func)
+            for bandIter in range(paths.shape[0]):
+                correctGradOfAction, correctGradOfPes = \
+                    gradObj.forward_action_grad(paths[bandIter],potential,\
+                                                potOnPaths[bandIter],mass,\
+                                                massOnPaths[bandIter],target_func)
+                #Different terms are perturbed, so the two agree only to within
+                #the finite-difference error
+                self.assertIsNone(np.testing.assert_allclose(gradOfAction[bandIter],\
+                                                             correctGradOfAction,atol=10**(-5)))
+                self.assertIsNone(np.testing.assert_allclose(gradOfPes[bandIter],\
+                                                             correctGradOfPes))
+        return None
+    
+    def test_unknown_target_func(self):
+        def target_func(path,potential,mass):
+            return None
+        
+        paths = np.zeros((1,3,2))
+        with self.assertRaises(ValueError):
+            GradientApproximations().forward_action_batch_grad(paths,None,None,None,None,\
+                                                               target_func)
+        return None
+    
+class forward_action_local_grad_(unittest.TestCase):
+    def test_matches_forward_action_grad(self):
+        def potential(path):
+            return path[:,0]**2 + 2*path[:,1]**2 + 0.5
+        
+        def mass(path):
+            massArr = np.full((path.shape[0],2,2),np.identity(2))
+            massArr[:,0,0] += path[:,1]**2
+            return massArr
+        
+        path = np.array([[0,0],[1,1],[2,3],[2.5,3]],dtype=float)
+        potOnPath = potential(path)
+        massOnPath = mass(path)
+        gradObj = GradientApproximations()
+        
+        for target_func in [TargetFunctions.action,TargetFunctions.action_squared]:
+            for (m,mOnPath) in [(None,None),(mass,massOnPath)]:
+                gradOfAction, gradOfPes = \
+                    gradObj.forward_action_local_grad(path,potential,potOnPath,m,\
+                                                      mOnPath,target_func)
+                correctGradOfAction, correctGradOfPes = \
+                    gradObj.forward_action_grad(path,potential,potOnPath,m,mOnPath,\
+                                                target_func)
+                
+                self.assertEqual(gradOfAction.shape,path.shape)
+                self.assertIsNone(np.testing.assert_allclose(gradOfAction,\
+                                                             correctGradOfAction,atol=10**(-5)))
+                self.assertIsNone(np.testing.assert_allclose(gradOfPes,correctGradOfPes))
+        return None
+    
+    def test_single_potential_call(self):
+        nCalls = []
+        def potential(path):
+            nCalls.append(path.shape[0])
+            return path[:,0]**2 + path[:,1]**2
+        
+        path = np.array([[0,0],[1,1],[2,2]],dtype=float)
+        
+        GradientApproximations().forward_action_local_grad(path,potential,potential(path),\
+                                                           None,None,TargetFunctions.action)
+        
+        self.assertListEqual(nCalls,[3,6])
+        return None
+    
+    def test_unknown_target_func(self):
+        def target_func(path,potential,mass):
+            if callable(potential):
+                potOnPath = potential(path)
+            else:
+                potOnPath = potential
+            return np.sum(potOnPath), potOnPath, mass
+        
+        def potential(path):
+            return path[:,0]**2 + path[:,1]**2
+        
+        path = np.array([[0,0],[1,1],[2,2]],dtype=float)
+        
+        gradOfAction, gradOfPes = \
+            GradientApproximations().forward_action_local_grad(path,potential,potential(path),\
+                                                               None,None,target_func)
+        
+        self.assertIsNone(np.testing.assert_allclose(gradOfAction,gradOfPes,atol=10**(-5)))
+        return None
+    
 class potential_central_grad_(unittest.TestCase):
     def test_correct_outputs(self):
         path = np.array([[0,0],[1,1],[2,2]],dtype=float)
@@ -156,14 +315,138 @@ class potential_central_grad_(unittest.TestCase):
         self.assertIsNone(gradOfAux)
         return None
     
+class analytic_action_grad_(unittest.TestCase):
+    def test_matches_forward_action_grad(self):
+        def potential(path):
+            return path[:,0]**2 + 2*path[:,1]**2 + 0.5
+        def potential_grad(path):
+            return np.array([2*path[:,0],4*path[:,1]]).T
+        
+        def mass(path):
+            massArr = np.full((path.shape[0],2,2),np.identity(2))
+            massArr[:,0,0] += path[:,1]**2
+            return massArr
+        def mass_grad(path):
+            gradArr = np.zeros((path.shape[0],2,2,2))
+            gradArr[:,0,0,1] = 2*path[:,1]
+            return gradArr
+        
+        class AnalyticPotential:
+            def __call__(self,path):
+                return potential(path)
+            def grad(self,path):
+                return potential_grad(path)
+        
+        path = np.array([[0,0],[1,1],[2,3],[2.5,3.5]],dtype=float)
+        gradObj = GradientApproximations()
+        
+        for target_func in [TargetFunctions.action,TargetFunctions.action_squared]:
+            _, potOnPath, massOnPath = target_func(path,potential,mass)
+            correctGradOfAction, correctGradOfPes = \
+                gradObj.forward_action_grad(path,potential,potOnPath,mass,massOnPath,\
+                                            target_func)
+            
+            #Plain functions opt in by setting the grad attribute
+            mass.grad = mass_grad
+            gradOfAction, gradOfPes = \
+                gradObj.forward_action_grad(path,AnalyticPotential(),potOnPath,mass,\
+                                            massOnPath,target_func)
+            del mass.grad
+            
+            self.assertIsNone(np.testing.assert_allclose(gradOfAction,correctGradOfAction,\
+                                                         rtol=10**(-6),atol=10**(-6)))
+            self.assertIsNone(np.testing.assert_allclose(gradOfPes,potential_grad(path)))
+            self.assertIsNone(np.testing.assert_allclose(gradOfPes,correctGradOfPes,\
+                                                         atol=10**(-6)))
+        return None
+    
 class midpoint_grad_(unittest.TestCase):
-    #TODO: tests
-    def test_1(self):
+    def test_tensor_output(self):
+        def mass(path):
+            massArr = np.full((path.shape[0],2,2),np.identity(2))
+            massArr[:,0,1] = path[:,0]*path[:,1]
+            return massArr
+        
+        path = np.array([[0,0],[1,1],[2,3]],dtype=float)
+        grad = midpoint_grad(mass,path)
+        
+        correctGrad = np.zeros((3,2,2,2))
+        correctGrad[:,0,1,0] = path[:,1]
+        correctGrad[:,0,1,1] = path[:,0]
+        
+        self.assertIsNone(np.testing.assert_allclose(grad,correctGrad,atol=10**(-7)))
+        return None
+    
+    def test_uses_grad_method(self):
+        def potential(path):
+            return path[:,0]**2
+        potential.grad = lambda path: np.full(path.shape,-1.)
+        
+        path = np.array([[0,0],[1,1]],dtype=float)
+        self.assertIsNone(np.testing.assert_array_equal(midpoint_grad(potential,path),\
+                                                        np.full(path.shape,-1.)))
+        return None
+    
+    def test_single_call(self):
+        nCalls = []
+        def potential(path):
+            nCalls.append(path.shape)
+            return path[:,0]**2 + 3*path[:,1]
+        
+        path = np.array([[0,0],[1,1],[2,3]],dtype=float)
+        grad = midpoint_grad(potential,path)
+        
+        correctGrad = np.stack((2*path[:,0],np.full(3,3.)),axis=-1)
+        
+        self.assertListEqual(nCalls,[(12,2)])
+        self.assertIsNone(np.testing.assert_allclose(grad,correctGrad,atol=10**(-7)))
         return None
     
 class beff_grad_(unittest.TestCase):
-    #TODO: tests
-    def test_1(self):
+    def test_uses_grad_method(self):
+        def mass(path):
+            massArr = np.full((path.shape[0],2,2),np.identity(2))
+            massArr[:,0,0] += path[:,1]**2
+            return massArr
+        
+        point = np.array([1.,2.])
+        dr = np.array([0.5,0.25])
+        correctGrad = beff_grad(mass,point,dr)
+        
+        def mass_grad(path):
+            gradArr = np.zeros((path.shape[0],2,2,2))
+            gradArr[:,0,0,1] = 2*path[:,1]
+            return gradArr
+        mass.grad = mass_grad
+        
+        self.assertIsNone(np.testing.assert_allclose(beff_grad(mass,point,dr),correctGrad,\
+                                                     atol=10**(-7)))
+        return None
+    
+    def test_displacement_per_point(self):
+        nCalls = []
+        def mass(path):
+            nCalls.append(path.shape)
+            massArr = np.full((path.shape[0],2,2),np.identity(2))
+            massArr[:,0,0] += path[:,1]**2
+            massArr[:,0,1] = path[:,0]
+            massArr[:,1,0] = path[:,0]
+            return massArr
+        
+        points = np.array([[1.,2.],[0.5,-1],[2,0]])
+        dr = np.array([[0.5,0.25],[1,0],[0.3,-0.4]])
+        grad = beff_grad(mass,points,dr)
+        
+        #B_eff = ((1+y^2) dx^2 + 2 x dx dy + dy^2)/|dr|^2
+        ds = np.sum(dr**2,axis=1)
+        correctGrad = np.stack((2*dr[:,0]*dr[:,1],2*points[:,1]*dr[:,0]**2),axis=-1)/ds[:,None]
+        
+        self.assertListEqual(nCalls,[(12,2)])
+        self.assertIsNone(np.testing.assert_allclose(grad,correctGrad,atol=10**(-7)))
+        
+        #A single displacement is used for every point
+        for (pt,g) in zip(points,beff_grad(mass,points,dr[0])):
+            self.assertIsNone(np.testing.assert_allclose(beff_grad(mass,pt,dr[0])[0],g))
         return None
     
 if __name__ == "__main__":
@@ -0,0 +1,72 @@
+from context import *
+
+import unittest
+import pickle
+import warnings
+
+print("\nRunning "+os.path.relpath(__file__))
+
+class __init___(unittest.TestCase):
+    def test_wrong_kind(self):
+        with self.assertRaises(ValueError):
+            GradientExecutor(kind="gpu")
+        return None
+    
+class map_chunks_(unittest.TestCase):
+    def test_chunks(self):
+        def func(scale,arr1,arr2):
+            #One entry per chunk, recording the chunk length
+            return np.full((arr1.shape[0],2),[scale,arr1.shape[0]]) + \
+                np.stack((arr1,arr2),axis=-1)
+        
+        arr1 = np.arange(10.)
+        arr2 = -np.arange(10.)
+        
+        for kind in ["thread","process"]:
+            executor = GradientExecutor(kind=kind,nWorkers=2,chunkSize=4)
+            out = executor.map_chunks(func,[arr1,arr2],constArgs=(100.,))
+            executor.shutdown()
+            
+            correctOut = np.stack((100+arr1,arr2+[4,4,4,4,4,4,4,4,2,2]),axis=-1)
+            self.assertIsNone(np.testing.assert_array_equal(out,correctOut))
+        return None
+    
+    def test_default_chunk_size(self):
+        executor = GradientExecutor(kind="thread",nWorkers=3)
+        out = executor.map_chunks(lambda arr: np.full(arr.shape,arr.shape[0]),[np.zeros(7)])
+        executor.shutdown()
+        
+        self.assertIsNone(np.testing.assert_array_equal(out,[3,3,3,3,3,3,1]))
+        return None
+    
+class shutdown_(unittest.TestCase):
+    def test_reuses_and_restarts(self):
+        executor = GradientExecutor(kind="thread",nWorkers=2)
+        executor.map_chunks(lambda arr: arr,[np.zeros(4)])
+        pool = executor.pool
+        executor.map_chunks(lambda arr: arr,[np.zeros(4)])
+        self.assertIs(executor.pool,pool)
+        
+        executor.shutdown()
+        self.assertIsNone(executor.pool)
+        
+        out = executor.map_chunks(lambda arr: arr+1,[np.zeros(4)])
+        executor.shutdown()
+        self.assertIsNone(np.testing.assert_array_equal(out,np.ones(4)))
+        return None
+    
+    def test_pickle_without_pool(self):
+        executor = GradientExecutor(kind="thread",nWorkers=2)
+        executor.map_chunks(lambda arr: arr,[np.zeros(4)])
+        
+        copied = pickle.loads(pickle.dumps(executor))
+        executor.shutdown()
+        
+        self.assertIsNone(copied.pool)
+        self.assertEqual(copied.nWorkers,2)
+        return None
+    
+if __name__ == "__main__":
+    warnings.simplefilter("default")
+    warnings.filterwarnings("ignore",message=".*should_run_async.*")
+    unittest.main()
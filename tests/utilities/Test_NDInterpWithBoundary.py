@@ -241,6 +241,46 @@ class __call___(unittest.TestCase):
         
         return None
     
+    def test_3d_in_and_out_of_bounds(self):
+        x = np.arange(-2,2.5,0.5)
+        y = x.copy()
+        z = np.arange(0,3.5,0.5)
+        
+        xx, yy, zzz = np.meshgrid(x,y,z)
+        vals = xx**2 + yy + xx*zzz
+        
+        points = np.array([[0.2,0.4,1.1],[2.2,0.4,0.3],[-0.3,1.7,3.2]])
+        
+        g = NDInterpWithBoundary((x,y,z),vals)
+        values = g(points)
+        
+        #Evaluating one point at a time
+        correctVals = np.zeros(3)
+        correctVals[0] = g._call_nd(points[0])
+        for ptIter in [1,2]:
+            isInBounds = np.array([points[ptIter] >= g.lowerBounds,\
+                                   points[ptIter] <= g.upperBounds])
+            correctVals[ptIter] = g._exp_boundary_handler(points[ptIter],isInBounds)
+        
+        self.assertIsNone(np.testing.assert_allclose(values,correctVals))
+        return None
+    
+    def test_does_not_modify_input(self):
+        x = np.arange(-5,5.5,0.5)
+        y = x.copy()
+        
+        xx, yy = np.meshgrid(x,y)
+        zz = xx**2 + yy**2
+        
+        points = np.array([[0.2,-0.4],[-1,-3]])
+        originalPoints = points.copy()
+        
+        g = NDInterpWithBoundary((x,y),zz)
+        g(points)
+        
+        self.assertIsNone(np.testing.assert_array_equal(points,originalPoints))
+        return None
+    
     def test_wrong_points_shape(self):
         x = np.arange(-5,5.5,0.5)
         y = x.copy()
@@ -256,6 +296,70 @@ class __call___(unittest.TestCase):
             
         return None
     
+class value_and_gradient_(unittest.TestCase):
+    def _central_difference(self,g,points):
+        h = 10**(-6)
+        grad = np.zeros(points.shape)
+        for dimIter in range(points.shape[-1]):
+            step = np.zeros(points.shape[-1])
+            step[dimIter] = h
+            grad[...,dimIter] = (g(points+step) - g(points-step))/(2*h)
+        return grad
+    
+    def test_2d(self):
+        x = np.arange(-5,5.5,0.5)
+        y = x.copy()
+        
+        xx, yy = np.meshgrid(x,y)
+        zz = xx**2 + yy**3 + xx*yy
+        
+        #In bounds, out of bounds, and reflected by symmetric extension
+        points = np.array([[0.2,0.4],[5.2,0.4],[-1.3,5.6],[0.7,-2.1]])
+        
+        for transformFuncName in ["identity","smooth_abs"]:
+            g = NDInterpWithBoundary((x,y),zz,transformFuncName=transformFuncName)
+            values, grad = g.value_and_gradient(points)
+            
+            self.assertIsNone(np.testing.assert_allclose(values,g(points.copy())))
+            self.assertIsNone(np.testing.assert_allclose(grad,\
+                                                         self._central_difference(g,points),\
+                                                         atol=10**(-6)))
+        return None
+    
+    def test_3d(self):
+        x = np.arange(-2,2.5,0.5)
+        y = x.copy()
+        z = np.arange(0,3.5,0.5)
+        
+        xx, yy, zzz = np.meshgrid(x,y,z)
+        vals = xx**2 + yy + xx*zzz
+        
+        points = np.array([[0.2,0.4,1.1],[2.2,0.4,0.3],[-0.3,-1.7,3.2]])
+        
+        g = NDInterpWithBoundary((x,y,z),vals)
+        values, grad = g.value_and_gradient(points)
+        
+        self.assertIsNone(np.testing.assert_allclose(values,g(points.copy())))
+        self.assertIsNone(np.testing.assert_allclose(grad,self._central_difference(g,points),\
+                                                     atol=10**(-6)))
+        return None
+    
+    def test_grad_protocol(self):
+        x = np.arange(-5,5.5,0.5)
+        y = x.copy()
+        
+        xx, yy = np.meshgrid(x,y)
+        zz = xx**2 + yy**2
+        
+        points = np.array([[0.2,0.4],[-1,3]])
+        
+        g = NDInterpWithBoundary((x,y),zz)
+        
+        #Spline interpolation of polynomials is exact
+        correctGrad = np.array([[0.4,0.8],[-2,6]])
+        self.assertIsNone(np.testing.assert_allclose(midpoint_grad(g,points),correctGrad))
+        return None
+    
 if __name__ == "__main__":
     warnings.simplefilter("default")
     warnings.filterwarnings("ignore",message=".*should_run_async.*")
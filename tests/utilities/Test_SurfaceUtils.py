@@ -2,6 +2,7 @@ from context import *
 
 import unittest
 import warnings
+import functools
 
 print("\nRunning "+os.path.relpath(__file__))
 
@@ -223,7 +224,120 @@ class find_endpoints_on_grid_(unittest.TestCase):
         # ax.contourf(*coordMeshTuple,zz)
         # ax.scatter(allowedEndpoints[:,0],allowedEndpoints[:,1],marker="x",color="red")
         return None
-    
+
+class grid_edge_weights_(unittest.TestCase):
+    def _per_edge_weights(self,coordMeshTuple,potArr,relativeNeighborInds,inertArr,\
+                          target_func):
+        weights = np.full(potArr.shape+(len(relativeNeighborInds),),np.inf)
+        for idx in np.ndindex(potArr.shape):
+            for (offsetIter,offset) in enumerate(relativeNeighborInds):
+                n = tuple(np.array(idx) - offset)
+                if min(n) < 0 or np.any(np.array(n) >= potArr.shape):
+                    continue
+                coords = np.array([[c[idx] for c in coordMeshTuple],\
+                                   [c[n] for c in coordMeshTuple]])
+                enegs = np.array([potArr[idx],potArr[n]])
+                masses = np.array([inertArr[idx],inertArr[n]])
+                weights[idx+(offsetIter,)] = target_func(coords,enegs,masses)[0]
+        return weights
+
+    def test_2d_action_with_inertia(self):
+        x = np.linspace(-1,1,5)
+        y = np.linspace(0,2,4)
+        coordMeshTuple = np.meshgrid(x,y)
+        potArr = coordMeshTuple[0]**2 + np.sin(coordMeshTuple[1])
+        inertArr = np.zeros(potArr.shape+(2,2))
+        inertArr[...,0,0] = 1 + coordMeshTuple[1]**2
+        inertArr[...,1,1] = 2
+        inertArr[...,0,1] = 0.1*coordMeshTuple[0]
+        inertArr[...,1,0] = inertArr[...,0,1]
+
+        relativeNeighborInds = np.array([(1,0),(0,-1),(-1,1),(1,1)])
+        for target_func in [TargetFunctions.action,TargetFunctions.action_squared]:
+            weights = SurfaceUtils.grid_edge_weights(coordMeshTuple,potArr,\
+                                                     relativeNeighborInds,inertArr,\
+                                                     target_func)
+            correctWeights = self._per_edge_weights(coordMeshTuple,potArr,\
+                                                    relativeNeighborInds,inertArr,\
+                                                    target_func)
+            self.assertIsNone(np.testing.assert_allclose(weights,correctWeights))
+
+        #Neighbors off the grid
+        self.assertTrue(np.all(weights[0,:,0] == np.inf))
+        self.assertTrue(np.all(weights[:,-1,1] == np.inf))
+        return None
+
+    def test_3d_custom_target_func(self):
+        def dist_func(coords,enegs,masses):
+            return enegs[1]*np.linalg.norm(coords[1]-coords[0]), enegs, masses
+
+        x = np.arange(3.)
+        coordMeshTuple = np.meshgrid(x,x+1,x**2)
+        potArr = sum(coordMeshTuple)
+        inertArr = np.broadcast_to(np.identity(3),potArr.shape+(3,3))
+
+        relativeNeighborInds = np.array([r for r in np.ndindex((3,3,3)) if r != (1,1,1)]) - 1
+        weights = SurfaceUtils.grid_edge_weights(coordMeshTuple,potArr,\
+                                                 relativeNeighborInds,\
+                                                 target_func=dist_func)
+        correctWeights = self._per_edge_weights(coordMeshTuple,potArr,\
+                                                relativeNeighborInds,inertArr,\
+                                                dist_func)
+
+        self.assertIsNone(np.testing.assert_allclose(weights,correctWeights))
+        return None
+
+    def test_wrapped_target_func(self):
+        #Only TargetFunctions.action itself takes the vectorized path, so a
+        #wrapper is still called on every edge
+        calls = []
+        @functools.wraps(TargetFunctions.action)
+        def wrapped_action(*args):
+            calls.append(args)
+            return TargetFunctions.action(*args)
+
+        x = np.linspace(-1,1,5)
+        coordMeshTuple = np.meshgrid(x,x+1)
+        potArr = coordMeshTuple[0]**2 + coordMeshTuple[1]
+        relativeNeighborInds = np.array([(1,0),(0,-1),(-1,1),(1,1)])
+        weights = SurfaceUtils.grid_edge_weights(coordMeshTuple,potArr,\
+                                                 relativeNeighborInds,\
+                                                 target_func=wrapped_action)
+        correctWeights = SurfaceUtils.grid_edge_weights(coordMeshTuple,potArr,\
+                                                        relativeNeighborInds,\
+                                                        target_func=TargetFunctions.action)
+
+        self.assertGreater(len(calls),0)
+        self.assertIsNone(np.testing.assert_allclose(weights,correctWeights))
+        return None
+
+class node_edge_weights_(unittest.TestCase):
+    def test_matches_grid_edge_weights(self):
+        def dist_func(coords,enegs,masses):
+            return enegs[1]*np.linalg.norm(coords[1]-coords[0]), enegs, masses
+        
+        x = np.linspace(-1,1,5)
+        y = np.linspace(0,2,4)
+        coordMeshTuple = np.meshgrid(x,y)
+        potArr = coordMeshTuple[0]**2 + np.sin(coordMeshTuple[1])
+        inertArr = np.zeros(potArr.shape+(2,2))
+        inertArr[...,0,0] = 1 + coordMeshTuple[1]**2
+        inertArr[...,1,1] = 2
+        inertArr[...,0,1] = 0.1*coordMeshTuple[0]
+        inertArr[...,1,0] = inertArr[...,0,1]
+        
+        relativeNeighborInds = np.array([(1,0),(0,-1),(-1,1),(1,1)])
+        for target_func in [TargetFunctions.action,TargetFunctions.action_squared,dist_func]:
+            correctWeights = SurfaceUtils.grid_edge_weights(coordMeshTuple,potArr,\
+                                                            relativeNeighborInds,inertArr,\
+                                                            target_func)
+            for inds in np.ndindex(potArr.shape):
+                weights = SurfaceUtils.node_edge_weights(coordMeshTuple,potArr,inds,\
+                                                         relativeNeighborInds,inertArr,\
+                                                         target_func)
+                self.assertIsNone(np.testing.assert_allclose(weights,correctWeights[inds]))
+        return None
+
 if __name__ == "__main__":
     warnings.simplefilter("default")
     warnings.filterwarnings("ignore",message=".*should_run_async.*")
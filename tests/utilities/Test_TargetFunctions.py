@@ -135,6 +135,103 @@ class action_(unittest.TestCase):
         
         return None
     
+    def test_diagonal_mass(self):
+        path = np.arange(10).reshape((5,2))
+        potential = np.arange(5)**2
+        diagMass = np.full((5,2),[1.,3.])
+        
+        act, eneg, mass = TargetFunctions.action(path,potential,masses=diagMass)
+        
+        fullMass = np.full((5,2,2),np.diag([1.,3.]))
+        correctAction, _, _ = TargetFunctions.action(path,potential,masses=fullMass)
+        
+        self.assertEqual(act,correctAction)
+        self.assertIsNone(np.testing.assert_array_equal(mass,fullMass))
+        
+        return None
+    
+    def test_identity_mass_is_view(self):
+        path = np.arange(10).reshape((5,2))
+        potential = np.arange(5)**2
+        
+        _, _, mass = TargetFunctions.action(path,potential)
+        
+        self.assertFalse(mass.flags.writeable)
+        
+        return None
+    
+    def test_matches_loop(self):
+        rng = np.random.default_rng(0)
+        path = rng.random((30,3))
+        potential = rng.random(30) - 0.1
+        massArr = rng.random((30,3,3))
+        massArr = massArr + np.swapaxes(massArr,1,2)
+        
+        act, _, _ = TargetFunctions.action(path,potential,masses=massArr)
+        
+        correctAction = 0
+        for ptIter in range(1,30):
+            coordDiff = path[ptIter] - path[ptIter-1]
+            dist = max(np.dot(coordDiff,np.dot(massArr[ptIter],coordDiff)),0)
+            correctAction += np.sqrt(2*max(potential[ptIter],0)*dist)
+        
+        #To the last bit, as finite-difference gradients amplify any rounding
+        #difference
+        self.assertEqual(act,correctAction)
+        
+        return None
+    
+    def test_stack_of_paths(self):
+        rng = np.random.default_rng(0)
+        paths = rng.random((4,6,2))
+        
+        callShapes = []
+        def pot(coordsArr):
+            callShapes.append(coordsArr.shape)
+            return np.sum(coordsArr**2,axis=-1)
+        
+        def mass_func(coordsArr):
+            return np.full((coordsArr.shape[0],2,2),np.identity(2)+0.5)
+        
+        act, eneg, mass = TargetFunctions.action(paths,pot,masses=mass_func)
+        
+        self.assertEqual(callShapes,[(24,2)])
+        self.assertEqual(act.shape,(4,))
+        self.assertEqual(eneg.shape,(4,6))
+        self.assertEqual(mass.shape,(4,6,2,2))
+        for pathIter in range(4):
+            correctAction, _, _ = TargetFunctions.action(paths[pathIter],pot,masses=mass_func)
+            self.assertAlmostEqual(act[pathIter],correctAction,places=14)
+        
+        return None
+    
+class action_terms_(unittest.TestCase):
+    def test_broadcast_mass(self):
+        #One full inertia tensor for all displacements, which has as many axes
+        #as the displacements
+        massArr = np.array([[2,.5],[.5,1]])
+        for nDiffs in [2,5]:
+            coordDiffs = np.resize([[1.,1],[1,-1]],(nDiffs,2))
+            terms = TargetFunctions.action_squared_terms(coordDiffs,np.ones(nDiffs),massArr)
+            
+            correctTerms = [np.dot(dx,np.dot(massArr,dx)) for dx in coordDiffs]
+            self.assertIsNone(np.testing.assert_allclose(terms,correctTerms))
+            self.assertIsNone(np.testing.assert_allclose(terms[:2],[4,2]))
+        
+        return None
+    
+    def test_diagonal_mass(self):
+        coordDiffs = np.array([[1.,1],[1,-1],[2,0]])
+        potArr = np.array([1.,2,3])
+        diagMass = np.array([[1.,3],[2,1],[1,1]])
+        
+        for terms_func in [TargetFunctions.action_terms,TargetFunctions.action_squared_terms]:
+            terms = terms_func(coordDiffs,potArr,diagMass,massIsDiagonal=True)
+            correctTerms = terms_func(coordDiffs,potArr,diagMass[:,:,None]*np.identity(2))
+            self.assertIsNone(np.testing.assert_array_equal(terms,correctTerms))
+        
+        return None
+    
 class term_in_action_sum_(unittest.TestCase):
     def test_array_potential_none_mass(self):
         path = np.arange(4).reshape((2,2))
@@ -348,6 +445,24 @@ class action_squared_(unittest.TestCase):
         
         return None
     
+    def test_stack_of_paths(self):
+        rng = np.random.default_rng(0)
+        paths = rng.random((4,6,2))
+        potential = rng.random((4,6))
+        diagMass = rng.random((4,6,2))
+        
+        actSqr, eneg, mass = TargetFunctions.action_squared(paths,potential,masses=diagMass)
+        
+        self.assertEqual(actSqr.shape,(4,))
+        self.assertEqual(mass.shape,(4,6,2,2))
+        for pathIter in range(4):
+            correctActionSqr, _, _ = \
+                TargetFunctions.action_squared(paths[pathIter],potential[pathIter],\
+                                               masses=mass[pathIter])
+            self.assertAlmostEqual(actSqr[pathIter],correctActionSqr,places=14)
+        
+        return None
+    
 class mep_default_(unittest.TestCase):
     def test_potential_function(self):
         path = np.arange(4).reshape((2,2))
@@ -366,6 +481,30 @@ class mep_default_(unittest.TestCase):
         
         return None
     
+    def test_single_potential_call(self):
+        path = np.arange(4).reshape((2,2))
+        nCalls = [0]
+        def potential(path):
+            nCalls[0] += 1
+            return path[:,0]**2 + path[:,1]**2
+        
+        TargetFunctions.mep_default(path,potential)
+        
+        self.assertEqual(nCalls[0],1)
+        
+        return None
+    
+    def test_array_potential(self):
+        path = np.arange(4).reshape((2,2))
+        potential = np.array([1,13])
+        
+        eneg, aux_eneg = TargetFunctions.mep_default(path,potential)
+        
+        self.assertIsNone(np.testing.assert_array_equal(eneg,potential))
+        self.assertIsNone(aux_eneg)
+        
+        return None
+    
     def test_wrong_potential_shape(self):
         path = np.arange(10).reshape((5,2))
         potential = np.arange(30)**2